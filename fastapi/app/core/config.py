@@ -12,6 +12,8 @@ class Settings:
     DATABASE_POOL_SIZE: int = config("DATABASE_POOL_SIZE", default=20, cast=int)
     DATABASE_MAX_OVERFLOW: int = config("DATABASE_MAX_OVERFLOW", default=30, cast=int)
     DATABASE_POOL_RECYCLE: int = config("DATABASE_POOL_RECYCLE", default=3600, cast=int)
+    # 异步引擎连接串，留空时由 DATABASE_URL 推导（mysql+pymysql → mysql+aiomysql，sqlite → sqlite+aiosqlite）
+    ASYNC_DATABASE_URL: str = config("ASYNC_DATABASE_URL", default="")
 
     # JWT配置
     SECRET_KEY: str = config("SECRET_KEY")
@@ -26,6 +28,9 @@ class Settings:
 
     # 日志配置
     LOG_LEVEL: str = config("LOG_LEVEL", default="INFO")
+    LOG_LEVELS: str = config("LOG_LEVELS", default="")  # 按模块覆盖级别，如 "app.core.redis=DEBUG,app.modules.v2.tech_square=WARNING"
+    LOG_FORMAT: str = config("LOG_FORMAT", default="text")  # text / json
+    LOG_SAMPLE_RATE: float = config("LOG_SAMPLE_RATE", default=0.01, cast=float)  # 每请求缓存事件的日志采样率
 
     # AI服务配置
     BASE_URL: str = config("BASE_URL", default="http://localhost:8100")
@@ -35,10 +40,46 @@ class Settings:
     REDIS_PASSWORD: str = config("REDIS_PASSWORD", default="")
     REDIS_DB: int = config("REDIS_DB", default=0, cast=int)
     REDIS_DECODE_RESPONSES: bool = config("REDIS_DECODE_RESPONSES", default=True, cast=bool)
+    REDIS_MAX_CONNECTIONS: int = config("REDIS_MAX_CONNECTIONS", default=50, cast=int)  # 每个worker的连接池上限
+    REDIS_HEALTH_CHECK_INTERVAL: int = config("REDIS_HEALTH_CHECK_INTERVAL", default=30, cast=int)  # 空闲连接健康检查间隔（秒）
+    REDIS_SOCKET_TIMEOUT: float = config("REDIS_SOCKET_TIMEOUT", default=5, cast=float)
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = config("REDIS_SOCKET_CONNECT_TIMEOUT", default=5, cast=float)
+    REDIS_CB_FAILURE_THRESHOLD: int = config("REDIS_CB_FAILURE_THRESHOLD", default=5, cast=int)  # 连续失败N次后熔断
+    REDIS_CB_RECOVERY_TIMEOUT: float = config("REDIS_CB_RECOVERY_TIMEOUT", default=5, cast=float)  # 熔断后首次探测等待（秒）
+    REDIS_CB_MAX_RECOVERY_TIMEOUT: float = config("REDIS_CB_MAX_RECOVERY_TIMEOUT", default=60, cast=float)  # 退避上限（秒）
 
     # 🆕 缓存配置
     USER_CACHE_TTL: int = config("USER_CACHE_TTL", default=3600, cast=int)  # 1小时
     CACHE_KEY_PREFIX: str = config("CACHE_KEY_PREFIX", default="fastapi_docs")
+    L1_CACHE_MAX_ENTRIES: int = config("L1_CACHE_MAX_ENTRIES", default=512, cast=int)  # 每个缓存服务在单个worker内的L1条目上限
+    L1_CACHE_TTL: float = config("L1_CACHE_TTL", default=10, cast=float)  # L1缓存TTL（秒），兜底限制最大陈旧时间
+    CACHE_INVALIDATION_CHANNEL: str = config("CACHE_INVALIDATION_CHANNEL", default="cache_invalidation")  # 失效广播频道
+    CACHE_SERIALIZER: str = config("CACHE_SERIALIZER", default="orjson")  # 缓存序列化后端：json / orjson / msgpack
+    CACHE_COMPRESSION: str = config("CACHE_COMPRESSION", default="zlib")  # 大数据压缩算法：none / zlib / lz4
+    CACHE_COMPRESS_MIN_BYTES: int = config("CACHE_COMPRESS_MIN_BYTES", default=4096, cast=int)  # 超过该大小才压缩
+    COUNT_CACHE_TTL: int = config("COUNT_CACHE_TTL", default=600, cast=int)  # 列表总数缓存TTL（秒），发布/撤回时按命名空间失效
+    COUNT_EXACT_LIMIT: int = config("COUNT_EXACT_LIMIT", default=10000, cast=int)  # 总数最多精确数到该值，超过返回近似值
+    VIEW_FLUSH_INTERVAL: float = config("VIEW_FLUSH_INTERVAL", default=10, cast=float)  # 浏览量缓冲写回MySQL的间隔（秒）
+    VIEW_FLUSH_BATCH_SIZE: int = config("VIEW_FLUSH_BATCH_SIZE", default=500, cast=int)  # 每条 UPDATE ... CASE 最多包含的文档数
+    VIEW_DEDUP_WINDOW: int = config("VIEW_DEDUP_WINDOW", default=1800, cast=int)  # 同一访客在该时间（秒）内重复浏览只计一次
+    UNIQUE_VIEW_RETENTION_DAYS: int = config("UNIQUE_VIEW_RETENTION_DAYS", default=30, cast=int)  # 按天的独立访客HyperLogLog保留天数
+    UNIQUE_VIEW_ALL_TIME_TTL_DAYS: int = config("UNIQUE_VIEW_ALL_TIME_TTL_DAYS", default=365, cast=int)  # 累计独立访客HyperLogLog在最后一次计数后保留的天数（每次计数刷新）
+    ACCESS_LOG_BATCH_SIZE: int = config("ACCESS_LOG_BATCH_SIZE", default=200, cast=int)  # 分享访问日志每批最多写入的条数
+    ACCESS_LOG_FLUSH_INTERVAL: float = config("ACCESS_LOG_FLUSH_INTERVAL", default=0.5, cast=float)  # 未攒满一批时的写库间隔（秒）
+    ACCESS_LOG_QUEUE_SIZE: int = config("ACCESS_LOG_QUEUE_SIZE", default=10000, cast=int)  # 每个worker访问日志队列的容量
+    ACCESS_LOG_ENQUEUE_TIMEOUT: float = config("ACCESS_LOG_ENQUEUE_TIMEOUT", default=0.05, cast=float)  # 队列满时请求最多等待的时间（秒），超时丢弃
+    SHARE_ACCESS_LOG_RETENTION_DAYS: int = config("SHARE_ACCESS_LOG_RETENTION_DAYS", default=90, cast=int)  # 分享访问原始日志保留天数，之前的移入归档表
+    SHARE_ACCESS_LOG_ARCHIVE_BATCH: int = config("SHARE_ACCESS_LOG_ARCHIVE_BATCH", default=1000, cast=int)  # 归档每批移动的日志条数
+    INTERACTION_STATS_TTL: int = config("INTERACTION_STATS_TTL", default=86400, cast=int)  # 互动计数Redis镜像的TTL（秒）
+    INTERACTION_RECONCILE_INTERVAL: float = config("INTERACTION_RECONCILE_INTERVAL", default=3600, cast=float)  # 互动计数校对间隔（秒）
+    INTERACTION_RECONCILE_BATCH_SIZE: int = config("INTERACTION_RECONCILE_BATCH_SIZE", default=500, cast=int)  # 校对每批的文档数
+    COMMENT_REPLY_PREVIEW_SIZE: int = config("COMMENT_REPLY_PREVIEW_SIZE", default=3, cast=int)  # 评论列表中每条评论预览的回复数，其余回复按游标分页加载
+    COMMENT_CACHE_TTL: int = config("COMMENT_CACHE_TTL", default=300, cast=int)  # 评论第一页缓存TTL（秒），评论增删改时按命名空间失效
+    UPLOAD_CHUNK_SIZE: int = config("UPLOAD_CHUNK_SIZE", default=1024 * 1024, cast=int)  # 文件上传分块读取/写入的块大小（字节），即每个上传的内存占用上限
+
+    # 全文检索配置
+    SEARCH_ENGINE: str = config("SEARCH_ENGINE", default="index")  # index：倒排索引+BM25；like：旧的 LIKE 模糊匹配
+    SEARCH_CONTENT_MAX_CHARS: int = config("SEARCH_CONTENT_MAX_CHARS", default=200000, cast=int)  # 每篇文档正文最多索引的字符数
 
     @property
     def is_production(self) -> bool:
@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .lazy_session import LazyAsyncSession, LazySession, SessionMetrics
 
 # 创建数据库引擎（添加连接池配置）
 engine = create_engine(
@@ -19,10 +21,68 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # 创建基础模型类
 Base = declarative_base()
 
-# 数据库依赖函数
+
+def _async_database_url() -> str:
+    """异步驱动连接串：未单独配置时把同步驱动替换为对应的异步驱动"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+
+    url = settings.DATABASE_URL
+    for sync_prefix, async_prefix in (
+            ("mysql+pymysql://", "mysql+aiomysql://"),
+            ("mysql://", "mysql+aiomysql://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+def _create_async_engine():
+    url = _async_database_url()
+    # sqlite（测试环境）不使用连接池参数
+    if url.startswith("sqlite"):
+        return create_async_engine(url, echo=settings.is_development)
+    return create_async_engine(
+        url,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=True,
+        echo=settings.is_development
+    )
+
+
+# 异步数据库引擎：async 路由中的查询不再阻塞事件循环
+async_engine = _create_async_engine()
+
+# 异步会话工厂（提交后不过期对象，避免在异步上下文中触发隐式懒加载）
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+
+# 会话使用统计：多少请求完全没有访问数据库（按worker进程统计）
+sync_session_metrics = SessionMetrics("sync")
+async_session_metrics = SessionMetrics("async")
+
+event.listen(engine, "checkout", sync_session_metrics.record_checkout)
+event.listen(async_engine.sync_engine, "checkout", async_session_metrics.record_checkout)
+
+
+# 数据库依赖函数（惰性会话：缓存命中的请求不会创建会话，也不会从连接池取连接）
 def get_db():
-    db = SessionLocal()
+    db = LazySession(SessionLocal)
+    try:
+        yield db
+    finally:
+        db.close()
+        sync_session_metrics.record_request(db.opened)
+
+
+# 异步数据库依赖函数（async def 路由使用）
+async def get_async_db():
+    db = LazyAsyncSession(AsyncSessionLocal)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
+        async_session_metrics.record_request(db.opened)
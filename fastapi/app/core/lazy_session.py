@@ -0,0 +1,89 @@
+"""
+请求级惰性数据库会话
+功能：get_db / get_async_db 注入的是会话代理，只有真正访问会话（查询、add、commit 等）时才创建
+Session 并从连接池取连接；缓存命中的请求从头到尾不会触碰 MySQL
+
+统计：
+- requests:        使用了数据库依赖的请求数
+- sessions_opened: 实际创建了会话的请求数
+- without_db:      整个请求没有访问数据库的请求数（缓存命中等）
+- checkouts:       连接池取连接次数（包含后台刷新等非请求会话）
+"""
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class SessionMetrics:
+    """数据库会话使用统计（每个引擎一份）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.sessions_opened = 0
+        self.checkouts = 0
+
+    def record_request(self, opened: bool):
+        with self._lock:
+            self.requests += 1
+            if opened:
+                self.sessions_opened += 1
+
+    def record_checkout(self, *_):
+        """连接池 checkout 事件回调"""
+        with self._lock:
+            self.checkouts += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            without_db = self.requests - self.sessions_opened
+            return {
+                "requests": self.requests,
+                "sessions_opened": self.sessions_opened,
+                "without_db": without_db,
+                "without_db_ratio": round(without_db / self.requests, 4) if self.requests else 0.0,
+                "checkouts": self.checkouts,
+            }
+
+
+class LazySession:
+    """
+    同步 Session 代理：首次访问属性时才创建会话
+
+    代理本身总是为真（兼容 `kwargs.get('db') or db` 这类写法），判断真值不会创建会话
+    """
+
+    __slots__ = ("_factory", "_session")
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._session: Optional[Any] = None
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get_session(), name)
+
+    def __bool__(self) -> bool:
+        return True
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class LazyAsyncSession(LazySession):
+    """AsyncSession 代理：首次访问属性时才创建会话"""
+
+    __slots__ = ()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
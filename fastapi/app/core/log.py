@@ -0,0 +1,102 @@
+"""
+日志工具
+功能：替代热路径上的 print，提供按模块分级、惰性格式化、可采样的结构化日志
+
+使用约定：
+- 模块内 logger = get_logger(__name__)
+- 消息使用 %s 占位符而不是 f-string：级别未开启时不做任何字符串格式化
+- 结构化字段通过 fields 传入，只在真正输出时才格式化（text 为 key=value，json 为一行JSON）
+- 每个请求都会触发的缓存事件（命中/未命中/回源）使用 log_sampled，按 LOG_SAMPLE_RATE 采样
+- 不在日志中输出缓存数据本身（payload），只输出Key、数量、耗时等元信息
+"""
+import json
+import logging
+import random
+from typing import Any, Dict, Optional
+
+from .config import settings
+
+_FIELDS_ATTR = "fields"
+
+
+class StructuredFormatter(logging.Formatter):
+    """在普通日志格式后追加结构化字段；LOG_FORMAT=json 时整行输出JSON"""
+
+    def __init__(self, fmt: Optional[str] = None, as_json: bool = False):
+        super().__init__(fmt)
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields: Optional[Dict[str, Any]] = getattr(record, _FIELDS_ATTR, None)
+
+        if self.as_json:
+            payload = {
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+            }
+            if fields:
+                payload.update(fields)
+            if record.exc_info:
+                payload["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
+        message = super().format(record)
+        if fields:
+            message += " | " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+def _parse_module_levels(spec: str) -> Dict[str, int]:
+    """解析 "app.core.redis=WARNING,app.modules.v2.tech_square=DEBUG" 形式的按模块级别配置"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.strip().partition("=")
+        if not sep or not name.strip():
+            continue
+        value = logging.getLevelName(level.strip().upper())
+        if isinstance(value, int):
+            levels[name.strip()] = value
+    return levels
+
+
+def setup_logging():
+    """配置根日志与按模块级别（应用启动时调用一次）"""
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        as_json=settings.LOG_FORMAT.lower() == "json"
+    ))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+
+    for name, level in _parse_module_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def log_sampled(logger: logging.Logger, level: int, msg: str, *args: Any,
+                rate: Optional[float] = None, **fields: Any):
+    """
+    采样输出每请求级别的事件
+
+    先检查级别（未开启时直接返回，不做采样和格式化），再按采样率决定是否输出
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = settings.LOG_SAMPLE_RATE if rate is None else rate
+    if rate < 1.0 and random.random() >= rate:
+        return
+    logger.log(level, msg, *args, extra={_FIELDS_ATTR: fields} if fields else None)
+
+
+def log_fields(logger: logging.Logger, level: int, msg: str, *args: Any, **fields: Any):
+    """输出带结构化字段的日志（不采样）"""
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, *args, extra={_FIELDS_ATTR: fields} if fields else None)
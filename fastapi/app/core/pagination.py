@@ -0,0 +1,124 @@
+"""
+游标（keyset）分页与总数统计
+功能：把排序键和ID编码为不透明的游标，下一页用 WHERE (排序键, id) < (上一页末行) 代替 OFFSET，
+翻到多深都只扫描一页的数据；游标模式不计算总数
+
+总数：最多精确数到 cap 行（COUNT 包一层 LIMIT cap + 1），超过时返回 cap 并标记为近似值，
+匹配行很多时 COUNT 的开销有上限
+
+约定：
+- 所有排序列方向一致（默认降序，升序列表如评论回复用 keyset_after(..., descending=False)），
+  最后一列必须是唯一的ID作为平局裁决
+- 游标绑定排序方式（kind），换排序方式后旧游标无效
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, or_, select
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析或与当前排序方式不匹配"""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+        raise InvalidCursorError("游标格式错误")
+    return value
+
+
+def encode_cursor(kind: str, values: Sequence[Any]) -> str:
+    """把排序键编码为URL安全的游标"""
+    payload = json.dumps({"k": kind, "v": [_encode_value(value) for value in values]},
+                         separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str) -> List[Any]:
+    """解析游标，返回排序键；格式错误或排序方式不匹配时抛出 InvalidCursorError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        values = [_decode_value(value) for value in payload["v"]]
+        cursor_kind = payload["k"]
+    except InvalidCursorError:
+        raise
+    except Exception:
+        raise InvalidCursorError("游标格式错误")
+
+    if cursor_kind != kind:
+        raise InvalidCursorError("游标与当前排序方式不匹配")
+    if any(value is None for value in values):
+        raise InvalidCursorError("游标格式错误")
+    return values
+
+
+def keyset_after(columns: Sequence[Any], values: Sequence[Any], descending: bool = True):
+    """
+    “位于游标之后”的条件，降序时：
+    (c1 < v1) OR (c1 = v1 AND c2 < v2) OR ...（升序时比较符为 >）
+
+    展开为 OR 而不用行构造器比较，MySQL 可以直接用复合索引做范围扫描
+    """
+    if len(columns) != len(values):
+        raise InvalidCursorError("游标与当前排序方式不匹配")
+
+    branches = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        branches.append(and_(*equal_prefix, column < value if descending else column > value))
+    return or_(*branches)
+
+
+def slice_page(rows: Sequence[Any], size: int, kind: str,
+               key_func: Callable[[Any], Sequence[Any]]) -> Tuple[List[Any], bool, Optional[str]]:
+    """
+    处理多取一行（limit size + 1）的查询结果
+
+    Returns:
+        (本页数据, 是否有下一页, 下一页游标)
+    """
+    has_next = len(rows) > size
+    page_rows = list(rows[:size])
+    next_cursor = encode_cursor(kind, key_func(page_rows[-1])) if has_next and page_rows else None
+    return page_rows, has_next, next_cursor
+
+
+def page_cursor(rows: Sequence[Any], has_next: bool, kind: str,
+                key_func: Callable[[Any], Sequence[Any]]) -> Optional[str]:
+    """页码分页时本页末行的游标：客户端可以从任意一页切换到游标分页继续向后翻"""
+    return encode_cursor(kind, key_func(rows[-1])) if has_next and rows else None
+
+
+def capped_count_select(stmt, cap: Optional[int] = None):
+    """列表语句对应的总数语句（去掉排序）；指定 cap 时最多数到 cap + 1 行"""
+    inner = stmt.order_by(None)
+    if cap:
+        inner = inner.limit(cap + 1)
+    return select(func.count()).select_from(inner.subquery())
+
+
+def capped_total(count: int, cap: Optional[int]) -> Tuple[int, bool]:
+    """把最多数到 cap + 1 的行数转换为 (总数, 是否近似)"""
+    if cap and count > cap:
+        return cap, True
+    return count, False
@@ -0,0 +1,381 @@
+"""
+Redis异步客户端 - 基于 redis.asyncio
+
+供 async def 的缓存服务使用：命令在事件循环上以非阻塞方式执行，
+Redis变慢时只挂起当前协程，不会卡住整个worker。
+同步客户端（client.py）继续服务于同步调用方，例如 AuthService.get_current_user。
+
+与同步客户端共享同一个熔断器：任一侧发现Redis故障，两侧都会快速失败。
+
+缓存数据是带格式标记的二进制（见 serializer.py），因此异步连接池固定不解码响应，
+GET 返回 bytes；标签成员等文本结果在本模块内解码后返回。
+"""
+import os
+import redis
+import redis.asyncio as aioredis
+from typing import Optional, Any, Dict, Callable, List, Tuple
+
+from ..config import settings
+from ..log import get_logger
+from .circuit_breaker import CircuitBreaker, redis_circuit_breaker
+from .client import RECORD_VIEW_LUA, _PoolMetrics
+from .local_cache import build_invalidation_message
+from .tags import GET_VERSIONED_LUA, INVALIDATE_TAGS_LUA, TAG_TTL, namespace_gen_key, tag_key
+
+logger = get_logger(__name__)
+
+async_pool_metrics = _PoolMetrics()
+
+# 只有锁的持有者（token一致）才能删除锁
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# 开始一次哈希写回：把缓冲哈希整体改名为"写回中"哈希并登记写回编号（_gen 字段）
+# 上一次写回尚未结束（"写回中"哈希仍存在）时不开始新的写回；取走期间的新增量写入新的缓冲哈希
+# KEYS: 缓冲哈希, 写回中哈希, 写回编号计数器  ARGV: 写回中哈希的过期时间（秒）
+# 返回 {写回编号, field1, value1, ...}；无需写回返回 {}，已有写回进行中返回 {-1}
+_BEGIN_HASH_FLUSH_LUA = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return {-1}
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {}
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+local data = redis.call('HGETALL', KEYS[2])
+local gen = redis.call('INCR', KEYS[3])
+redis.call('HSET', KEYS[2], '_gen', gen)
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[1]))
+table.insert(data, 1, gen)
+return data
+"""
+
+# 结束一次哈希写回：把"写回中"哈希的增量累加到目标哈希后删除（编号不一致说明已过期被别的写回取代，不处理）
+# KEYS: 写回中哈希, 目标哈希  ARGV: 写回编号
+_END_HASH_FLUSH_LUA = """
+if redis.call('HGET', KEYS[1], '_gen') ~= ARGV[1] then
+    return 0
+end
+local data = redis.call('HGETALL', KEYS[1])
+for i = 1, #data, 2 do
+    if data[i] ~= '_gen' then
+        redis.call('HINCRBY', KEYS[2], data[i], data[i + 1])
+    end
+end
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+
+class _TrackedAsyncConnectionMixin:
+    """记录真实 socket 建立/断开次数的异步连接混入类"""
+
+    async def connect(self):
+        was_connected = self.is_connected
+        await super().connect()
+        if not was_connected and self.is_connected:
+            async_pool_metrics.record_connect()
+
+    async def disconnect(self, *args, **kwargs):
+        was_connected = self.is_connected
+        await super().disconnect(*args, **kwargs)
+        if was_connected:
+            async_pool_metrics.record_disconnect()
+
+
+class TrackedAsyncConnection(_TrackedAsyncConnectionMixin, aioredis.Connection):
+    pass
+
+
+class TrackedAsyncSSLConnection(_TrackedAsyncConnectionMixin, aioredis.SSLConnection):
+    pass
+
+
+def _build_async_connection_pool() -> aioredis.ConnectionPool:
+    """根据配置创建进程级异步连接池（连接在首次使用时于当前事件循环中建立）"""
+    connection_class = TrackedAsyncSSLConnection if settings.REDIS_URL.startswith("rediss://") else TrackedAsyncConnection
+    return aioredis.ConnectionPool.from_url(
+        settings.REDIS_URL,
+        connection_class=connection_class,
+        password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
+        db=settings.REDIS_DB,
+        decode_responses=False,  # 缓存数据为二进制格式
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        retry_on_timeout=False  # 超时不重试：由熔断器记失败并降级，重试会让每条慢命令付出两次超时
+    )
+
+
+class AsyncRedisClient:
+    """Redis异步客户端封装（基于共享异步连接池 + 熔断器）"""
+
+    def __init__(self, pool: Optional[aioredis.ConnectionPool] = None, breaker: Optional[CircuitBreaker] = None):
+        self._pool = pool or _build_async_connection_pool()
+        self.breaker = breaker or redis_circuit_breaker
+        self._redis = aioredis.Redis(connection_pool=self._pool)
+        self._release_lock_script = self._redis.register_script(_RELEASE_LOCK_LUA)
+        self._invalidate_tags_script = self._redis.register_script(INVALIDATE_TAGS_LUA)
+        self._get_versioned_script = self._redis.register_script(GET_VERSIONED_LUA)
+        self._begin_hash_flush_script = self._redis.register_script(_BEGIN_HASH_FLUSH_LUA)
+        self._end_hash_flush_script = self._redis.register_script(_END_HASH_FLUSH_LUA)
+        self._record_view_script = self._redis.register_script(RECORD_VIEW_LUA)
+
+    def is_available(self) -> bool:
+        """检查Redis是否可用（只看熔断器状态，不发送PING）"""
+        return not self.breaker.is_open()
+
+    async def _execute(self, command: str, func: Callable, *args, default: Any = None, **kwargs) -> Any:
+        """通过熔断器执行一次异步Redis命令（规则与同步客户端一致）"""
+        if not self.breaker.allow_request():
+            return default
+        settled = False
+        try:
+            result = await func(*args, **kwargs)
+            settled = True
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            settled = True
+            self.breaker.record_failure()
+            logger.warning("❌ Redis(async) %s 连接错误: %s", command, e)
+            return default
+        except redis.RedisError as e:
+            settled = True
+            self.breaker.record_success()
+            logger.error("❌ Redis(async) %s 错误: %s", command, e)
+            return default
+        finally:
+            # 非Redis异常向上抛出前归还探测机会，否则 HALF_OPEN 状态会一直拒绝请求
+            if not settled:
+                self.breaker.release_probe()
+        self.breaker.record_success()
+        return result
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """获取数据（返回原始bytes，不自动解析）"""
+        return await self._execute("GET", self._redis.get, key)
+
+    async def get_with_ttl(self, key: str) -> Tuple[Optional[bytes], int]:
+        """在一次往返内同时获取数据和剩余TTL（pipeline，无事务）"""
+        async def _get_with_ttl():
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.ttl(key)
+                return tuple(await pipe.execute())
+
+        return await self._execute("GET+TTL", _get_with_ttl, default=(None, -1))
+
+    async def get_versioned(self, namespace: str, key: str) -> Tuple[int, Optional[bytes], int]:
+        """
+        读取版本化命名空间下的数据（一次Lua调用）
+
+        返回 (当前版本号, 数据, 剩余TTL)
+        """
+        async def _get_versioned():
+            gen, value, ttl = await self._get_versioned_script(
+                keys=[namespace_gen_key(namespace)],
+                args=[f"{namespace}:g", f":{key}"]
+            )
+            return int(gen), value, int(ttl)
+
+        return await self._execute("GET VERSIONED", _get_versioned, default=(0, None, -1))
+
+    async def setex(self, key: str, time: int, value: Any) -> bool:
+        """设置数据并指定过期时间（接受已序列化的值）"""
+        return bool(await self._execute("SETEX", self._redis.setex, key, time, value, default=False))
+
+    async def setex_with_tags(self, key: str, time: int, value: Any, tags: List[str]) -> bool:
+        """写入数据并登记到标签集合（SETEX + SADD + EXPIRE 在一次往返内完成）"""
+        if not tags:
+            return await self.setex(key, time, value)
+
+        async def _setex_with_tags():
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.setex(key, time, value)
+                for tag in tags:
+                    pipe.sadd(tag_key(tag), key)
+                    pipe.expire(tag_key(tag), TAG_TTL)
+                return (await pipe.execute())[0]
+
+        return bool(await self._execute("SETEX+TAGS", _setex_with_tags, default=False))
+
+    async def invalidate_tags(self, tags: List[str], namespaces: Optional[List[str]] = None) -> int:
+        """按标签删除缓存并递增命名空间版本号（一次Lua调用），返回按标签删除的缓存Key数量"""
+        namespaces = namespaces or []
+        if not tags and not namespaces:
+            return 0
+        keys = [tag_key(tag) for tag in tags] + [namespace_gen_key(ns) for ns in namespaces]
+        args = [len(tags), settings.CACHE_INVALIDATION_CHANNEL, build_invalidation_message(tags, namespaces)]
+        return await self._execute("INVALIDATE", self._invalidate_tags_script, keys=keys, args=args, default=0)
+
+    async def ttl(self, key: str) -> int:
+        """获取键的剩余生存时间（秒）"""
+        return await self._execute("TTL", self._redis.ttl, key, default=-1)
+
+    async def delete(self, *keys: str) -> int:
+        """删除一个或多个key，返回删除数量"""
+        if not keys:
+            return 0
+        return await self._execute("DELETE", self._redis.delete, *keys, default=0)
+
+    async def exists(self, key: str) -> bool:
+        """检查key是否存在"""
+        return await self._execute("EXISTS", self._redis.exists, key, default=0) > 0
+
+    async def acquire_lock(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        """
+        抢占分布式锁（SET key token NX PX ttl）
+
+        返回 True=抢到锁，False=锁被其他进程持有，None=Redis不可用
+        """
+        async def _acquire():
+            return bool(await self._redis.set(key, token, nx=True, px=ttl_ms))
+
+        return await self._execute("SET NX", _acquire, default=None)
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        """释放分布式锁（只删除自己持有的锁，避免误删其他进程续上的锁）"""
+        return bool(await self._execute("UNLOCK", self._release_lock_script, keys=[key], args=[token], default=0))
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> Optional[int]:
+        """哈希字段原子加减，返回新值；Redis不可用时返回 None"""
+        return await self._execute("HINCRBY", self._redis.hincrby, key, field, amount)
+
+    async def hincrby_many(self, key: str, increments: Dict[str, int]) -> bool:
+        """一次往返内对多个哈希字段加减（pipeline，无事务）"""
+        if not increments:
+            return True
+
+        async def _hincrby_many():
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for field, amount in increments.items():
+                    pipe.hincrby(key, field, amount)
+                await pipe.execute()
+            return True
+
+        return bool(await self._execute("HINCRBY*", _hincrby_many, default=False))
+
+    async def hmget_many(self, keys: List[str], fields: List[str]) -> List[List[Optional[bytes]]]:
+        """一次往返内从多个哈希读取同一组字段（pipeline，无事务）；Redis不可用时全部返回 None"""
+        if not fields:
+            return [[] for _ in keys]
+
+        async def _hmget_many():
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.hmget(key, fields)
+                return await pipe.execute()
+
+        return await self._execute("HMGET*", _hmget_many, default=[[None] * len(fields) for _ in keys])
+
+    async def hgetall_many(self, keys: List[str]) -> Optional[List[Dict[str, str]]]:
+        """一次往返内读取多个哈希（pipeline，无事务），不存在的哈希为空dict；Redis不可用时返回 None"""
+        if not keys:
+            return []
+
+        async def _hgetall_many():
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.hgetall(key)
+                return await pipe.execute()
+
+        results = await self._execute("HGETALL*", _hgetall_many)
+        if results is None:
+            return None
+        return [
+            {
+                (field.decode("utf-8") if isinstance(field, bytes) else field):
+                    (value.decode("utf-8") if isinstance(value, bytes) else value)
+                for field, value in data.items()
+            }
+            for data in results
+        ]
+
+    async def hset_many_with_ttl(self, mappings: Dict[str, Dict[str, Any]], ttl: int) -> bool:
+        """一次往返内写入多个哈希并设置过期时间（pipeline，无事务）"""
+        if not mappings:
+            return True
+
+        async def _hset_many_with_ttl():
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, mapping in mappings.items():
+                    pipe.hset(key, mapping=mapping)
+                    pipe.expire(key, ttl)
+                await pipe.execute()
+            return True
+
+        return bool(await self._execute("HSET*", _hset_many_with_ttl, default=False))
+
+    async def begin_hash_flush(self, key: str, flushing_key: str, gen_key: str,
+                               ttl: int) -> Optional[Tuple[int, Dict[str, str]]]:
+        """
+        开始一次哈希写回（见 _BEGIN_HASH_FLUSH_LUA）
+
+        返回 (写回编号, 增量)；缓冲区为空时编号为0，已有写回进行中时编号为-1；Redis不可用时返回 None
+        """
+        data = await self._execute("BEGIN FLUSH", self._begin_hash_flush_script,
+                                   keys=[key, flushing_key, gen_key], args=[ttl])
+        if data is None:
+            return None
+        if not data:
+            return 0, {}
+        decoded = [item.decode("utf-8") if isinstance(item, bytes) else item for item in data[1:]]
+        return int(data[0]), dict(zip(decoded[::2], decoded[1::2]))
+
+    async def end_hash_flush(self, flushing_key: str, target_key: str, gen: int) -> bool:
+        """结束一次哈希写回：增量累加到 target_key（见 _END_HASH_FLUSH_LUA）"""
+        return bool(await self._execute("END FLUSH", self._end_hash_flush_script,
+                                        keys=[flushing_key, target_key], args=[gen], default=0))
+
+    async def record_view(self, seen_key: str, window: int, hll_ttls: Dict[str, int], visitor: str) -> Optional[int]:
+        """记录一次浏览（返回值同同步客户端：0=重复浏览，1=新浏览，2=新浏览且是新访客，None=Redis不可用）"""
+        return await self._execute("RECORD VIEW", self._record_view_script,
+                                   keys=[seen_key, *hll_ttls], args=[visitor, window, *hll_ttls.values()])
+
+    async def pfcount_many(self, key_groups: List[List[str]]) -> List[Optional[int]]:
+        """
+        一次往返内执行多个 PFCOUNT（pipeline，无事务），每组多个Key时返回其并集的基数
+
+        Redis不可用时全部返回 None
+        """
+        if not key_groups:
+            return []
+
+        async def _pfcount_many():
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for keys in key_groups:
+                    pipe.pfcount(*keys)
+                return await pipe.execute()
+
+        return await self._execute("PFCOUNT*", _pfcount_many, default=[None] * len(key_groups))
+
+    def pubsub(self) -> aioredis.client.PubSub:
+        """创建发布订阅对象（占用一个独立连接，用于接收缓存失效广播）"""
+        return self._redis.pubsub(ignore_subscribe_messages=True)
+
+    async def close(self):
+        """关闭连接池（应用退出时调用）"""
+        await self._pool.disconnect()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取当前进程的异步连接池统计（字段含义同同步客户端）"""
+        pool = self._pool
+        available = len(getattr(pool, "_available_connections", []))
+        in_use = len(getattr(pool, "_in_use_connections", []))
+        return {
+            "pid": os.getpid(),
+            "max_connections": pool.max_connections,
+            "created_connections": getattr(pool, "_created_connections", available + in_use),
+            "available_connections": available,
+            "in_use_connections": in_use,
+            "connects_total": async_pool_metrics.connects,
+            "disconnects_total": async_pool_metrics.disconnects,
+        }
+
+
+# 全局异步Redis客户端实例（进程内唯一，所有异步缓存服务共享）
+async_redis_client = AsyncRedisClient()
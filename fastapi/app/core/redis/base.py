@@ -1,6 +1,7 @@
 """
 Redis缓存基类 - 提供通用缓存操作
 """
+import json
 from abc import ABC, abstractmethod
 from typing import Optional, Any, Dict
 from .client import redis_client
@@ -21,9 +22,15 @@ class BaseCacheService(ABC):
         return f"{self.key_prefix}:{identifier}"
 
     def get(self, identifier: str) -> Optional[Any]:
-        """获取缓存数据"""
+        """获取缓存数据（set时以JSON写入，这里对应解析）"""
         key = self._make_key(identifier)
-        return self.redis_client.get(key)
+        raw = self.redis_client.get(key)
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            return None
 
     def set(self, identifier: str, data: Any, ttl: int = None) -> bool:
         """设置缓存数据"""
@@ -0,0 +1,141 @@
+"""
+Redis熔断器
+功能：根据真实命令的失败情况判断Redis是否可用，替代每次操作前的PING
+
+状态流转：
+- CLOSED（正常）：命令直接执行，连续失败达到阈值后转为 OPEN
+- OPEN（熔断）：所有命令直接跳过（不建连、不等超时），等待退避时间结束
+- HALF_OPEN（探测）：退避结束后只放行一个探测命令，成功则恢复 CLOSED，
+  失败则重新 OPEN 并加倍退避时间（不超过上限）
+"""
+import time
+import threading
+from typing import Dict, Any
+
+from ..config import settings
+from ..log import get_logger
+
+logger = get_logger(__name__)
+
+
+class CircuitBreaker:
+    """线程安全的简单熔断器"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self,
+            name: str,
+            failure_threshold: int = 5,
+            recovery_timeout: float = 5.0,
+            max_recovery_timeout: float = 60.0
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max(recovery_timeout, max_recovery_timeout)
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._recovery_timeout = recovery_timeout
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        # 统计信息
+        self._total_failures = 0
+        self._times_opened = 0
+        self._rejected_calls = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_open(self) -> bool:
+        """熔断中且未到探测时间（不消耗探测机会）"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return False
+            return time.monotonic() - self._opened_at < self._recovery_timeout
+
+    def allow_request(self) -> bool:
+        """判断是否允许执行命令；OPEN 状态下到期后放行唯一的探测请求"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self._recovery_timeout:
+                    self._rejected_calls += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            # HALF_OPEN：同一时间只允许一个探测
+            if self._probe_in_flight:
+                self._rejected_calls += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        """命令执行成功"""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("✅ [CIRCUIT] %s 探测成功，熔断器恢复", self.name)
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._recovery_timeout = self.base_recovery_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """命令因连接/超时失败"""
+        with self._lock:
+            self._total_failures += 1
+            self._consecutive_failures += 1
+
+            if self._state == self.HALF_OPEN:
+                # 探测失败：重新熔断并加倍退避
+                self._recovery_timeout = min(self._recovery_timeout * 2, self.max_recovery_timeout)
+                self._trip()
+            elif self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._trip()
+
+    def release_probe(self):
+        """命令既未成功也未因连接失败结束（如调用方代码抛出的非Redis异常、协程被取消）：归还探测机会，状态不变"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _trip(self):
+        """进入 OPEN 状态（调用方需持有锁）"""
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._times_opened += 1
+        logger.warning("⚠️ [CIRCUIT] %s 熔断开启，%.1f秒后探测", self.name, self._recovery_timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """熔断器统计信息"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout": self._recovery_timeout,
+                "total_failures": self._total_failures,
+                "times_opened": self._times_opened,
+                "rejected_calls": self._rejected_calls,
+            }
+
+
+# 全局Redis熔断器（同一进程内所有Redis客户端共享同一个可用性判断）
+redis_circuit_breaker = CircuitBreaker(
+    name="redis",
+    failure_threshold=settings.REDIS_CB_FAILURE_THRESHOLD,
+    recovery_timeout=settings.REDIS_CB_RECOVERY_TIMEOUT,
+    max_recovery_timeout=settings.REDIS_CB_MAX_RECOVERY_TIMEOUT
+)
@@ -1,130 +1,305 @@
 """
 Redis客户端 - 统一连接管理
+
+每个进程（gunicorn worker）只创建一个 ConnectionPool，所有缓存服务共享
+同一个 RedisClient 实例，不再各自建池，也不在导入时连接/PING。
+连接在第一次执行命令时才按需建立。
 """
+import os
 import json
+import threading
 import redis
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Callable, List, Tuple
 from ..config import settings
+from ..log import get_logger
+from .circuit_breaker import CircuitBreaker, redis_circuit_breaker
+from .local_cache import build_invalidation_message
+from .tags import GET_VERSIONED_LUA, INVALIDATE_TAGS_LUA, namespace_gen_key, tag_key
 
+logger = get_logger(__name__)
 
-class RedisClient:
-    """Redis客户端封装"""
+# 哈希存在时才更新（数据库镜像：不存在时不创建残缺的哈希，由读取方从数据库完整回填）
+# ARGV[1]=加减的字段数n，ARGV[2..2n+1]=HINCRBY 的字段/增量，其余=HSET 的字段/值
+_UPDATE_HASH_IF_EXISTS_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local increments = tonumber(ARGV[1])
+for i = 2, #ARGV, 2 do
+    if (i - 2) / 2 < increments then
+        redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+    else
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+return 1
+"""
+
+# 浏览去重 + 独立访客计数（一次往返）：去重窗口内已浏览过直接返回0，否则把访客加入各个HyperLogLog
+# 返回 1=新浏览，2=新浏览且是 KEYS[2] 中的新访客（PFADD 改变了基数估计）
+# KEYS[1]=去重Key，KEYS[2..n]=HyperLogLog；ARGV[1]=访客标识，ARGV[2]=去重窗口（秒），ARGV[3..]=各HLL的TTL（0=不过期）
+RECORD_VIEW_LUA = """
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[2]) then
+    return 0
+end
+local result = 1
+for i = 2, #KEYS do
+    local added = redis.call('PFADD', KEYS[i], ARGV[1])
+    if i == 2 and added == 1 then
+        result = 2
+    end
+    local ttl = tonumber(ARGV[i + 1])
+    if ttl > 0 then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return result
+"""
+
+
+class _PoolMetrics:
+    """连接池统计（进程内计数，用于观察连接抖动）"""
 
     def __init__(self):
-        print("🔍 [DEBUG] 初始化Redis客户端...")
-        self._redis = None
-        self._connect()
-        print(f"🔍 [DEBUG] Redis客户端初始化完成，状态: {self.is_available()}")
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.disconnects = 0
 
-    def _connect(self):
-        """连接Redis"""
-        try:
-            self._redis = redis.from_url(
-                settings.REDIS_URL,
-                password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
-                db=settings.REDIS_DB,
-                decode_responses=settings.REDIS_DECODE_RESPONSES,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True
-            )
-            self._redis.ping()
-            print("✅ Redis连接成功")
-        except Exception as e:
-            print(f"❌ Redis连接失败: {e}")
-            print("📝 系统将使用数据库模式运行（无缓存）")
-            self._redis = None
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_disconnect(self):
+        with self._lock:
+            self.disconnects += 1
+
+
+pool_metrics = _PoolMetrics()
+
+
+class _TrackedConnectionMixin:
+    """记录真实 socket 建立/断开次数的连接混入类"""
+
+    def connect(self):
+        had_socket = self._sock is not None
+        super().connect()
+        if not had_socket and self._sock is not None:
+            pool_metrics.record_connect()
+
+    def disconnect(self, *args):
+        had_socket = self._sock is not None
+        super().disconnect(*args)
+        if had_socket:
+            pool_metrics.record_disconnect()
+
+
+class TrackedConnection(_TrackedConnectionMixin, redis.Connection):
+    pass
+
+
+class TrackedSSLConnection(_TrackedConnectionMixin, redis.SSLConnection):
+    pass
+
+
+def _build_connection_pool() -> redis.ConnectionPool:
+    """根据配置创建进程级连接池"""
+    connection_class = TrackedSSLConnection if settings.REDIS_URL.startswith("rediss://") else TrackedConnection
+    return redis.ConnectionPool.from_url(
+        settings.REDIS_URL,
+        connection_class=connection_class,
+        password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
+        db=settings.REDIS_DB,
+        decode_responses=settings.REDIS_DECODE_RESPONSES,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        retry_on_timeout=False  # 超时不重试：由熔断器记失败并降级，重试会让每条慢命令付出两次超时
+    )
+
+
+class RedisClient:
+    """Redis客户端封装（基于共享连接池）"""
+
+    def __init__(self, pool: Optional[redis.ConnectionPool] = None, breaker: Optional[CircuitBreaker] = None):
+        self._pool = pool or _build_connection_pool()
+        self.breaker = breaker or redis_circuit_breaker
+        # redis.Redis 本身不持有连接，只是连接池的命令入口
+        self._redis = redis.Redis(connection_pool=self._pool)
+        self._invalidate_tags_script = self._redis.register_script(INVALIDATE_TAGS_LUA)
+        self._get_versioned_script = self._redis.register_script(GET_VERSIONED_LUA)
+        self._record_view_script = self._redis.register_script(RECORD_VIEW_LUA)
+        self._update_hash_if_exists_script = self._redis.register_script(_UPDATE_HASH_IF_EXISTS_LUA)
 
     def is_available(self) -> bool:
-        """检查Redis是否可用"""
-        if not self._redis:
-            return False
+        """
+        检查Redis是否可用
+
+        不再发送PING：可用性由熔断器根据真实命令的成败判断，
+        熔断期间返回False，调用方可直接跳过缓存。
+        """
+        return not self.breaker.is_open()
+
+    def _execute(self, command: str, func: Callable, *args, default: Any = None, **kwargs) -> Any:
+        """
+        通过熔断器执行一次Redis命令
+
+        - 熔断中：直接返回 default，不建连、不等待超时
+        - 连接/超时错误：计入熔断器失败次数
+        - 其他命令错误（如类型错误）：不影响熔断状态
+        """
+        if not self.breaker.allow_request():
+            return default
+        settled = False
         try:
-            self._redis.ping()
-            return True
-        except:
-            return False
+            result = func(*args, **kwargs)
+            settled = True
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            settled = True
+            self.breaker.record_failure()
+            logger.warning("❌ Redis %s 连接错误: %s", command, e)
+            return default
+        except redis.RedisError as e:
+            settled = True
+            self.breaker.record_success()
+            logger.error("❌ Redis %s 错误: %s", command, e)
+            return default
+        finally:
+            # 非Redis异常向上抛出前归还探测机会，否则 HALF_OPEN 状态会一直拒绝请求
+            if not settled:
+                self.breaker.release_probe()
+        self.breaker.record_success()
+        return result
 
     def get(self, key: str) -> Optional[str]:
         """获取数据（返回原始字符串，不自动解析JSON）"""
-        if not self.is_available():
-            return None
-        try:
-            return self._redis.get(key)
-        except Exception as e:
-            print(f"Redis GET错误: {e}")
-            return None
+        return self._execute("GET", self._redis.get, key)
 
-    def set(self, key: str, value: Any, ttl: int = None) -> bool:
-        """设置数据"""
-        print(f"💾 [DEBUG] Redis SET - Key: {key}, TTL: {ttl}")
-        print(f"💾 [DEBUG] Redis 可用性检查: {self.is_available()}")
+    def get_with_ttl(self, key: str) -> Tuple[Optional[str], int]:
+        """在一次往返内同时获取数据和剩余TTL（pipeline，无事务）"""
+        def _get_with_ttl():
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.ttl(key)
+            return tuple(pipe.execute())
 
-        if not self.is_available():
-            print("❌ [DEBUG] Redis不可用")
-            return False
+        return self._execute("GET+TTL", _get_with_ttl, default=(None, -1))
 
-        try:
-            data = json.dumps(value, default=str)
-            print(f"💾 [DEBUG] 序列化数据: {data}")
+    def get_versioned(self, namespace: str, key: str) -> Tuple[int, Optional[str], int]:
+        """
+        读取版本化命名空间下的数据（一次Lua调用）
 
-            if ttl:
-                result = self._redis.setex(key, ttl, data)
-            else:
-                result = self._redis.set(key, data)
+        返回 (当前版本号, 数据, 剩余TTL)
+        """
+        def _get_versioned():
+            gen, value, ttl = self._get_versioned_script(
+                keys=[namespace_gen_key(namespace)],
+                args=[f"{namespace}:g", f":{key}"]
+            )
+            return int(gen), value, int(ttl)
 
-            print(f"💾 [DEBUG] Redis SET 原始结果: {result}")
-            return bool(result)
-        except Exception as e:
-            print(f"❌ [DEBUG] Redis SET错误: {e}")
-            return False
+        return self._execute("GET VERSIONED", _get_versioned, default=(0, None, -1))
 
-    def setex(self, key: str, time: int, value: str) -> bool:
-        """设置数据并指定过期时间（接受原始字符串）"""
-        print(f"💾 [DEBUG] Redis SETEX - Key: {key}, TTL: {time}")
-        print(f"💾 [DEBUG] Redis 可用性检查: {self.is_available()}")
+    def set(self, key: str, value: Any, ttl: int = None) -> bool:
+        """设置数据（value会被序列化为JSON）"""
+        data = json.dumps(value, default=str)
 
-        if not self.is_available():
-            print("❌ [DEBUG] Redis不可用")
-            return False
+        if ttl:
+            result = self._execute("SETEX", self._redis.setex, key, ttl, data, default=False)
+        else:
+            result = self._execute("SET", self._redis.set, key, data, default=False)
 
-        try:
-            result = self._redis.setex(key, time, value)
-            print(f"💾 [DEBUG] Redis SETEX 原始结果: {result}")
-            return bool(result)
-        except Exception as e:
-            print(f"❌ [DEBUG] Redis SETEX错误: {e}")
-            return False
+        logger.debug("Redis SET key=%s ttl=%s size=%d result=%s", key, ttl, len(data), result)
+        return bool(result)
+
+    def setex(self, key: str, time: int, value: str) -> bool:
+        """设置数据并指定过期时间（接受原始字符串）"""
+        result = self._execute("SETEX", self._redis.setex, key, time, value, default=False)
+        logger.debug("Redis SETEX key=%s ttl=%s result=%s", key, time, result)
+        return bool(result)
 
     def ttl(self, key: str) -> int:
         """获取键的剩余生存时间（秒）"""
-        if not self.is_available():
-            return -1
-        try:
-            return self._redis.ttl(key)
-        except Exception as e:
-            print(f"❌ [DEBUG] Redis TTL错误: {e}")
-            return -1
+        return self._execute("TTL", self._redis.ttl, key, default=-1)
 
     def delete(self, key: str) -> bool:
         """删除数据"""
-        if not self.is_available():
-            return False
-        try:
-            return self._redis.delete(key) > 0
-        except Exception as e:
-            print(f"Redis DELETE错误: {e}")
-            return False
+        return self._execute("DELETE", self._redis.delete, key, default=0) > 0
 
     def exists(self, key: str) -> bool:
         """检查key是否存在"""
-        if not self.is_available():
-            return False
-        try:
-            return self._redis.exists(key) > 0
-        except Exception as e:
-            return False
+        return self._execute("EXISTS", self._redis.exists, key, default=0) > 0
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> Optional[int]:
+        """哈希字段原子加减，返回新值；Redis不可用时返回 None"""
+        return self._execute("HINCRBY", self._redis.hincrby, key, field, amount)
+
+    def hmget_many(self, keys: List[str], fields: List[str]) -> List[List[Optional[str]]]:
+        """一次往返内从多个哈希读取同一组字段（pipeline，无事务）；Redis不可用时全部返回 None"""
+        if not fields:
+            return [[] for _ in keys]
+
+        def _hmget_many():
+            pipe = self._redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.hmget(key, fields)
+            return pipe.execute()
+
+        return self._execute("HMGET*", _hmget_many, default=[[None] * len(fields) for _ in keys])
+
+    def record_view(self, seen_key: str, window: int, hll_ttls: Dict[str, int], visitor: str) -> Optional[int]:
+        """
+        记录一次浏览（见 RECORD_VIEW_LUA）
+
+        返回 0=去重窗口内的重复浏览，1=新浏览，2=新浏览且是第一个HLL中的新访客，None=Redis不可用
+        """
+        return self._execute("RECORD VIEW", self._record_view_script,
+                             keys=[seen_key, *hll_ttls], args=[visitor, window, *hll_ttls.values()])
+
+    def update_hash_if_exists(self, key: str, increments: Dict[str, int], values: Optional[Dict[str, Any]] = None) -> bool:
+        """哈希存在时对字段原子加减并设置其他字段（一次Lua调用），返回是否更新了"""
+        args = [len(increments)]
+        args += [item for field, amount in increments.items() for item in (field, amount)]
+        args += [item for field, value in (values or {}).items() for item in (field, value)]
+        return bool(self._execute("UPDATE HASH", self._update_hash_if_exists_script, keys=[key], args=args, default=0))
+
+    def invalidate_tags(self, tags: List[str], namespaces: Optional[List[str]] = None) -> int:
+        """
+        按标签删除缓存并递增命名空间版本号（一次Lua调用）
+
+        返回按标签删除的缓存Key数量
+        """
+        namespaces = namespaces or []
+        if not tags and not namespaces:
+            return 0
+        keys = [tag_key(tag) for tag in tags] + [namespace_gen_key(ns) for ns in namespaces]
+        args = [len(tags), settings.CACHE_INVALIDATION_CHANNEL, build_invalidation_message(tags, namespaces)]
+        return self._execute("INVALIDATE", self._invalidate_tags_script, keys=keys, args=args, default=0)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        获取当前进程的连接池统计
+
+        - created/available/in_use: 连接池当前持有的连接（即本worker的socket数）
+        - connects_total/disconnects_total: 进程启动以来真实建立/断开的socket次数，
+          两者持续增长说明存在连接抖动（超时断开、健康检查失败等）
+        """
+        pool = self._pool
+        # redis-py 未提供公开的池状态接口，这里读取其内部字段
+        available = len(getattr(pool, "_available_connections", []))
+        in_use = len(getattr(pool, "_in_use_connections", []))
+        return {
+            "pid": os.getpid(),
+            "max_connections": pool.max_connections,
+            "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+            "created_connections": getattr(pool, "_created_connections", available + in_use),
+            "available_connections": available,
+            "in_use_connections": in_use,
+            "connects_total": pool_metrics.connects,
+            "disconnects_total": pool_metrics.disconnects,
+            "circuit_breaker": self.breaker.get_stats(),
+        }
 
 
-# 全局Redis客户端实例
-redis_client = RedisClient()
\ No newline at end of file
+# 全局Redis客户端实例（进程内唯一，所有缓存服务共享）
+redis_client = RedisClient()
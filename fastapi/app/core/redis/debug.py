@@ -4,38 +4,59 @@ Redis缓存调试工具
 """
 import time
 import json
+import logging
 from typing import Any, Dict, Optional, Callable
 from functools import wraps
-from datetime import datetime
+
+from ..log import get_logger
+
+# 调试器级别 -> 标准日志级别
+_LEVELS = {
+    'TRACE': logging.DEBUG,
+    'CACHE': logging.DEBUG,
+    'DB': logging.DEBUG,
+    'PERF': logging.DEBUG,
+    'INFO': logging.INFO,
+    'SUCCESS': logging.INFO,
+    'WARN': logging.WARNING,
+    'ERROR': logging.ERROR,
+}
+
+
+class _LazyJson:
+    """附带数据只在日志真正输出时才序列化"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Dict):
+        self.data = data
+
+    def __str__(self) -> str:
+        return json.dumps(self.data, ensure_ascii=False, default=str)
 
 
 class CacheDebugger:
-    """缓存调试器"""
+    """缓存调试器（基于标准 logging，级别由 LOG_LEVEL / LOG_LEVELS 控制）"""
 
     def __init__(self, module_name: str = "Unknown"):
         self.module_name = module_name
-        self.debug_enabled = True  # 开发阶段始终开启
+        self.logger = get_logger(f"{__name__}.{module_name}")
+
+    @property
+    def debug_enabled(self) -> bool:
+        """是否输出附带数据（只在DEBUG级别开启时输出）"""
+        return self.logger.isEnabledFor(logging.DEBUG)
 
     def log(self, level: str, message: str, data: Optional[Dict] = None):
-        """统一日志输出"""
-        icons = {
-            'TRACE': '🔍',
-            'INFO': 'ℹ️',
-            'WARN': '⚠️',
-            'ERROR': '❌',
-            'SUCCESS': '✅',
-            'CACHE': '💾',
-            'DB': '🗄️',
-            'PERF': '⚡'
-        }
-
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        icon = icons.get(level, '📝')
-
-        print(f"{icon} [{timestamp}] [{self.module_name}] {message}")
+        """统一日志输出（级别未开启时不做任何格式化）"""
+        log_level = _LEVELS.get(level, logging.INFO)
+        if not self.logger.isEnabledFor(log_level):
+            return
 
         if data and self.debug_enabled:
-            print(f"   📋 数据: {json.dumps(data, ensure_ascii=False, indent=2)}")
+            self.logger.log(log_level, "[%s] %s | 数据: %s", level, message, _LazyJson(data))
+        else:
+            self.logger.log(log_level, "[%s] %s", level, message)
 
     def trace(self, message: str, data: Optional[Dict] = None):
         """详细执行路径"""
@@ -59,6 +80,8 @@ class CacheDebugger:
 
     def cache_hit(self, key: str, data_size: int = 0):
         """缓存命中"""
+        if not self.debug_enabled:
+            return
         self.log('CACHE', f"缓存命中: {key}", {
             "key": key,
             "data_size": data_size,
@@ -67,6 +90,8 @@ class CacheDebugger:
 
     def cache_miss(self, key: str):
         """缓存未命中"""
+        if not self.debug_enabled:
+            return
         self.log('CACHE', f"缓存未命中: {key}", {
             "key": key,
             "hit": False
@@ -74,6 +99,8 @@ class CacheDebugger:
 
     def cache_set(self, key: str, ttl: int, data_size: int = 0):
         """缓存写入"""
+        if not self.debug_enabled:
+            return
         self.log('CACHE', f"缓存写入: {key} (TTL: {ttl}s)", {
             "key": key,
             "ttl": ttl,
@@ -82,6 +109,8 @@ class CacheDebugger:
 
     def db_query(self, query_type: str, duration_ms: float, result_count: int = 0):
         """数据库查询"""
+        if not self.debug_enabled:
+            return
         self.log('DB', f"数据库查询: {query_type} ({duration_ms:.2f}ms)", {
             "query_type": query_type,
             "duration_ms": duration_ms,
@@ -90,6 +119,8 @@ class CacheDebugger:
 
     def performance(self, operation: str, duration_ms: float, improvement: Optional[str] = None):
         """性能信息"""
+        if not self.debug_enabled:
+            return
         msg = f"性能: {operation} ({duration_ms:.2f}ms)"
         if improvement:
             msg += f" - {improvement}"
@@ -104,14 +135,16 @@ class CacheDebugger:
 def cache_performance_monitor(operation_name: str):
     """性能监控装饰器"""
 
+    debugger = CacheDebugger("PerformanceMonitor")
+
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            debugger = CacheDebugger("PerformanceMonitor")
             start_time = time.time()
 
             try:
-                debugger.trace(f"开始执行: {operation_name}")
+                if debugger.debug_enabled:
+                    debugger.trace(f"开始执行: {operation_name}")
                 result = await func(*args, **kwargs)
 
                 duration_ms = (time.time() - start_time) * 1000
@@ -0,0 +1,223 @@
+"""
+进程内L1缓存
+功能：在Redis（L2）前面为极热的少量数据（热门/最新文档、分类统计、全站统计）提供进程内缓存，
+命中时既不访问Redis，也不需要 json.loads
+
+一致性：
+- 每个条目都有较短的TTL（settings.L1_CACHE_TTL），兜底限制最大陈旧时间
+- 条目登记了与L2相同的标签/命名空间；失效时 Redis 会在同一次Lua调用中 PUBLISH 失效消息，
+  每个worker的订阅任务收到后删除本地对应条目，所有worker同时失效
+- 订阅断线重连时清空全部L1，避免漏掉断线期间的失效消息
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..config import settings
+from ..log import get_logger
+
+logger = get_logger(__name__)
+
+# 命名空间在L1标签索引中的前缀（与普通标签区分）
+NAMESPACE_TAG_PREFIX = "ns:"
+
+
+class LocalCache:
+    """有界 LRU + TTL 缓存（单个worker进程内）"""
+
+    def __init__(self, name: str, max_entries: int = 512):
+        self.name = name
+        self.max_entries = max(1, max_entries)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tag_index: Dict[str, Set[str]] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: str) -> Tuple[bool, Any, float]:
+        """返回 (是否命中, 数据, 剩余秒数)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None, 0.0
+
+            expires_at, value, _ = entry
+            if expires_at <= now:
+                self._remove(key)
+                self._misses += 1
+                return False, None, 0.0
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, value, expires_at - now
+
+    def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._evictions += 1
+
+    def invalidate(self, tags: Iterable[str] = (), namespaces: Iterable[str] = ()) -> int:
+        """删除登记在指定标签/命名空间下的条目，返回删除数量"""
+        index_tags = list(tags) + [NAMESPACE_TAG_PREFIX + ns for ns in namespaces]
+        removed = 0
+        with self._lock:
+            for tag in index_tags:
+                for key in list(self._tag_index.get(tag, ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+            self._invalidations += removed
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def _remove(self, key: str):
+        """删除条目及其标签索引（调用方需持有锁）"""
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+_local_caches: List[LocalCache] = []
+
+
+def create_local_cache(name: str) -> LocalCache:
+    """创建并登记L1缓存，失效广播会作用于所有已登记的L1"""
+    cache = LocalCache(name, max_entries=settings.L1_CACHE_MAX_ENTRIES)
+    _local_caches.append(cache)
+    return cache
+
+
+def invalidate_local(tags: Iterable[str] = (), namespaces: Iterable[str] = ()) -> int:
+    """在当前进程内按标签/命名空间清除所有L1"""
+    tags, namespaces = list(tags), list(namespaces)
+    return sum(cache.invalidate(tags, namespaces) for cache in _local_caches)
+
+
+def clear_local():
+    for cache in _local_caches:
+        cache.clear()
+
+
+def build_invalidation_message(tags: List[str], namespaces: List[str]) -> str:
+    return json.dumps({"tags": tags, "namespaces": namespaces}, ensure_ascii=False)
+
+
+# ==================== 失效广播订阅 ====================
+
+class InvalidationListener:
+    """订阅失效频道，把其他worker（以及本worker）发出的失效消息应用到本地L1"""
+
+    def __init__(self, channel: str = settings.CACHE_INVALIDATION_CHANNEL, retry_interval: float = 1.0,
+                 max_retry_interval: float = 30.0):
+        self.channel = channel
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self._task: Optional[asyncio.Task] = None
+        self.messages_received = 0
+        self.reconnects = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        from .async_client import async_redis_client
+
+        delay = self.retry_interval
+        while True:
+            pubsub = async_redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # 订阅成功前可能漏掉了失效消息，清空L1后重新开始
+                clear_local()
+                delay = self.retry_interval
+                logger.info("📡 [L1_CACHE] 已订阅失效频道: %s", self.channel)
+
+                # 使用带超时的 get_message，而不是 listen()：
+                # listen() 会受连接池 socket_timeout 影响，空闲时反复超时重连
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message.get("type") == "message":
+                        self._apply(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.reconnects += 1
+                clear_local()
+                logger.warning("⚠️ [L1_CACHE] 失效频道订阅中断，%.0f秒后重连: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_interval)
+            finally:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+
+    def _apply(self, data: Any):
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            logger.error("❌ [L1_CACHE] 无法解析失效消息: %r", data)
+            return
+        self.messages_received += 1
+        invalidate_local(payload.get("tags") or [], payload.get("namespaces") or [])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "channel": self.channel,
+            "running": self._task is not None and not self._task.done(),
+            "messages_received": self.messages_received,
+            "reconnects": self.reconnects,
+        }
+
+
+# 全局实例
+invalidation_listener = InvalidationListener()
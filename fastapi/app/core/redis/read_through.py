@@ -0,0 +1,396 @@
+"""
+通用读穿缓存（Read-Through）
+功能：统一 "读缓存 → 未命中 → 回源查询 → 写缓存" 流程，并提供防击穿保护
+
+防击穿（single-flight）策略：
+1. 进程内：同一个key同一时间只有一个协程回源，其余协程等待同一个Future
+2. 跨进程：回源前用 SET NX PX 抢占分布式锁，抢到锁的worker负责回源，
+   其余worker轮询缓存等待结果；等待超时或Redis不可用时自行回源，保证可用性
+
+软/硬TTL（stale-while-revalidate）：
+- 传入 soft_ttl 时，缓存值外包一层信封，记录写入时间和回源耗时，Redis过期时间使用硬TTL
+- 超过软TTL：直接返回旧数据，同时在后台刷新（跨worker只有抢到锁的一个刷新）
+- 未超过软TTL：按 XFetch 规则 age - delta * beta * ln(rand) >= soft_ttl 提前后台刷新，
+  回源越慢、越接近过期，提前刷新的概率越高，避免大量请求在过期瞬间一起回源
+
+进程内L1（可选）：
+- 传入 l1_ttl 时，在Redis前增加一层进程内 LRU+TTL 缓存（见 local_cache.py），
+  L1命中时不访问Redis、不做反序列化；标签/命名空间失效通过 Redis pub/sub 广播到所有worker
+
+序列化：写入Redis的数据由 serializer.py 编码（orjson/msgpack + 可选压缩，带格式标记），
+旧版本写入的纯JSON仍可读取；编码/解码耗时和数据大小计入 get_stats()["codec"]
+"""
+import asyncio
+import inspect
+import logging
+import math
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from ..log import get_logger, log_sampled
+from .async_client import AsyncRedisClient, async_redis_client
+from .local_cache import NAMESPACE_TAG_PREFIX, LocalCache, create_local_cache
+from .serializer import CacheSerializer, CodecStats, cache_serializer
+from .tags import versioned_key
+
+logger = get_logger(__name__)
+
+Loader = Callable[[], Union[Any, Awaitable[Any]]]
+# 缓存标签：固定列表，或根据回源结果计算（如列表页中每个文档的 doc:{id}）
+Tags = Union[List[str], Callable[[Any], List[str]], None]
+
+# 软TTL信封字段（没有该字段的旧缓存按普通数据处理）
+_ENVELOPE_KEY = "__rt_meta__"
+
+
+class ReadThroughCache:
+    """读穿缓存 + 单飞回源"""
+
+    def __init__(
+            self,
+            name: str,
+            client: AsyncRedisClient = async_redis_client,
+            lock_ttl_ms: int = 10000,
+            wait_timeout: float = 3.0,
+            poll_interval: float = 0.05,
+            xfetch_beta: float = 1.0,
+            l1_ttl: Optional[float] = None,
+            serializer: CacheSerializer = cache_serializer
+    ):
+        self.name = name
+        self.client = client
+        self.lock_ttl_ms = lock_ttl_ms  # 分布式锁过期时间，防止回源进程崩溃后锁无法释放
+        self.wait_timeout = wait_timeout  # 等待其他worker回源的最长时间
+        self.poll_interval = poll_interval
+        self.xfetch_beta = xfetch_beta  # XFetch提前刷新系数，<=0 表示关闭
+        self.l1_ttl = l1_ttl
+        self.local: Optional[LocalCache] = create_local_cache(name) if l1_ttl else None
+        self.serializer = serializer
+        self.codec_stats = CodecStats()
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "coalesced": 0,  # 进程内合并的并发请求数
+            "peer_waits": 0,  # 等到其他worker写入缓存的次数
+            "peer_timeouts": 0,  # 等待其他worker超时后自行回源的次数
+            "stale_hits": 0,  # 超过软TTL、返回旧数据的次数
+            "early_refreshes": 0,  # XFetch 提前刷新触发次数
+            "background_refreshes": 0,
+            "refresh_failures": 0,
+        }
+        _registry.append(self)
+
+    # ==================== 核心流程 ====================
+
+    async def get_or_load(
+            self,
+            key: str,
+            loader: Loader,
+            ttl: int,
+            soft_ttl: Optional[int] = None,
+            refresh_loader: Optional[Loader] = None,
+            tags: Tags = None,
+            namespace: Optional[str] = None
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        读取缓存，未命中时通过 loader 回源并写入缓存
+
+        Args:
+            key: 缓存Key
+            loader: 回源函数（无参数，可以是同步函数或返回协程）
+            ttl: 缓存过期时间（秒）；启用软TTL时为硬TTL
+            soft_ttl: 软TTL（秒），超过后返回旧数据并后台刷新；None表示不启用
+            refresh_loader: 后台刷新使用的回源函数；请求结束后请求级数据库会话已关闭，
+                            后台刷新需要自己管理会话，未提供时使用 loader
+            tags: 写入缓存时登记的标签，数据变更时按标签失效（见 tags.py）
+            namespace: 版本化命名空间；指定时 key 只是命名空间内的部分，
+                       完整Key为 {namespace}:g{版本号}:{key}，版本号与数据在一次往返内读取
+
+        Returns:
+            (数据, 缓存元信息)，元信息包含 cached / ttl_remaining / source / key
+        """
+        l1_key = f"{namespace}:{key}" if namespace else key
+        if self.local is not None:
+            found, value, remaining = self.local.get(l1_key)
+            if found:
+                log_sampled(logger, logging.DEBUG, "[READ_THROUGH] %s 缓存访问", self.name, source="l1", key=l1_key)
+                return _copy_value(value), {"cached": True, "ttl_remaining": int(remaining), "source": "l1", "key": l1_key}
+
+        if namespace is None:
+            doc, ttl_remaining = await self._read(key)
+        else:
+            key, doc, ttl_remaining = await self._read_versioned(namespace, key)
+
+        if doc is not None:
+            self._stats["hits"] += 1
+            value, envelope = _unwrap(doc)
+            meta = {"cached": True, "ttl_remaining": ttl_remaining, "source": "cache", "key": key}
+
+            if envelope is not None:
+                age = time.time() - envelope["created"]
+                if age >= envelope["soft_ttl"]:
+                    self._stats["stale_hits"] += 1
+                    meta.update({"source": "stale", "stale": True})
+                    self._schedule_refresh(key, refresh_loader or loader, ttl, soft_ttl, tags)
+                elif self._should_refresh_early(age, envelope):
+                    self._stats["early_refreshes"] += 1
+                    self._schedule_refresh(key, refresh_loader or loader, ttl, soft_ttl, tags)
+
+            self._remember_local(l1_key, value, tags, namespace)
+            log_sampled(logger, logging.DEBUG, "[READ_THROUGH] %s 缓存访问", self.name, source=meta["source"], key=key)
+            return _copy_value(value), meta
+
+        self._stats["misses"] += 1
+
+        # 进程内单飞：已有协程在回源，直接等待其结果
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            value, meta = await asyncio.shield(inflight)
+            return _copy_value(value), {**meta, "source": "coalesced"}
+
+        future = asyncio.get_running_loop().create_future()
+        # 没有等待者时也要取走异常，避免 "exception was never retrieved" 警告
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value, meta = await self._load_single_flight(key, loader, ttl, soft_ttl, tags)
+            future.set_result((value, meta))
+            self._remember_local(l1_key, value, tags, namespace)
+            log_sampled(logger, logging.DEBUG, "[READ_THROUGH] %s 缓存访问", self.name, source=meta["source"], key=key)
+            return _copy_value(value), meta
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _load_single_flight(
+            self,
+            key: str,
+            loader: Loader,
+            ttl: int,
+            soft_ttl: Optional[int],
+            tags: Tags
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """跨进程单飞：抢锁成功则回源，否则等待持锁worker写入缓存"""
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        acquired = await self.client.acquire_lock(lock_key, token, self.lock_ttl_ms)
+
+        if acquired is False:
+            doc, ttl_remaining = await self._wait_for_peer(key)
+            if doc is not None:
+                self._stats["peer_waits"] += 1
+                return _unwrap(doc)[0], {"cached": True, "ttl_remaining": ttl_remaining, "source": "peer", "key": key}
+            self._stats["peer_timeouts"] += 1
+            logger.warning("⚠️ [READ_THROUGH] %s 等待其他worker回源超时，自行查询: %s", self.name, key)
+
+        try:
+            value = await self._load_and_write(key, loader, ttl, soft_ttl, tags)
+        finally:
+            if acquired:
+                await self.client.release_lock(lock_key, token)
+
+        return value, {"cached": False, "ttl_remaining": ttl, "source": "loader", "key": key}
+
+    async def _wait_for_peer(self, key: str) -> Tuple[Optional[Any], int]:
+        """轮询缓存，等待持锁的worker写入结果"""
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            value, ttl_remaining = await self._read(key)
+            if value is not None:
+                return value, ttl_remaining
+        return None, -1
+
+    async def _call_loader(self, loader: Loader) -> Any:
+        self._stats["loads"] += 1
+        result = loader()
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def _load_and_write(self, key: str, loader: Loader, ttl: int, soft_ttl: Optional[int], tags: Tags) -> Any:
+        """回源并写入缓存；启用软TTL时记录回源耗时，供 XFetch 计算"""
+        start_time = time.monotonic()
+        value = await self._call_loader(loader)
+        delta = time.monotonic() - start_time
+
+        tag_list = tags(value) if callable(tags) else (tags or [])
+        if soft_ttl is None:
+            await self._write(key, value, ttl, tag_list)
+        else:
+            await self._write(key, _wrap(value, soft_ttl, delta), ttl, tag_list)
+        return value
+
+    def _remember_local(self, l1_key: str, value: Any, tags: Tags, namespace: Optional[str]):
+        """写入L1，登记与Redis相同的标签和命名空间，便于收到失效广播时删除"""
+        if self.local is None:
+            return
+        l1_tags = list(tags(value) if callable(tags) else (tags or []))
+        if namespace:
+            l1_tags.append(NAMESPACE_TAG_PREFIX + namespace)
+        # L1保存独立副本，调用方对返回值的修改不会影响L1
+        self.local.set(l1_key, _copy_value(value), self.l1_ttl, l1_tags)
+
+    # ==================== 软TTL后台刷新 ====================
+
+    def _should_refresh_early(self, age: float, envelope: Dict[str, Any]) -> bool:
+        """XFetch：age - delta * beta * ln(rand) >= soft_ttl 时提前刷新"""
+        delta = envelope.get("delta") or 0
+        if self.xfetch_beta <= 0 or delta <= 0:
+            return False
+        # 1 - random() 取值 (0, 1]，避免 log(0)
+        return age - delta * self.xfetch_beta * math.log(1.0 - random.random()) >= envelope["soft_ttl"]
+
+    def _schedule_refresh(self, key: str, loader: Loader, ttl: int, soft_ttl: Optional[int], tags: Tags):
+        """后台刷新（同一个key在进程内只有一个刷新任务）"""
+        if key in self._refreshing or key in self._inflight:
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh(key, loader, ttl, soft_ttl, tags))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key: str, loader: Loader, ttl: int, soft_ttl: Optional[int], tags: Tags):
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        acquired = await self.client.acquire_lock(lock_key, token, self.lock_ttl_ms)
+        if acquired is False:
+            # 其他worker正在刷新，本进程继续返回旧数据即可
+            return
+
+        try:
+            await self._load_and_write(key, loader, ttl, soft_ttl, tags)
+            self._stats["background_refreshes"] += 1
+        except Exception as e:
+            self._stats["refresh_failures"] += 1
+            logger.error("❌ [READ_THROUGH] %s 后台刷新失败，继续使用旧数据: %s, %s", self.name, key, e)
+        finally:
+            if acquired:
+                await self.client.release_lock(lock_key, token)
+
+    # ==================== 读写与序列化 ====================
+
+    async def _read(self, key: str) -> Tuple[Optional[Any], int]:
+        raw, ttl_remaining = await self.client.get_with_ttl(key)
+        return self._parse(raw, ttl_remaining)
+
+    async def _read_versioned(self, namespace: str, key: str) -> Tuple[str, Optional[Any], int]:
+        """读取版本化Key，返回 (完整Key, 数据, 剩余TTL)"""
+        generation, raw, ttl_remaining = await self.client.get_versioned(namespace, key)
+        doc, ttl_remaining = self._parse(raw, ttl_remaining)
+        return versioned_key(namespace, generation, key), doc, ttl_remaining
+
+    def _parse(self, raw: Any, ttl_remaining: int) -> Tuple[Optional[Any], int]:
+        if not raw:
+            return None, -1
+        try:
+            return self._decode(raw), ttl_remaining
+        except (TypeError, ValueError) as e:
+            logger.error("❌ [READ_THROUGH] %s 缓存数据解析失败，按未命中处理: %s", self.name, e)
+            return None, -1
+
+    async def _write(self, key: str, value: Any, ttl: int, tags: List[str]) -> bool:
+        try:
+            data = self._encode(value)
+        except (TypeError, ValueError) as e:
+            logger.error("❌ [READ_THROUGH] %s 缓存数据序列化失败: %s", self.name, e)
+            return False
+        return await self.client.setex_with_tags(key, ttl, data, tags)
+
+    def _encode(self, value: Any) -> bytes:
+        return self.serializer.dumps(value, self.codec_stats)
+
+    def _decode(self, raw: Any) -> Any:
+        return self.serializer.loads(raw, self.codec_stats)
+
+    # ==================== 统计 ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """分层统计：l1 为进程内缓存，l2 为Redis（只统计穿过L1的请求）"""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "name": self.name,
+            "l1": self.local.get_stats() if self.local is not None else None,
+            "l2": {
+                "hits": self._stats["hits"],
+                "misses": self._stats["misses"],
+                "hit_ratio": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            },
+            **{k: v for k, v in self._stats.items() if k not in ("hits", "misses")},
+            "inflight": len(self._inflight),
+            "refreshing": len(self._refreshing),
+            "codec": {**self.serializer.describe(), **self.codec_stats.get_stats()},
+        }
+
+
+def _copy_value(value: Any) -> Any:
+    """调用方会在结果上追加 cache_info 等字段，返回浅拷贝避免并发请求互相污染"""
+    return dict(value) if isinstance(value, dict) else value
+
+
+def _wrap(value: Any, soft_ttl: int, delta: float) -> Dict[str, Any]:
+    return {
+        _ENVELOPE_KEY: {"created": time.time(), "soft_ttl": soft_ttl, "delta": round(delta, 4)},
+        "value": value
+    }
+
+
+def _unwrap(doc: Any) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """拆开软TTL信封，返回 (数据, 信封元信息)；旧格式数据的元信息为None"""
+    if isinstance(doc, dict) and _ENVELOPE_KEY in doc:
+        return doc.get("value"), doc[_ENVELOPE_KEY]
+    return doc, None
+
+
+def with_new_session(query: Callable[[Any], Awaitable[Any]]) -> Loader:
+    """
+    包装后台刷新用的回源函数：使用独立的数据库会话
+
+    请求结束后 get_db 提供的会话会被关闭，后台刷新不能复用它。
+    """
+    async def _load():
+        from ..database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            return await query(db)
+        finally:
+            db.close()
+
+    return _load
+
+
+def with_new_async_session(query: Callable[[Any], Awaitable[Any]]) -> Loader:
+    """
+    包装后台刷新用的回源函数：使用独立的异步数据库会话（AsyncSession 版本的 with_new_session）
+    """
+    async def _load():
+        from ..database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            return await query(db)
+
+    return _load
+
+
+async def resolve(result: Any) -> Any:
+    """缓存服务的 query_func 可以是同步函数，也可以是返回协程的 async 函数"""
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+_registry: List[ReadThroughCache] = []
+
+
+def get_read_through_stats() -> List[Dict[str, Any]]:
+    """当前进程内所有读穿缓存的统计"""
+    return [cache.get_stats() for cache in _registry]
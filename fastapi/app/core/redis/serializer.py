@@ -0,0 +1,253 @@
+"""
+缓存数据序列化器
+功能：读穿缓存写入Redis前的编码/解码，可选 orjson / msgpack 后端，大于阈值的数据可选 zlib / lz4 压缩
+
+存储格式：首字节为格式标记，其后为（可能压缩过的）序列化数据
+- 标记字节 >= 0x80：bit3-6 为序列化后端编号，bit0-2 为压缩算法编号
+- 旧版本写入的纯JSON文本首字节一定是ASCII（{、[ 等），按旧格式用 json 解析，升级后无需清空缓存
+
+orjson / msgpack / lz4 都是可选依赖：未安装时回退到标准库 json / zlib，
+读到本进程无法解码的格式时按缓存未命中处理
+"""
+import json
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config import settings
+from ..log import get_logger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 可选依赖
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - 可选依赖
+    lz4_frame = None
+
+logger = get_logger(__name__)
+
+_MARKER_FLAG = 0x80
+
+# 编号写入缓存数据，只能追加，不能修改已有编号
+SERIALIZER_IDS = {"json": 1, "orjson": 2, "msgpack": 3}
+COMPRESSION_IDS = {"none": 0, "zlib": 1, "lz4": 2}
+
+
+# ==================== 序列化后端 ====================
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")  # default=str处理datetime等类型
+
+
+def _json_loads(data: bytes) -> Any:
+    return json.loads(data)
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    # 透传 datetime 交给 default=str，保持与 json 版本相同的时间格式（"2024-01-01 12:00:00"）
+    return orjson.dumps(
+        value,
+        default=str,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+
+def _orjson_loads(data: bytes) -> Any:
+    return orjson.loads(data)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=str, use_bin_type=True)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def _available_serializers() -> Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    backends = {"json": (_json_dumps, _json_loads)}
+    if orjson is not None:
+        backends["orjson"] = (_orjson_dumps, _orjson_loads)
+        # orjson 输出也是JSON，json 编号的数据同样交给 orjson 解析
+        backends["json"] = (_json_dumps, _orjson_loads)
+    if msgpack is not None:
+        backends["msgpack"] = (_msgpack_dumps, _msgpack_loads)
+    return backends
+
+
+def _available_compressions() -> Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    codecs = {"zlib": (lambda data: zlib.compress(data, 6), zlib.decompress)}
+    if lz4_frame is not None:
+        codecs["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+    return codecs
+
+
+# ==================== 统计 ====================
+
+class CodecStats:
+    """编码/解码次数、耗时与数据大小统计（每个读穿缓存一份）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.encodes = 0
+        self.decodes = 0
+        self.encode_ms = 0.0
+        self.decode_ms = 0.0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.compressed_writes = 0
+        self.decode_errors = 0
+
+    def record_encode(self, elapsed_ms: float, raw_size: int, stored_size: int, compressed: bool):
+        with self._lock:
+            self.encodes += 1
+            self.encode_ms += elapsed_ms
+            self.raw_bytes += raw_size
+            self.stored_bytes += stored_size
+            if compressed:
+                self.compressed_writes += 1
+
+    def record_decode(self, elapsed_ms: float):
+        with self._lock:
+            self.decodes += 1
+            self.decode_ms += elapsed_ms
+
+    def record_decode_error(self):
+        with self._lock:
+            self.decode_errors += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "encodes": self.encodes,
+                "decodes": self.decodes,
+                "decode_errors": self.decode_errors,
+                "avg_encode_ms": round(self.encode_ms / self.encodes, 4) if self.encodes else 0.0,
+                "avg_decode_ms": round(self.decode_ms / self.decodes, 4) if self.decodes else 0.0,
+                "avg_raw_bytes": round(self.raw_bytes / self.encodes) if self.encodes else 0,
+                "avg_stored_bytes": round(self.stored_bytes / self.encodes) if self.encodes else 0,
+                "compression_ratio": round(self.stored_bytes / self.raw_bytes, 4) if self.raw_bytes else 1.0,
+                "compressed_writes": self.compressed_writes,
+            }
+
+
+# ==================== 序列化器 ====================
+
+class CacheSerializer:
+    """带格式标记的缓存序列化器"""
+
+    def __init__(self, serializer: str = "orjson", compression: str = "zlib", compress_min_bytes: int = 4096):
+        self._serializers = _available_serializers()
+        self._compressions = _available_compressions()
+
+        if serializer not in SERIALIZER_IDS:
+            raise ValueError(f"未知的缓存序列化后端: {serializer}")
+        if compression not in COMPRESSION_IDS:
+            raise ValueError(f"未知的缓存压缩算法: {compression}")
+
+        if serializer not in self._serializers:
+            logger.warning("⚠️ [CACHE_SERIALIZER] %s 未安装，回退到 json", serializer)
+            serializer = "json"
+        if compression != "none" and compression not in self._compressions:
+            logger.warning("⚠️ [CACHE_SERIALIZER] %s 未安装，回退到 zlib", compression)
+            compression = "zlib"
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self._dumps = self._serializers[serializer][0]
+
+    def dumps(self, value: Any, stats: Optional[CodecStats] = None) -> bytes:
+        start_time = time.perf_counter()
+        payload = self._dumps(value)
+        raw_size = len(payload)
+
+        compression = "none"
+        if self.compression != "none" and raw_size >= self.compress_min_bytes:
+            compressed = self._compressions[self.compression][0](payload)
+            # 压缩收益不明显时（例如已经很紧凑的数据）保存原文，解码时少一次解压
+            if len(compressed) < raw_size:
+                payload, compression = compressed, self.compression
+
+        marker = _MARKER_FLAG | (SERIALIZER_IDS[self.serializer] << 3) | COMPRESSION_IDS[compression]
+        data = bytes((marker,)) + payload
+
+        if stats is not None:
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            stats.record_encode(elapsed_ms, raw_size, len(data), compression != "none")
+        return data
+
+    def loads(self, raw: Any, stats: Optional[CodecStats] = None) -> Any:
+        """解码缓存数据；格式无法识别时抛出 ValueError"""
+        start_time = time.perf_counter()
+        try:
+            value = self._loads(raw)
+        except ValueError:
+            if stats is not None:
+                stats.record_decode_error()
+            raise
+
+        if stats is not None:
+            stats.record_decode((time.perf_counter() - start_time) * 1000)
+        return value
+
+    def _loads(self, raw: Any) -> Any:
+        if isinstance(raw, str):
+            return json.loads(raw)
+        if not raw or not raw[0] & _MARKER_FLAG:
+            return json.loads(raw)  # 旧版本写入的纯JSON
+
+        marker = raw[0]
+        serializer_id = (marker >> 3) & 0x0F
+        compression_id = marker & 0x07
+        serializer = _name_of(SERIALIZER_IDS, serializer_id)
+        compression = _name_of(COMPRESSION_IDS, compression_id)
+
+        if serializer not in self._serializers:
+            raise ValueError(f"当前进程不支持的序列化格式: {serializer or serializer_id}")
+        payload = raw[1:]
+        if compression != "none":
+            if compression not in self._compressions:
+                raise ValueError(f"当前进程不支持的压缩格式: {compression or compression_id}")
+            try:
+                payload = self._compressions[compression][1](payload)
+            except Exception as e:
+                raise ValueError(f"缓存数据解压失败: {e}") from e
+
+        try:
+            return self._serializers[serializer][1](payload)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"缓存数据解码失败: {e}") from e
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "serializer": self.serializer,
+            "compression": self.compression,
+            "compress_min_bytes": self.compress_min_bytes,
+        }
+
+
+def _name_of(ids: Dict[str, int], value: int) -> Optional[str]:
+    for name, known in ids.items():
+        if known == value:
+            return name
+    return None
+
+
+# 全局实例
+cache_serializer = CacheSerializer(
+    serializer=settings.CACHE_SERIALIZER,
+    compression=settings.CACHE_COMPRESSION,
+    compress_min_bytes=settings.CACHE_COMPRESS_MIN_BYTES
+)
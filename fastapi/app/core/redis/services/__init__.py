@@ -6,6 +6,11 @@ from .tech_square_cache import tech_square_stats_cache_service
 from .document_list_cache import document_list_cache_service
 from .hot_data_cache import hot_data_cache_service
 from .search_cache import search_cache_service  # 🆕 新增
+from .cache_invalidation import cache_invalidation_service
+from .count_cache import count_cache_service
+from .view_counter import view_counter_service
+from .unique_views import unique_view_service
+from .comment_cache import comment_cache_service
 
 __all__ = [
     "stats_cache_service",
@@ -13,4 +18,9 @@ __all__ = [
     "document_list_cache_service",
     "hot_data_cache_service",
     "search_cache_service",  # 🆕 新增
+    "cache_invalidation_service",
+    "count_cache_service",
+    "view_counter_service",
+    "unique_view_service",
+    "comment_cache_service",
 ]
\ No newline at end of file
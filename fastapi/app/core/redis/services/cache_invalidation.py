@@ -0,0 +1,73 @@
+"""
+缓存失效服务
+功能：文档发布/撤回/更新/删除后，按标签精确清除受影响的缓存
+
+业务服务（DocumentPublishService / DocumentService）是同步代码，
+这里使用同步Redis客户端，在事务提交后调用；标签删除和命名空间版本号递增在一次Lua调用内完成。
+Redis不可用时只打印警告，不影响业务流程（缓存会在TTL到期后自然过期）。
+"""
+from typing import List, Optional
+
+from ...log import get_logger
+from ..client import redis_client
+from ..tags import (
+    PUBLIC_LIST_NAMESPACE, PUBLIC_LIST_TAG, SEARCH_NAMESPACE,
+    comment_namespace, doc_tag, unique_tags, user_list_namespace, user_tag
+)
+
+logger = get_logger(__name__)
+
+
+class CacheInvalidationService:
+    """缓存失效服务"""
+
+    def __init__(self):
+        self.redis_client = redis_client  # 共享进程级连接池
+
+    def invalidate(self, tags: List[str], namespaces: Optional[List[str]] = None) -> int:
+        """清除指定标签下的所有缓存并递增命名空间版本号，返回按标签删除的Key数量"""
+        tags = unique_tags(tags)
+        namespaces = unique_tags(namespaces or [])
+        if not tags and not namespaces:
+            return 0
+
+        if not self.redis_client.is_available():
+            logger.warning("⚠️ [CACHE_INVALIDATE] Redis不可用，跳过缓存清除: %s %s", tags, namespaces)
+            return 0
+
+        deleted_count = self.redis_client.invalidate_tags(tags, namespaces)
+        logger.info("🧹 [CACHE_INVALIDATE] 标签 %s 已清除 %d 个缓存Key, 版本号递增: %s", tags, deleted_count, namespaces)
+        return deleted_count
+
+    def on_document_changed(self, document_id: int, user_id: int, affects_public: bool = False) -> int:
+        """
+        文档变更后清除相关缓存
+
+        Args:
+            document_id: 文档ID（清除包含该文档的热门/最新缓存）
+            user_id: 文档所有者（个人文档列表版本号递增，清除个人统计）
+            affects_public: 技术广场可见的内容是否变化（发布、撤回、修改或删除已发布文档），
+                            为True时技术广场列表和搜索版本号递增，并清除全站统计
+        """
+        tags = [doc_tag(document_id), user_tag(user_id)]
+        namespaces = [user_list_namespace(user_id)]
+        if affects_public:
+            tags.append(PUBLIC_LIST_TAG)
+            namespaces += [PUBLIC_LIST_NAMESPACE, SEARCH_NAMESPACE]
+        return self.invalidate(tags, namespaces)
+
+    def on_user_documents_changed(self, user_id: int) -> int:
+        """用户文档集合变化（新建文档、文件夹变更）后清除个人缓存"""
+        return self.invalidate([user_tag(user_id)], [user_list_namespace(user_id)])
+
+    def on_comments_changed(self, document_id: int) -> int:
+        """评论或回复增删改后，该文档的评论第一页缓存失效"""
+        return self.invalidate([], [comment_namespace(document_id)])
+
+    def on_search_index_changed(self) -> int:
+        """全文索引更新（单篇文档后台建索引或全量重建）后，带关键词的技术广场列表和搜索结果全部失效"""
+        return self.invalidate([], [PUBLIC_LIST_NAMESPACE, SEARCH_NAMESPACE])
+
+
+# 全局实例
+cache_invalidation_service = CacheInvalidationService()
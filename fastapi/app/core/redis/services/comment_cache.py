@@ -0,0 +1,45 @@
+"""
+评论第一页缓存服务
+功能：文档评论列表的第一页（绝大多数评论区访问只看第一页）读穿缓存，热门文档的评论区不再每次访问都查库
+
+- 缓存Key位于每个文档的版本化命名空间 comments:doc{id} 内（见 tags.py），按每页数量区分
+- 评论、回复的创建/修改/删除提交后命名空间版本号递增（cache_invalidation_service.on_comments_changed），
+  该文档所有每页数量的第一页同时失效；TTL只作为兜底
+- 只缓存页码分页的第一页；游标翻页、后续页码和回复列表直接查库
+"""
+from typing import Any, Dict
+
+from ...config import settings
+from ...log import get_logger
+from ..async_client import async_redis_client
+from ..read_through import Loader, ReadThroughCache
+from ..tags import comment_namespace
+
+logger = get_logger(__name__)
+
+
+class CommentCacheService:
+    """评论第一页缓存服务"""
+
+    def __init__(self):
+        self.redis_client = async_redis_client  # 共享进程级异步连接池
+        self.read_through = ReadThroughCache("comments", client=self.redis_client)
+        self.ttl = settings.COMMENT_CACHE_TTL
+
+        logger.info("💬 [COMMENT_CACHE] 评论第一页缓存服务初始化，TTL: %s秒", self.ttl)
+
+    async def get_first_page(self, document_id: int, size: int, loader: Loader) -> Dict[str, Any]:
+        """
+        获取文档评论第一页
+
+        Args:
+            loader: 回源函数，返回可序列化的 {"items": [...], "total": 总数, "next_cursor": 游标}
+        """
+        data, _ = await self.read_through.get_or_load(
+            f"first:{size}", loader, self.ttl, namespace=comment_namespace(document_id)
+        )
+        return data
+
+
+# 全局实例
+comment_cache_service = CommentCacheService()
@@ -0,0 +1,109 @@
+"""
+列表总数缓存服务
+功能：分页列表的总数按筛选条件缓存，翻页、换排序、换每页数量都复用同一个总数，
+不再每次对 文档 × 发布记录 × 用户 的整个JOIN结果执行 COUNT
+
+- 总数最多精确数到 COUNT_EXACT_LIMIT，超过返回近似值（LIMIT N+1 探测，见 core/pagination.py）
+- 缓存Key位于版本化命名空间内：发布/撤回/更新已发布文档时命名空间版本号递增，总数随之失效
+- 同步（DocumentPublishService）和异步（技术广场）两条路径读写同一格式的数据
+"""
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ...config import settings
+from ...log import get_logger
+from ...pagination import capped_total
+from ..async_client import async_redis_client
+from ..client import redis_client
+from ..read_through import resolve
+from ..tags import versioned_key
+
+logger = get_logger(__name__)
+
+
+class CountCacheService:
+    """列表总数缓存服务"""
+
+    def __init__(self):
+        self.redis_client = async_redis_client  # 共享进程级异步连接池
+        self.sync_redis_client = redis_client  # 同步业务服务使用
+        self.ttl = settings.COUNT_CACHE_TTL
+        self.exact_limit = settings.COUNT_EXACT_LIMIT
+        self.key_prefix = "count"
+        self._stats = {"hits": 0, "misses": 0, "approximate": 0}
+
+        logger.info("🔢 [COUNT_CACHE] 列表总数缓存服务初始化，TTL: %s秒，精确上限: %s", self.ttl, self.exact_limit)
+
+    def _key(self, signature: str) -> str:
+        return f"{self.key_prefix}:{signature}"
+
+    async def get_total(self, namespace: str, signature: str, count_func: Callable[[int], Any]) -> Tuple[int, bool]:
+        """
+        获取列表总数
+
+        Args:
+            namespace: 版本化命名空间（列表数据变更时递增，见 tags.py）
+            signature: 筛选条件签名（不含页码、每页数量、排序）
+            count_func: count_func(cap) 返回最多数到 cap + 1 的行数，可以是协程函数
+
+        Returns:
+            (总数, 是否近似)
+        """
+        key = self._key(signature)
+        generation, raw, _ = await self.redis_client.get_versioned(namespace, key)
+        cached = self._parse(raw)
+        if cached is not None:
+            self._stats["hits"] += 1
+            return cached
+
+        result = self._count(await resolve(count_func(self.exact_limit)))
+        await self.redis_client.setex(versioned_key(namespace, generation, key), self.ttl, self._dump(result))
+        return result
+
+    def get_total_sync(self, namespace: str, signature: str, count_func: Callable[[int], int]) -> Tuple[int, bool]:
+        """获取列表总数（同步版本，参数同 get_total）"""
+        key = self._key(signature)
+        generation, raw, _ = self.sync_redis_client.get_versioned(namespace, key)
+        cached = self._parse(raw)
+        if cached is not None:
+            self._stats["hits"] += 1
+            return cached
+
+        result = self._count(count_func(self.exact_limit))
+        self.sync_redis_client.setex(versioned_key(namespace, generation, key), self.ttl, self._dump(result))
+        return result
+
+    def _count(self, count: int) -> Tuple[int, bool]:
+        self._stats["misses"] += 1
+        total, approximate = capped_total(count, self.exact_limit)
+        if approximate:
+            self._stats["approximate"] += 1
+        return total, approximate
+
+    @staticmethod
+    def _dump(result: Tuple[int, bool]) -> str:
+        total, approximate = result
+        return json.dumps({"total": total, "approximate": approximate})
+
+    def _parse(self, raw: Any) -> Optional[Tuple[int, bool]]:
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+            return int(data["total"]), bool(data["approximate"])
+        except (TypeError, ValueError, KeyError) as e:
+            logger.error("❌ [COUNT_CACHE] 总数缓存解析失败，按未命中处理: %s", e)
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_ratio": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "ttl": self.ttl,
+            "exact_limit": self.exact_limit,
+        }
+
+
+# 全局实例
+count_cache_service = CountCacheService()
@@ -2,30 +2,39 @@
 文档列表缓存服务
 功能：专门处理文档列表查询的缓存逻辑
 """
-import json
-import time
 import hashlib
-from typing import Dict, Any, Optional, Union
+import logging
+import time
+from typing import Dict, Any, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..client import RedisClient
+from ...log import get_logger, log_sampled
+from ..async_client import async_redis_client
+from ..read_through import ReadThroughCache, resolve, with_new_async_session
+from ..tags import PUBLIC_LIST_NAMESPACE, user_list_namespace
+from .view_counter import view_counter_service
+
+logger = get_logger(__name__)
 
 
 class DocumentListCacheService:
     """文档列表缓存服务"""
 
     def __init__(self):
-        self.redis_client = RedisClient()
+        self.redis_client = async_redis_client  # 共享进程级异步连接池
+        self.read_through = ReadThroughCache("doc_list", client=self.redis_client)
 
         # 缓存配置
-        self.public_list_ttl = 600  # 技术广场列表：10分钟
-        self.user_list_ttl = 1200  # 个人文档列表：20分钟
+        # 发布/撤回/更新/删除会按标签主动失效，TTL只作为兜底
+        self.public_list_ttl = 1800  # 技术广场列表：软TTL 30分钟
+        self.public_list_hard_ttl = 7200  # 技术广场列表：硬TTL 2小时（软TTL后返回旧数据并后台刷新）
+        self.user_list_ttl = 3600  # 个人文档列表：1小时
         self.key_prefix = "doc_list"
 
-        print(f"📄 [DOC_LIST_CACHE] 文档列表缓存服务初始化")
-        print(f"📄 [DOC_LIST_CACHE] 公开列表TTL: {self.public_list_ttl}秒")
-        print(f"📄 [DOC_LIST_CACHE] 用户列表TTL: {self.user_list_ttl}秒")
-        print(f"📄 [DOC_LIST_CACHE] Redis可用: {self.redis_client.is_available()}")
+        logger.info("📄 [DOC_LIST_CACHE] 文档列表缓存服务初始化")
+        logger.debug("📄 [DOC_LIST_CACHE] 公开列表TTL: %s/%s秒", self.public_list_ttl, self.public_list_hard_ttl)
+        logger.debug("📄 [DOC_LIST_CACHE] 用户列表TTL: %s秒", self.user_list_ttl)
 
     def _generate_search_hash(self, search_text: Optional[str]) -> str:
         """生成搜索关键词的哈希值（避免Key过长）"""
@@ -36,7 +45,7 @@ class DocumentListCacheService:
         hash_obj = hashlib.md5(search_text.encode('utf-8'))
         hash_value = hash_obj.hexdigest()[:8]  # 取前8位
 
-        print(f"🔍 [DOC_LIST_CACHE] 搜索词哈希: '{search_text}' -> {hash_value}")
+        logger.debug("🔍 [DOC_LIST_CACHE] 搜索词哈希: '%s' -> %s", search_text, hash_value)
         return hash_value
 
     def _build_public_cache_key(
@@ -46,9 +55,10 @@ class DocumentListCacheService:
             search: Optional[str] = None,
             file_type: Optional[str] = None,
             time_filter: Optional[str] = None,
-            sort_by: str = "latest"
+            sort_by: str = "latest",
+            include_total: bool = True
     ) -> str:
-        """构建技术广场文档列表缓存Key"""
+        """构建技术广场文档列表缓存Key（命名空间内部分，完整Key带版本号）"""
 
         # 处理可选参数
         search_hash = self._generate_search_hash(search)
@@ -56,11 +66,13 @@ class DocumentListCacheService:
         time_filter_str = time_filter or "none"
 
         # 构建缓存Key
-        key = f"{self.key_prefix}:public:p{page}:s{size}:q{search_hash}:t{file_type_str}:time{time_filter_str}:sort{sort_by}"
+        key = f"p{page}:s{size}:q{search_hash}:t{file_type_str}:time{time_filter_str}:sort{sort_by}"
+        if not include_total:
+            key += ":nototal"
 
-        print(f"🔑 [DOC_LIST_CACHE] 构建公开列表缓存Key: {key}")
-        print(
-            f"🔑 [DOC_LIST_CACHE] 参数详情: page={page}, size={size}, search='{search}', type={file_type_str}, time={time_filter_str}, sort={sort_by}")
+        logger.debug("🔑 [DOC_LIST_CACHE] 构建公开列表缓存Key: %s", key)
+        logger.debug("🔑 [DOC_LIST_CACHE] 参数详情: page=%s, size=%s, search='%s', type=%s, time=%s, sort=%s",
+                     page, size, search, file_type_str, time_filter_str, sort_by)
 
         return key
 
@@ -71,19 +83,20 @@ class DocumentListCacheService:
             size: int,
             folder_id: Optional[int] = None
     ) -> str:
-        """构建个人文档列表缓存Key"""
+        """构建个人文档列表缓存Key（命名空间内部分，完整Key带版本号）"""
 
         folder_str = str(folder_id) if folder_id is not None else "none"
-        key = f"{self.key_prefix}:user{user_id}:p{page}:s{size}:f{folder_str}"
+        key = f"p{page}:s{size}:f{folder_str}"
 
-        print(f"🔑 [DOC_LIST_CACHE] 构建用户列表缓存Key: {key}")
-        print(f"🔑 [DOC_LIST_CACHE] 参数详情: user_id={user_id}, page={page}, size={size}, folder_id={folder_id}")
+        logger.debug("🔑 [DOC_LIST_CACHE] 构建用户列表缓存Key: %s", key)
+        logger.debug("🔑 [DOC_LIST_CACHE] 参数详情: user_id=%s, page=%s, size=%s, folder_id=%s",
+                     user_id, page, size, folder_id)
 
         return key
 
     async def get_public_document_list(
             self,
-            db: Session,
+            db: AsyncSession,
             query_func,  # 传入查询函数
             page: int,
             size: int,
@@ -91,6 +104,7 @@ class DocumentListCacheService:
             file_type: Optional[str] = None,
             time_filter: Optional[str] = None,
             sort_by: str = "latest",
+            include_total: bool = True,
             **kwargs
     ) -> Dict[str, Any]:
         """
@@ -105,44 +119,40 @@ class DocumentListCacheService:
             file_type: 文件类型筛选
             time_filter: 时间筛选
             sort_by: 排序方式
+            include_total: 是否统计总数（不同取值分别缓存）
             **kwargs: 其他参数传递给查询函数
         """
-        cache_key = self._build_public_cache_key(page, size, search, file_type, time_filter, sort_by)
-
-        print(f"📄 [DOC_LIST_CACHE] 开始获取技术广场文档列表缓存...")
-        print(f"📄 [DOC_LIST_CACHE] 缓存Key: {cache_key}")
-
-        # 🔍 第一步：尝试从缓存获取
-        cached_data = await self._get_from_cache(cache_key)
-        if cached_data:
-            print(f"✅ [DOC_LIST_CACHE] 缓存命中! 返回缓存数据")
-
-            # 添加缓存信息
-            cached_data["cache_info"] = {
-                "cached": True,
-                "cache_time": cached_data.get("_cache_time"),
-                "ttl_remaining": self.redis_client.ttl(cache_key),
-                "cache_type": "public_document_list",
-                "cache_key": cache_key
-            }
-
-            return cached_data
-
-        # 🗄️ 第二步：缓存未命中，查询数据库
-        print(f"❌ [DOC_LIST_CACHE] 缓存未命中，查询数据库...")
-        list_data = await self._query_public_list(db, query_func, page, size, search, file_type, time_filter, sort_by,
-                                                  **kwargs)
-
-        # 💾 第三步：写入缓存
-        await self._save_to_cache(cache_key, list_data, self.public_list_ttl)
+        cache_key = self._build_public_cache_key(page, size, search, file_type, time_filter, sort_by, include_total)
+        kwargs["include_total"] = include_total
+
+        logger.debug("📄 [DOC_LIST_CACHE] 开始获取技术广场文档列表缓存...")
+        logger.debug("📄 [DOC_LIST_CACHE] 缓存Key: %s", cache_key)
+
+        # 读穿缓存：未命中时同一时间只有一个请求回源查询数据库
+        list_data, meta = await self.read_through.get_or_load(
+            cache_key,
+            lambda: self._query_public_list(db, query_func, page, size, search, file_type, time_filter,
+                                            sort_by, **kwargs),
+            self.public_list_hard_ttl,
+            soft_ttl=self.public_list_ttl,
+            refresh_loader=with_new_async_session(
+                lambda session: self._query_public_list(session, query_func, page, size, search, file_type,
+                                                        time_filter, sort_by, **kwargs)
+            ),
+            namespace=PUBLIC_LIST_NAMESPACE
+        )
+        if meta["cached"]:
+            log_sampled(logger, logging.DEBUG, "✅ [DOC_LIST_CACHE] 缓存命中! 返回缓存数据")
 
         # 添加缓存信息
         list_data["cache_info"] = {
-            "cached": False,
+            "cached": meta["cached"],
             "cache_time": list_data.get("_cache_time"),
-            "ttl_remaining": self.public_list_ttl,
+            "ttl_remaining": meta["ttl_remaining"],
+            "source": meta["source"],
+            "stale": meta.get("stale", False),
             "cache_type": "public_document_list",
-            "cache_key": cache_key
+            "cache_key": meta["key"]
         }
 
         return list_data
@@ -171,53 +181,42 @@ class DocumentListCacheService:
         """
         cache_key = self._build_user_cache_key(user_id, page, size, folder_id)
 
-        print(f"📄 [DOC_LIST_CACHE] 开始获取用户文档列表缓存...")
-        print(f"📄 [DOC_LIST_CACHE] 缓存Key: {cache_key}")
+        logger.debug("📄 [DOC_LIST_CACHE] 开始获取用户文档列表缓存...")
+        logger.debug("📄 [DOC_LIST_CACHE] 缓存Key: %s", cache_key)
 
-        # 🔍 第一步：尝试从缓存获取
-        cached_data = await self._get_from_cache(cache_key)
-        if cached_data:
-            print(f"✅ [DOC_LIST_CACHE] 缓存命中! 返回缓存数据")
-
-            # 添加缓存信息
-            cached_data["cache_info"] = {
-                "cached": True,
-                "cache_time": cached_data.get("_cache_time"),
-                "ttl_remaining": self.redis_client.ttl(cache_key),
-                "cache_type": "user_document_list",
-                "cache_key": cache_key
-            }
-
-            return cached_data
-
-        # 🗄️ 第二步：缓存未命中，查询数据库
-        print(f"❌ [DOC_LIST_CACHE] 缓存未命中，查询数据库...")
-        list_data = await self._query_user_list(db, query_func, user_id, page, size, folder_id, **kwargs)
-
-        # 💾 第三步：写入缓存
-        await self._save_to_cache(cache_key, list_data, self.user_list_ttl)
+        # 读穿缓存：未命中时同一时间只有一个请求回源查询数据库
+        list_data, meta = await self.read_through.get_or_load(
+            cache_key,
+            lambda: self._query_user_list(db, query_func, user_id, page, size, folder_id, **kwargs),
+            self.user_list_ttl,
+            namespace=user_list_namespace(user_id)
+        )
+        if meta["cached"]:
+            log_sampled(logger, logging.DEBUG, "✅ [DOC_LIST_CACHE] 缓存命中! 返回缓存数据")
 
         # 添加缓存信息
         list_data["cache_info"] = {
-            "cached": False,
+            "cached": meta["cached"],
             "cache_time": list_data.get("_cache_time"),
-            "ttl_remaining": self.user_list_ttl,
+            "ttl_remaining": meta["ttl_remaining"],
+            "source": meta["source"],
             "cache_type": "user_document_list",
-            "cache_key": cache_key
+            "cache_key": meta["key"]
         }
 
         return list_data
 
-    async def _query_public_list(self, db: Session, query_func, page: int, size: int, search: Optional[str],
+    async def _query_public_list(self, db: AsyncSession, query_func, page: int, size: int, search: Optional[str],
                                  file_type: Optional[str], time_filter: Optional[str], sort_by: str, **kwargs) -> Dict[
         str, Any]:
         """查询技术广场文档列表（带详细性能监控）"""
-        print(f"🗄️ [DOC_LIST_CACHE] 开始技术广场文档列表数据库查询...")
+        logger.debug("🗄️ [DOC_LIST_CACHE] 开始技术广场文档列表数据库查询...")
         start_time = time.time()
 
         try:
-            # 调用实际的查询函数
-            result = query_func(
+            # 调用实际的查询函数（可为async函数；后台刷新时db为独立的异步会话）
+            result = await resolve(query_func(
+                db=db,
                 page=page,
                 size=size,
                 search=search,
@@ -225,7 +224,7 @@ class DocumentListCacheService:
                 time_filter=time_filter,
                 sort_by=sort_by,
                 **kwargs
-            )
+            ))
 
             query_time = (time.time() - start_time) * 1000
 
@@ -250,33 +249,35 @@ class DocumentListCacheService:
                 }
             })
 
-            print(f"✅ [DOC_LIST_CACHE] 技术广场列表查询完成，总耗时: {query_time:.2f}ms")
-            print(
-                f"📊 [DOC_LIST_CACHE] 查询结果: 总数{result_dict.get('total', 0)}, 返回{len(result_dict.get('documents', []))}条")
+            logger.debug("✅ [DOC_LIST_CACHE] 技术广场列表查询完成，总耗时: %.2fms", query_time)
+            logger.debug("📊 [DOC_LIST_CACHE] 查询结果: 总数%s, 返回%s条",
+                         result_dict.get('total', 0), len(result_dict.get('documents', [])))
 
+            # 记录写回累计值：快照缓存期间写回数据库的浏览量仍能合并进来
+            await view_counter_service.stamp(result_dict, "documents")
             return result_dict
 
         except Exception as e:
             query_time = (time.time() - start_time) * 1000
-            print(f"❌ [DOC_LIST_CACHE] 技术广场列表查询失败 ({query_time:.2f}ms): {e}")
+            logger.error("❌ [DOC_LIST_CACHE] 技术广场列表查询失败 (%.2fms): %s", query_time, e)
             raise
 
     async def _query_user_list(self, db: Session, query_func, user_id: int, page: int, size: int,
                                folder_id: Optional[int], **kwargs) -> Dict[str, Any]:
         """查询个人文档列表（带详细性能监控）"""
-        print(f"🗄️ [DOC_LIST_CACHE] 开始用户文档列表数据库查询...")
+        logger.debug("🗄️ [DOC_LIST_CACHE] 开始用户文档列表数据库查询...")
         start_time = time.time()
 
         try:
             # 调用实际的查询函数
-            result = query_func(
+            result = await resolve(query_func(
                 db=db,
                 user_id=user_id,
                 folder_id=folder_id,
                 page=page,
                 page_size=size,
                 **kwargs
-            )
+            ))
 
             query_time = (time.time() - start_time) * 1000
 
@@ -303,116 +304,36 @@ class DocumentListCacheService:
                 }
             })
 
-            print(f"✅ [DOC_LIST_CACHE] 用户文档列表查询完成，总耗时: {query_time:.2f}ms")
-            print(
-                f"📊 [DOC_LIST_CACHE] 查询结果: 用户{user_id}, 总数{result_dict.get('total', 0)}, 返回{len(result_dict.get('documents', []))}条")
+            logger.debug("✅ [DOC_LIST_CACHE] 用户文档列表查询完成，总耗时: %.2fms", query_time)
+            logger.debug("📊 [DOC_LIST_CACHE] 查询结果: 用户%s, 总数%s, 返回%s条",
+                         user_id, result_dict.get('total', 0), len(result_dict.get('documents', [])))
 
             return result_dict
 
         except Exception as e:
             query_time = (time.time() - start_time) * 1000
-            print(f"❌ [DOC_LIST_CACHE] 用户文档列表查询失败 ({query_time:.2f}ms): {e}")
+            logger.error("❌ [DOC_LIST_CACHE] 用户文档列表查询失败 (%.2fms): %s", query_time, e)
             raise
 
-    async def _get_from_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """从缓存获取数据"""
-        if not self.redis_client.is_available():
-            print(f"⚠️ [DOC_LIST_CACHE] Redis不可用，跳过缓存读取")
-            return None
-
-        try:
-            start_time = time.time()
-            cached_str = self.redis_client.get(cache_key)
-            read_time = (time.time() - start_time) * 1000
-
-            if cached_str:
-                data = json.loads(cached_str)
-                print(f"💾 [DOC_LIST_CACHE] 缓存读取成功 ({read_time:.2f}ms), 数据大小: {len(cached_str)} bytes")
-                return data
-            else:
-                print(f"💾 [DOC_LIST_CACHE] 缓存Key不存在 ({read_time:.2f}ms)")
-                return None
-
-        except Exception as e:
-            print(f"❌ [DOC_LIST_CACHE] 缓存读取失败: {e}")
-            return None
-
-    async def _save_to_cache(self, cache_key: str, data: Dict[str, Any], ttl: int) -> bool:
-        """保存数据到缓存"""
+    async def invalidate_public_list_cache(self) -> bool:
+        """清除技术广场文档列表缓存（递增版本号，旧版本Key随TTL过期）"""
         if not self.redis_client.is_available():
-            print(f"⚠️ [DOC_LIST_CACHE] Redis不可用，跳过缓存写入")
+            logger.warning("⚠️ [DOC_LIST_CACHE] Redis不可用，无法清除缓存")
             return False
 
-        try:
-            start_time = time.time()
-            data_str = json.dumps(data, ensure_ascii=False, default=str)  # default=str处理datetime等类型
-            success = self.redis_client.setex(cache_key, ttl, data_str)
-            write_time = (time.time() - start_time) * 1000
-
-            if success:
-                print(f"💾 [DOC_LIST_CACHE] 缓存写入成功 ({write_time:.2f}ms)")
-                print(f"💾 [DOC_LIST_CACHE] 数据大小: {len(data_str)} bytes, TTL: {ttl}秒")
-                return True
-            else:
-                print(f"⚠️ [DOC_LIST_CACHE] 缓存写入失败 ({write_time:.2f}ms)")
-                return False
-
-        except Exception as e:
-            print(f"❌ [DOC_LIST_CACHE] 缓存写入异常: {e}")
-            return False
-
-    async def invalidate_public_list_cache(self, pattern: str = "doc_list:public:*") -> int:
-        """清除技术广场文档列表缓存（当有新文档发布时调用）"""
-        if not self.redis_client.is_available():
-            print(f"⚠️ [DOC_LIST_CACHE] Redis不可用，无法清除缓存")
-            return 0
-
-        try:
-            # 获取匹配的Key
-            keys = self.redis_client.keys(pattern)
-            if not keys:
-                print(f"ℹ️ [DOC_LIST_CACHE] 没有找到匹配的公开列表缓存Key")
-                return 0
-
-            # 批量删除
-            deleted_count = 0
-            for key in keys:
-                if self.redis_client.delete(key):
-                    deleted_count += 1
-
-            print(f"✅ [DOC_LIST_CACHE] 已清除{deleted_count}个技术广场列表缓存")
-            return deleted_count
-
-        except Exception as e:
-            print(f"❌ [DOC_LIST_CACHE] 清除公开列表缓存失败: {e}")
-            return 0
+        await self.redis_client.invalidate_tags([], namespaces=[PUBLIC_LIST_NAMESPACE])
+        logger.info("✅ [DOC_LIST_CACHE] 技术广场列表缓存版本号已递增")
+        return True
 
-    async def invalidate_user_list_cache(self, user_id: int) -> int:
-        """清除指定用户的文档列表缓存（当用户文档变更时调用）"""
+    async def invalidate_user_list_cache(self, user_id: int) -> bool:
+        """清除指定用户的文档列表缓存（递增该用户的版本号）"""
         if not self.redis_client.is_available():
-            print(f"⚠️ [DOC_LIST_CACHE] Redis不可用，无法清除缓存")
-            return 0
-
-        try:
-            pattern = f"doc_list:user{user_id}:*"
-            keys = self.redis_client.keys(pattern)
-
-            if not keys:
-                print(f"ℹ️ [DOC_LIST_CACHE] 没有找到用户{user_id}的列表缓存")
-                return 0
-
-            # 批量删除
-            deleted_count = 0
-            for key in keys:
-                if self.redis_client.delete(key):
-                    deleted_count += 1
-
-            print(f"✅ [DOC_LIST_CACHE] 已清除用户{user_id}的{deleted_count}个列表缓存")
-            return deleted_count
+            logger.warning("⚠️ [DOC_LIST_CACHE] Redis不可用，无法清除缓存")
+            return False
 
-        except Exception as e:
-            print(f"❌ [DOC_LIST_CACHE] 清除用户列表缓存失败: {e}")
-            return 0
+        await self.redis_client.invalidate_tags([], namespaces=[user_list_namespace(user_id)])
+        logger.info("✅ [DOC_LIST_CACHE] 用户%s的列表缓存版本号已递增", user_id)
+        return True
 
 
 # 全局实例
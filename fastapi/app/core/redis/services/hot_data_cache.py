@@ -2,130 +2,130 @@
 热门数据缓存服务
 功能：专门处理热门文档和最新文档的缓存逻辑
 """
-import json
+import logging
 import time
-from typing import Dict, Any, Optional, Callable
-from sqlalchemy.orm import Session
+from typing import Dict, Any, Callable
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..client import RedisClient
+from ...config import settings
+from ...log import get_logger, log_sampled
+from ..async_client import async_redis_client
+from ..read_through import ReadThroughCache, resolve, with_new_async_session
+from ..tags import PUBLIC_LIST_TAG, document_tags
+from .view_counter import view_counter_service
+
+logger = get_logger(__name__)
 
 
 class HotDataCacheService:
     """热门数据缓存服务"""
 
     def __init__(self):
-        self.redis_client = RedisClient()
-
-        # 缓存配置
-        self.hot_docs_ttl = 600  # 热门文档缓存10分钟
-        self.latest_docs_ttl = 300  # 最新文档缓存5分钟
+        self.redis_client = async_redis_client  # 共享进程级异步连接池
+        # 热门/最新列表是少量极热数据，额外启用进程内L1
+        self.read_through = ReadThroughCache("hot_data", client=self.redis_client, l1_ttl=settings.L1_CACHE_TTL)
+
+        # 缓存配置（软TTL到期后先返回旧数据再后台刷新，硬TTL到期才真正删除）
+        # 发布/撤回/更新会按标签主动失效；热门排序还依赖浏览量，软TTL保持较短
+        self.hot_docs_ttl = 600  # 热门文档软TTL 10分钟
+        self.hot_docs_hard_ttl = 3600  # 热门文档硬TTL 1小时
+        self.latest_docs_ttl = 1800  # 最新文档软TTL 30分钟
+        self.latest_docs_hard_ttl = 7200  # 最新文档硬TTL 2小时
         self.key_prefix = "hot_data"
+        self.hot_docs_tag = f"{self.key_prefix}:hot_docs"
+        self.latest_docs_tag = f"{self.key_prefix}:latest_docs"
 
-        print(f"🔥 [CACHE] 热门数据缓存服务初始化")
-        print(f"🔥 [CACHE] 热门文档TTL: {self.hot_docs_ttl}秒, 最新文档TTL: {self.latest_docs_ttl}秒")
-        print(f"🔥 [CACHE] Redis可用: {self.redis_client.is_available()}")
+        logger.info("🔥 [CACHE] 热门数据缓存服务初始化")
+        logger.debug("🔥 [CACHE] 热门文档TTL: %s/%s秒, 最新文档TTL: %s/%s秒",
+                     self.hot_docs_ttl, self.hot_docs_hard_ttl, self.latest_docs_ttl, self.latest_docs_hard_ttl)
 
     def _build_hot_docs_cache_key(self, limit: int) -> str:
         """构建热门文档缓存Key"""
         key = f"{self.key_prefix}:hot_docs:limit_{limit}"
-        print(f"🔑 [CACHE] 构建热门文档缓存Key: {key}")
+        logger.debug("🔑 [CACHE] 构建热门文档缓存Key: %s", key)
         return key
 
     def _build_latest_docs_cache_key(self, limit: int) -> str:
         """构建最新文档缓存Key"""
         key = f"{self.key_prefix}:latest_docs:limit_{limit}"
-        print(f"🔑 [CACHE] 构建最新文档缓存Key: {key}")
+        logger.debug("🔑 [CACHE] 构建最新文档缓存Key: %s", key)
         return key
 
-    async def get_hot_documents(self, db: Session, query_func: Callable, limit: int = 10) -> Dict[str, Any]:
+    async def get_hot_documents(self, db: AsyncSession, query_func: Callable, limit: int = 10) -> Dict[str, Any]:
         """
         获取热门文档列表（缓存优化版）
         """
         cache_key = self._build_hot_docs_cache_key(limit)
 
-        print(f"🔥 [CACHE] 开始获取热门文档缓存...")
-        print(f"🔥 [CACHE] 限制数量: {limit}, 缓存Key: {cache_key}")
-
-        # 🔍 第一步：尝试从缓存获取
-        cached_data = await self._get_from_cache(cache_key)
-        if cached_data:
-            print(f"✅ [CACHE] 热门文档缓存命中! 返回缓存数据")
-
-            # 添加缓存信息
-            cached_data["cache_info"] = {
-                "cached": True,
-                "cache_time": cached_data.get("_cache_time"),
-                "ttl_remaining": self.redis_client.ttl(cache_key)
-            }
-
-            return cached_data
-
-        # 🗄️ 第二步：缓存未命中，查询数据库
-        print(f"❌ [CACHE] 热门文档缓存未命中，查询数据库...")
-        docs_data = await self._query_hot_documents(db, query_func, limit)
-
-        # 💾 第三步：写入缓存
-        await self._save_to_cache(cache_key, docs_data, self.hot_docs_ttl)
+        logger.debug("🔥 [CACHE] 开始获取热门文档缓存...")
+        logger.debug("🔥 [CACHE] 限制数量: %s, 缓存Key: %s", limit, cache_key)
+
+        # 读穿缓存：未命中时同一时间只有一个请求回源查询数据库
+        docs_data, meta = await self.read_through.get_or_load(
+            cache_key,
+            lambda: self._query_hot_documents(db, query_func, limit),
+            self.hot_docs_hard_ttl,
+            soft_ttl=self.hot_docs_ttl,
+            refresh_loader=with_new_async_session(lambda session: self._query_hot_documents(session, query_func, limit)),
+            tags=lambda data: [PUBLIC_LIST_TAG, self.hot_docs_tag] + document_tags(data)
+        )
+        if meta["cached"]:
+            log_sampled(logger, logging.DEBUG, "✅ [CACHE] 热门文档缓存命中! 返回缓存数据")
 
         # 添加缓存信息
         docs_data["cache_info"] = {
-            "cached": False,
+            "cached": meta["cached"],
             "cache_time": docs_data.get("_cache_time"),
-            "ttl_remaining": self.hot_docs_ttl
+            "ttl_remaining": meta["ttl_remaining"],
+            "source": meta["source"],
+            "stale": meta.get("stale", False)
         }
 
         return docs_data
 
-    async def get_latest_documents(self, db: Session, query_func: Callable, limit: int = 10) -> Dict[str, Any]:
+    async def get_latest_documents(self, db: AsyncSession, query_func: Callable, limit: int = 10) -> Dict[str, Any]:
         """
         获取最新文档列表（缓存优化版）
         """
         cache_key = self._build_latest_docs_cache_key(limit)
 
-        print(f"📅 [CACHE] 开始获取最新文档缓存...")
-        print(f"📅 [CACHE] 限制数量: {limit}, 缓存Key: {cache_key}")
-
-        # 🔍 第一步：尝试从缓存获取
-        cached_data = await self._get_from_cache(cache_key)
-        if cached_data:
-            print(f"✅ [CACHE] 最新文档缓存命中! 返回缓存数据")
-
-            # 添加缓存信息
-            cached_data["cache_info"] = {
-                "cached": True,
-                "cache_time": cached_data.get("_cache_time"),
-                "ttl_remaining": self.redis_client.ttl(cache_key)
-            }
-
-            return cached_data
-
-        # 🗄️ 第二步：缓存未命中，查询数据库
-        print(f"❌ [CACHE] 最新文档缓存未命中，查询数据库...")
-        docs_data = await self._query_latest_documents(db, query_func, limit)
-
-        # 💾 第三步：写入缓存
-        await self._save_to_cache(cache_key, docs_data, self.latest_docs_ttl)
+        logger.debug("📅 [CACHE] 开始获取最新文档缓存...")
+        logger.debug("📅 [CACHE] 限制数量: %s, 缓存Key: %s", limit, cache_key)
+
+        # 读穿缓存：未命中时同一时间只有一个请求回源查询数据库
+        docs_data, meta = await self.read_through.get_or_load(
+            cache_key,
+            lambda: self._query_latest_documents(db, query_func, limit),
+            self.latest_docs_hard_ttl,
+            soft_ttl=self.latest_docs_ttl,
+            refresh_loader=with_new_async_session(lambda session: self._query_latest_documents(session, query_func, limit)),
+            tags=lambda data: [PUBLIC_LIST_TAG, self.latest_docs_tag] + document_tags(data)
+        )
+        if meta["cached"]:
+            log_sampled(logger, logging.DEBUG, "✅ [CACHE] 最新文档缓存命中! 返回缓存数据")
 
         # 添加缓存信息
         docs_data["cache_info"] = {
-            "cached": False,
+            "cached": meta["cached"],
             "cache_time": docs_data.get("_cache_time"),
-            "ttl_remaining": self.latest_docs_ttl
+            "ttl_remaining": meta["ttl_remaining"],
+            "source": meta["source"],
+            "stale": meta.get("stale", False)
         }
 
         return docs_data
 
-    async def _query_hot_documents(self, db: Session, query_func: Callable, limit: int) -> Dict[str, Any]:
+    async def _query_hot_documents(self, db: AsyncSession, query_func: Callable, limit: int) -> Dict[str, Any]:
         """查询热门文档数据（带性能监控）"""
-        print(f"🗄️ [CACHE] 开始查询热门文档数据库...")
+        logger.debug("🗄️ [CACHE] 开始查询热门文档数据库...")
         start_time = time.time()
 
         try:
-            # 调用传入的查询函数
-            result = query_func(limit=limit)
+            # 调用传入的查询函数（可为async函数；后台刷新时db为独立的异步会话）
+            result = await resolve(query_func(db=db, limit=limit))
 
             query_time = (time.time() - start_time) * 1000
-            print(f"✅ [CACHE] 热门文档数据库查询完成，总耗时: {query_time:.2f}ms")
+            logger.debug("✅ [CACHE] 热门文档数据库查询完成，总耗时: %.2fms", query_time)
 
             # 转换为字典格式
             if hasattr(result, 'model_dump'):
@@ -145,25 +145,27 @@ class HotDataCacheService:
                 }
             })
 
-            print(f"🗄️ [CACHE] 热门文档数量: {len(result_dict.get('documents', []))}")
+            logger.debug("🗄️ [CACHE] 热门文档数量: %s", len(result_dict.get('documents', [])))
+            # 记录写回累计值：快照缓存期间写回数据库的浏览量仍能合并进来
+            await view_counter_service.stamp(result_dict, "documents")
             return result_dict
 
         except Exception as e:
             query_time = (time.time() - start_time) * 1000
-            print(f"❌ [CACHE] 热门文档数据库查询失败 ({query_time:.2f}ms): {e}")
+            logger.error("❌ [CACHE] 热门文档数据库查询失败 (%.2fms): %s", query_time, e)
             raise
 
-    async def _query_latest_documents(self, db: Session, query_func: Callable, limit: int) -> Dict[str, Any]:
+    async def _query_latest_documents(self, db: AsyncSession, query_func: Callable, limit: int) -> Dict[str, Any]:
         """查询最新文档数据（带性能监控）"""
-        print(f"🗄️ [CACHE] 开始查询最新文档数据库...")
+        logger.debug("🗄️ [CACHE] 开始查询最新文档数据库...")
         start_time = time.time()
 
         try:
-            # 调用传入的查询函数
-            result = query_func(limit=limit)
+            # 调用传入的查询函数（可为async函数；后台刷新时db为独立的异步会话）
+            result = await resolve(query_func(db=db, limit=limit))
 
             query_time = (time.time() - start_time) * 1000
-            print(f"✅ [CACHE] 最新文档数据库查询完成，总耗时: {query_time:.2f}ms")
+            logger.debug("✅ [CACHE] 最新文档数据库查询完成，总耗时: %.2fms", query_time)
 
             # 转换为字典格式
             if hasattr(result, 'model_dump'):
@@ -183,129 +185,45 @@ class HotDataCacheService:
                 }
             })
 
-            print(f"🗄️ [CACHE] 最新文档数量: {len(result_dict.get('documents', []))}")
+            logger.debug("🗄️ [CACHE] 最新文档数量: %s", len(result_dict.get('documents', [])))
+            # 记录写回累计值：快照缓存期间写回数据库的浏览量仍能合并进来
+            await view_counter_service.stamp(result_dict, "documents")
             return result_dict
 
         except Exception as e:
             query_time = (time.time() - start_time) * 1000
-            print(f"❌ [CACHE] 最新文档数据库查询失败 ({query_time:.2f}ms): {e}")
+            logger.error("❌ [CACHE] 最新文档数据库查询失败 (%.2fms): %s", query_time, e)
             raise
 
-    async def _get_from_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """从缓存获取数据"""
-        if not self.redis_client.is_available():
-            print(f"⚠️ [CACHE] Redis不可用，跳过缓存读取")
-            return None
-
-        try:
-            start_time = time.time()
-            cached_str = self.redis_client.get(cache_key)
-            read_time = (time.time() - start_time) * 1000
-
-            if cached_str:
-                data = json.loads(cached_str)
-                print(f"💾 [CACHE] 缓存读取成功 ({read_time:.2f}ms), 数据大小: {len(cached_str)} bytes")
-                return data
-            else:
-                print(f"💾 [CACHE] 缓存Key不存在 ({read_time:.2f}ms)")
-                return None
-
-        except Exception as e:
-            print(f"❌ [CACHE] 缓存读取失败: {e}")
-            return None
-
-    async def _save_to_cache(self, cache_key: str, data: Dict[str, Any], ttl: int) -> bool:
-        """保存数据到缓存"""
-        if not self.redis_client.is_available():
-            print(f"⚠️ [CACHE] Redis不可用，跳过缓存写入")
-            return False
-
-        try:
-            start_time = time.time()
-            data_str = json.dumps(data, ensure_ascii=False, default=str)
-            success = self.redis_client.setex(cache_key, ttl, data_str)
-            write_time = (time.time() - start_time) * 1000
-
-            if success:
-                print(f"💾 [CACHE] 缓存写入成功 ({write_time:.2f}ms)")
-                print(f"💾 [CACHE] 数据大小: {len(data_str)} bytes, TTL: {ttl}秒")
-                return True
-            else:
-                print(f"⚠️ [CACHE] 缓存写入失败 ({write_time:.2f}ms)")
-                return False
-
-        except Exception as e:
-            print(f"❌ [CACHE] 缓存写入异常: {e}")
-            return False
-
     async def invalidate_hot_documents_cache(self) -> bool:
         """清除所有热门文档缓存"""
         if not self.redis_client.is_available():
-            print(f"⚠️ [CACHE] Redis不可用，无法清除缓存")
+            logger.warning("⚠️ [CACHE] Redis不可用，无法清除缓存")
             return False
 
-        try:
-            # 获取所有热门文档缓存Key
-            pattern = f"{self.key_prefix}:hot_docs:*"
-            keys = self.redis_client.scan_iter(match=pattern)
-
-            deleted_count = 0
-            for key in keys:
-                if self.redis_client.delete(key):
-                    deleted_count += 1
-
-            print(f"✅ [CACHE] 热门文档缓存已清除: {deleted_count}个Key")
-            return True
-
-        except Exception as e:
-            print(f"❌ [CACHE] 清除热门文档缓存失败: {e}")
-            return False
+        deleted_count = await self.redis_client.invalidate_tags([self.hot_docs_tag])
+        logger.info("✅ [CACHE] 热门文档缓存已清除: %s个Key", deleted_count)
+        return True
 
     async def invalidate_latest_documents_cache(self) -> bool:
         """清除所有最新文档缓存"""
         if not self.redis_client.is_available():
-            print(f"⚠️ [CACHE] Redis不可用，无法清除缓存")
+            logger.warning("⚠️ [CACHE] Redis不可用，无法清除缓存")
             return False
 
-        try:
-            # 获取所有最新文档缓存Key
-            pattern = f"{self.key_prefix}:latest_docs:*"
-            keys = self.redis_client.scan_iter(match=pattern)
-
-            deleted_count = 0
-            for key in keys:
-                if self.redis_client.delete(key):
-                    deleted_count += 1
-
-            print(f"✅ [CACHE] 最新文档缓存已清除: {deleted_count}个Key")
-            return True
-
-        except Exception as e:
-            print(f"❌ [CACHE] 清除最新文档缓存失败: {e}")
-            return False
+        deleted_count = await self.redis_client.invalidate_tags([self.latest_docs_tag])
+        logger.info("✅ [CACHE] 最新文档缓存已清除: %s个Key", deleted_count)
+        return True
 
     async def invalidate_all_hot_data_cache(self) -> bool:
         """清除所有热门数据缓存"""
         if not self.redis_client.is_available():
-            print(f"⚠️ [CACHE] Redis不可用，无法清除缓存")
+            logger.warning("⚠️ [CACHE] Redis不可用，无法清除缓存")
             return False
 
-        try:
-            # 获取所有热门数据缓存Key
-            pattern = f"{self.key_prefix}:*"
-            keys = self.redis_client.scan_iter(match=pattern)
-
-            deleted_count = 0
-            for key in keys:
-                if self.redis_client.delete(key):
-                    deleted_count += 1
-
-            print(f"✅ [CACHE] 所有热门数据缓存已清除: {deleted_count}个Key")
-            return True
-
-        except Exception as e:
-            print(f"❌ [CACHE] 清除所有热门数据缓存失败: {e}")
-            return False
+        deleted_count = await self.redis_client.invalidate_tags([self.hot_docs_tag, self.latest_docs_tag])
+        logger.info("✅ [CACHE] 所有热门数据缓存已清除: %s个Key", deleted_count)
+        return True
 
 
 # 全局实例
@@ -0,0 +1,149 @@
+"""
+浏览去重与独立访客统计（HyperLogLog）
+功能：浏览先经过去重窗口，再计入独立访客；刷新、重复请求在写库之前就被丢弃
+
+- 访客标识：登录用户用用户ID，匿名访客用 IP + User-Agent 的哈希
+- 去重窗口：views:seen:{范围}:{访客} SET NX EX，窗口内同一访客重复浏览直接忽略，不写缓冲、不写库
+- 独立访客：每个范围按天一个 HyperLogLog（views:uv:{范围}:{YYYYMMDD}，保留 UNIQUE_VIEW_RETENTION_DAYS 天）
+  另有一个累计 HyperLogLog（views:uv:{范围}:all），每个约12KB，基数误差约0.81%；
+  累计HLL每次计数时刷新过期时间，UNIQUE_VIEW_ALL_TIME_TTL_DAYS 天没有新浏览的范围会被回收
+- 去重、PFADD、设置过期时间在一个Lua脚本里完成，每次浏览只有一次Redis往返
+- 查询独立访客用 PFCOUNT，与访问量无关；近7天是7个按天HLL的并集
+- 记录结果区分重复浏览、计数、当天新访客（PFADD 改变了当天HLL），供分享访问日汇总累计当日独立访客
+- Redis 不可用时不做去重（每次都计数），独立访客数返回 None
+
+范围：doc:{document_id}（技术广场文档）、share:{share_id}（分享链接）、square（技术广场整体）
+日期按 UTC 划分，与分享统计的时间窗口一致
+"""
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from ...config import settings
+from ...log import get_logger
+from ..async_client import async_redis_client
+from ..client import redis_client
+
+logger = get_logger(__name__)
+
+SQUARE_SCOPE = "square"
+
+# 浏览记录结果
+VIEW_DUPLICATE = 0  # 去重窗口内的重复浏览，不计数
+VIEW_COUNTED = 1  # 计数，今天已经来过的访客
+VIEW_NEW_VISITOR = 2  # 计数，且是今天的新访客
+
+
+def document_scope(document_id: int) -> str:
+    return f"doc:{document_id}"
+
+
+def share_scope(share_id: int) -> str:
+    return f"share:{share_id}"
+
+
+def visitor_id(user_id: Optional[int], ip: Optional[str], user_agent: Optional[str]) -> str:
+    """访客标识：登录用户按用户ID，匿名访客按 IP + User-Agent 哈希（不在Redis中保存原始IP）"""
+    if user_id:
+        return f"u{user_id}"
+    digest = hashlib.sha1(f"{ip or ''}\n{user_agent or ''}".encode("utf-8")).hexdigest()
+    return f"a{digest[:16]}"
+
+
+class UniqueViewService:
+    """浏览去重与独立访客统计服务"""
+
+    def __init__(self):
+        self.redis_client = async_redis_client
+        self.sync_redis_client = redis_client
+        self.dedup_window = settings.VIEW_DEDUP_WINDOW
+        self.retention_days = settings.UNIQUE_VIEW_RETENTION_DAYS
+        self.all_time_ttl = settings.UNIQUE_VIEW_ALL_TIME_TTL_DAYS * 86400
+        self._stats = {"counted": 0, "duplicates": 0, "unavailable": 0}
+
+        logger.info("👥 [UNIQUE_VIEWS] 独立访客统计初始化，去重窗口: %s秒", self.dedup_window)
+
+    # ==================== 记录 ====================
+
+    async def record(self, scopes: List[str], visitor: str) -> int:
+        """
+        记录一次浏览，返回 VIEW_DUPLICATE / VIEW_COUNTED / VIEW_NEW_VISITOR（非0即应该计数）
+
+        Args:
+            scopes: 统计范围，第一个范围用于去重和判断当天新访客，其余范围只累计独立访客
+            visitor: 访客标识（visitor_id）
+        """
+        seen_key, hll_ttls = self._keys(scopes, visitor)
+        return self._count(await self.redis_client.record_view(seen_key, self.dedup_window, hll_ttls, visitor))
+
+    def record_sync(self, scopes: List[str], visitor: str) -> int:
+        """同 record（同步版本）"""
+        seen_key, hll_ttls = self._keys(scopes, visitor)
+        return self._count(self.sync_redis_client.record_view(seen_key, self.dedup_window, hll_ttls, visitor))
+
+    async def record_document_view(self, document_id: int, visitor: str) -> int:
+        """技术广场文档浏览：同时计入技术广场整体的独立访客"""
+        return await self.record([document_scope(document_id), SQUARE_SCOPE], visitor)
+
+    async def record_share_view(self, share_id: int, visitor: str) -> int:
+        return await self.record([share_scope(share_id)], visitor)
+
+    def record_share_view_sync(self, share_id: int, visitor: str) -> int:
+        return self.record_sync([share_scope(share_id)], visitor)
+
+    def _keys(self, scopes: List[str], visitor: str):
+        day_ttl = (self.retention_days + 1) * 86400
+        today = self._day_suffix(datetime.utcnow())
+        hll_ttls: Dict[str, int] = {}
+        for scope in scopes:
+            hll_ttls[f"views:uv:{scope}:{today}"] = day_ttl
+            hll_ttls[f"views:uv:{scope}:all"] = self.all_time_ttl
+        return f"views:seen:{scopes[0]}:{visitor}", hll_ttls
+
+    def _count(self, result: Optional[int]) -> int:
+        if result is None:
+            # Redis 不可用：不去重，保持原来每次都计数的行为，每次浏览按新访客计
+            self._stats["unavailable"] += 1
+            return VIEW_NEW_VISITOR
+        self._stats["counted" if result else "duplicates"] += 1
+        return int(result)
+
+    # ==================== 查询 ====================
+
+    async def get_unique_counts(self, scopes: List[str]) -> Dict[str, Dict[str, Optional[int]]]:
+        """
+        批量查询独立访客数（一次pipeline）
+
+        Returns:
+            {范围: {"total": 累计, "today": 今日, "week": 近7天}}，Redis不可用时值为 None
+        """
+        days = [self._day_suffix(datetime.utcnow() - timedelta(days=offset)) for offset in range(7)]
+        key_groups = []
+        for scope in scopes:
+            key_groups.append([f"views:uv:{scope}:all"])
+            key_groups.append([f"views:uv:{scope}:{days[0]}"])
+            key_groups.append([f"views:uv:{scope}:{day}" for day in days])
+
+        counts = await self.redis_client.pfcount_many(key_groups)
+        return {
+            scope: dict(zip(("total", "today", "week"), counts[index * 3:index * 3 + 3]))
+            for index, scope in enumerate(scopes)
+        }
+
+    async def get_share_unique_counts(self, share_id: int) -> Dict[str, Optional[int]]:
+        scope = share_scope(share_id)
+        return (await self.get_unique_counts([scope]))[scope]
+
+    async def get_square_unique_counts(self) -> Dict[str, Optional[int]]:
+        return (await self.get_unique_counts([SQUARE_SCOPE]))[SQUARE_SCOPE]
+
+    @staticmethod
+    def _day_suffix(moment: datetime) -> str:
+        return moment.strftime("%Y%m%d")
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self._stats, "dedup_window": self.dedup_window, "retention_days": self.retention_days}
+
+
+# 全局实例
+unique_view_service = UniqueViewService()
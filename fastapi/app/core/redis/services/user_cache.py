@@ -5,6 +5,9 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 from ....core.redis.base import BaseCacheService
 from ....core.config import settings
+from ....core.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class UserCacheService(BaseCacheService):
@@ -26,11 +29,8 @@ class UserCacheService(BaseCacheService):
 
     def set_user_info(self, user_id: int, user_data: Dict[str, Any]) -> bool:
         """设置用户信息缓存"""
-        print(f"💾 [DEBUG] 开始写入缓存，用户ID: {user_id}")
-        print(f"💾 [DEBUG] Redis客户端可用性: {self.redis_client.is_available()}")
-
         result = self.set(str(user_id), user_data)
-        print(f"💾 [DEBUG] 缓存写入最终结果: {result}")
+        logger.debug("💾 用户缓存写入 user_id=%s result=%s", user_id, result)
         return result
 
     def delete_user_info(self, user_id: int) -> bool:
@@ -0,0 +1,266 @@
+"""
+浏览量写缓冲（write-behind）
+功能：浏览量先 HINCRBY 到 Redis 哈希，后台任务定期取走全部增量，用一条 UPDATE ... CASE 批量写回 MySQL
+
+- 每次浏览只有一条 Redis 命令，没有 SELECT / UPDATE / COMMIT，也没有读改写竞争导致的丢失
+- 写回分三步，任何时刻每个增量都能被读到：
+  1. views:pending 整体改名为 views:flushing（Lua，原子；上一次写回未结束时不开始新的写回）
+  2. 写库提交
+  3. views:flushing 的增量累加到 views:flushed（每篇文档累计已写回的浏览量）后删除
+- 写库失败时把 views:flushing 加回缓冲区，下个周期重试
+- 读取浏览量时合并尚未落库的增量（apply_pending）：pending + flushing，
+  缓存的快照另外加上快照之后才写回数据库的部分（views:flushed 当前值 - 快照时记录的值，见 stamp），
+  写回之后、旧快照过期之前，列表中的数字不会回落
+- Redis 不可用时退回直接执行 view_count = view_count + 1（数据库原子自增）
+- 缓冲区按 document_id 计数；写库语句由业务模块注册（register_writer），core 不依赖业务模型
+
+取舍：
+- worker 在取走增量之后、写库提交之前崩溃，views:flushing 过期后会丢失这一个刷新周期的浏览量
+- 快照在读库之后记录写回累计值，两者之间（毫秒级）恰好完成的写回会让该快照少算或多算一次增量
+"""
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from ...config import settings
+from ...database import AsyncSessionLocal, SessionLocal
+from ...log import get_logger
+from ..async_client import async_redis_client
+from ..client import redis_client
+
+logger = get_logger(__name__)
+
+# 缓存快照中记录写回累计值的字段（返回前由 apply_pending 移除）
+VIEW_MARKS_FIELD = "_view_marks"
+
+# 写库语句构造函数：(document_id → 增量, 每条语句最多包含的文档数) → 语句列表
+WriteStatements = Callable[[Dict[int, int], int], List[Any]]
+
+
+def _get_field(item: Any, name: str) -> Any:
+    return item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+
+
+def _to_int(value: Any) -> int:
+    return int(value) if value else 0
+
+
+class ViewCounterService:
+    """浏览量写缓冲服务"""
+
+    def __init__(self):
+        self.redis_client = async_redis_client  # 共享进程级异步连接池
+        self.sync_redis_client = redis_client  # 同步业务服务使用
+        self.buffer_key = "views:pending"
+        self.flushing_key = "views:flushing"
+        self.flushed_key = "views:flushed"
+        self.flush_gen_key = "views:flush_gen"
+        self.flush_interval = settings.VIEW_FLUSH_INTERVAL
+        self.batch_size = settings.VIEW_FLUSH_BATCH_SIZE
+        # 写回中的增量在worker崩溃后最多保留的时间，之后允许新的写回
+        self.flushing_ttl = max(60, int(self.flush_interval * 6))
+        self._write_statements: Optional[WriteStatements] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "buffered": 0,
+            "direct_writes": 0,
+            "flushes": 0,
+            "flushed_documents": 0,
+            "flushed_views": 0,
+            "flush_failures": 0,
+        }
+
+        logger.info("👁️ [VIEW_COUNTER] 浏览量写缓冲初始化，刷新间隔: %s秒", self.flush_interval)
+
+    def register_writer(self, write_statements: WriteStatements):
+        """注册写库语句（由拥有浏览量字段的业务模块在导入时调用）"""
+        self._write_statements = write_statements
+
+    def _statements(self, deltas: Dict[int, int]) -> List[Any]:
+        if self._write_statements is None:
+            raise RuntimeError("浏览量写库语句未注册（view_counter_service.register_writer）")
+        return self._write_statements(deltas, self.batch_size)
+
+    # ==================== 计数 ====================
+
+    async def increment(self, document_id: int):
+        """记录一次浏览"""
+        if await self.redis_client.hincrby(self.buffer_key, str(document_id)) is not None:
+            self._stats["buffered"] += 1
+            return
+
+        # Redis 不可用：直接写库（原子自增）
+        await self._write({document_id: 1})
+        self._stats["direct_writes"] += 1
+
+    def increment_sync(self, document_id: int):
+        """记录一次浏览（同步版本）"""
+        if self.sync_redis_client.hincrby(self.buffer_key, str(document_id)) is not None:
+            self._stats["buffered"] += 1
+            return
+
+        with SessionLocal() as session:
+            for statement in self._statements({document_id: 1}):
+                session.execute(statement)
+            session.commit()
+        self._stats["direct_writes"] += 1
+
+    # ==================== 读取时合并 ====================
+
+    async def stamp(self, result: Any, field: Optional[str] = None):
+        """
+        给即将写入缓存的快照记录各文档当前的写回累计值（缓存服务的回源函数在读库之后调用）
+
+        之后读取该快照时，累计值的增长部分就是快照之后才写回数据库、快照里没有的浏览量
+        """
+        items = self._items(result, field)
+        if not items or not isinstance(result, dict):
+            return
+        document_ids = [str(_get_field(item, "id")) for item in items]
+        flushed, = await self.redis_client.hmget_many([self.flushed_key], document_ids)
+        result[VIEW_MARKS_FIELD] = {
+            document_id: _to_int(total) for document_id, total in zip(document_ids, flushed) if total is not None
+        }
+
+    async def apply_pending(self, result: Any, field: Optional[str] = None):
+        """
+        把尚未落库的浏览量增量加到文档的 view_count 上
+
+        Args:
+            result: 接口返回值（dict 或响应模型；带 stamp 记录的缓存快照时同时补上快照之后写回的部分）
+            field: 文档列表所在字段（如 "documents"），为空时 result 本身就是一篇文档
+        """
+        marks = self._pop_marks(result)
+        items = self._items(result, field)
+        if items:
+            document_ids = [str(_get_field(item, "id")) for item in items]
+            values = await self.redis_client.hmget_many(self._read_keys(marks), document_ids)
+            self._merge(result, field, items, self._deltas(document_ids, values, marks))
+
+    def apply_pending_sync(self, result: Any, field: Optional[str] = None):
+        """同 apply_pending（同步版本）"""
+        marks = self._pop_marks(result)
+        items = self._items(result, field)
+        if items:
+            document_ids = [str(_get_field(item, "id")) for item in items]
+            values = self.sync_redis_client.hmget_many(self._read_keys(marks), document_ids)
+            self._merge(result, field, items, self._deltas(document_ids, values, marks))
+
+    @staticmethod
+    def _pop_marks(result: Any) -> Optional[Dict[str, int]]:
+        return result.pop(VIEW_MARKS_FIELD, None) if isinstance(result, dict) else None
+
+    def _read_keys(self, marks: Optional[Dict[str, int]]) -> List[str]:
+        keys = [self.buffer_key, self.flushing_key]
+        return keys + [self.flushed_key] if marks is not None else keys
+
+    @staticmethod
+    def _deltas(document_ids: List[str], values: List[List[Any]], marks: Optional[Dict[str, int]]) -> List[int]:
+        """每篇文档：缓冲区 + 写回中 +（快照之后写回的部分，累计值被清空时不回退）"""
+        deltas = []
+        for i, document_id in enumerate(document_ids):
+            delta = _to_int(values[0][i]) + _to_int(values[1][i])
+            if marks is not None:
+                delta += max(_to_int(values[2][i]) - marks.get(document_id, 0), 0)
+            deltas.append(delta)
+        return deltas
+
+    @staticmethod
+    def _items(result: Any, field: Optional[str]) -> List[Any]:
+        if result is None:
+            return []
+        return list(_get_field(result, field) or []) if field else [result]
+
+    @staticmethod
+    def _merge(result: Any, field: Optional[str], items: List[Any], deltas: List[int]):
+        merged = []
+        for item, delta in zip(items, deltas):
+            if delta:
+                view_count = (_get_field(item, "view_count") or 0) + delta
+                if isinstance(item, dict):
+                    # 缓存返回的 dict 只浅拷贝了外层，文档条目可能与L1缓存共享，复制后再修改
+                    item = {**item, "view_count": view_count}
+                else:
+                    item.view_count = view_count
+            merged.append(item)
+
+        if field and isinstance(result, dict):
+            result[field] = merged
+
+    # ==================== 刷新 ====================
+
+    async def flush(self) -> int:
+        """取走缓冲区的全部增量并写库，返回写入的文档数"""
+        taken = await self.redis_client.begin_hash_flush(
+            self.buffer_key, self.flushing_key, self.flush_gen_key, self.flushing_ttl
+        )
+        if taken is None:
+            return 0
+        gen, data = taken
+        if gen < 0:
+            logger.debug("👁️ [VIEW_COUNTER] 其他worker正在写回浏览量，跳过本轮")
+        if gen <= 0:
+            return 0
+
+        deltas = {
+            int(document_id): int(delta) for document_id, delta in data.items()
+            if document_id != "_gen" and int(delta)
+        }
+        try:
+            await self._write(deltas)
+        except Exception as e:
+            self._stats["flush_failures"] += 1
+            logger.error("❌ [VIEW_COUNTER] 浏览量写库失败，增量放回缓冲区: %s", e)
+            await self.redis_client.end_hash_flush(self.flushing_key, self.buffer_key, gen)
+            return 0
+
+        # 已写入数据库：计入写回累计值，旧快照据此补上这部分浏览量
+        await self.redis_client.end_hash_flush(self.flushing_key, self.flushed_key, gen)
+
+        self._stats["flushes"] += 1
+        self._stats["flushed_documents"] += len(deltas)
+        self._stats["flushed_views"] += sum(deltas.values())
+        logger.debug("👁️ [VIEW_COUNTER] 已写回 %s 篇文档的浏览量，共 %s 次", len(deltas), sum(deltas.values()))
+        return len(deltas)
+
+    async def _write(self, deltas: Dict[int, int]):
+        """所有批次在同一个事务中提交：失败时整体回滚，放回缓冲区不会重复累加"""
+        async with AsyncSessionLocal() as session:
+            for statement in self._statements(deltas):
+                await session.execute(statement)
+            await session.commit()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台刷新，并把剩余增量写库"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ [VIEW_COUNTER] 刷新浏览量失败: %s", e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self._task is not None and not self._task.done(),
+            "flush_interval": self.flush_interval,
+        }
+
+
+# 全局实例
+view_counter_service = ViewCounterService()
@@ -0,0 +1,98 @@
+"""
+缓存标签（Tag）与版本化命名空间定义
+
+标签：缓存写入时把Key登记到标签集合，数据变更时按标签精确删除，不扫描整个keyspace
+- doc:{id}      包含该文档的热门/最新列表
+- public_list   依赖"已发布文档集合"的单Key缓存（热门、最新、全站统计）
+- user:{id}     该用户的统计缓存
+- 其余标签为各缓存服务自己的命名空间（如 hot_docs），用于整体清除
+
+版本化命名空间：分页/筛选组合很多的缓存，Key中带上 {namespace}:gen 的当前值，
+失效时只需 INCR 一次，旧版本的Key不再被读取，随TTL自然过期
+- doc_list:public     技术广场文档列表
+- search_cache        搜索结果
+- doc_list:user{id}   个人文档列表
+- comments:doc{id}    文档评论第一页
+"""
+from typing import Any, Dict, Iterable, List
+
+TAG_KEY_PREFIX = "cache_tag"
+
+# 标签集合过期时间：需要不小于所有缓存的硬TTL，集合里残留的过期Key删除时无副作用
+TAG_TTL = 86400
+
+PUBLIC_LIST_TAG = "public_list"
+
+PUBLIC_LIST_NAMESPACE = "doc_list:public"
+SEARCH_NAMESPACE = "search_cache"
+
+# KEYS 前 ARGV[1] 个为标签集合，其余为命名空间版本号
+# 标签：删除集合中的所有缓存Key，再删除集合本身（分批 unpack，避免超出Lua栈限制）
+# 命名空间：版本号 INCR
+# 最后向 ARGV[2] 频道发布 ARGV[3]，通知所有worker清除进程内L1缓存
+INVALIDATE_TAGS_LUA = """
+local tag_count = tonumber(ARGV[1])
+local deleted = 0
+for i, key in ipairs(KEYS) do
+    if i <= tag_count then
+        local members = redis.call('SMEMBERS', key)
+        for j = 1, #members, 500 do
+            deleted = deleted + redis.call('DEL', unpack(members, j, math.min(j + 499, #members)))
+        end
+        redis.call('DEL', key)
+    else
+        redis.call('INCR', key)
+    end
+end
+redis.call('PUBLISH', ARGV[2], ARGV[3])
+return deleted
+"""
+
+# 一次往返读取命名空间版本号，并用当前版本号拼出Key读取数据和TTL
+# 返回 false 而不是 nil，避免Lua数组在空值处被截断
+GET_VERSIONED_LUA = """
+local gen = redis.call('GET', KEYS[1]) or '0'
+local key = ARGV[1] .. gen .. ARGV[2]
+return {gen, redis.call('GET', key), redis.call('TTL', key)}
+"""
+
+
+def doc_tag(document_id: int) -> str:
+    return f"doc:{document_id}"
+
+
+def user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def user_list_namespace(user_id: int) -> str:
+    return f"doc_list:user{user_id}"
+
+
+def comment_namespace(document_id: int) -> str:
+    return f"comments:doc{document_id}"
+
+
+def namespace_gen_key(namespace: str) -> str:
+    """命名空间版本号Key"""
+    return f"{namespace}:gen"
+
+
+def versioned_key(namespace: str, generation: int, key: str) -> str:
+    """带版本号的完整缓存Key"""
+    return f"{namespace}:g{generation}:{key}"
+
+
+def tag_key(tag: str) -> str:
+    """标签对应的Redis集合Key"""
+    return f"{TAG_KEY_PREFIX}:{tag}"
+
+
+def document_tags(data: Dict[str, Any]) -> List[str]:
+    """列表类缓存数据中每个文档对应的 doc:{id} 标签"""
+    return [doc_tag(doc["id"]) for doc in data.get("documents") or [] if isinstance(doc, dict) and "id" in doc]
+
+
+def unique_tags(tags: Iterable[str]) -> List[str]:
+    """去重并保持顺序"""
+    return list(dict.fromkeys(tag for tag in tags if tag))
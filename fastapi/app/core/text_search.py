@@ -0,0 +1,87 @@
+"""
+全文检索分词与BM25参数
+功能：把标题、摘要、正文切分为检索词，供倒排索引（tech_square/search_index.py）建索引和查询共用
+
+分词规则：
+- 先做 NFKC 归一化并转小写（全角字母数字转半角）
+- 连续的中日韩字符切成二元组（bigram）："全文检索" → 全文 / 文检 / 检索，单个汉字保留为一个词
+- 建索引时另外为每个中日韩字符登记单字词（unigram），单字查询（如"索"）也能命中"检索"；
+  查询时多字只用二元组，单字词不参与多字查询的打分
+- 连续的字母数字作为一个词："FastAPI2" → fastapi2
+- 其他字符（标点、Markdown 语法符号）作为分隔符丢弃
+
+字段权重：标题、摘要中的词按权重计入词频，命中标题的文档排名更靠前（BM25F 的简化形式）
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 检索词最大长度（与 us_search_postings.term 列宽一致）
+MAX_TERM_LENGTH = 32
+
+# 单次查询最多使用的检索词数量
+MAX_QUERY_TERMS = 16
+
+# 字段权重
+TITLE_WEIGHT = 3
+SUMMARY_WEIGHT = 2
+CONTENT_WEIGHT = 1
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 平假名/片假名、CJK扩展A、CJK基本区、韩文音节、CJK兼容区
+_CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN_PATTERN = re.compile(f"[{_CJK_RANGES}]+|[a-z0-9]+")
+_CJK_PATTERN = re.compile(f"[{_CJK_RANGES}]")
+
+
+def tokenize(text: Optional[str], unigrams: bool = False) -> List[str]:
+    """
+    把文本切分为检索词（保留重复，用于统计词频）
+
+    Args:
+        unigrams: 多字的中日韩字符串是否同时输出单字词（建索引时为 True）
+    """
+    if not text:
+        return []
+
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(normalized):
+        run = match.group()
+        if _CJK_PATTERN.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+                if unigrams:
+                    tokens.extend(run)
+        else:
+            tokens.append(run[:MAX_TERM_LENGTH])
+    return tokens
+
+
+def query_terms(query: Optional[str]) -> List[str]:
+    """查询词去重（保持顺序），最多 MAX_QUERY_TERMS 个"""
+    terms = list(dict.fromkeys(tokenize(query)))
+    return terms[:MAX_QUERY_TERMS]
+
+
+def term_frequencies(fields: Iterable[Tuple[Optional[str], int]]) -> Tuple[Dict[str, int], int]:
+    """
+    按字段权重统计词频（建索引用，包含中日韩单字词）
+
+    Args:
+        fields: (文本, 权重) 列表
+
+    Returns:
+        (词 → 加权词频, 加权文档长度)
+    """
+    frequencies: Counter = Counter()
+    for text, weight in fields:
+        for term in tokenize(text, unigrams=True):
+            frequencies[term] += weight
+    return dict(frequencies), sum(frequencies.values())
@@ -5,12 +5,10 @@ import os
 import importlib
 import logging
 from .core.config import settings
+from .core.log import setup_logging
 
-# 配置日志
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# 配置日志（根级别 LOG_LEVEL，按模块覆盖 LOG_LEVELS）
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -118,6 +116,97 @@ def create_app() -> FastAPI:
             "debug": settings.DEBUG
         }
 
+    @app.get("/api/health/redis")
+    async def redis_pool_stats():
+        """Redis连接池统计（按worker进程统计，pid区分不同worker）"""
+        from .core.redis import get_redis_client, get_async_redis_client
+        from .core.redis.read_through import get_read_through_stats
+        from .core.redis.local_cache import invalidation_listener
+        from .core.redis.serializer import cache_serializer
+        from .core.redis.services import count_cache_service, unique_view_service, view_counter_service
+        from .modules.v2.interaction.counters import interaction_counter_service
+        return {
+            "sync_pool": get_redis_client().get_pool_stats(),
+            "async_pool": get_async_redis_client().get_pool_stats(),
+            "serializer": cache_serializer.describe(),
+            "read_through": get_read_through_stats(),
+            "count_cache": count_cache_service.get_stats(),
+            "view_counter": view_counter_service.get_stats(),
+            "unique_views": unique_view_service.get_stats(),
+            "interaction_counters": interaction_counter_service.get_stats(),
+            "invalidation_listener": invalidation_listener.get_stats()
+        }
+
+    @app.get("/api/health/db")
+    async def db_pool_stats():
+        """数据库连接池与请求会话统计（同步引擎 / 异步引擎，按worker进程统计）"""
+        from .core.database import engine, async_engine, sync_session_metrics, async_session_metrics
+        from .modules.v2.share_system.access_log_writer import access_log_writer
+        return {
+            "pid": os.getpid(),
+            "sync_pool": engine.pool.status(),
+            "async_pool": async_engine.pool.status(),
+            "sync_sessions": sync_session_metrics.get_stats(),
+            "async_sessions": async_session_metrics.get_stats(),
+            "access_log_writer": access_log_writer.get_stats()
+        }
+
+    @app.on_event("startup")
+    async def start_cache_invalidation_listener():
+        """每个worker订阅缓存失效广播，用于清除进程内L1缓存"""
+        from .core.redis.local_cache import invalidation_listener
+        invalidation_listener.start()
+
+    @app.on_event("startup")
+    async def start_view_counter_flusher():
+        """每个worker定期把Redis中缓冲的浏览量批量写回MySQL"""
+        from .core.redis.services import view_counter_service
+        view_counter_service.start()
+
+    @app.on_event("startup")
+    async def start_interaction_reconciler():
+        """每个worker定期校对互动计数（分布式锁保证每个周期只有一个worker执行）"""
+        from .modules.v2.interaction.counters import interaction_counter_service
+        interaction_counter_service.start()
+
+    @app.on_event("shutdown")
+    async def stop_interaction_reconciler():
+        """应用退出时停止互动计数校对任务"""
+        from .modules.v2.interaction.counters import interaction_counter_service
+        await interaction_counter_service.stop()
+
+    @app.on_event("startup")
+    async def start_access_log_writer():
+        """每个worker在后台批量写入分享访问日志"""
+        from .modules.v2.share_system.access_log_writer import access_log_writer
+        access_log_writer.start()
+
+    @app.on_event("shutdown")
+    async def flush_view_counter():
+        """应用退出时写回剩余的浏览量（在关闭Redis和数据库连接池之前注册，先执行）"""
+        from .core.redis.services import view_counter_service
+        await view_counter_service.stop()
+
+    @app.on_event("shutdown")
+    async def flush_access_log_writer():
+        """应用退出时写入队列中剩余的访问日志（在关闭数据库连接池之前注册，先执行）"""
+        from .modules.v2.share_system.access_log_writer import access_log_writer
+        await access_log_writer.stop()
+
+    @app.on_event("shutdown")
+    async def close_redis_pools():
+        """应用退出时停止失效订阅并关闭异步Redis连接池"""
+        from .core.redis import get_async_redis_client
+        from .core.redis.local_cache import invalidation_listener
+        await invalidation_listener.stop()
+        await get_async_redis_client().close()
+
+    @app.on_event("shutdown")
+    async def dispose_async_engine():
+        """应用退出时关闭异步数据库连接池"""
+        from .core.database import async_engine
+        await async_engine.dispose()
+
     return app
 
 
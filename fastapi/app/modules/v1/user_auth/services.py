@@ -13,10 +13,13 @@ from sqlalchemy import or_
 
 from app.core.config import settings
 from app.core.database import get_db
+from ....core.log import get_logger
 from ....core.redis import user_cache  # 🆕 使用相对路径导入Redis缓存
 from .models import User
 from .schemas import LoginRequest, TokenResponse, UserInfo
 
+logger = get_logger(__name__)
+
 
 class AuthService:
     """认证服务类"""
@@ -179,47 +182,46 @@ class AuthService:
         """
         根据令牌获取当前用户（带Redis缓存优化）
         """
-        print("🔍 [DEBUG] 开始获取当前用户...")
+        logger.debug("🔍 [DEBUG] 开始获取当前用户...")
 
         # 验证令牌
         payload = AuthService.verify_token(token)
         if not payload:
-            print("❌ [DEBUG] Token验证失败")
+            logger.debug("❌ [DEBUG] Token验证失败")
             return None
 
         # 获取用户ID
         user_id = payload.get("sub")
         if not user_id:
-            print("❌ [DEBUG] 无法从Token获取用户ID")
+            logger.debug("❌ [DEBUG] 无法从Token获取用户ID")
             return None
 
         user_id = int(user_id)
-        print(f"🔍 [DEBUG] 用户ID: {user_id}")
+        logger.debug("🔍 [DEBUG] 用户ID: %s", user_id)
 
         # 🚀 尝试从Redis缓存获取用户信息
-        print("🔍 [DEBUG] 尝试从Redis缓存获取用户信息...")
+        logger.debug("🔍 [DEBUG] 尝试从Redis缓存获取用户信息...")
         try:
             cached_user_data = user_cache.get_user_info(user_id)
             if cached_user_data:
-                print("✅ [DEBUG] 从缓存获取用户信息成功")
+                logger.debug("✅ [DEBUG] 从缓存获取用户信息成功")
                 return user_cache.create_user_object(cached_user_data)
             else:
-                print("❌ [DEBUG] 缓存未命中")
+                logger.debug("❌ [DEBUG] 缓存未命中")
         except Exception as e:
-            print(f"❌ [DEBUG] 缓存获取异常: {e}")
+            logger.debug("❌ [DEBUG] 缓存获取异常: %s", e)
 
-        print("🔍 [DEBUG] 查询数据库...")
+        logger.debug("🔍 [DEBUG] 查询数据库...")
         # 缓存未命中，查询数据库
         user = db.query(User).filter(User.id == user_id).first()
         if user:
-            print("✅ [DEBUG] 数据库查询成功，尝试写入缓存...")
+            logger.debug("✅ [DEBUG] 数据库查询成功，尝试写入缓存...")
             try:
                 # 🚀 将用户信息写入Redis缓存
                 user_data = user_cache.format_user_data(user)
-                print(f"💾 [DEBUG] 准备缓存数据: {user_data}")
                 result = user_cache.set_user_info(user_id, user_data)
-                print(f"💾 [DEBUG] 缓存写入结果: {result}")
+                logger.debug("💾 [DEBUG] 缓存写入结果: %s", result)
             except Exception as e:
-                print(f"❌ [DEBUG] 缓存写入异常: {e}")
+                logger.debug("❌ [DEBUG] 缓存写入异常: %s", e)
 
         return user
\ No newline at end of file
@@ -4,20 +4,10 @@
 """
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
-from app.core.database import SessionLocal
+from app.core.database import get_db  # 复用核心惰性会话依赖，同一请求内与认证依赖共享会话
 from app.modules.v1.user_auth.dependencies import get_current_user
 from app.modules.v1.user_register.models import User
 
-def get_db():
-    """
-    获取数据库会话
-    这是一个依赖函数，FastAPI会自动管理数据库连接的生命周期
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     """
@@ -40,4 +30,4 @@ def get_db_and_user(
     组合依赖：同时提供数据库会话和当前用户
     这样在路由中就不需要重复声明两个依赖了
     """
-    return db, current_user
\ No newline at end of file
+    return db, current_user
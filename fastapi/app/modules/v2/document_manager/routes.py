@@ -7,6 +7,7 @@ from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
+import logging
 import time
 from datetime import datetime
 import mimetypes
@@ -21,9 +22,14 @@ from .schemas import (
     DocumentCreateRequest, DocumentUpdateRequest, DocumentResponse,
     DocumentListWithPaginationResponse, SuccessResponse
 )
+from ....core.log import get_logger, log_sampled
+from ....core.pagination import InvalidCursorError
 from ....core.redis.services import stats_cache_service, document_list_cache_service
 from ....modules.v1.user_register.models import User
 # 创建路由器
+
+logger = get_logger(__name__)
+
 router = APIRouter()
 
 
@@ -174,6 +180,7 @@ async def get_documents_list(
         folder_id: Optional[int] = Query(None, description="文件夹ID，不填获取所有文档，0表示根目录"),
         page: int = Query(1, ge=1, description="页码"),
         page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+        cursor: Optional[str] = Query(None, description="游标（取自上一页的next_cursor，传入时忽略page）"),
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_active_user)
 ):
@@ -187,6 +194,7 @@ async def get_documents_list(
       - 其他数字：获取指定文件夹下的文档
     - **page**: 页码（从1开始）
     - **page_size**: 每页数量（1-100）
+    - **cursor**: 游标分页（可选），深翻页耗时不随页数增长，不返回总数
 
     返回：
     - 文档列表（按更新时间倒序）
@@ -199,8 +207,16 @@ async def get_documents_list(
     - ✅ 缓存未命中时自动查询数据库
     - ✅ 优雅降级：Redis不可用时直接查询数据库
     """
-    print("📄 [USER_DOCS] 开始获取用户文档列表（缓存版）")
-    print(f"📄 [USER_DOCS] 用户ID: {current_user.id}, 查询参数: folder_id={folder_id}, page={page}, size={page_size}")
+    logger.debug("📄 [USER_DOCS] 开始获取用户文档列表（缓存版）")
+    logger.debug("📄 [USER_DOCS] 用户ID: %s, 查询参数: folder_id=%s, page=%s, size=%s",
+                 current_user.id, folder_id, page, page_size)
+
+    # 📑 游标分页：直接走 keyset 查询，不经过页码缓存
+    if cursor:
+        try:
+            return DocumentService.get_documents_list(db, current_user.id, folder_id, page, page_size, cursor=cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     try:
         start_time = time.time()
@@ -208,7 +224,7 @@ async def get_documents_list(
         # 🚀 使用缓存服务获取文档列表
         def query_function(**kwargs):
             """实际的数据库查询函数"""
-            print(f"🗄️ [USER_DOCS] 执行数据库查询...")
+            logger.debug("🗄️ [USER_DOCS] 执行数据库查询...")
 
             # 调用原有服务
             return DocumentService.get_documents_list(
@@ -232,9 +248,9 @@ async def get_documents_list(
 
         # 添加路由层的调试信息
         is_cached = result.get("cache_info", {}).get("cached", False)
-        print(f"📄 [USER_DOCS] 用户文档列表获取完成，总耗时: {total_time:.2f}ms")
-        print(f"📄 [USER_DOCS] 缓存状态: {'命中' if is_cached else '未命中'}")
-        print(f"📄 [USER_DOCS] 返回结果: 总数{result.get('total', 0)}, 当前页{len(result.get('documents', []))}条")
+        logger.debug("📄 [USER_DOCS] 用户文档列表获取完成，总耗时: %.2fms", total_time)
+        log_sampled(logger, logging.DEBUG, "📄 [USER_DOCS] 缓存状态: %s", '命中' if is_cached else '未命中')
+        logger.debug("📄 [USER_DOCS] 返回结果: 总数%s, 当前页%s条", result.get('total', 0), len(result.get('documents', [])))
 
         # 添加路由层的性能信息
         result["_route_debug_info"] = {
@@ -251,9 +267,9 @@ async def get_documents_list(
         }
 
         if is_cached:
-            print(f"✅ [USER_DOCS] 缓存命中! 总耗时: {total_time:.2f}ms")
+            log_sampled(logger, logging.DEBUG, "✅ [USER_DOCS] 缓存命中! 总耗时: %.2fms", total_time)
         else:
-            print(f"🔄 [USER_DOCS] 缓存未命中，已查询数据库并写入缓存")
+            log_sampled(logger, logging.DEBUG, "🔄 [USER_DOCS] 缓存未命中，已查询数据库并写入缓存")
 
         # 转换为响应模型
         if isinstance(result, dict):
@@ -265,14 +281,14 @@ async def get_documents_list(
 
     except Exception as e:
         error_time = (time.time() - start_time) * 1000 if 'start_time' in locals() else 0
-        print(f"❌ [USER_DOCS] 获取用户文档列表失败 ({error_time:.2f}ms): {str(e)}")
+        logger.error("❌ [USER_DOCS] 获取用户文档列表失败 (%.2fms): %s", error_time, e)
 
         # 🛡️ 优雅降级：缓存服务异常时使用原有服务
-        print(f"🔄 [USER_DOCS] 尝试使用原有服务作为降级方案...")
+        logger.info("🔄 [USER_DOCS] 尝试使用原有服务作为降级方案...")
         try:
             fallback_result = DocumentService.get_documents_list(db, current_user.id, folder_id, page, page_size)
 
-            print(f"✅ [USER_DOCS] 降级方案成功")
+            logger.info("✅ [USER_DOCS] 降级方案成功")
 
             # 添加降级信息
             if hasattr(fallback_result, '__dict__'):
@@ -285,7 +301,7 @@ async def get_documents_list(
             return fallback_result
 
         except Exception as fallback_error:
-            print(f"❌ [USER_DOCS] 降级方案也失败: {str(fallback_error)}")
+            logger.error("❌ [USER_DOCS] 降级方案也失败: %s", fallback_error)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"获取文档列表失败: {str(e)}，降级方案也失败: {str(fallback_error)}"
@@ -308,16 +324,14 @@ async def get_user_stats(
     - Redis缓存优化
     - 详细的性能监控信息
     """
-    print("🔍 [STATS] =========================")
-    print(f"🔍 [STATS] 开始获取用户统计数据（缓存版）")
-    print(f"🔍 [STATS] 用户ID: {current_user.id}")
-    print(f"🔍 [STATS] 用户名: {current_user.username}")
-    print(f"🔍 [STATS] 请求时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}")
+    logger.debug("🔍 [STATS] 开始获取用户统计数据（缓存版）")
+    logger.debug("🔍 [STATS] 用户ID: %s", current_user.id)
+    logger.debug("🔍 [STATS] 用户名: %s", current_user.username)
 
     overall_start = time.time()
 
     try:
-        print("💾 [STATS] 尝试使用Redis缓存...")
+        logger.debug("💾 [STATS] 尝试使用Redis缓存...")
 
         # 🚀 使用缓存服务获取统计数据
         cache_start = time.time()
@@ -329,13 +343,13 @@ async def get_user_stats(
         is_cached = result.get("cache_info", {}).get("cached", False)
 
         if is_cached:
-            print(f"✅ [STATS] 缓存命中! 总耗时: {total_time:.2f}ms")
-            print(f"⚡ [STATS] 缓存服务耗时: {cache_time:.2f}ms")
-            print(f"🚀 [STATS] 性能提升: 跳过了数据库查询!")
+            log_sampled(logger, logging.DEBUG, "✅ [STATS] 缓存命中! 总耗时: %.2fms", total_time)
+            logger.debug("⚡ [STATS] 缓存服务耗时: %.2fms", cache_time)
+            logger.debug("🚀 [STATS] 性能提升: 跳过了数据库查询!")
         else:
-            print(f"✅ [STATS] 缓存未命中，已查询数据库并缓存")
-            print(f"⚡ [STATS] 总耗时: {total_time:.2f}ms")
-            print(f"💾 [STATS] 下次请求将从缓存获取")
+            log_sampled(logger, logging.DEBUG, "✅ [STATS] 缓存未命中，已查询数据库并缓存")
+            logger.debug("⚡ [STATS] 总耗时: %.2fms", total_time)
+            logger.debug("💾 [STATS] 下次请求将从缓存获取")
 
         # 添加路由层的性能信息
         result["_route_debug_info"] = {
@@ -345,19 +359,15 @@ async def get_user_stats(
             "performance_improvement": "缓存命中，跳过数据库查询" if is_cached else "首次查询，已写入缓存"
         }
 
-        print(f"📊 [STATS] 返回结果: 文档{result['total_documents']}个, 文件夹{result['total_folders']}个")
-        print(f"📊 [STATS] 状态分布: {result['documents_by_status']}")
-        print(f"💾 [STATS] 缓存状态: {'命中' if is_cached else '未命中'}")
-        print("🔍 [STATS] =========================")
+        logger.debug("📊 [STATS] 返回结果: 文档%s个, 文件夹%s个", result['total_documents'], result['total_folders'])
+        logger.debug("📊 [STATS] 状态分布: %s", result['documents_by_status'])
+        log_sampled(logger, logging.DEBUG, "💾 [STATS] 缓存状态: %s", '命中' if is_cached else '未命中')
 
         return result
 
     except Exception as e:
         error_time = (time.time() - overall_start) * 1000
-        print(f"❌ [STATS] 统计失败! 耗时: {error_time:.2f}ms")
-        print(f"❌ [STATS] 错误类型: {type(e).__name__}")
-        print(f"❌ [STATS] 错误详情: {str(e)}")
-        print("🔍 [STATS] =========================")
+        logger.error("❌ [STATS] 统计失败! 耗时: %.2fms, 错误类型: %s, 错误详情: %s", error_time, type(e).__name__, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取统计信息失败: {str(e)}"
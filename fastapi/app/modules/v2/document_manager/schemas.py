@@ -126,10 +126,11 @@ class DocumentListResponse(BaseModel):
 class DocumentListWithPaginationResponse(BaseModel):
     """带分页的文档列表响应"""
     documents: List[DocumentListResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # 游标分页模式不计算
+    page: Optional[int] = None  # 游标分页模式为空
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # 下一页游标（没有下一页时为空）
 
 
 # ==================== 通用响应 ====================
@@ -6,9 +6,9 @@
 import urllib.parse
 import re
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from sqlalchemy import and_, or_, desc, func, select
 from fastapi import HTTPException, status
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import os
 from datetime import datetime
 
@@ -19,12 +19,39 @@ from .schemas import (
     DocumentListResponse, DocumentListWithPaginationResponse
 )
 from app.modules.v2.document_publish.models import PublishRecord
+from app.modules.v2.tech_square.search_index import search_index_service
+from app.core.redis.services import cache_invalidation_service
+from app.core.pagination import decode_cursor, keyset_after, page_cursor, slice_page
 # 在现有导入中添加
 from fastapi.responses import FileResponse, StreamingResponse
 import mimetypes
 from pathlib import Path
 import aiofiles
 
+# 个人文档列表游标分页：按更新时间倒序，ID作为平局裁决
+DOCUMENT_LIST_CURSOR_KIND = "documents:updated"
+DOCUMENT_LIST_SORT_COLUMNS = [Document.updated_at, Document.id]
+
+
+def _document_sort_key(row) -> Tuple[datetime, int]:
+    doc = row[0]
+    return doc.updated_at, doc.id
+
+
+def _to_document_list_item(doc: Document, folder_name: Optional[str]) -> DocumentListResponse:
+    return DocumentListResponse(
+        id=doc.id,
+        title=doc.title,
+        file_type=doc.file_type,  # 直接使用字符串值
+        file_size=doc.file_size,
+        status=doc.status,  # 直接使用字符串值
+        folder_id=doc.folder_id,
+        folder_name=folder_name,
+        created_at=doc.created_at,
+        updated_at=doc.updated_at
+    )
+
+
 class FolderService:
     """文件夹服务类"""
 
@@ -87,32 +114,34 @@ class FolderService:
 
     @staticmethod
     def get_folder_tree(db: Session, user_id: int) -> List[FolderTreeResponse]:
-        """获取用户的文件夹树形结构"""
+        """获取用户的文件夹树形结构（固定2次查询，线性时间建树）"""
         # 获取用户所有文件夹
-        folders = db.query(Folder).filter(Folder.user_id == user_id).all()
+        folders = db.query(Folder).filter(Folder.user_id == user_id).order_by(Folder.id).all()
+
+        # 一次 GROUP BY 统计每个文件夹下的文档数量
+        doc_counts = dict(
+            db.query(Document.folder_id, func.count(Document.id))
+            .filter(and_(Document.user_id == user_id, Document.folder_id.isnot(None)))
+            .group_by(Document.folder_id)
+            .all()
+        )
+
+        # 父ID -> 子文件夹列表
+        children_map: Dict[Optional[int], List[Folder]] = {}
+        for folder in folders:
+            children_map.setdefault(folder.parent_id, []).append(folder)
 
-        # 构建树形结构
         def build_tree(parent_id: Optional[int] = None) -> List[FolderTreeResponse]:
-            tree = []
-            for folder in folders:
-                if folder.parent_id == parent_id:
-                    # 计算该文件夹下的文档数量
-                    doc_count = db.query(Document).filter(
-                        and_(
-                            Document.folder_id == folder.id,
-                            Document.user_id == user_id
-                        )
-                    ).count()
-
-                    folder_node = FolderTreeResponse(
-                        id=folder.id,
-                        name=folder.name,
-                        level=folder.level,
-                        children=build_tree(folder.id),
-                        document_count=doc_count
-                    )
-                    tree.append(folder_node)
-            return tree
+            return [
+                FolderTreeResponse(
+                    id=folder.id,
+                    name=folder.name,
+                    level=folder.level,
+                    children=build_tree(folder.id),
+                    document_count=doc_counts.get(folder.id, 0)
+                )
+                for folder in children_map.get(parent_id, [])
+            ]
 
         return build_tree()
 
@@ -199,6 +228,9 @@ class DocumentService:
         db.commit()
         db.refresh(new_document)
 
+        # 清除个人文档列表和统计缓存
+        cache_invalidation_service.on_user_documents_changed(user_id)
+
         return DocumentService._build_document_response(db, new_document)
 
     @staticmethod
@@ -279,6 +311,13 @@ class DocumentService:
         db.commit()
         db.refresh(document)
 
+        is_published = document.status == 'published'
+        if is_published:
+            search_index_service.schedule_sync(doc_id)
+
+        # 清除个人列表和统计缓存；已发布文档的修改同时影响技术广场列表和搜索
+        cache_invalidation_service.on_document_changed(doc_id, user_id, affects_public=is_published)
+
         return DocumentService._build_document_response(db, document)
 
     @staticmethod
@@ -301,8 +340,15 @@ class DocumentService:
             except Exception as e:
                 print(f"删除文件失败: {e}")
 
+        was_published = document.status == 'published'
+        if was_published:
+            search_index_service.remove_document(db, doc_id)
+
         db.delete(document)
         db.commit()
+
+        # 删除已发布文档会改变技术广场的文档集合
+        cache_invalidation_service.on_document_changed(doc_id, user_id, affects_public=was_published)
         return True
 
     @staticmethod
@@ -311,9 +357,14 @@ class DocumentService:
         user_id: int,
         folder_id: Optional[int] = None,
         page: int = 1,
-        page_size: int = 20
+        page_size: int = 20,
+        cursor: Optional[str] = None
     ) -> DocumentListWithPaginationResponse:
-        """获取文档列表（分页）"""
+        """
+        获取文档列表（分页）
+
+        传入 cursor 时使用游标分页：按 (updated_at, id) 定位，不计算总数
+        """
         # 构建查询条件
         query = db.query(Document).filter(Document.user_id == user_id)
 
@@ -323,62 +374,68 @@ class DocumentService:
             else:
                 query = query.filter(Document.folder_id == folder_id)
 
+        # 列表查询（LEFT JOIN 一次取出文件夹名称；ID作为平局裁决保证翻页顺序稳定）
+        list_query = (
+            query.outerjoin(Folder, Document.folder_id == Folder.id)
+            .add_columns(Folder.name)
+            .order_by(desc(Document.updated_at), desc(Document.id))
+        )
+
+        if cursor:
+            after = decode_cursor(cursor, DOCUMENT_LIST_CURSOR_KIND)
+            rows = list_query.filter(keyset_after(DOCUMENT_LIST_SORT_COLUMNS, after)).limit(page_size + 1).all()
+            rows, has_next, next_cursor = slice_page(rows, page_size, DOCUMENT_LIST_CURSOR_KIND, _document_sort_key)
+            return DocumentListWithPaginationResponse(
+                documents=[_to_document_list_item(doc, folder_name) for doc, folder_name in rows],
+                page_size=page_size,
+                next_cursor=next_cursor
+            )
+
         # 获取总数
         total = query.count()
 
         # 分页查询
-        documents = query.order_by(desc(Document.updated_at)).offset((page - 1) * page_size).limit(page_size).all()
-
-        # 构建响应
-        doc_list = []
-        for doc in documents:
-            folder_name = None
-            if doc.folder_id:
-                folder = db.query(Folder).filter(Folder.id == doc.folder_id).first()
-                folder_name = folder.name if folder else None
-
-            doc_list.append(DocumentListResponse(
-                id=doc.id,
-                title=doc.title,
-                file_type=doc.file_type,  # 直接使用字符串值
-                file_size=doc.file_size,
-                status=doc.status,  # 直接使用字符串值
-                folder_id=doc.folder_id,
-                folder_name=folder_name,
-                created_at=doc.created_at,
-                updated_at=doc.updated_at
-            ))
+        rows = list_query.offset((page - 1) * page_size).limit(page_size).all()
 
         total_pages = (total + page_size - 1) // page_size
+        next_cursor = page_cursor(rows, page < total_pages, DOCUMENT_LIST_CURSOR_KIND, _document_sort_key)
 
         return DocumentListWithPaginationResponse(
-            documents=doc_list,
+            documents=[_to_document_list_item(doc, folder_name) for doc, folder_name in rows],
             total=total,
             page=page,
             page_size=page_size,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor
+        )
+
+    @staticmethod
+    def _folder_name_subquery(folder_id: Optional[int]):
+        return select(Folder.name).where(Folder.id == folder_id).scalar_subquery()
+
+    @staticmethod
+    def _publish_status_subquery(doc_id: int):
+        return (
+            select(PublishRecord.publish_status)
+            .where(PublishRecord.document_id == doc_id)
+            .order_by(PublishRecord.id)
+            .limit(1)
+            .scalar_subquery()
         )
 
     @staticmethod
     def _build_document_response(db: Session, document: Document) -> DocumentResponse:
         """构建文档响应对象"""
-        folder_name = None
-        if document.folder_id:
-            folder = db.query(Folder).filter(Folder.id == document.folder_id).first()
-            folder_name = folder.name if folder else None
-
-        # 🆕 获取发布记录状态
-        publish_record = db.query(PublishRecord).filter(
-            PublishRecord.document_id == document.id
-        ).first()
+        # 文件夹名称和发布记录状态合并为一次查询
+        folder_name, record_status = db.query(
+            DocumentService._folder_name_subquery(document.folder_id),
+            DocumentService._publish_status_subquery(document.id)
+        ).one()
 
         # 🆕 计算组合状态
-        publish_status = "draft"  # 技术广场状态
+        publish_status = record_status or "draft"  # 技术广场状态
         content_status = document.status  # 内容状态
 
-        if publish_record:
-            publish_status = publish_record.publish_status
-
         return DocumentResponse(
             id=document.id,
             title=document.title,
@@ -65,6 +65,7 @@ async def get_published_documents(
         size: int = Query(20, ge=1, le=100, description="每页数量"),
         status: Optional[str] = Query(None, description="发布状态筛选"),
         is_featured: Optional[bool] = Query(None, description="是否精选"),
+        include_total: bool = Query(True, description="是否返回总数（false时不执行COUNT）"),
         db: Session = Depends(get_db)
 ):
     """
@@ -80,7 +81,8 @@ async def get_published_documents(
             page=page,
             size=size,
             status=status,
-            is_featured=is_featured
+            is_featured=is_featured,
+            include_total=include_total
         )
         result = DocumentPublishService.get_published_documents(db=db, query=query)
         return result
@@ -144,6 +146,7 @@ async def unpublish_document(
 async def get_my_publish_records(
         page: int = Query(1, ge=1, description="页码"),
         size: int = Query(20, ge=1, le=100, description="每页数量"),
+        include_total: bool = Query(True, description="是否返回总数（false时不执行COUNT）"),
         deps=Depends(get_publish_dependencies)
 ):
     """
@@ -158,7 +161,8 @@ async def get_my_publish_records(
             db=deps["db"],
             user_id=deps["user_id"],
             page=page,
-            size=size
+            size=size,
+            include_total=include_total
         )
         return {
             "success": True,
@@ -59,6 +59,7 @@ class PublishedDocumentsQuery(BaseModel):
     size: int = Field(20, ge=1, le=100, description="每页数量")
     status: Optional[str] = Field(None, description="发布状态筛选")
     is_featured: Optional[bool] = Field(None, description="是否精选")
+    include_total: bool = Field(True, description="是否统计总数")
 
 
 # 发布统计响应
@@ -108,10 +109,12 @@ class PublishedDocumentItem(BaseModel):
 # 分页响应模型
 class PublishedDocumentsResponse(BaseModel):
     items: List[PublishedDocumentItem]
-    total: int
+    total: Optional[int] = None  # include_total=false 时为空
+    total_approximate: bool = False  # 超过精确统计上限时为 true
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    has_next: bool = False
 
 
 # 🆕 文档更新请求模型
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func, or_
+from sqlalchemy import and_, case, desc, func, or_, update
 from fastapi import HTTPException
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
@@ -15,6 +15,34 @@ from .schemas import (
 # 导入其他模块的模型
 from app.modules.v2.document_manager.models import Document
 from app.modules.v2.ai_review.models import AIReviewLog
+from app.modules.v2.tech_square.search_index import search_index_service
+from app.core.redis.services import cache_invalidation_service, count_cache_service, view_counter_service
+from app.core.redis.tags import PUBLIC_LIST_NAMESPACE, user_list_namespace
+
+
+def view_count_increments(deltas: Dict[int, int], batch_size: int) -> List[Any]:
+    """
+    浏览量批量自增语句，每批一条：
+    UPDATE us_publish_records SET view_count = view_count + CASE document_id WHEN ... THEN ... END
+    WHERE document_id IN (...) AND publish_status = 'published'
+    """
+    document_ids = sorted(deltas)
+    statements = []
+    for start in range(0, len(document_ids), batch_size):
+        batch = {document_id: deltas[document_id] for document_id in document_ids[start:start + batch_size]}
+        statements.append(
+            update(PublishRecord).where(
+                PublishRecord.document_id.in_(list(batch)),
+                PublishRecord.publish_status == 'published'
+            ).values(
+                view_count=PublishRecord.view_count + case(batch, value=PublishRecord.document_id, else_=0)
+            ).execution_options(synchronize_session=False)
+        )
+    return statements
+
+
+# 浏览量写缓冲在 core 中，不依赖业务模型：由本模块注册写回发布记录表的语句
+view_counter_service.register_writer(view_count_increments)
 
 
 class DocumentPublishService:
@@ -95,6 +123,14 @@ class DocumentPublishService:
         db.commit()
         db.refresh(publish_record)
 
+        # AI审核通过即发布：技术广场列表、搜索、统计都需要刷新
+        if publish_record.publish_status == "published":
+            search_index_service.schedule_sync(request.document_id)
+            cache_invalidation_service.on_document_changed(request.document_id, user_id, affects_public=True)
+        else:
+            # 未直接发布：只有“我的发布记录”（及其总数）变化
+            cache_invalidation_service.on_user_documents_changed(user_id)
+
         return PublishRecordResponse.model_validate(publish_record)
 
     @staticmethod
@@ -202,12 +238,20 @@ class DocumentPublishService:
         # 按发布时间倒序
         base_query = base_query.order_by(desc(PublishRecord.publish_time))
 
-        # 计算总数
-        total = base_query.count()
+        # 计算总数（按筛选条件缓存，超过上限为近似值）
+        total, approximate = None, False
+        if query.include_total:
+            total, approximate = count_cache_service.get_total_sync(
+                PUBLIC_LIST_NAMESPACE,
+                f"published:st{query.status or 'none'}:f{query.is_featured}",
+                lambda cap: base_query.order_by(None).limit(cap + 1).count()
+            )
 
-        # 分页
+        # 分页（多取一行判断是否有下一页）
         offset = (query.page - 1) * query.size
-        results = base_query.offset(offset).limit(query.size).all()
+        results = base_query.offset(offset).limit(query.size + 1).all()
+        has_next = len(results) > query.size
+        results = results[:query.size]
 
         # 构建响应
         items = []
@@ -223,15 +267,20 @@ class DocumentPublishService:
                 is_featured=publish_record.is_featured
             ))
 
-        pages = (total + query.size - 1) // query.size
+        pages = (total + query.size - 1) // query.size if total is not None else None
 
-        return PublishedDocumentsResponse(
+        response = PublishedDocumentsResponse(
             items=items,
             total=total,
+            total_approximate=approximate,
             page=query.page,
             size=query.size,
-            pages=pages
+            pages=pages,
+            has_next=has_next
         )
+        # 浏览量合并尚未写回数据库的增量
+        view_counter_service.apply_pending_sync(response, "items")
+        return response
 
     @staticmethod
     def get_document_publish_detail(
@@ -328,6 +377,10 @@ class DocumentPublishService:
         db.commit()
         db.refresh(publish_record)
 
+        # 撤回后文档从技术广场和全文索引中消失
+        search_index_service.schedule_sync(document_id)
+        cache_invalidation_service.on_document_changed(document_id, user_id, affects_public=True)
+
         return PublishRecordResponse.model_validate(publish_record)
 
     @staticmethod
@@ -335,7 +388,8 @@ class DocumentPublishService:
             db: Session,
             user_id: int,
             page: int = 1,
-            size: int = 20
+            size: int = 20,
+            include_total: bool = True
     ) -> Dict[str, Any]:
         """获取我的发布记录"""
 
@@ -347,12 +401,20 @@ class DocumentPublishService:
         # 按创建时间倒序
         query = query.order_by(desc(PublishRecord.created_at))
 
-        # 计算总数
-        total = query.count()
+        # 计算总数（缓存在用户命名空间内，提交/发布/撤回时失效）
+        total, approximate = None, False
+        if include_total:
+            total, approximate = count_cache_service.get_total_sync(
+                user_list_namespace(user_id),
+                "publish_records",
+                lambda cap: query.order_by(None).limit(cap + 1).count()
+            )
 
-        # 分页
+        # 分页（多取一行判断是否有下一页）
         offset = (page - 1) * size
-        results = query.offset(offset).limit(size).all()
+        results = query.offset(offset).limit(size + 1).all()
+        has_next = len(results) > size
+        results = results[:size]
 
         # 构建响应
         items = []
@@ -368,14 +430,16 @@ class DocumentPublishService:
             }
             items.append(item)
 
-        pages = (total + size - 1) // size
+        pages = (total + size - 1) // size if total is not None else None
 
         return {
             "items": items,
             "total": total,
+            "total_approximate": approximate,
             "page": page,
             "size": size,
-            "pages": pages
+            "pages": pages,
+            "has_next": has_next
         }
 
     @staticmethod
@@ -428,17 +492,13 @@ class DocumentPublishService:
 
     @staticmethod
     def increment_view_count(db: Session, document_id: int):
-        """增加文档浏览量"""
-        publish_record = db.query(PublishRecord).filter(
-            and_(
-                PublishRecord.document_id == document_id,
-                PublishRecord.publish_status == "published"
-            )
+        """增加文档浏览量（写入Redis缓冲，后台批量写回数据库）；未发布的文档不计数"""
+        published = db.query(PublishRecord.id).filter(
+            PublishRecord.document_id == document_id,
+            PublishRecord.publish_status == "published"
         ).first()
-
-        if publish_record:
-            publish_record.view_count += 1
-            db.commit()
+        if published:
+            view_counter_service.increment_sync(document_id)
 
     @staticmethod
     def update_published_document(
@@ -515,6 +575,10 @@ class DocumentPublishService:
         db.commit()
         db.refresh(publish_record)
 
+        # 审核通过后标题/摘要/内容已更新，重建该文档的索引，技术广场列表和搜索需要刷新
+        search_index_service.schedule_sync(document_id)
+        cache_invalidation_service.on_document_changed(document_id, user_id, affects_public=True)
+
         # 8. 构建响应
         return DocumentUpdateResponse(
             success=True,
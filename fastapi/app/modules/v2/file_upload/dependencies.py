@@ -5,22 +5,13 @@
 
 from fastapi import Depends, HTTPException, status, UploadFile
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import get_db  # 复用核心惰性会话依赖，同一请求内与认证依赖共享会话
 from app.modules.v1.user_auth.dependencies import get_current_user
 from app.modules.v1.user_register.models import User
 import os
 from pathlib import Path
 
 
-def get_db():
-    """获取数据库会话"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     """获取当前活跃用户"""
     if not current_user.is_active:
@@ -62,4 +53,4 @@ def ensure_upload_directory(user_id: int) -> str:
     """确保用户上传目录存在"""
     upload_dir = f"uploads/user_{user_id}/documents"
     os.makedirs(upload_dir, exist_ok=True)
-    return upload_dir
\ No newline at end of file
+    return upload_dir
@@ -56,15 +56,12 @@ async def validate_file_only(
         # 验证文件基本要求
         validate_upload_file(file)
 
-        # 读取文件内容进行验证
-        file_content = await file.read()
+        # 分块读取并验证（不把整个文件读入内存）
+        validation_result = await FileValidationService.validate_upload(file)
 
         # 重置文件指针
         await file.seek(0)
 
-        # 执行文件验证
-        validation_result = FileValidationService.validate_file(file, file_content)
-
         return validation_result
 
     except HTTPException:
@@ -3,148 +3,132 @@
 功能：处理文件上传、验证、存储等核心业务
 """
 
+import codecs
 import os
 import uuid
 import hashlib
 import time
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any
+
+import aiofiles
+import aiofiles.os
 from fastapi import UploadFile, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
+from app.core.config import settings
 from .models import UploadRecord
 from .schemas import FileValidationResponse, FileUploadResponse, UploadRecordResponse
 from app.modules.v2.document_manager.models import Document
 from app.modules.v2.document_manager.services import DocumentService
 
 
-class FileValidationService:
-    """文件验证服务"""
-
-    # 文件大小限制（字节）
-    MAX_FILE_SIZES = {
-        'md': 20 * 1024 * 1024,    # 10MB
-        'pdf': 100 * 1024 * 1024,   # 50MB
-    }
-
-    @classmethod
-    def validate_file(cls, file: UploadFile, file_content: bytes) -> FileValidationResponse:
-        """
-        综合验证文件
-
-        Args:
-            file: 上传的文件对象
-            file_content: 文件内容字节
-
-        Returns:
-            FileValidationResponse: 验证结果
-        """
+class StreamingFileValidator:
+    """
+    流式文件验证：按块喂入文件内容，验证所需的状态随块增量更新，内存占用与文件大小无关
+
+    - 大小：累计字节数，超过上限立即判定失败，调用方停止读取
+    - 文件头：PDF 从开头的字节检查 %PDF-；Markdown 用增量 UTF-8 解码器逐块解码，同时统计字符数和行数
+    - PDF 页数：逐块统计 /Type/Page 标记，每种标记保留上一块末尾 len(标记)-1 字节，跨块的标记不会漏数也不会重复
+    - PDF 完整性：只保留最后 100 字节检查 %%EOF
+    - MD5：逐块更新
+    """
+
+    PDF_SIGNATURE = b'%PDF-'
+    PDF_PAGE_MARKERS = (b'/Type/Page', b'/Type /Page')
+    PDF_TAIL_SIZE = 100
+
+    def __init__(self, file_type: str, max_size: int):
+        self.file_type = file_type
+        self.max_size = max_size
+        self.file_size = 0
+        self.error: Optional[str] = None
+        self.error_details: Dict[str, Any] = {}
+        self._hash = hashlib.md5()
+        self._head = b''
+        self._tail = b''
+        self._page_markers = dict.fromkeys(self.PDF_PAGE_MARKERS, 0)
+        self._carries = dict.fromkeys(self.PDF_PAGE_MARKERS, b'')
+        self._decoder = codecs.getincrementaldecoder('utf-8')() if file_type == 'md' else None
+        self._char_count = 0
+        self._line_count = 1
+
+    def feed(self, chunk: bytes) -> bool:
+        """喂入一块内容，返回是否继续读取（已经确定验证失败时返回False）"""
+        if self.error:
+            return False
+
+        self.file_size += len(chunk)
+        if self.file_size > self.max_size:
+            return self._fail(f"文件大小超出限制，最大允许 {self.max_size // (1024*1024)}MB", max_size=self.max_size)
+
+        self._hash.update(chunk)
+        if self.file_type == 'pdf':
+            return self._feed_pdf(chunk)
+        if self.file_type == 'md':
+            return self._feed_text(chunk, final=False)
+        return True
+
+    def _feed_pdf(self, chunk: bytes) -> bool:
+        if len(self._head) < len(self.PDF_SIGNATURE):
+            self._head += chunk[:len(self.PDF_SIGNATURE) - len(self._head)]
+            if not self.PDF_SIGNATURE.startswith(self._head):
+                return self._fail('不是有效的PDF文件格式', signature=True)
+
+        for marker, carry in self._carries.items():
+            window = carry + chunk
+            self._page_markers[marker] += window.count(marker)
+            self._carries[marker] = window[-(len(marker) - 1):]
+        self._tail = (self._tail + chunk)[-self.PDF_TAIL_SIZE:]
+        return True
+
+    def _feed_text(self, chunk: bytes, final: bool) -> bool:
         try:
-            # 1. 基础信息检查
-            file_ext = Path(file.filename).suffix.lower().lstrip('.')
-            file_size = len(file_content)
-
-            # 2. 文件类型检查
-            if file_ext not in ['md', 'pdf']:
-                return FileValidationResponse(
-                    is_valid=False,
-                    file_type=file_ext,
-                    file_size=file_size,
-                    validation_details={},
-                    error_message="不支持的文件类型"
-                )
-
-            # 3. 文件大小检查
-            max_size = cls.MAX_FILE_SIZES.get(file_ext, 0)
-            if file_size > max_size:
-                return FileValidationResponse(
-                    is_valid=False,
-                    file_type=file_ext,
-                    file_size=file_size,
-                    validation_details={"max_size": max_size},
-                    error_message=f"文件大小超出限制，最大允许 {max_size // (1024*1024)}MB"
-                )
-
-            # 4. 文件头验证
-            validation_result = cls._validate_file_signature(file_ext, file_content)
-            if not validation_result['is_valid']:
-                return FileValidationResponse(
-                    is_valid=False,
-                    file_type=file_ext,
-                    file_size=file_size,
-                    validation_details=validation_result,
-                    error_message=validation_result.get('error', '文件格式验证失败')
-                )
-
-            # 5. 内容完整性检查
-            content_validation = cls._validate_file_content(file_ext, file_content)
-
-            return FileValidationResponse(
-                is_valid=content_validation['is_valid'],
-                file_type=file_ext,
-                file_size=file_size,
-                validation_details={
-                    'signature_check': validation_result,
-                    'content_check': content_validation
-                },
-                error_message=content_validation.get('error') if not content_validation['is_valid'] else None
-            )
-
-        except Exception as e:
-            return FileValidationResponse(
-                is_valid=False,
-                file_type=file_ext if 'file_ext' in locals() else 'unknown',
-                file_size=len(file_content) if file_content else 0,
-                validation_details={},
-                error_message=f"文件验证过程中发生错误: {str(e)}"
-            )
-
-    @classmethod
-    def _validate_file_signature(cls, file_type: str, content: bytes) -> Dict[str, Any]:
-        """验证文件头签名"""
-        if file_type == 'pdf':
-            # PDF文件必须以%PDF-开头
-            if not content.startswith(b'%PDF-'):
-                return {
-                    'is_valid': False,
-                    'error': '不是有效的PDF文件格式'
-                }
-            return {'is_valid': True}
-
-        elif file_type == 'md':
-            # Markdown文件验证UTF-8编码
-            try:
-                content.decode('utf-8')
-                return {'is_valid': True}
-            except UnicodeDecodeError:
-                return {
-                    'is_valid': False,
-                    'error': 'Markdown文件必须是UTF-8编码'
-                }
-
-        return {'is_valid': True}
-
-    @classmethod
-    def _validate_file_content(cls, file_type: str, content: bytes) -> Dict[str, Any]:
-        """验证文件内容完整性"""
-        if file_type == 'pdf':
-            return cls._validate_pdf_content(content)
-        elif file_type == 'md':
-            return cls._validate_md_content(content)
+            text = self._decoder.decode(chunk, final=final)
+        except UnicodeDecodeError:
+            return self._fail('Markdown文件必须是UTF-8编码', signature=True)
+        self._char_count += len(text)
+        self._line_count += text.count('\n')
+        return True
+
+    def _fail(self, error: str, **details: Any) -> bool:
+        self.error = error
+        self.error_details = details
+        return False
+
+    @property
+    def md5(self) -> str:
+        return self._hash.hexdigest()
+
+    def finish(self) -> FileValidationResponse:
+        """全部内容喂入后给出验证结果（结构与原来的一次性验证一致）"""
+        if not self.error and self._decoder is not None:
+            self._feed_text(b'', final=True)
+
+        if self.error:
+            if self.error_details.get('max_size'):
+                details = {"max_size": self.max_size}
+            elif self.error_details.get('signature'):
+                details = {'is_valid': False, 'error': self.error}
+            else:
+                details = {}
+            return self._response(False, details, self.error)
 
-        return {'is_valid': True}
+        if self.file_type == 'pdf' and len(self._head) < len(self.PDF_SIGNATURE):
+            return self._response(False, {'is_valid': False, 'error': '不是有效的PDF文件格式'}, '不是有效的PDF文件格式')
 
-    @classmethod
-    def _validate_pdf_content(cls, content: bytes) -> Dict[str, Any]:
-        """验证PDF文件内容"""
-        try:
-            # 简单的PDF页数估算（基于/Page关键字出现次数）
-            page_count = content.count(b'/Type/Page')
+        content_check = self._content_check()
+        return self._response(
+            content_check['is_valid'],
+            {'signature_check': {'is_valid': True}, 'content_check': content_check},
+            content_check.get('error') if not content_check['is_valid'] else None
+        )
 
-            # 如果没有找到标准的页面标记，尝试其他方法
-            if page_count == 0:
-                page_count = content.count(b'/Type /Page')
+    def _content_check(self) -> Dict[str, Any]:
+        if self.file_type == 'pdf':
+            # 简单的PDF页数估算（基于/Page关键字出现次数），没有找到标准的页面标记时按带空格的写法统计
+            page_count = self._page_markers[b'/Type/Page'] or self._page_markers[b'/Type /Page']
 
             # 页数限制检查
             if page_count > 20:
@@ -155,7 +139,7 @@ class FileValidationService:
                 }
 
             # 检查PDF文件是否完整（必须有EOF标记）
-            if not content.endswith(b'%%EOF') and b'%%EOF' not in content[-100:]:
+            if b'%%EOF' not in self._tail:
                 return {
                     'is_valid': False,
                     'error': 'PDF文件可能不完整或已损坏'
@@ -167,51 +151,98 @@ class FileValidationService:
                 'file_complete': True
             }
 
-        except Exception as e:
-            return {
-                'is_valid': False,
-                'error': f'PDF文件内容验证失败: {str(e)}'
-            }
-
-    @classmethod
-    def _validate_md_content(cls, content: bytes) -> Dict[str, Any]:
-        """验证Markdown文件内容"""
-        try:
-            # 解码为文本
-            text_content = content.decode('utf-8')
-
-            # 基础检查
-            char_count = len(text_content)
-            line_count = text_content.count('\n') + 1
-
+        if self.file_type == 'md':
             # 估算页数（按A4纸标准：约2000字/页）
-            estimated_pages = char_count / 2000
+            estimated_pages = self._char_count / 2000
 
             if estimated_pages > 20:
                 return {
                     'is_valid': False,
                     'error': f'Markdown文件内容过长，估算约{estimated_pages:.1f}页，最多允许相当于20页A4纸的内容',
-                    'char_count': char_count,
+                    'char_count': self._char_count,
                     'estimated_pages': estimated_pages
                 }
 
             return {
                 'is_valid': True,
-                'char_count': char_count,
-                'line_count': line_count,
+                'char_count': self._char_count,
+                'line_count': self._line_count,
                 'estimated_pages': estimated_pages
             }
 
-        except UnicodeDecodeError as e:
-            return {
-                'is_valid': False,
-                'error': f'Markdown文件编码错误: {str(e)}'
-            }
-        except Exception as e:
-            return {
-                'is_valid': False,
-                'error': f'Markdown文件内容验证失败: {str(e)}'
-            }
+        return {'is_valid': True}
+
+    def _response(self, is_valid: bool, details: Dict[str, Any], error: Optional[str]) -> FileValidationResponse:
+        return FileValidationResponse(
+            is_valid=is_valid,
+            file_type=self.file_type,
+            file_size=self.file_size,
+            validation_details=details,
+            error_message=error
+        )
+
+
+class FileValidationService:
+    """文件验证服务"""
+
+    # 文件大小限制（字节）
+    MAX_FILE_SIZES = {
+        'md': 20 * 1024 * 1024,    # 10MB
+        'pdf': 100 * 1024 * 1024,   # 50MB
+    }
+
+    @classmethod
+    def get_file_type(cls, file: UploadFile) -> str:
+        return Path(file.filename).suffix.lower().lstrip('.')
+
+    @classmethod
+    def create_validator(cls, file: UploadFile) -> Optional[StreamingFileValidator]:
+        """创建流式验证器；不支持的文件类型返回None"""
+        file_ext = cls.get_file_type(file)
+        if file_ext not in cls.MAX_FILE_SIZES:
+            return None
+        return StreamingFileValidator(file_ext, cls.MAX_FILE_SIZES[file_ext])
+
+    @classmethod
+    def unsupported_type(cls, file: UploadFile, file_size: int = 0) -> FileValidationResponse:
+        return FileValidationResponse(
+            is_valid=False,
+            file_type=cls.get_file_type(file),
+            file_size=file_size,
+            validation_details={},
+            error_message="不支持的文件类型"
+        )
+
+    @classmethod
+    def validate_file(cls, file: UploadFile, file_content: bytes) -> FileValidationResponse:
+        """
+        综合验证文件（内容已在内存中）
+
+        Args:
+            file: 上传的文件对象
+            file_content: 文件内容字节
+
+        Returns:
+            FileValidationResponse: 验证结果
+        """
+        validator = cls.create_validator(file)
+        if validator is None:
+            return cls.unsupported_type(file, len(file_content))
+        validator.feed(file_content)
+        return validator.finish()
+
+    @classmethod
+    async def validate_upload(cls, file: UploadFile) -> FileValidationResponse:
+        """按块读取并验证上传文件，不保存（内存占用不超过一个块）"""
+        validator = cls.create_validator(file)
+        if validator is None:
+            return cls.unsupported_type(file)
+
+        while True:
+            chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+            if not chunk or not validator.feed(chunk):
+                break
+        return validator.finish()
 
 
 class FileUploadService:
@@ -238,16 +269,19 @@ class FileUploadService:
         upload_dir: str
     ) -> FileUploadResponse:
         """
-        处理文件上传的完整流程
+        处理文件上传的完整流程（流式）
+
+        按 UPLOAD_CHUNK_SIZE 分块读取：每块先交给流式验证器（大小、文件头、页数、MD5 增量更新），
+        再通过 aiofiles 写入临时文件，不阻塞事件循环；验证通过后原子重命名为正式文件名，
+        验证失败（包括中途超出大小限制、文件头不对时提前停止读取）删除临时文件。
+        每个上传同时占用的内存不超过一个块
         """
+        temp_path = None
         try:
-            # 1. 读取文件内容
-            file_content = await file.read()
-
-            # 2. 验证文件
-            validation_result = FileValidationService.validate_file(file, file_content)
-
-            if not validation_result.is_valid:
+            # 1. 确定文件类型
+            validator = FileValidationService.create_validator(file)
+            if validator is None:
+                validation_result = FileValidationService.unsupported_type(file)
                 return FileUploadResponse(
                     success=False,
                     message=f"文件验证失败: {validation_result.error_message}",
@@ -255,13 +289,32 @@ class FileUploadService:
                     file_info=validation_result.validation_details
                 )
 
-            # 3. 生成存储文件名和路径
+            # 2. 生成存储文件名和路径
             stored_filename = FileUploadService.generate_unique_filename(file.filename, user_id)
             file_path = os.path.join(upload_dir, stored_filename)
+            temp_path = f"{file_path}.part"
 
-            # 4. 保存文件到磁盘
-            with open(file_path, "wb") as f:
-                f.write(file_content)
+            # 3. 分块读取、验证并写入临时文件
+            async with aiofiles.open(temp_path, "wb") as f:
+                while True:
+                    chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not chunk or not validator.feed(chunk):
+                        break
+                    await f.write(chunk)
+
+            validation_result = validator.finish()
+            if not validation_result.is_valid:
+                await _remove_quietly(temp_path)
+                return FileUploadResponse(
+                    success=False,
+                    message=f"文件验证失败: {validation_result.error_message}",
+                    upload_id=None,
+                    file_info=validation_result.validation_details
+                )
+
+            # 4. 验证通过：原子重命名为正式文件
+            await aiofiles.os.replace(temp_path, file_path)
+            temp_path = file_path
 
             # 5. 创建上传记录 - 🔧 直接使用字符串值
             upload_record = UploadRecord(
@@ -288,17 +341,15 @@ class FileUploadService:
                     "original_filename": file.filename,
                     "file_size": validation_result.file_size,
                     "file_type": validation_result.file_type,
+                    "md5": validator.md5,
                     "validation_details": validation_result.validation_details
                 }
             )
 
         except Exception as e:
-            # 如果出错，尝试清理已创建的文件
-            if 'file_path' in locals() and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except:
-                    pass
+            # 如果出错，清理已创建的临时文件或正式文件
+            if temp_path:
+                await _remove_quietly(temp_path)
 
             return FileUploadResponse(
                 success=False,
@@ -400,4 +451,12 @@ class FileUploadService:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"创建文档失败: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+
+async def _remove_quietly(path: str):
+    """删除文件，文件不存在或删除失败时忽略"""
+    try:
+        await aiofiles.os.remove(path)
+    except OSError:
+        pass
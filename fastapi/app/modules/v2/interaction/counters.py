@@ -0,0 +1,465 @@
+# app/modules/v2/interaction/counters.py
+"""
+互动计数：文档的点赞/收藏/评论数（us_document_interaction_stats），
+用户给出/收到的点赞、收藏、评论数（us_user_interaction_stats，按用户ID主键读取）
+
+- 写：计数与点赞、收藏、评论的增删在同一事务中，用 UPDATE ... SET like_count = like_count ± n 原子加减，
+  不再每次操作后 COUNT(*) 重新统计；一次互动同时加减文档计数、互动者的给出计数和文档作者的收到计数（adjust_interaction）；
+  统计行不存在时（文档/用户第一次互动）统计一次并插入，并发插入的唯一键冲突在保存点内回滚后改为原子加减
+- 读用户计数：一次主键查询，统计行不存在说明用户还没有互动（已有数据的部署上线后先执行一次 backfill）
+- 读：计数从 Redis 哈希镜像 interaction:stats:{document_id} 读取，未命中时查统计表并回填（TTL INTERACTION_STATS_TTL）；
+  事务提交后镜像存在时原子加减（加减可交换，并发顺序不影响结果），不存在时不创建
+- 校对：后台任务每 INTERACTION_RECONCILE_INTERVAL 秒按文档ID、用户ID分批重新统计并修复偏差
+  （文档或用户删除后级联删除的互动不经过计数加减，也由校对修正），
+  用 WHERE 旧值 = 快照值 做比较后更新，校对期间发生的互动不会被覆盖（留到下一轮）；
+  修复的文档删除镜像；同时校对评论的冗余回复数（reply_count），修复后该文档的评论第一页缓存失效；
+  分布式锁保证多个worker每个周期只校对一次
+
+取舍：镜像回填与并发的计数更新交错时，镜像可能短暂偏差1，在TTL到期或下一次校对后恢复
+
+维护命令：
+    python -m app.modules.v2.interaction.counters backfill   按现有数据重建用户互动计数（上线时执行一次）
+"""
+import asyncio
+import sys
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ....core.config import settings
+from ....core.database import AsyncSessionLocal
+from ....core.log import get_logger
+from ....core.redis.async_client import async_redis_client
+from ....core.redis.client import redis_client
+from ....core.redis.tags import comment_namespace
+from ..document_manager.models import Document
+from ...v1.user_register.models import User
+from .models import DocumentComment, DocumentFavorite, DocumentInteractionStats, DocumentLike, UserInteractionCounter
+
+logger = get_logger(__name__)
+
+COUNTER_FIELDS = ("like_count", "favorite_count", "comment_count")
+USER_COUNTER_FIELDS = (
+    "likes_given", "favorites_given", "comments_given",
+    "likes_received", "favorites_received", "comments_received",
+)
+
+# 互动类型 → (文档计数, 互动者的给出计数, 文档作者的收到计数)
+INTERACTION_FIELDS = {
+    "like": ("like_count", "likes_given", "likes_received"),
+    "favorite": ("favorite_count", "favorites_given", "favorites_received"),
+    "comment": ("comment_count", "comments_given", "comments_received"),
+}
+
+
+def _actual_count_selects(document_ids: List[int]) -> Dict[str, Any]:
+    """按文档分组重新统计的查询（评论只统计未删除的，含回复）"""
+    return {
+        "like_count": select(DocumentLike.document_id, func.count()).where(
+            DocumentLike.document_id.in_(document_ids)
+        ).group_by(DocumentLike.document_id),
+        "favorite_count": select(DocumentFavorite.document_id, func.count()).where(
+            DocumentFavorite.document_id.in_(document_ids)
+        ).group_by(DocumentFavorite.document_id),
+        "comment_count": select(DocumentComment.document_id, func.count()).where(
+            DocumentComment.document_id.in_(document_ids), DocumentComment.is_deleted == False
+        ).group_by(DocumentComment.document_id),
+    }
+
+
+def _received_select(model, user_ids: List[int], *conditions):
+    """按文档作者分组统计收到的互动"""
+    return select(Document.user_id, func.count()).select_from(model).join(
+        Document, Document.id == model.document_id
+    ).where(Document.user_id.in_(user_ids), *conditions).group_by(Document.user_id)
+
+
+def _actual_user_count_selects(user_ids: List[int]) -> Dict[str, Any]:
+    """按用户分组重新统计的查询（与原 get_user_interaction_stats 的六个统计口径一致）"""
+    return {
+        "likes_given": select(DocumentLike.user_id, func.count()).where(
+            DocumentLike.user_id.in_(user_ids)
+        ).group_by(DocumentLike.user_id),
+        "favorites_given": select(DocumentFavorite.user_id, func.count()).where(
+            DocumentFavorite.user_id.in_(user_ids)
+        ).group_by(DocumentFavorite.user_id),
+        "comments_given": select(DocumentComment.user_id, func.count()).where(
+            DocumentComment.user_id.in_(user_ids), DocumentComment.is_deleted == False
+        ).group_by(DocumentComment.user_id),
+        "likes_received": _received_select(DocumentLike, user_ids),
+        "favorites_received": _received_select(DocumentFavorite, user_ids),
+        "comments_received": _received_select(DocumentComment, user_ids, DocumentComment.is_deleted == False),
+    }
+
+
+class _CounterTable:
+    """一张计数表：模型、键列、计数列，以及按键分组重新统计的查询"""
+
+    def __init__(self, model, key: str, fields: Iterable[str], selects: Callable[[List[int]], Dict[str, Any]]):
+        self.model = model
+        self.key = key
+        self.key_column = getattr(model, key)
+        self.fields = tuple(fields)
+        self.selects = selects
+
+    def collect(self, ids: Iterable[int], results: Dict[str, Iterable]) -> Dict[int, Dict[str, int]]:
+        counts = {id_: {field: 0 for field in self.fields} for id_ in ids}
+        for field, rows in results.items():
+            for id_, count in rows:
+                counts[id_][field] = count
+        return counts
+
+
+_DOCUMENT_COUNTERS = _CounterTable(DocumentInteractionStats, "document_id", COUNTER_FIELDS, _actual_count_selects)
+_USER_COUNTERS = _CounterTable(UserInteractionCounter, "user_id", USER_COUNTER_FIELDS, _actual_user_count_selects)
+
+
+def _mirror_key(document_id: int) -> str:
+    return f"interaction:stats:{document_id}"
+
+
+class InteractionCounterService:
+    """文档互动计数服务"""
+
+    def __init__(self):
+        self.redis_client = async_redis_client
+        self.sync_redis_client = redis_client
+        self.mirror_ttl = settings.INTERACTION_STATS_TTL
+        self.reconcile_interval = settings.INTERACTION_RECONCILE_INTERVAL
+        self.batch_size = settings.INTERACTION_RECONCILE_BATCH_SIZE
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "adjustments": 0,
+            "rows_created": 0,
+            "mirror_hits": 0,
+            "mirror_misses": 0,
+            "reconcile_runs": 0,
+            "repaired": 0,
+            "users_repaired": 0,
+            "replies_repaired": 0,
+        }
+
+        logger.info("❤️ [INTERACTION_COUNTERS] 互动计数初始化，校对间隔: %s秒", self.reconcile_interval)
+
+    # ==================== 写 ====================
+
+    def adjust(self, db: Session, document_id: int, **deltas: int):
+        """
+        在调用方的事务中原子加减文档计数（不提交），如 adjust(db, 1, like_count=1)
+
+        调用前互动记录的增删必须已经执行（统计行不存在时按当前数据统计）
+        """
+        self._adjust(db, _DOCUMENT_COUNTERS, document_id, deltas)
+
+    def adjust_interaction(self, db: Session, kind: str, document_id: int, owner_id: int, actor_deltas: Dict[int, int]):
+        """
+        一次互动变更的全部计数（同一事务，不提交）：文档计数、各互动者的给出计数、文档作者的收到计数
+
+        Args:
+            kind: like / favorite / comment
+            owner_id: 文档作者
+            actor_deltas: 互动者 → 增减数（删除顶级评论时连带删除的回复按各自作者计）
+
+        同一用户的多项增减合并为一条语句（给自己的文档点赞时，给出和收到在同一行）
+        """
+        document_field, given_field, received_field = INTERACTION_FIELDS[kind]
+        total = sum(actor_deltas.values())
+        self.adjust(db, document_id, **{document_field: total})
+
+        user_deltas: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for user_id, delta in actor_deltas.items():
+            user_deltas[user_id][given_field] += delta
+        user_deltas[owner_id][received_field] += total
+        for user_id in sorted(user_deltas):  # 固定加锁顺序
+            self._adjust(db, _USER_COUNTERS, user_id, user_deltas[user_id])
+
+    def _adjust(self, db: Session, table: _CounterTable, key: int, deltas: Dict[str, int]):
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        self._stats["adjustments"] += 1
+        if self._update(db, table, key, deltas):
+            return
+
+        # 统计行不存在：统计一次（已包含本次变更）并插入
+        db.flush()
+        counts = self._actual_counts_sync(db, table, [key])[key]
+        try:
+            with db.begin_nested():
+                db.execute(insert(table.model).values({table.key: key, **counts}))
+            self._stats["rows_created"] += 1
+        except IntegrityError:
+            # 其他事务刚插入了统计行（统计时看不到本事务的变更）：改为原子加减
+            self._update(db, table, key, deltas)
+
+    @staticmethod
+    def _update(db: Session, table: _CounterTable, key: int, deltas: Dict[str, int]) -> bool:
+        result = db.execute(
+            update(table.model).where(table.key_column == key).values({
+                field: getattr(table.model, field) + delta for field, delta in deltas.items()
+            }).execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    def after_commit(self, document_id: int, **deltas: int):
+        """事务提交后同步镜像（镜像不存在时不创建）"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if deltas:
+            self.sync_redis_client.update_hash_if_exists(
+                _mirror_key(document_id), deltas, {"updated_at": datetime.utcnow().isoformat()}
+            )
+
+    @staticmethod
+    def get_count_sync(db: Session, document_id: int, field: str) -> int:
+        """从统计表读取单个计数（写操作返回最新值用）"""
+        count = db.execute(
+            select(getattr(DocumentInteractionStats, field)).where(DocumentInteractionStats.document_id == document_id)
+        ).scalar()
+        return count or 0
+
+    # ==================== 读 ====================
+
+    async def get_counts(self, db: AsyncSession, document_id: int) -> Dict[str, Any]:
+        """读取文档的互动计数：{like_count, favorite_count, comment_count, updated_at}"""
+        return (await self.get_counts_many(db, [document_id]))[document_id]
+
+    async def get_counts_many(self, db: AsyncSession, document_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        批量读取互动计数：一次 pipeline 读镜像，未命中的文档一次 IN 查询统计表，再一次 pipeline 回填镜像
+
+        统计行不存在说明文档还没有互动（第一次互动时创建），计数为0
+        """
+        document_ids = list(dict.fromkeys(document_ids))
+        cached = await self.redis_client.hgetall_many([_mirror_key(document_id) for document_id in document_ids])
+
+        counts: Dict[int, Dict[str, Any]] = {}
+        missing = []
+        for index, document_id in enumerate(document_ids):
+            mirror = cached[index] if cached is not None else None
+            if mirror and all(field in mirror for field in COUNTER_FIELDS):
+                counts[document_id] = {field: int(mirror[field]) for field in COUNTER_FIELDS}
+                counts[document_id]["updated_at"] = (
+                    datetime.fromisoformat(mirror["updated_at"]) if mirror.get("updated_at") else None
+                )
+            else:
+                missing.append(document_id)
+
+        self._stats["mirror_hits"] += len(counts)
+        self._stats["mirror_misses"] += len(missing)
+        if not missing:
+            return counts
+
+        rows = {
+            row.document_id: row for row in (await db.execute(
+                select(DocumentInteractionStats).where(DocumentInteractionStats.document_id.in_(missing))
+            )).scalars().all()
+        }
+        now = datetime.utcnow()
+        for document_id in missing:
+            row = rows.get(document_id)
+            counts[document_id] = {field: (getattr(row, field) or 0) if row else 0 for field in COUNTER_FIELDS}
+            counts[document_id]["updated_at"] = (row.updated_at if row else None) or now
+
+        if cached is not None:
+            await self.redis_client.hset_many_with_ttl({
+                _mirror_key(document_id): {**counts[document_id], "updated_at": counts[document_id]["updated_at"].isoformat()}
+                for document_id in missing
+            }, self.mirror_ttl)
+        return counts
+
+    @staticmethod
+    def _user_counts(row: Optional[UserInteractionCounter]) -> Dict[str, int]:
+        return {field: (getattr(row, field) or 0) if row else 0 for field in USER_COUNTER_FIELDS}
+
+    def get_user_counts_sync(self, db: Session, user_id: int) -> Dict[str, int]:
+        """读取用户互动计数（一次主键查询；统计行不存在说明还没有互动，返回0）"""
+        return self._user_counts(db.get(UserInteractionCounter, user_id))
+
+    async def get_user_counts(self, db: AsyncSession, user_id: int) -> Dict[str, int]:
+        """同 get_user_counts_sync（AsyncSession 版）"""
+        return self._user_counts(await db.get(UserInteractionCounter, user_id))
+
+    # ==================== 校对 ====================
+
+    @staticmethod
+    def _actual_counts_sync(db: Session, table: _CounterTable, ids: List[int]) -> Dict[int, Dict[str, int]]:
+        return table.collect(ids, {field: db.execute(stmt).all() for field, stmt in table.selects(ids).items()})
+
+    @staticmethod
+    async def _actual_counts(db: AsyncSession, table: _CounterTable, ids: List[int]) -> Dict[int, Dict[str, int]]:
+        results = {}
+        for field, stmt in table.selects(ids).items():
+            results[field] = (await db.execute(stmt)).all()
+        return table.collect(ids, results)
+
+    async def reconcile(self) -> int:
+        """按文档ID、用户ID分批重新统计并修复偏差，返回修复的文档数和用户数"""
+        repaired_total = 0
+        last_id = 0
+        async with AsyncSessionLocal() as session:
+            while True:
+                document_ids = (await session.execute(
+                    select(Document.id).where(Document.id > last_id).order_by(Document.id).limit(self.batch_size)
+                )).scalars().all()
+                if not document_ids:
+                    break
+                last_id = document_ids[-1]
+
+                repaired = await self._reconcile_rows(session, _DOCUMENT_COUNTERS, document_ids)
+                threads = await self._reconcile_reply_counts(session, document_ids)
+                await session.commit()
+                if repaired:
+                    await self.redis_client.delete(*[_mirror_key(document_id) for document_id in repaired])
+                    repaired_total += len(repaired)
+                if threads:
+                    await self.redis_client.invalidate_tags([], [comment_namespace(document_id) for document_id in threads])
+
+        users_repaired = await self.reconcile_users()
+
+        self._stats["reconcile_runs"] += 1
+        self._stats["repaired"] += repaired_total
+        if repaired_total or users_repaired:
+            logger.warning("⚠️ [INTERACTION_COUNTERS] 校对修复了 %s 篇文档、%s 个用户的互动计数", repaired_total, users_repaired)
+        return repaired_total + users_repaired
+
+    async def reconcile_users(self) -> int:
+        """按用户ID分批重新统计用户互动计数并修复偏差（也用于上线时的回填），返回修复的用户数"""
+        repaired_total = 0
+        last_id = 0
+        async with AsyncSessionLocal() as session:
+            while True:
+                user_ids = (await session.execute(
+                    select(User.id).where(User.id > last_id).order_by(User.id).limit(self.batch_size)
+                )).scalars().all()
+                if not user_ids:
+                    break
+                last_id = user_ids[-1]
+
+                repaired_total += len(await self._reconcile_rows(session, _USER_COUNTERS, user_ids))
+                await session.commit()
+
+        self._stats["users_repaired"] += repaired_total
+        return repaired_total
+
+    async def _reconcile_rows(self, session: AsyncSession, table: _CounterTable, ids: List[int]) -> List[int]:
+        actual = await self._actual_counts(session, table, ids)
+        stored = {
+            row[0]: row for row in (await session.execute(
+                select(table.key_column, *[getattr(table.model, field) for field in table.fields])
+                .where(table.key_column.in_(ids))
+            )).all()
+        }
+
+        repaired = []
+        for id_ in ids:
+            counts = actual[id_]
+            row = stored.get(id_)
+            if row is None:
+                if any(counts.values()):
+                    await session.execute(insert(table.model).values({table.key: id_, **counts}))
+                    repaired.append(id_)
+                continue
+
+            if all((getattr(row, field) or 0) == counts[field] for field in table.fields):
+                continue
+
+            # 比较后更新：快照之后计数被互动操作改过则跳过，留到下一轮
+            result = await session.execute(
+                update(table.model).where(
+                    table.key_column == id_,
+                    *[getattr(table.model, field) == getattr(row, field) for field in table.fields]
+                ).values(**counts).execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                repaired.append(id_)
+        return repaired
+
+    async def _reconcile_reply_counts(self, session: AsyncSession, document_ids: List[int]) -> List[int]:
+        """校对顶级评论的冗余回复数，返回有修复的文档ID"""
+        actual = dict((await session.execute(
+            select(DocumentComment.parent_id, func.count()).where(
+                DocumentComment.document_id.in_(document_ids),
+                DocumentComment.parent_id.isnot(None),
+                DocumentComment.is_deleted == False
+            ).group_by(DocumentComment.parent_id)
+        )).all())
+        # 只需要检查有回复、或记录的回复数不为0的评论
+        stored = (await session.execute(
+            select(DocumentComment.id, DocumentComment.document_id, DocumentComment.reply_count).where(
+                DocumentComment.document_id.in_(document_ids),
+                DocumentComment.parent_id.is_(None),
+                or_(DocumentComment.reply_count != 0, DocumentComment.id.in_(list(actual)))
+            )
+        )).all()
+
+        repaired = set()
+        for comment_id, document_id, reply_count in stored:
+            count = actual.get(comment_id, 0)
+            if reply_count == count:
+                continue
+            # 比较后更新，同 _reconcile_rows
+            result = await session.execute(
+                update(DocumentComment).where(
+                    DocumentComment.id == comment_id, DocumentComment.reply_count == reply_count
+                ).values(
+                    reply_count=count, updated_at=DocumentComment.updated_at
+                ).execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                repaired.add(document_id)
+                self._stats["replies_repaired"] += 1
+        return list(repaired)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                # 锁不主动释放，到期自动失效：整个集群每个周期只校对一次；Redis 不可用时各worker各自校对（比较后更新，结果一致）
+                acquired = await self.redis_client.acquire_lock(
+                    "lock:interaction:reconcile", uuid.uuid4().hex, int(self.reconcile_interval * 1000)
+                )
+                if acquired is not False:
+                    await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ [INTERACTION_COUNTERS] 互动计数校对失败: %s", e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self._task is not None and not self._task.done(),
+            "reconcile_interval": self.reconcile_interval,
+        }
+
+
+# 全局实例
+interaction_counter_service = InteractionCounterService()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        print("用法: python -m app.modules.v2.interaction.counters backfill")
+        sys.exit(1)
+
+    print(f"✅ 用户互动计数回填完成: {asyncio.run(interaction_counter_service.reconcile_users())} 个用户")
@@ -43,6 +43,7 @@ class DocumentFavorite(Base):
         Index('idx_document_id', 'document_id'),
         Index('idx_user_id', 'user_id'),
         Index('idx_created_at', 'created_at'),
+        Index('idx_user_created', 'user_id', 'created_at', 'id'),  # 我的收藏（游标分页）
     )
 
 
@@ -56,6 +57,7 @@ class DocumentComment(Base):
     parent_id = Column(Integer, ForeignKey("us_document_comments.id", ondelete="CASCADE"), nullable=True)
     content = Column(Text, nullable=False)
     is_deleted = Column(Boolean, default=False)
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")  # 未删除的回复数（冗余计数，回复增删时原子加减）
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -70,6 +72,8 @@ class DocumentComment(Base):
         Index('idx_user_id', 'user_id'),
         Index('idx_parent_id', 'parent_id'),
         Index('idx_created_at', 'created_at'),
+        Index('idx_document_parent_created', 'document_id', 'parent_id', 'created_at', 'id'),  # 评论列表（游标分页）
+        Index('idx_parent_created', 'parent_id', 'created_at', 'id'),  # 回复预览与回复列表（游标分页）
     )
 
 
@@ -89,4 +93,18 @@ class DocumentInteractionStats(Base):
 
     __table_args__ = (
         Index('idx_document_id', 'document_id'),
-    )
\ No newline at end of file
+    )
+
+
+class UserInteractionCounter(Base):
+    """用户互动计数表（给出/收到的点赞、收藏、评论，互动时原子加减，按用户ID主键读取）"""
+    __tablename__ = "us_user_interaction_stats"
+
+    user_id = Column(Integer, ForeignKey("us_users.id", ondelete="CASCADE"), primary_key=True)
+    likes_given = Column(Integer, nullable=False, default=0, server_default="0")
+    favorites_given = Column(Integer, nullable=False, default=0, server_default="0")
+    comments_given = Column(Integer, nullable=False, default=0, server_default="0")
+    likes_received = Column(Integer, nullable=False, default=0, server_default="0")
+    favorites_received = Column(Integer, nullable=False, default=0, server_default="0")
+    comments_received = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
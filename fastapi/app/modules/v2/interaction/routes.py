@@ -1,17 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 import math
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
+from app.core.pagination import InvalidCursorError
 from ...v1.user_auth.dependencies import get_current_user
 from ...v1.user_register.models import User
 from .dependencies import get_current_user_optional, validate_document_access
-from .services import interaction_service
+from .services import BATCH_STATUS_MAX_DOCUMENTS, interaction_service, async_interaction_service
 from .schemas import (
     LikeResponse, LikeStatusResponse, FavoriteResponse, FavoriteStatusResponse,
     FavoriteListResponse, CommentCreate, CommentUpdate, CommentListResponse,
-    CommentResponse, InteractionStats, UserInteractionStats
+    CommentReplyListResponse, CommentResponse, InteractionStats, UserInteractionStats, BatchInteractionStatusResponse
 )
 
 router = APIRouter()
@@ -60,12 +62,12 @@ async def toggle_like(
 async def get_like_status(
         document_id: int,
         current_user: Optional[User] = Depends(get_current_user_optional),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取文档点赞状态"""
     try:
         user_id = current_user.id if current_user else None
-        is_liked, like_count = interaction_service.get_like_status(
+        is_liked, like_count = await async_interaction_service.get_like_status(
             db, document_id, user_id
         )
 
@@ -108,12 +110,12 @@ async def toggle_favorite(
 async def get_favorite_status(
         document_id: int,
         current_user: Optional[User] = Depends(get_current_user_optional),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取文档收藏状态"""
     try:
         user_id = current_user.id if current_user else None
-        is_favorited, favorite_count = interaction_service.get_favorite_status(
+        is_favorited, favorite_count = await async_interaction_service.get_favorite_status(
             db, document_id, user_id
         )
 
@@ -129,15 +131,19 @@ async def get_favorite_status(
 async def get_my_favorites(
         page: int = Query(1, ge=1, description="页码"),
         size: int = Query(20, ge=1, le=100, description="每页数量"),
+        cursor: Optional[str] = Query(None, description="游标（取自上一页的next_cursor，传入时忽略page）"),
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取我的收藏列表"""
     try:
-        items, total = interaction_service.get_user_favorites(
-            db, current_user.id, page, size
+        items, total, next_cursor = await async_interaction_service.get_user_favorites(
+            db, current_user.id, page, size, cursor=cursor
         )
 
+        if total is None:
+            return FavoriteListResponse(items=items, size=size, next_cursor=next_cursor)
+
         pages = math.ceil(total / size) if total > 0 else 1
 
         return FavoriteListResponse(
@@ -145,8 +151,11 @@ async def get_my_favorites(
             total=total,
             page=page,
             size=size,
-            pages=pages
+            pages=pages,
+            next_cursor=next_cursor
         )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取收藏列表失败: {str(e)}")
 
@@ -183,14 +192,18 @@ async def get_comments(
         document_id: int,
         page: int = Query(1, ge=1, description="页码"),
         size: int = Query(20, ge=1, le=100, description="每页数量"),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="游标（取自上一页的next_cursor，传入时忽略page）"),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取文档评论列表"""
     try:
-        items, total = interaction_service.get_comments(
-            db, document_id, page, size
+        items, total, next_cursor = await async_interaction_service.get_comments(
+            db, document_id, page, size, cursor=cursor
         )
 
+        if total is None:
+            return CommentListResponse(items=items, size=size, next_cursor=next_cursor)
+
         pages = math.ceil(total / size) if total > 0 else 1
 
         return CommentListResponse(
@@ -198,12 +211,32 @@ async def get_comments(
             total=total,
             page=page,
             size=size,
-            pages=pages
+            pages=pages,
+            next_cursor=next_cursor
         )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取评论列表失败: {str(e)}")
 
 
+@router.get("/comments/{comment_id}/replies", response_model=CommentReplyListResponse)
+async def get_comment_replies(
+        comment_id: int,
+        size: int = Query(20, ge=1, le=100, description="每页数量"),
+        cursor: Optional[str] = Query(None, description="游标（取自评论的replies_cursor或上一页的next_cursor）"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """获取评论的回复列表（按时间正序）"""
+    try:
+        items, next_cursor = await async_interaction_service.get_replies(db, comment_id, size, cursor=cursor)
+        return CommentReplyListResponse(items=items, size=size, next_cursor=next_cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取回复列表失败: {str(e)}")
+
+
 @router.put("/comments/{comment_id}", response_model=CommentResponse)
 async def update_comment(
         comment_id: int,
@@ -254,24 +287,42 @@ async def delete_comment(
 @router.get("/documents/{document_id}/stats", response_model=InteractionStats)
 async def get_document_stats(
         document_id: int,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取文档互动统计"""
     try:
-        stats = interaction_service.get_document_stats(db, document_id)
+        stats = await async_interaction_service.get_document_stats(db, document_id)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取统计信息失败: {str(e)}")
 
 
+@router.get("/documents/batch-status", response_model=BatchInteractionStatusResponse)
+async def get_batch_status(
+        ids: List[int] = Query(..., description="文档ID列表，如 ?ids=1&ids=2"),
+        current_user: Optional[User] = Depends(get_current_user_optional),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """批量获取文档列表的互动状态（点赞/收藏/评论数，以及当前用户是否已点赞、收藏）"""
+    if len(set(ids)) > BATCH_STATUS_MAX_DOCUMENTS:
+        raise HTTPException(status_code=400, detail=f"一次最多查询{BATCH_STATUS_MAX_DOCUMENTS}篇文档")
+
+    try:
+        user_id = current_user.id if current_user else None
+        items = await async_interaction_service.get_batch_status(db, ids, user_id)
+        return BatchInteractionStatusResponse(items=items)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取互动状态失败: {str(e)}")
+
+
 @router.get("/my-stats", response_model=UserInteractionStats)
 async def get_my_interaction_stats(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取我的互动统计"""
     try:
-        stats = interaction_service.get_user_interaction_stats(db, current_user.id)
+        stats = await async_interaction_service.get_user_interaction_stats(db, current_user.id)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取用户统计失败: {str(e)}")
\ No newline at end of file
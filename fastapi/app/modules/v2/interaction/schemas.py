@@ -49,10 +49,11 @@ class FavoriteItem(BaseModel):
 class FavoriteListResponse(BaseModel):
     """收藏列表响应模型"""
     items: List[FavoriteItem]
-    total: int
-    page: int
+    total: Optional[int] = None  # 游标分页模式不计算
+    page: Optional[int] = None  # 游标分页模式为空
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # 下一页游标（没有下一页时为空）
 
 
 # ============= 评论相关 =============
@@ -106,8 +107,9 @@ class CommentItem(BaseModel):
     id: int
     content: str
     user: CommentUser
-    replies: List[CommentReply] = []
+    replies: List[CommentReply] = []  # 回复预览（前 COMMENT_REPLY_PREVIEW_SIZE 条）
     reply_count: int = 0
+    replies_cursor: Optional[str] = None  # 预览之后的回复游标（没有更多回复时为空），传给回复列表接口
     created_at: datetime
     updated_at: datetime
 
@@ -118,10 +120,18 @@ class CommentItem(BaseModel):
 class CommentListResponse(BaseModel):
     """评论列表响应模型"""
     items: List[CommentItem]
-    total: int
-    page: int
+    total: Optional[int] = None  # 游标分页模式不计算
+    page: Optional[int] = None  # 游标分页模式为空
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # 下一页游标（没有下一页时为空）
+
+
+class CommentReplyListResponse(BaseModel):
+    """回复列表响应模型（游标分页）"""
+    items: List[CommentReply]
+    size: int
+    next_cursor: Optional[str] = None  # 下一页游标（没有下一页时为空）
 
 
 class CommentResponse(BaseModel):
@@ -144,6 +154,21 @@ class InteractionStats(BaseModel):
         from_attributes = True
 
 
+class DocumentInteractionState(BaseModel):
+    """单篇文档的互动状态（列表页卡片使用）"""
+    document_id: int
+    like_count: int
+    favorite_count: int
+    comment_count: int
+    is_liked: bool
+    is_favorited: bool
+
+
+class BatchInteractionStatusResponse(BaseModel):
+    """批量互动状态响应模型"""
+    items: List[DocumentInteractionState]
+
+
 class UserInteractionStats(BaseModel):
     """用户互动统计模型"""
     total_likes_given: int
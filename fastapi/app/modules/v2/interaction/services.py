@@ -1,16 +1,35 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, desc
-from typing import Optional, List, Tuple
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, delete, desc, select, update
+from typing import Any, Dict, Optional, List, Tuple
+from datetime import datetime
 from fastapi import HTTPException
 import math
 
 from .models import DocumentLike, DocumentFavorite, DocumentComment, DocumentInteractionStats
+from .counters import interaction_counter_service
 from .schemas import (
     CommentCreate, CommentUpdate, CommentItem, CommentReply, CommentUser,
-    FavoriteItem, InteractionStats, UserInteractionStats
+    DocumentInteractionState, FavoriteItem, InteractionStats, UserInteractionStats
 )
 from ..document_manager.models import Document
 from ...v1.user_register.models import User
+from ....core.config import settings
+from ....core.pagination import decode_cursor, encode_cursor, keyset_after, page_cursor, slice_page
+from ....core.redis.services.cache_invalidation import cache_invalidation_service
+from ....core.redis.services.comment_cache import comment_cache_service
+
+# 收藏/评论游标分页：按创建时间倒序，ID作为平局裁决
+FAVORITE_CURSOR_KIND = "favorites:created"
+FAVORITE_SORT_COLUMNS = [DocumentFavorite.created_at, DocumentFavorite.id]
+COMMENT_CURSOR_KIND = "comments:created"
+COMMENT_SORT_COLUMNS = [DocumentComment.created_at, DocumentComment.id]
+# 回复按创建时间正序（对话顺序）
+REPLY_CURSOR_KIND = "replies:created"
+REPLY_SORT_COLUMNS = [DocumentComment.created_at, DocumentComment.id]
+
+# 批量互动状态一次最多查询的文档数（列表页一页20~50张卡片）
+BATCH_STATUS_MAX_DOCUMENTS = 100
 
 
 class InteractionService:
@@ -27,27 +46,21 @@ class InteractionService:
         if not document:
             raise HTTPException(status_code=404, detail="文档不存在")
 
-        # 检查是否已点赞
-        existing_like = db.query(DocumentLike).filter(
-            and_(DocumentLike.document_id == document_id, DocumentLike.user_id == user_id)
-        ).first()
+        # 已点赞则取消（按删除行数判断，省去一次查询），否则添加点赞
+        deleted = db.execute(delete(DocumentLike).where(
+            DocumentLike.document_id == document_id, DocumentLike.user_id == user_id
+        )).rowcount
+        if not deleted:
+            db.add(DocumentLike(document_id=document_id, user_id=user_id))
+            db.flush()
+        is_liked = not deleted
+        delta = 1 if is_liked else -1
 
-        if existing_like:
-            # 取消点赞
-            db.delete(existing_like)
-            is_liked = False
-            message = "取消点赞成功"
-        else:
-            # 添加点赞
-            new_like = DocumentLike(document_id=document_id, user_id=user_id)
-            db.add(new_like)
-            is_liked = True
-            message = "点赞成功"
-
-        # 更新统计
-        self._update_like_stats(db, document_id)
+        # 原子更新文档和用户统计（同一事务）
+        interaction_counter_service.adjust_interaction(db, "like", document_id, document.user_id, {user_id: delta})
 
         db.commit()
+        interaction_counter_service.after_commit(document_id, like_count=delta)
 
         # 获取最新点赞数
         like_count = self._get_like_count(db, document_id)
@@ -73,25 +86,8 @@ class InteractionService:
         return is_liked, like_count
 
     def _get_like_count(self, db: Session, document_id: int) -> int:
-        """获取文档点赞数"""
-        return db.query(DocumentLike).filter(DocumentLike.document_id == document_id).count()
-
-    def _update_like_stats(self, db: Session, document_id: int):
-        """更新点赞统计"""
-        like_count = self._get_like_count(db, document_id)
-
-        stats = db.query(DocumentInteractionStats).filter(
-            DocumentInteractionStats.document_id == document_id
-        ).first()
-
-        if stats:
-            stats.like_count = like_count
-        else:
-            stats = DocumentInteractionStats(
-                document_id=document_id,
-                like_count=like_count
-            )
-            db.add(stats)
+        """获取文档点赞数（统计表）"""
+        return interaction_counter_service.get_count_sync(db, document_id, "like_count")
 
     # ============= 收藏功能 =============
     def toggle_favorite(self, db: Session, document_id: int, user_id: int) -> Tuple[bool, bool, int]:
@@ -104,27 +100,21 @@ class InteractionService:
         if not document:
             raise HTTPException(status_code=404, detail="文档不存在")
 
-        # 检查是否已收藏
-        existing_favorite = db.query(DocumentFavorite).filter(
-            and_(DocumentFavorite.document_id == document_id, DocumentFavorite.user_id == user_id)
-        ).first()
-
-        if existing_favorite:
-            # 取消收藏
-            db.delete(existing_favorite)
-            is_favorited = False
-            message = "取消收藏成功"
-        else:
-            # 添加收藏
-            new_favorite = DocumentFavorite(document_id=document_id, user_id=user_id)
-            db.add(new_favorite)
-            is_favorited = True
-            message = "收藏成功"
+        # 已收藏则取消（按删除行数判断），否则添加收藏
+        deleted = db.execute(delete(DocumentFavorite).where(
+            DocumentFavorite.document_id == document_id, DocumentFavorite.user_id == user_id
+        )).rowcount
+        if not deleted:
+            db.add(DocumentFavorite(document_id=document_id, user_id=user_id))
+            db.flush()
+        is_favorited = not deleted
+        delta = 1 if is_favorited else -1
 
-        # 更新统计
-        self._update_favorite_stats(db, document_id)
+        # 原子更新文档和用户统计（同一事务）
+        interaction_counter_service.adjust_interaction(db, "favorite", document_id, document.user_id, {user_id: delta})
 
         db.commit()
+        interaction_counter_service.after_commit(document_id, favorite_count=delta)
 
         # 获取最新收藏数
         favorite_count = self._get_favorite_count(db, document_id)
@@ -149,55 +139,37 @@ class InteractionService:
 
         return is_favorited, favorite_count
 
-    def get_user_favorites(self, db: Session, user_id: int, page: int = 1, size: int = 20) -> Tuple[
-        List[FavoriteItem], int]:
-        """获取用户收藏列表"""
+    def get_user_favorites(self, db: Session, user_id: int, page: int = 1, size: int = 20,
+                           cursor: Optional[str] = None) -> Tuple[List[FavoriteItem], Optional[int], Optional[str]]:
+        """
+        获取用户收藏列表
+        返回: (收藏列表, 总数, 下一页游标)；传入 cursor 时使用游标分页，总数为None
+        """
         offset = (page - 1) * size
 
         # 查询收藏列表
         query = db.query(DocumentFavorite).options(
             joinedload(DocumentFavorite.document)
-        ).filter(DocumentFavorite.user_id == user_id).order_by(desc(DocumentFavorite.created_at))
+        ).filter(DocumentFavorite.user_id == user_id).order_by(*_desc_columns(FAVORITE_SORT_COLUMNS))
+
+        if cursor:
+            after = decode_cursor(cursor, FAVORITE_CURSOR_KIND)
+            favorites = query.filter(keyset_after(FAVORITE_SORT_COLUMNS, after)).limit(size + 1).all()
+            favorites, _, next_cursor = slice_page(favorites, size, FAVORITE_CURSOR_KIND, _created_sort_key)
+            return [_to_favorite_item(favorite) for favorite in favorites if favorite.document], None, next_cursor
 
         total = query.count()
         favorites = query.offset(offset).limit(size).all()
+        next_cursor = page_cursor(favorites, offset + size < total, FAVORITE_CURSOR_KIND, _created_sort_key)
 
-        # 转换为响应模型
-        items = []
-        for favorite in favorites:
-            if favorite.document:  # 确保文档存在
-                item = FavoriteItem(
-                    id=favorite.id,
-                    document_id=favorite.document.id,
-                    document_title=favorite.document.title,
-                    document_summary=favorite.document.summary,
-                    file_type=favorite.document.file_type,
-                    created_at=favorite.created_at
-                )
-                items.append(item)
+        # 转换为响应模型（确保文档存在）
+        items = [_to_favorite_item(favorite) for favorite in favorites if favorite.document]
 
-        return items, total
+        return items, total, next_cursor
 
     def _get_favorite_count(self, db: Session, document_id: int) -> int:
-        """获取文档收藏数"""
-        return db.query(DocumentFavorite).filter(DocumentFavorite.document_id == document_id).count()
-
-    def _update_favorite_stats(self, db: Session, document_id: int):
-        """更新收藏统计"""
-        favorite_count = self._get_favorite_count(db, document_id)
-
-        stats = db.query(DocumentInteractionStats).filter(
-            DocumentInteractionStats.document_id == document_id
-        ).first()
-
-        if stats:
-            stats.favorite_count = favorite_count
-        else:
-            stats = DocumentInteractionStats(
-                document_id=document_id,
-                favorite_count=favorite_count
-            )
-            db.add(stats)
+        """获取文档收藏数（统计表）"""
+        return interaction_counter_service.get_count_sync(db, document_id, "favorite_count")
 
     # ============= 评论功能 =============
     def create_comment(self, db: Session, document_id: int, user_id: int, comment_data: CommentCreate) -> CommentItem:
@@ -234,70 +206,50 @@ class InteractionService:
         db.add(new_comment)
         db.flush()  # 获取ID
 
-        # 更新统计
-        self._update_comment_stats(db, document_id)
+        # 原子更新文档、用户统计和父评论的回复数（同一事务）
+        interaction_counter_service.adjust_interaction(db, "comment", document_id, document.user_id, {user_id: 1})
+        if comment_data.parent_id:
+            _adjust_reply_count(db, comment_data.parent_id, 1)
 
         db.commit()
+        interaction_counter_service.after_commit(document_id, comment_count=1)
+        cache_invalidation_service.on_comments_changed(document_id)
 
         # 返回完整的评论信息
         return self._get_comment_detail(db, new_comment.id)
 
-    def get_comments(self, db: Session, document_id: int, page: int = 1, size: int = 20) -> Tuple[
-        List[CommentItem], int]:
-        """获取文档评论列表（只返回顶级评论，回复作为子项）"""
+    def get_comments(self, db: Session, document_id: int, page: int = 1, size: int = 20,
+                     cursor: Optional[str] = None) -> Tuple[List[CommentItem], Optional[int], Optional[str]]:
+        """
+        获取文档评论列表（只返回顶级评论，每条评论附带前 COMMENT_REPLY_PREVIEW_SIZE 条回复）
+        返回: (评论列表, 总数, 下一页游标)；传入 cursor 时使用游标分页，总数为None
+        """
+        stmt = select(DocumentComment).options(
+            joinedload(DocumentComment.user)
+        ).where(_top_level_conditions(document_id)).order_by(*_desc_columns(COMMENT_SORT_COLUMNS))
+
+        if cursor:
+            after = decode_cursor(cursor, COMMENT_CURSOR_KIND)
+            stmt = stmt.where(keyset_after(COMMENT_SORT_COLUMNS, after)).limit(size + 1)
+            comments, _, next_cursor = slice_page(db.execute(stmt).scalars().all(), size,
+                                                  COMMENT_CURSOR_KIND, _created_sort_key)
+            return self._with_reply_previews(db, comments), None, next_cursor
+
+        total = db.execute(select(func.count(DocumentComment.id)).where(_top_level_conditions(document_id))).scalar_one()
         offset = (page - 1) * size
+        comments = db.execute(stmt.offset(offset).limit(size)).scalars().all()
+        next_cursor = page_cursor(comments, offset + size < total, COMMENT_CURSOR_KIND, _created_sort_key)
 
-        # 查询顶级评论
-        query = db.query(DocumentComment).options(
-            joinedload(DocumentComment.user),
-            joinedload(DocumentComment.replies).joinedload(DocumentComment.user)
-        ).filter(
-            and_(
-                DocumentComment.document_id == document_id,
-                DocumentComment.parent_id.is_(None),
-                DocumentComment.is_deleted == False
-            )
-        ).order_by(desc(DocumentComment.created_at))
+        return self._with_reply_previews(db, comments), total, next_cursor
 
-        total = query.count()
-        comments = query.offset(offset).limit(size).all()
-
-        # 转换为响应模型
-        items = []
-        for comment in comments:
-            # 获取回复列表（只显示未删除的回复）
-            replies = []
-            for reply in comment.replies:
-                if not reply.is_deleted:
-                    reply_item = CommentReply(
-                        id=reply.id,
-                        content=reply.content,
-                        user=CommentUser(
-                            id=reply.user.id,
-                            username=reply.user.username,
-                            nickname=reply.user.nickname
-                        ),
-                        created_at=reply.created_at,
-                        updated_at=reply.updated_at
-                    )
-                    replies.append(reply_item)
-
-            comment_item = CommentItem(
-                id=comment.id,
-                content=comment.content,
-                user=CommentUser(
-                    id=comment.user.id,
-                    username=comment.user.username,
-                    nickname=comment.user.nickname
-                ),
-                replies=replies,
-                reply_count=len(replies),
-                created_at=comment.created_at,
-                updated_at=comment.updated_at
-            )
-            items.append(comment_item)
-
-        return items, total
+    @staticmethod
+    def _with_reply_previews(db: Session, comments: List[DocumentComment]) -> List[CommentItem]:
+        """一条查询取出本页所有评论的回复预览"""
+        parent_ids = [comment.id for comment in comments if comment.reply_count]
+        previews = db.execute(
+            _reply_preview_select(parent_ids).options(joinedload(DocumentComment.user))
+        ).scalars().all() if parent_ids else []
+        return _to_comment_items(comments, previews)
 
     def update_comment(self, db: Session, comment_id: int, user_id: int, comment_data: CommentUpdate) -> CommentItem:
         """更新评论"""
@@ -314,6 +266,7 @@ class InteractionService:
 
         comment.content = comment_data.content
         db.commit()
+        cache_invalidation_service.on_comments_changed(comment.document_id)
 
         return self._get_comment_detail(db, comment_id)
 
@@ -332,24 +285,37 @@ class InteractionService:
 
         # 软删除
         comment.is_deleted = True
+        deleted_by_user = {comment.user_id: 1}
 
-        # 如果是顶级评论，同时软删除所有回复
+        # 如果是顶级评论，同时软删除所有回复（按回复作者统计本次删除的回复）；如果是回复，父评论的回复数减1
         if comment.parent_id is None:
-            db.query(DocumentComment).filter(
-                DocumentComment.parent_id == comment_id
-            ).update({"is_deleted": True})
+            replies = and_(DocumentComment.parent_id == comment_id, DocumentComment.is_deleted == False)
+            for reply_user_id, count in db.execute(
+                select(DocumentComment.user_id, func.count()).where(replies).group_by(DocumentComment.user_id)
+            ).all():
+                deleted_by_user[reply_user_id] = deleted_by_user.get(reply_user_id, 0) + count
+            db.execute(update(DocumentComment).where(replies).values(is_deleted=True).execution_options(synchronize_session=False))
+            comment.reply_count = 0
+        else:
+            _adjust_reply_count(db, comment.parent_id, -1)
+        deleted_count = sum(deleted_by_user.values())
 
-        # 更新统计
-        self._update_comment_stats(db, comment.document_id)
+        # 原子更新文档和用户统计（同一事务）
+        db.flush()
+        owner_id = db.execute(select(Document.user_id).where(Document.id == comment.document_id)).scalar_one()
+        interaction_counter_service.adjust_interaction(db, "comment", comment.document_id, owner_id, {
+            user_id: -count for user_id, count in deleted_by_user.items()
+        })
 
         db.commit()
+        interaction_counter_service.after_commit(comment.document_id, comment_count=-deleted_count)
+        cache_invalidation_service.on_comments_changed(comment.document_id)
         return True
 
     def _get_comment_detail(self, db: Session, comment_id: int) -> CommentItem:
-        """获取评论详情"""
+        """获取评论详情（附带回复预览）"""
         comment = db.query(DocumentComment).options(
-            joinedload(DocumentComment.user),
-            joinedload(DocumentComment.replies).joinedload(DocumentComment.user)
+            joinedload(DocumentComment.user)
         ).filter(
             and_(DocumentComment.id == comment_id, DocumentComment.is_deleted == False)
         ).first()
@@ -357,118 +323,310 @@ class InteractionService:
         if not comment:
             raise HTTPException(status_code=404, detail="评论不存在")
 
-        # 获取回复列表
-        replies = []
-        for reply in comment.replies:
-            if not reply.is_deleted:
-                reply_item = CommentReply(
-                    id=reply.id,
-                    content=reply.content,
-                    user=CommentUser(
-                        id=reply.user.id,
-                        username=reply.user.username,
-                        nickname=reply.user.nickname
-                    ),
-                    created_at=reply.created_at,
-                    updated_at=reply.updated_at
-                )
-                replies.append(reply_item)
-
-        return CommentItem(
-            id=comment.id,
-            content=comment.content,
-            user=CommentUser(
-                id=comment.user.id,
-                username=comment.user.username,
-                nickname=comment.user.nickname
-            ),
-            replies=replies,
-            reply_count=len(replies),
-            created_at=comment.created_at,
-            updated_at=comment.updated_at
-        )
-
-    def _get_comment_count(self, db: Session, document_id: int) -> int:
-        """获取文档评论数（包括回复）"""
-        return db.query(DocumentComment).filter(
-            and_(DocumentComment.document_id == document_id, DocumentComment.is_deleted == False)
-        ).count()
-
-    def _update_comment_stats(self, db: Session, document_id: int):
-        """更新评论统计"""
-        comment_count = self._get_comment_count(db, document_id)
-
-        stats = db.query(DocumentInteractionStats).filter(
-            DocumentInteractionStats.document_id == document_id
-        ).first()
-
-        if stats:
-            stats.comment_count = comment_count
-        else:
-            stats = DocumentInteractionStats(
-                document_id=document_id,
-                comment_count=comment_count
-            )
-            db.add(stats)
+        return self._with_reply_previews(db, [comment])[0]
 
     # ============= 统计功能 =============
     def get_document_stats(self, db: Session, document_id: int) -> InteractionStats:
-        """获取文档互动统计"""
+        """获取文档互动统计（统计行不存在说明还没有互动，返回0，不写库）"""
         stats = db.query(DocumentInteractionStats).filter(
             DocumentInteractionStats.document_id == document_id
         ).first()
 
-        if not stats:
-            # 如果统计不存在，创建一个
-            stats = DocumentInteractionStats(document_id=document_id)
-            db.add(stats)
-            db.commit()
-
         return InteractionStats(
-            document_id=stats.document_id,
-            like_count=stats.like_count,
-            favorite_count=stats.favorite_count,
-            comment_count=stats.comment_count,
-            updated_at=stats.updated_at
+            document_id=document_id,
+            like_count=stats.like_count if stats else 0,
+            favorite_count=stats.favorite_count if stats else 0,
+            comment_count=stats.comment_count if stats else 0,
+            updated_at=stats.updated_at if stats else datetime.utcnow()
         )
 
     def get_user_interaction_stats(self, db: Session, user_id: int) -> UserInteractionStats:
-        """获取用户互动统计"""
-        # 用户给出的互动
-        total_likes_given = db.query(DocumentLike).filter(DocumentLike.user_id == user_id).count()
-        total_favorites = db.query(DocumentFavorite).filter(DocumentFavorite.user_id == user_id).count()
-        total_comments = db.query(DocumentComment).filter(
-            and_(DocumentComment.user_id == user_id, DocumentComment.is_deleted == False)
-        ).count()
-
-        # 🔧 修复SQLAlchemy警告：使用select()而不是subquery()
-        from sqlalchemy import select
-        user_documents_query = select(Document.id).where(Document.user_id == user_id)
-
-        total_likes_received = db.query(DocumentLike).filter(
-            DocumentLike.document_id.in_(user_documents_query)
-        ).count()
-
-        total_favorites_received = db.query(DocumentFavorite).filter(
-            DocumentFavorite.document_id.in_(user_documents_query)
-        ).count()
-
-        total_comments_received = db.query(DocumentComment).filter(
-            and_(
-                DocumentComment.document_id.in_(user_documents_query),
-                DocumentComment.is_deleted == False
+        """获取用户互动统计（用户互动计数表，一次主键查询）"""
+        return _to_user_interaction_stats(interaction_counter_service.get_user_counts_sync(db, user_id))
+
+
+class AsyncInteractionService:
+    """
+    互动只读查询（AsyncSession 版）
+
+    点赞/收藏状态、收藏列表、评论列表和统计都是高频读接口，查询通过 await 执行，不阻塞事件循环；
+    关联对象全部用 selectinload 预加载（异步会话不支持访问属性时隐式懒加载）
+    """
+
+    async def get_like_status(self, db: AsyncSession, document_id: int,
+                              user_id: Optional[int] = None) -> Tuple[bool, int]:
+        """获取点赞状态，返回: (是否已点赞, 点赞总数)"""
+        is_liked = False
+        if user_id:
+            is_liked = await _exists(db, select(DocumentLike.id).where(
+                DocumentLike.document_id == document_id, DocumentLike.user_id == user_id
+            ))
+
+        like_count = (await interaction_counter_service.get_counts(db, document_id))["like_count"]
+        return is_liked, like_count
+
+    async def get_favorite_status(self, db: AsyncSession, document_id: int,
+                                  user_id: Optional[int] = None) -> Tuple[bool, int]:
+        """获取收藏状态，返回: (是否已收藏, 收藏总数)"""
+        is_favorited = False
+        if user_id:
+            is_favorited = await _exists(db, select(DocumentFavorite.id).where(
+                DocumentFavorite.document_id == document_id, DocumentFavorite.user_id == user_id
+            ))
+
+        favorite_count = (await interaction_counter_service.get_counts(db, document_id))["favorite_count"]
+        return is_favorited, favorite_count
+
+    async def get_batch_status(self, db: AsyncSession, document_ids: List[int],
+                               user_id: Optional[int] = None) -> List[DocumentInteractionState]:
+        """
+        批量获取文档列表的互动状态（计数 + 当前用户是否已点赞/收藏），按传入顺序返回，重复ID只返回一次
+
+        往返次数与文档数无关：计数一次 pipeline 读镜像（未命中时一次 IN 查询 + 一次 pipeline 回填），
+        登录用户的点赞、收藏各一次 IN 查询
+        """
+        document_ids = list(dict.fromkeys(document_ids))
+        counts = await interaction_counter_service.get_counts_many(db, document_ids)
+
+        liked_ids, favorited_ids = set(), set()
+        if user_id and document_ids:
+            liked_ids = set((await db.execute(select(DocumentLike.document_id).where(
+                DocumentLike.user_id == user_id, DocumentLike.document_id.in_(document_ids)
+            ))).scalars().all())
+            favorited_ids = set((await db.execute(select(DocumentFavorite.document_id).where(
+                DocumentFavorite.user_id == user_id, DocumentFavorite.document_id.in_(document_ids)
+            ))).scalars().all())
+
+        return [
+            DocumentInteractionState(
+                document_id=document_id,
+                like_count=counts[document_id]["like_count"],
+                favorite_count=counts[document_id]["favorite_count"],
+                comment_count=counts[document_id]["comment_count"],
+                is_liked=document_id in liked_ids,
+                is_favorited=document_id in favorited_ids
             )
-        ).count()
-
-        return UserInteractionStats(
-            total_likes_given=total_likes_given,
-            total_favorites=total_favorites,
-            total_comments=total_comments,
-            total_likes_received=total_likes_received,
-            total_favorites_received=total_favorites_received,
-            total_comments_received=total_comments_received
-        )
+            for document_id in document_ids
+        ]
+
+    async def get_user_favorites(self, db: AsyncSession, user_id: int, page: int = 1, size: int = 20,
+                                 cursor: Optional[str] = None) -> Tuple[List[FavoriteItem], Optional[int], Optional[str]]:
+        """获取用户收藏列表，返回 (收藏列表, 总数, 下一页游标)"""
+        stmt = select(DocumentFavorite).options(
+            selectinload(DocumentFavorite.document)
+        ).where(
+            DocumentFavorite.user_id == user_id
+        ).order_by(*_desc_columns(FAVORITE_SORT_COLUMNS))
+
+        if cursor:
+            after = decode_cursor(cursor, FAVORITE_CURSOR_KIND)
+            stmt = stmt.where(keyset_after(FAVORITE_SORT_COLUMNS, after)).limit(size + 1)
+            favorites, _, next_cursor = slice_page((await db.execute(stmt)).scalars().all(), size,
+                                                   FAVORITE_CURSOR_KIND, _created_sort_key)
+            return [_to_favorite_item(favorite) for favorite in favorites if favorite.document], None, next_cursor
+
+        total = await _count(db, select(func.count(DocumentFavorite.id)).where(
+            DocumentFavorite.user_id == user_id
+        ))
+        offset = (page - 1) * size
+        favorites = (await db.execute(stmt.offset(offset).limit(size))).scalars().all()
+        next_cursor = page_cursor(favorites, offset + size < total, FAVORITE_CURSOR_KIND, _created_sort_key)
+
+        return [_to_favorite_item(favorite) for favorite in favorites if favorite.document], total, next_cursor
+
+    async def get_comments(self, db: AsyncSession, document_id: int, page: int = 1, size: int = 20,
+                           cursor: Optional[str] = None) -> Tuple[List[CommentItem], Optional[int], Optional[str]]:
+        """
+        获取文档评论列表（只返回顶级评论，每条评论附带前 COMMENT_REPLY_PREVIEW_SIZE 条回复），
+        返回 (评论列表, 总数, 下一页游标)；第一页走缓存（评论增删改时失效）
+        """
+        if cursor:
+            after = decode_cursor(cursor, COMMENT_CURSOR_KIND)
+            stmt = self._comments_select(document_id).where(keyset_after(COMMENT_SORT_COLUMNS, after)).limit(size + 1)
+            comments, _, next_cursor = slice_page((await db.execute(stmt)).scalars().all(), size,
+                                                  COMMENT_CURSOR_KIND, _created_sort_key)
+            return await self._with_reply_previews(db, comments), None, next_cursor
+
+        if page > 1:
+            return await self._comment_page(db, document_id, page, size)
+
+        async def _load_first_page() -> Dict[str, Any]:
+            items, total, next_cursor = await self._comment_page(db, document_id, 1, size)
+            return {"items": [item.model_dump() for item in items], "total": total, "next_cursor": next_cursor}
+
+        data = await comment_cache_service.get_first_page(document_id, size, _load_first_page)
+        return [CommentItem(**item) for item in data["items"]], data["total"], data["next_cursor"]
+
+    async def _comment_page(self, db: AsyncSession, document_id: int, page: int,
+                            size: int) -> Tuple[List[CommentItem], int, Optional[str]]:
+        total = await _count(db, select(func.count(DocumentComment.id)).where(_top_level_conditions(document_id)))
+        offset = (page - 1) * size
+        comments = (await db.execute(
+            self._comments_select(document_id).offset(offset).limit(size)
+        )).scalars().all()
+        next_cursor = page_cursor(comments, offset + size < total, COMMENT_CURSOR_KIND, _created_sort_key)
+
+        return await self._with_reply_previews(db, comments), total, next_cursor
+
+    @staticmethod
+    def _comments_select(document_id: int):
+        return select(DocumentComment).options(
+            selectinload(DocumentComment.user)
+        ).where(_top_level_conditions(document_id)).order_by(*_desc_columns(COMMENT_SORT_COLUMNS))
+
+    @staticmethod
+    async def _with_reply_previews(db: AsyncSession, comments: List[DocumentComment]) -> List[CommentItem]:
+        """一条查询取出本页所有评论的回复预览（没有回复的评论不参与查询）"""
+        parent_ids = [comment.id for comment in comments if comment.reply_count]
+        previews = (await db.execute(
+            _reply_preview_select(parent_ids).options(selectinload(DocumentComment.user))
+        )).scalars().all() if parent_ids else []
+        return _to_comment_items(comments, previews)
+
+    async def get_replies(self, db: AsyncSession, comment_id: int, size: int = 20,
+                          cursor: Optional[str] = None) -> Tuple[List[CommentReply], Optional[str]]:
+        """
+        按创建时间正序分页获取评论的回复，返回 (回复列表, 下一页游标)
+
+        评论列表中回复预览的 replies_cursor 可以直接作为 cursor 传入，从预览之后继续加载
+        """
+        stmt = select(DocumentComment).options(
+            selectinload(DocumentComment.user)
+        ).where(_reply_conditions([comment_id])).order_by(*REPLY_SORT_COLUMNS)
+
+        if cursor:
+            after = decode_cursor(cursor, REPLY_CURSOR_KIND)
+            stmt = stmt.where(keyset_after(REPLY_SORT_COLUMNS, after, descending=False))
+
+        replies, _, next_cursor = slice_page((await db.execute(stmt.limit(size + 1))).scalars().all(), size,
+                                             REPLY_CURSOR_KIND, _created_sort_key)
+        return [_to_comment_reply(reply) for reply in replies], next_cursor
+
+    async def get_document_stats(self, db: AsyncSession, document_id: int) -> InteractionStats:
+        """获取文档互动统计（Redis 哈希镜像，未命中时查统计表）"""
+        counts = await interaction_counter_service.get_counts(db, document_id)
+        return InteractionStats(document_id=document_id, **counts)
+
+    async def get_user_interaction_stats(self, db: AsyncSession, user_id: int) -> UserInteractionStats:
+        """获取用户互动统计（用户互动计数表，一次主键查询）"""
+        return _to_user_interaction_stats(await interaction_counter_service.get_user_counts(db, user_id))
+
+
+async def _count(db: AsyncSession, stmt) -> int:
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def _exists(db: AsyncSession, stmt) -> bool:
+    return (await db.execute(stmt.limit(1))).first() is not None
+
+
+def _desc_columns(columns):
+    return [desc(column) for column in columns]
+
+
+def _created_sort_key(row) -> Tuple:
+    return row.created_at, row.id
+
+
+# ============= 评论查询（同步/异步服务共用） =============
+def _top_level_conditions(document_id: int):
+    return and_(
+        DocumentComment.document_id == document_id,
+        DocumentComment.parent_id.is_(None),
+        DocumentComment.is_deleted == False
+    )
+
+
+def _reply_conditions(parent_ids: List[int]):
+    return and_(DocumentComment.parent_id.in_(parent_ids), DocumentComment.is_deleted == False)
+
+
+def _reply_preview_select(parent_ids: List[int]):
+    """
+    每条评论的前 COMMENT_REPLY_PREVIEW_SIZE 条回复：按父评论分区编号后取前N条，一页评论只需一条查询，
+    回复再多也只读取预览条数（idx_parent_created）
+    """
+    row_number = func.row_number().over(
+        partition_by=DocumentComment.parent_id, order_by=REPLY_SORT_COLUMNS
+    ).label("row_number")
+    ranked = select(DocumentComment.id, row_number).where(_reply_conditions(parent_ids)).subquery()
+    return select(DocumentComment).join(ranked, ranked.c.id == DocumentComment.id).where(
+        ranked.c.row_number <= settings.COMMENT_REPLY_PREVIEW_SIZE
+    ).order_by(DocumentComment.parent_id, *REPLY_SORT_COLUMNS)
+
+
+def _adjust_reply_count(db: Session, parent_id: int, delta: int):
+    """原子加减父评论的回复数（调用方的事务中，不提交；显式保留 updated_at，回复不算编辑父评论）"""
+    db.execute(
+        update(DocumentComment).where(DocumentComment.id == parent_id).values(
+            reply_count=DocumentComment.reply_count + delta, updated_at=DocumentComment.updated_at
+        ).execution_options(synchronize_session=False)
+    )
+
+
+# ============= 响应模型转换（同步/异步服务共用） =============
+def _to_comment_user(user: User) -> CommentUser:
+    return CommentUser(id=user.id, username=user.username, nickname=user.nickname)
+
+
+def _to_comment_reply(reply: DocumentComment) -> CommentReply:
+    return CommentReply(
+        id=reply.id,
+        content=reply.content,
+        user=_to_comment_user(reply.user),
+        created_at=reply.created_at,
+        updated_at=reply.updated_at
+    )
+
+
+def _to_comment_items(comments: List[DocumentComment], previews: List[DocumentComment]) -> List[CommentItem]:
+    """顶级评论转换为响应模型，附带回复预览；回复数取冗余计数，超过预览条数时给出继续加载的游标"""
+    replies_by_parent: Dict[int, List[DocumentComment]] = {}
+    for reply in previews:
+        replies_by_parent.setdefault(reply.parent_id, []).append(reply)
+
+    items = []
+    for comment in comments:
+        replies = replies_by_parent.get(comment.id, [])
+        reply_count = comment.reply_count or 0
+        items.append(CommentItem(
+            id=comment.id,
+            content=comment.content,
+            user=_to_comment_user(comment.user),
+            replies=[_to_comment_reply(reply) for reply in replies],
+            reply_count=reply_count,
+            replies_cursor=(
+                encode_cursor(REPLY_CURSOR_KIND, _created_sort_key(replies[-1]))
+                if replies and reply_count > len(replies) else None
+            ),
+            created_at=comment.created_at,
+            updated_at=comment.updated_at
+        ))
+    return items
+
+
+def _to_user_interaction_stats(counts: Dict[str, int]) -> UserInteractionStats:
+    return UserInteractionStats(
+        total_likes_given=counts["likes_given"],
+        total_favorites=counts["favorites_given"],
+        total_comments=counts["comments_given"],
+        total_likes_received=counts["likes_received"],
+        total_favorites_received=counts["favorites_received"],
+        total_comments_received=counts["comments_received"]
+    )
+
+
+def _to_favorite_item(favorite: DocumentFavorite) -> FavoriteItem:
+    return FavoriteItem(
+        id=favorite.id,
+        document_id=favorite.document.id,
+        document_title=favorite.document.title,
+        document_summary=favorite.document.summary,
+        file_type=favorite.document.file_type,
+        created_at=favorite.created_at
+    )
 
 
 # 创建服务实例
-interaction_service = InteractionService()
\ No newline at end of file
+interaction_service = InteractionService()
+async_interaction_service = AsyncInteractionService()
\ No newline at end of file
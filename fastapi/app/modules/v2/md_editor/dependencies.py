@@ -1,10 +1,2 @@
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
-
-def get_db():
-    """获取数据库会话"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+from app.core.database import get_db  # 复用核心惰性会话依赖，同一请求内与认证依赖共享会话
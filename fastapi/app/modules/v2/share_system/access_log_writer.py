@@ -0,0 +1,268 @@
+# app/modules/v2/share_system/access_log_writer.py
+"""
+分享访问日志批量写入
+功能：访问/下载事件先进入进程内有界队列，后台任务攒够 ACCESS_LOG_BATCH_SIZE 条或每 ACCESS_LOG_FLUSH_INTERVAL 秒
+批量写库：一条多行 INSERT 写访问日志，一条 UPDATE ... CASE 更新各分享的 view_count / download_count，
+同时累加访问日汇总（analytics.py），同一个事务提交
+
+- 访问分享的请求不再同步写库（原来每次访问两次提交）
+- 背压：队列满时请求最多等待 ACCESS_LOG_ENQUEUE_TIMEOUT 秒，仍然没有空位则丢弃该事件并计数（日志与计数属于统计数据）
+- 应用退出时先停止后台任务，再把队列中剩余的事件全部写库
+- 写库失败的批次回滚后重试一次（包括多个worker同时插入同一日汇总行的主键冲突），仍失败则丢弃并记录日志
+- 后台任务未启动（脚本、测试）时直接同步写库
+
+取舍：worker 进程崩溃会丢失队列中尚未写库的事件（最多一个刷新周期）；访问计数因此最多滞后一个刷新周期
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, insert, select, update
+
+from ....core.config import settings
+from ....core.database import AsyncSessionLocal, SessionLocal
+from ....core.log import get_logger, log_sampled
+from .analytics import log_rows, rollup_deltas, rollup_keys_select, rollup_statements
+from .models import DocumentShare, ShareAccessLog
+
+logger = get_logger(__name__)
+
+# 访问类型 → 分享表上对应的计数列
+_COUNTER_COLUMNS = {"VIEW": DocumentShare.view_count, "DOWNLOAD": DocumentShare.download_count}
+
+# 通知后台任务写完剩余事件后退出
+_STOP = object()
+
+
+def access_event(share_id: int, access_type: str, visitor_ip: Optional[str],
+                 visitor_user_agent: Optional[str], visitor_user_id: Optional[int],
+                 new_visitor: bool = False) -> Dict[str, Any]:
+    """访问事件（字段与 us_share_access_logs 一致，时间取事件发生时；new_visitor 表示当天新访客，计入日汇总）"""
+    return {
+        "share_id": share_id,
+        "visitor_ip": visitor_ip,
+        "visitor_user_agent": visitor_user_agent,
+        "visitor_user_id": visitor_user_id,
+        "access_type": access_type,
+        "access_result": "success",
+        "accessed_at": datetime.utcnow(),
+        "new_visitor": new_visitor,
+    }
+
+
+def _counter_statements(events: List[Dict[str, Any]]) -> List[Any]:
+    """按访问类型汇总，每种计数一条 UPDATE ... SET x = x + CASE id WHEN ... END"""
+    statements = []
+    for access_type, column in _COUNTER_COLUMNS.items():
+        counts = Counter(event["share_id"] for event in events if event["access_type"] == access_type)
+        if counts:
+            statements.append(
+                update(DocumentShare).where(DocumentShare.id.in_(list(counts))).values(
+                    {column.key: column + case(dict(counts), value=DocumentShare.id, else_=0)}
+                ).execution_options(synchronize_session=False)
+            )
+    return statements
+
+
+def _batch_statements(events: List[Dict[str, Any]], rollup: Dict, existing_rollup_keys) -> List[Any]:
+    """一批事件的全部写入语句：访问日志、分享计数、日汇总"""
+    return [
+        insert(ShareAccessLog).values(log_rows(events)),
+        *_counter_statements(events),
+        *rollup_statements(rollup, existing_rollup_keys),
+    ]
+
+
+def _existing_events(events: List[Dict[str, Any]], existing_ids) -> List[Dict[str, Any]]:
+    """去掉已删除分享的事件，避免外键错误导致整批失败"""
+    existing_ids = set(existing_ids)
+    return [event for event in events if event["share_id"] in existing_ids]
+
+
+class AccessLogWriter:
+    """分享访问日志批量写入服务"""
+
+    def __init__(self):
+        self.batch_size = settings.ACCESS_LOG_BATCH_SIZE
+        self.flush_interval = settings.ACCESS_LOG_FLUSH_INTERVAL
+        self.queue_size = settings.ACCESS_LOG_QUEUE_SIZE
+        self.enqueue_timeout = settings.ACCESS_LOG_ENQUEUE_TIMEOUT
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "queued": 0,
+            "dropped": 0,
+            "direct_writes": 0,
+            "batches": 0,
+            "written": 0,
+            "failed": 0,
+        }
+
+        logger.info("📝 [ACCESS_LOG] 访问日志批量写入初始化，批量: %s条，间隔: %s秒",
+                    self.batch_size, self.flush_interval)
+
+    # ==================== 入队 ====================
+
+    def _running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def submit(self, event: Dict[str, Any]):
+        """提交一个访问事件；队列满时等待空位（背压），超时则丢弃"""
+        if not self._running():
+            await self._write([event])
+            self._stats["direct_writes"] += 1
+            return
+
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(event), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self._drop()
+                return
+        self._stats["queued"] += 1
+
+    def submit_nowait(self, event: Dict[str, Any]):
+        """
+        提交一个访问事件（同步代码使用，不阻塞）
+
+        在事件循环线程中直接入队；在线程池中通过 call_soon_threadsafe 交给事件循环入队；队列满时丢弃
+        """
+        if not self._running():
+            self._write_sync([event])
+            self._stats["direct_writes"] += 1
+            return
+
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+
+        if in_loop:
+            self._put_nowait(event)
+        else:
+            self._loop.call_soon_threadsafe(self._put_nowait, event)
+
+    def _put_nowait(self, event: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(event)
+            self._stats["queued"] += 1
+        except asyncio.QueueFull:
+            self._drop()
+
+    def _drop(self):
+        self._stats["dropped"] += 1
+        log_sampled(logger, logging.WARNING, "⚠️ [ACCESS_LOG] 访问日志队列已满（%s），丢弃事件", self.queue_size)
+
+    # ==================== 写库 ====================
+
+    async def _write(self, events: List[Dict[str, Any]]):
+        """一批事件在同一个事务中写入：多行 INSERT + 计数 UPDATE + 日汇总"""
+        async with AsyncSessionLocal() as session:
+            share_ids = {event["share_id"] for event in events}
+            existing_ids = (await session.execute(
+                select(DocumentShare.id).where(DocumentShare.id.in_(share_ids))
+            )).scalars().all()
+            events = _existing_events(events, existing_ids)
+            if not events:
+                return
+
+            rollup = rollup_deltas(events)
+            existing_rollup_keys = (await session.execute(rollup_keys_select(rollup))).all()
+            for statement in _batch_statements(events, rollup, existing_rollup_keys):
+                await session.execute(statement)
+            await session.commit()
+
+    def _write_sync(self, events: List[Dict[str, Any]]):
+        """同 _write（同步版本）"""
+        with SessionLocal() as session:
+            share_ids = {event["share_id"] for event in events}
+            existing_ids = session.execute(
+                select(DocumentShare.id).where(DocumentShare.id.in_(share_ids))
+            ).scalars().all()
+            events = _existing_events(events, existing_ids)
+            if not events:
+                return
+
+            rollup = rollup_deltas(events)
+            existing_rollup_keys = session.execute(rollup_keys_select(rollup)).all()
+            for statement in _batch_statements(events, rollup, existing_rollup_keys):
+                session.execute(statement)
+            session.commit()
+
+    async def _flush(self, events: List[Dict[str, Any]]):
+        """写入一批事件，失败重试一次"""
+        if not events:
+            return
+        for attempt in (1, 2):
+            try:
+                await self._write(events)
+                self._stats["batches"] += 1
+                self._stats["written"] += len(events)
+                return
+            except Exception as e:
+                logger.error("❌ [ACCESS_LOG] 访问日志写库失败（第%s次，%s条）: %s", attempt, len(events), e)
+        self._stats["failed"] += len(events)
+
+    def _drain(self, batch: List[Any]):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    # ==================== 后台任务 ====================
+
+    def start(self):
+        if self._running():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """停止后台任务，并把队列中剩余的事件全部写库"""
+        if not self._running():
+            return
+
+        # 不取消任务：取消可能打断正在提交的批次；发送结束标记，让任务写完当前批次后退出
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+        remaining: List[Any] = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        await self._flush([event for event in remaining if event is not _STOP])
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.batch_size and _STOP not in batch:
+                # 未攒满一批：等待一个刷新周期再取一次
+                await asyncio.sleep(self.flush_interval)
+                self._drain(batch)
+
+            stopping = _STOP in batch
+            await self._flush([event for event in batch if event is not _STOP])
+            if stopping:
+                return
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self._running(),
+            "queue_length": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+        }
+
+
+# 全局实例
+access_log_writer = AccessLogWriter()
@@ -0,0 +1,193 @@
+# app/modules/v2/share_system/analytics.py
+"""
+分享访问统计：日汇总表与访问日志归档
+
+- us_share_daily_stats：(share_id, day) → 访问数、下载数、当日独立访客数，
+  由 access_log_writer 写入访问日志时在同一事务中增量更新（见 rollup_statements）
+- 今日/近7天/近30天访问量对日汇总表求和，每个分享最多31行，耗时与访问日志总量无关
+- 超过 SHARE_ACCESS_LOG_RETENTION_DAYS 天的原始日志按批移入 us_share_access_logs_archive（INSERT ... SELECT + DELETE）
+
+维护命令：
+    python -m app.modules.v2.share_system.analytics archive   归档过期日志（建议每天定时执行）
+    python -m app.modules.v2.share_system.analytics rebuild   由原始日志（含归档）重建日汇总表
+"""
+import sys
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import String, case, cast, delete, func, insert, select, union_all, update
+from sqlalchemy.orm import Session
+
+from ....core.config import settings
+from ....core.log import get_logger
+from .models import DocumentShare, ShareAccessLog, ShareAccessLogArchive, ShareDailyStats
+
+logger = get_logger(__name__)
+
+# 访问日志表的列（不含自增ID）
+LOG_FIELDS = (
+    "share_id", "visitor_ip", "visitor_user_agent", "visitor_user_id",
+    "access_type", "access_result", "accessed_at",
+)
+
+RollupKey = Tuple[int, date]
+
+
+def view_days() -> Tuple[date, date, date]:
+    """今日、近7天、近30天的起始日期（UTC），近30天最多覆盖31个日汇总行"""
+    today = datetime.utcnow().date()
+    return today, today - timedelta(days=7), today - timedelta(days=30)
+
+
+def window_views_select(*conditions):
+    """今日/近7天/近30天访问量：对日汇总表求和"""
+    today, week_start, month_start = view_days()
+    return select(
+        func.coalesce(func.sum(case((ShareDailyStats.day >= today, ShareDailyStats.views), else_=0)), 0).label("today"),
+        func.coalesce(func.sum(case((ShareDailyStats.day >= week_start, ShareDailyStats.views), else_=0)), 0).label("week"),
+        func.coalesce(func.sum(ShareDailyStats.views), 0).label("month")
+    ).where(*conditions, ShareDailyStats.day >= month_start)
+
+
+# ==================== 增量汇总 ====================
+
+def log_rows(events: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """访问事件 → 访问日志行（去掉只用于汇总的字段）"""
+    return [{field: event[field] for field in LOG_FIELDS} for event in events]
+
+
+def rollup_deltas(events: Iterable[Dict[str, Any]]) -> Dict[RollupKey, Dict[str, int]]:
+    """按 (分享, 日期) 汇总一批访问事件"""
+    deltas: Dict[RollupKey, Dict[str, int]] = defaultdict(lambda: {"views": 0, "downloads": 0, "unique_visitors": 0})
+    for event in events:
+        delta = deltas[(event["share_id"], event["accessed_at"].date())]
+        if event["access_type"] == "VIEW":
+            delta["views"] += 1
+            delta["unique_visitors"] += int(event.get("new_visitor", False))
+        elif event["access_type"] == "DOWNLOAD":
+            delta["downloads"] += 1
+    return dict(deltas)
+
+
+def rollup_keys_select(deltas: Dict[RollupKey, Dict[str, int]]):
+    """查询这批汇总中已存在的 (分享, 日期) 行"""
+    return select(ShareDailyStats.share_id, ShareDailyStats.day).where(
+        ShareDailyStats.share_id.in_({share_id for share_id, _ in deltas}),
+        ShareDailyStats.day.in_({day for _, day in deltas})
+    )
+
+
+def rollup_statements(deltas: Dict[RollupKey, Dict[str, int]], existing_keys: Iterable[Tuple[int, date]]) -> List[Any]:
+    """
+    已存在的行按日期各一条 UPDATE ... CASE 原子累加，不存在的行一条多行 INSERT
+
+    多个worker同时插入同一行时后提交的一方主键冲突，整批回滚后由调用方重试（重试时该行已存在，走 UPDATE）
+    """
+    existing = {(share_id, day) for share_id, day in existing_keys}
+    statements = []
+
+    updates_by_day: Dict[date, Dict[int, Dict[str, int]]] = defaultdict(dict)
+    new_rows = []
+    for (share_id, day), delta in deltas.items():
+        if (share_id, day) in existing:
+            updates_by_day[day][share_id] = delta
+        else:
+            new_rows.append({"share_id": share_id, "day": day, **delta})
+
+    for day, shares in updates_by_day.items():
+        values = {
+            column.key: column + case(
+                {share_id: delta[column.key] for share_id, delta in shares.items()},
+                value=ShareDailyStats.share_id, else_=0
+            )
+            for column in (ShareDailyStats.views, ShareDailyStats.downloads, ShareDailyStats.unique_visitors)
+        }
+        statements.append(
+            update(ShareDailyStats).where(
+                ShareDailyStats.day == day, ShareDailyStats.share_id.in_(list(shares))
+            ).values(values).execution_options(synchronize_session=False)
+        )
+
+    if new_rows:
+        statements.append(insert(ShareDailyStats).values(new_rows))
+    return statements
+
+
+# ==================== 维护 ====================
+
+def archive_access_logs(db: Session, retention_days: int = None, batch_size: int = None) -> int:
+    """把超过保留期的访问日志按批移入归档表，每批一个事务，返回归档条数"""
+    retention_days = retention_days or settings.SHARE_ACCESS_LOG_RETENTION_DAYS
+    batch_size = batch_size or settings.SHARE_ACCESS_LOG_ARCHIVE_BATCH
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    columns = [ShareAccessLog.id] + [getattr(ShareAccessLog, field) for field in LOG_FIELDS]
+
+    archived = 0
+    while True:
+        ids = db.execute(
+            select(ShareAccessLog.id).where(ShareAccessLog.accessed_at < cutoff)
+            .order_by(ShareAccessLog.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return archived
+
+        db.execute(insert(ShareAccessLogArchive).from_select(
+            [column.key for column in columns], select(*columns).where(ShareAccessLog.id.in_(ids))
+        ))
+        db.execute(delete(ShareAccessLog).where(ShareAccessLog.id.in_(ids)))
+        db.commit()
+        archived += len(ids)
+        logger.info("📦 [SHARE_ANALYTICS] 已归档 %s 条访问日志（%s 之前）", archived, cutoff)
+
+
+def rebuild_rollups(db: Session) -> int:
+    """由原始日志和归档日志重建日汇总表，返回汇总行数（当日独立访客按 用户ID / IP + User-Agent 去重）"""
+    sources = union_all(*[
+        select(
+            table.share_id, table.visitor_user_id, table.visitor_ip, table.visitor_user_agent,
+            table.access_type, table.accessed_at
+        ) for table in (ShareAccessLog, ShareAccessLogArchive)
+    ]).subquery("logs")
+
+    visitor = func.coalesce(
+        cast(sources.c.visitor_user_id, String),
+        func.coalesce(sources.c.visitor_ip, "") + "|" + func.coalesce(sources.c.visitor_user_agent, "")
+    )
+    is_view = sources.c.access_type == "VIEW"
+    day = func.date(sources.c.accessed_at)
+
+    db.execute(delete(ShareDailyStats))
+    db.execute(insert(ShareDailyStats).from_select(
+        ["share_id", "day", "views", "downloads", "unique_visitors"],
+        select(
+            sources.c.share_id,
+            day,
+            func.count(case((is_view, 1))),
+            func.count(case((sources.c.access_type == "DOWNLOAD", 1))),
+            func.count(func.distinct(case((is_view, visitor))))
+        ).where(
+            sources.c.share_id.in_(select(DocumentShare.id)),
+            sources.c.accessed_at.isnot(None)
+        ).group_by(sources.c.share_id, day)
+    ))
+    db.commit()
+    return db.execute(select(func.count()).select_from(ShareDailyStats)).scalar()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] not in (["archive"], ["rebuild"]):
+        print("用法: python -m app.modules.v2.share_system.analytics archive|rebuild")
+        sys.exit(1)
+
+    from ....core.database import SessionLocal
+    from ...v1.user_register.models import User  # noqa: F401  注册外键引用的表
+
+    session = SessionLocal()
+    try:
+        if sys.argv[1] == "archive":
+            print(f"✅ 归档完成: {archive_access_logs(session)} 条访问日志")
+        else:
+            print(f"✅ 日汇总重建完成: {rebuild_rollups(session)} 行")
+    finally:
+        session.close()
@@ -1,14 +1,18 @@
 from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import jwt
 
-from ....core.database import get_db
+from ....core.database import get_async_db, get_db
 from ....core.config import settings  # 🔧 修复：导入你的配置
+from ....core.log import get_logger
 from ...v1.user_auth.dependencies import get_current_user
 from .models import DocumentShare
 from ..document_manager.models import Document
 
+logger = get_logger(__name__)
+
 
 def get_user_share(
         share_id: int,
@@ -68,6 +72,44 @@ def get_public_share(
     return share
 
 
+def _token_user_id(request: Request) -> Optional[int]:
+    """从 Bearer token 中解析用户ID；没有token或token无效时返回None"""
+    # 检查是否有Authorization header
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        logger.debug("🔍 没有Authorization header")
+        return None
+
+    # 检查是否是Bearer token格式
+    if not authorization.startswith("Bearer "):
+        logger.debug("🔍 不是Bearer token格式")
+        return None
+
+    # 提取token
+    token = authorization.split(" ")[1]
+
+    try:
+        # 验证JWT token
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user_id = int(payload.get("sub"))
+        logger.debug("🔍 解析到user_id: %s", user_id)
+        return user_id
+    except jwt.ExpiredSignatureError:
+        logger.debug("❌ Token已过期")
+        return None
+    except jwt.JWTError as e:
+        logger.debug("❌ JWT验证失败: %s", e)
+        return None
+
+
+def _active_user(user):
+    if user and user.is_active:
+        logger.debug("✅ 找到活跃用户: %s", user.username)
+        return user
+    logger.debug("❌ 用户不存在或不活跃")
+    return None
+
+
 # 🔧 修复：重新实现可选认证依赖
 def get_optional_current_user(request: Request, db: Session = Depends(get_db)):
     """
@@ -77,53 +119,32 @@ def get_optional_current_user(request: Request, db: Session = Depends(get_db)):
     - 不会抛出认证异常
     """
     try:
-        # 检查是否有Authorization header
-        authorization = request.headers.get("Authorization")
-        if not authorization:
-            print("🔍 没有Authorization header")
+        user_id = _token_user_id(request)
+        if user_id is None:
             return None
 
-        # 检查是否是Bearer token格式
-        if not authorization.startswith("Bearer "):
-            print("🔍 不是Bearer token格式")
-            return None
+        from ...v1.user_register.models import User
+        return _active_user(db.get(User, user_id))
 
-        # 提取token
-        token = authorization.split(" ")[1]
-        print(f"🔍 提取到token: {token[:20]}...")
+    except Exception as e:
+        # 任何认证错误都返回None，不抛出异常
+        logger.debug("❌ 认证异常: %s", e)
+        return None
 
-        # 🔧 修复：直接使用JWT验证
-        from ...v1.user_register.models import User
 
-        try:
-            # 验证JWT token
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-            user_id = int(payload.get("sub"))
-            print(f"🔍 解析到user_id: {user_id}")
-
-            if user_id is None:
-                print("🔍 token中没有user_id")
-                return None
-
-            # 查询用户
-            user = db.query(User).filter(User.id == user_id).first()
-            if user and user.is_active:
-                print(f"✅ 找到活跃用户: {user.username}")
-                return user
-            else:
-                print(f"❌ 用户不存在或不活跃")
-                return None
-
-        except jwt.ExpiredSignatureError:
-            print("❌ Token已过期")
-            return None
-        except jwt.JWTError as e:
-            print(f"❌ JWT验证失败: {str(e)}")
+async def get_optional_current_user_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """同 get_optional_current_user（AsyncSession 版，供 async def 路由使用，不占用线程池和同步连接池）"""
+    try:
+        user_id = _token_user_id(request)
+        if user_id is None:
             return None
 
+        from ...v1.user_register.models import User
+        return _active_user(await db.get(User, user_id))
+
     except Exception as e:
         # 任何认证错误都返回None，不抛出异常
-        print(f"❌ 认证异常: {str(e)}")
+        logger.debug("❌ 认证异常: %s", e)
         return None
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, Enum, ForeignKey, Index
 from datetime import datetime
 
 # 导入现有的基类
@@ -74,4 +74,37 @@ class ShareAccessLog(Base):
     access_result = Column(String(50), default="success")
 
     # 时间戳
-    accessed_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    accessed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ShareAccessLogArchive(Base):
+    """超过保留期的访问日志（结构同 us_share_access_logs，不设外键，分享删除后仍保留历史）"""
+    __tablename__ = "us_share_access_logs_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    share_id = Column(Integer, nullable=False)
+    visitor_ip = Column(String(45), nullable=True)
+    visitor_user_agent = Column(Text, nullable=True)
+    visitor_user_id = Column(Integer, nullable=True)
+    access_type = Column(String(20), nullable=False)
+    access_result = Column(String(50), default="success")
+    accessed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('idx_share_id', 'share_id'),
+    )
+
+
+class ShareDailyStats(Base):
+    """分享访问日汇总：由访问日志写入时增量维护，时间窗口统计只需汇总最多31行"""
+    __tablename__ = "us_share_daily_stats"
+
+    share_id = Column(Integer, ForeignKey("us_document_shares.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True, comment="日期（UTC）")
+    views = Column(Integer, nullable=False, default=0, comment="访问次数")
+    downloads = Column(Integer, nullable=False, default=0, comment="下载次数")
+    unique_visitors = Column(Integer, nullable=False, default=0, comment="当日独立访客数")
+
+    __table_args__ = (
+        Index('idx_day', 'day'),
+    )
@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import os
 
-from ....core.database import get_db
+from ....core.database import get_db, get_async_db
 from ...v1.user_auth.dependencies import get_current_user
-from .dependencies import get_optional_current_user  # 🆕 导入新依赖
-from .services import share_system_service
+from .dependencies import get_optional_current_user, get_optional_current_user_async  # 🆕 导入新依赖
+from .services import share_system_service, async_share_system_service
 from .schemas import (
     CreateShareRequest, UpdateShareRequest, AccessShareRequest,
     ShareResponse, ShareDetailResponse, ShareListResponse, ShareStatsResponse,
@@ -52,7 +53,7 @@ async def get_my_shares(
         page: int = 1,
         size: int = 20,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取我的分享列表"""
     try:
@@ -62,7 +63,7 @@ async def get_my_shares(
                 detail="页码和每页数量必须为正数，且每页数量不超过100"
             )
 
-        shares, total = share_system_service.get_my_shares(current_user, page, size, db)
+        shares, total = await async_share_system_service.get_my_shares(current_user, page, size, db)
         pages = (total + size - 1) // size
 
         return ShareListResponse(
@@ -83,11 +84,11 @@ async def get_my_shares(
 async def get_share_detail(
     share_id: int,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取分享详情"""
     try:
-        return share_system_service.get_share_detail(share_id, current_user, db)
+        return await async_share_system_service.get_share_detail(share_id, current_user, db)
     except HTTPException as e:
         # 🔧 修复：直接重新抛出HTTPException
         raise e
@@ -147,8 +148,8 @@ async def access_shared_document(
     share_code: str,
     request: AccessShareRequest,
     req: Request,
-    db: Session = Depends(get_db),
-    current_user: Optional = Depends(get_optional_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional = Depends(get_optional_current_user_async)
 ):
     """访问分享的文档（公开接口）"""
     try:
@@ -157,7 +158,7 @@ async def access_shared_document(
         visitor_user_agent = req.headers.get("user-agent", "")
         visitor_user_id = current_user.id if current_user else None
 
-        return share_system_service.access_shared_document(
+        return await async_share_system_service.access_shared_document(
             share_code, request, visitor_ip, visitor_user_agent, visitor_user_id, db
         )
     except HTTPException as e:
@@ -178,8 +179,8 @@ async def get_shared_document(
         share_code: str,
         password: Optional[str] = None,
         req: Request = None,
-        db: Session = Depends(get_db),
-        current_user: Optional = Depends(get_optional_current_user)  # 🔧 使用新的可选依赖
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Optional = Depends(get_optional_current_user_async)  # 🔧 使用新的可选依赖
 ):
     """获取分享的文档（GET方式，用于直接链接访问）"""
     try:
@@ -191,7 +192,7 @@ async def get_shared_document(
         visitor_user_agent = req.headers.get("user-agent", "")
         visitor_user_id = current_user.id if current_user else None
 
-        return share_system_service.access_shared_document(
+        return await async_share_system_service.access_shared_document(
             share_code, access_request, visitor_ip, visitor_user_agent, visitor_user_id, db
         )
     except Exception as e:
@@ -268,11 +269,11 @@ async def download_shared_document(
 @router.get("/stats", response_model=ShareStatsResponse)
 async def get_share_stats(
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取分享统计"""
     try:
-        return share_system_service.get_share_stats(current_user, db)
+        return await async_share_system_service.get_share_stats(current_user, db)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -98,6 +98,11 @@ class ShareDetailResponse(ShareResponse):
     week_views: int
     month_views: int
 
+    # 独立访客（HyperLogLog估算，Redis不可用时为空）
+    unique_views: Optional[int] = None
+    today_unique_views: Optional[int] = None
+    week_unique_views: Optional[int] = None
+
     # 最近访问记录
     recent_access_logs: List[AccessLogResponse]
 
@@ -1,13 +1,16 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc, select
-from typing import Optional, List, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, func, desc, select, case
+from typing import Dict, Iterable, Optional, List, Tuple
 from datetime import datetime, timedelta
 import secrets
 import string
 from fastapi import HTTPException, status
 
 # 🔧 修复：移除枚举导入，只导入模型类
-from .models import DocumentShare, ShareAccessLog
+from .models import DocumentShare, ShareAccessLog, ShareDailyStats
+from .access_log_writer import access_event, access_log_writer
+from .analytics import window_views_select
 from .schemas import (
     CreateShareRequest, UpdateShareRequest, AccessShareRequest,
     ShareResponse, ShareDetailResponse, ShareStatsResponse,
@@ -15,6 +18,8 @@ from .schemas import (
 )
 from ..document_manager.models import Document
 from ...v1.user_register.models import User
+from ....core.redis.services import unique_view_service
+from ....core.redis.services.unique_views import VIEW_NEW_VISITOR, visitor_id
 import os
 
 class ShareSystemService:
@@ -84,18 +89,6 @@ class ShareSystemService:
 
         return self._build_share_response(share, db)
 
-    def get_my_shares(self, current_user, page: int, size: int, db: Session) -> Tuple[List[ShareResponse], int]:
-        """获取我的分享列表"""
-        user_id = current_user.id
-
-        query = db.query(DocumentShare).filter(DocumentShare.user_id == user_id)
-
-        total = query.count()
-        shares = query.order_by(desc(DocumentShare.created_at)).offset((page - 1) * size).limit(size).all()
-
-        share_responses = [self._build_share_response(share, db) for share in shares]
-        return share_responses, total
-
     def get_share_detail(self, share_id: int, current_user, db: Session) -> ShareDetailResponse:
         """获取分享详情"""
         user_id = current_user.id
@@ -111,40 +104,13 @@ class ShareSystemService:
                 detail="分享不存在或无权限访问"
             )
 
-        # 获取访问统计
-        now = datetime.utcnow()
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        week_start = now - timedelta(days=7)
-        month_start = now - timedelta(days=30)
+        # 获取访问统计（日汇总表，最多31行）
+        views = db.execute(window_views_select(ShareDailyStats.share_id == share_id)).one()
 
-        today_views = db.query(ShareAccessLog).filter(
-            and_(
-                ShareAccessLog.share_id == share_id,
-                ShareAccessLog.access_type == "VIEW",
-                ShareAccessLog.accessed_at >= today_start
-            )
-        ).count()
-
-        week_views = db.query(ShareAccessLog).filter(
-            and_(
-                ShareAccessLog.share_id == share_id,
-                ShareAccessLog.access_type == "VIEW",
-                ShareAccessLog.accessed_at >= week_start
-            )
-        ).count()
-
-        month_views = db.query(ShareAccessLog).filter(
-            and_(
-                ShareAccessLog.share_id == share_id,
-                ShareAccessLog.access_type == "VIEW",
-                ShareAccessLog.accessed_at >= month_start
-            )
-        ).count()
-
-        # 获取最近访问记录
+        # 获取最近访问记录（按ID倒序：走 share_id 索引，不需要对该分享的全部日志排序）
         recent_logs = db.query(ShareAccessLog).filter(
             ShareAccessLog.share_id == share_id
-        ).order_by(desc(ShareAccessLog.accessed_at)).limit(10).all()
+        ).order_by(desc(ShareAccessLog.id)).limit(10).all()
 
         recent_access_logs = [self._build_access_log_response(log, db) for log in recent_logs]
 
@@ -152,9 +118,9 @@ class ShareSystemService:
 
         return ShareDetailResponse(
             **base_response.dict(),
-            today_views=today_views,
-            week_views=week_views,
-            month_views=month_views,
+            today_views=views.today,
+            week_views=views.week,
+            month_views=views.month,
             recent_access_logs=recent_access_logs
         )
 
@@ -213,13 +179,161 @@ class ShareSystemService:
         db.commit()
         return True
 
-    def access_shared_document(self, share_code: str, request: AccessShareRequest,
-                               visitor_ip: str, visitor_user_agent: str,
-                               visitor_user_id: Optional[int], db: Session) -> PublicDocumentResponse:
-        """访问分享的文档"""
-        # 查找分享记录
+    def download_shared_document(self, share_code: str, visitor_ip: str,
+                                 visitor_user_agent: str, visitor_user_id: Optional[int],
+                                 db: Session) -> Tuple[str, str]:
+        """下载分享的文档"""
         share = db.query(DocumentShare).filter(DocumentShare.share_code == share_code).first()
 
+        if not share:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="分享链接不存在"
+            )
+
+        if not share.allow_download:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="该分享不允许下载"
+            )
+
+        # 记录下载日志并更新下载计数（批量异步写入）
+        self._log_access(share.id, "DOWNLOAD", visitor_ip, visitor_user_agent, visitor_user_id)
+
+        # 获取文档信息
+        document = db.query(Document).filter(Document.id == share.document_id).first()
+
+        return document.file_path, document.title
+
+    def _build_share_response(self, share: DocumentShare, db: Session) -> ShareResponse:
+        """构建分享响应"""
+        document = db.query(Document).filter(Document.id == share.document_id).first()
+        return _to_share_response(share, document)
+
+    def _build_access_log_response(self, log: ShareAccessLog, db: Session) -> AccessLogResponse:
+        """构建访问日志响应"""
+        visitor_username = None
+        if log.visitor_user_id:
+            visitor = db.query(User).filter(User.id == log.visitor_user_id).first()
+            if visitor:
+                visitor_username = visitor.username
+
+        return _to_access_log_response(log, visitor_username)
+
+    def _log_access(self, share_id: int, access_type: str, visitor_ip: str,
+                    visitor_user_agent: str, visitor_user_id: Optional[int], new_visitor: bool = False):
+        """记录访问日志（交给 access_log_writer 批量写入，同时累加分享的访问/下载计数和日汇总）"""
+        access_log_writer.submit_nowait(
+            access_event(share_id, access_type, visitor_ip, visitor_user_agent, visitor_user_id, new_visitor)
+        )
+
+
+def _to_share_response(share: DocumentShare, document: Document) -> ShareResponse:
+    # 🔑 关键修改：从环境变量读取基础URL，默认本地地址
+    base_url = os.getenv("BASE_URL", "http://localhost:8100")
+    share_url = f"{base_url}/api/v2/share_system/public/{share.share_code}"
+
+    return ShareResponse(
+        id=share.id,
+        document_id=share.document_id,
+        share_code=share.share_code,
+        share_type=share.share_type,
+        share_url=share_url,  # 这里会根据环境变量自动变化
+        allow_download=share.allow_download,
+        allow_comment=share.allow_comment,
+        status=share.status,
+        expire_time=share.expire_time,
+        view_count=share.view_count,
+        download_count=share.download_count,
+        created_at=share.created_at,
+        updated_at=share.updated_at,
+        document_title=document.title,
+        document_summary=document.summary
+    )
+
+
+def _to_access_log_response(log: ShareAccessLog, visitor_username: Optional[str]) -> AccessLogResponse:
+    return AccessLogResponse(
+        id=log.id,
+        access_type=log.access_type,
+        access_result=log.access_result,
+        visitor_ip=log.visitor_ip,
+        visitor_user_id=log.visitor_user_id,
+        visitor_username=visitor_username,
+        accessed_at=log.accessed_at
+    )
+
+
+class AsyncShareSystemService:
+    """
+    分享系统读接口（AsyncSession 版）
+
+    公开分享访问、我的分享、分享详情和统计；查询通过 await 执行，不阻塞事件循环。
+    列表中的文档标题、访问者用户名按ID批量查询，不再逐条查询
+    """
+
+    async def get_my_shares(self, current_user, page: int, size: int,
+                            db: AsyncSession) -> Tuple[List[ShareResponse], int]:
+        """获取我的分享列表"""
+        user_id = current_user.id
+
+        total = (await db.execute(
+            select(func.count(DocumentShare.id)).where(DocumentShare.user_id == user_id)
+        )).scalar_one()
+        shares = (await db.execute(
+            select(DocumentShare).where(DocumentShare.user_id == user_id)
+            .order_by(desc(DocumentShare.created_at)).offset((page - 1) * size).limit(size)
+        )).scalars().all()
+
+        return await self._build_share_responses(shares, db), total
+
+    async def get_share_detail(self, share_id: int, current_user, db: AsyncSession) -> ShareDetailResponse:
+        """获取分享详情"""
+        share = (await db.execute(
+            select(DocumentShare).where(DocumentShare.id == share_id, DocumentShare.user_id == current_user.id)
+        )).scalar_one_or_none()
+
+        if not share:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="分享不存在或无权限访问"
+            )
+
+        # 今日/近7天/近30天访问量：对日汇总表求和（最多31行）
+        views = (await db.execute(window_views_select(ShareDailyStats.share_id == share_id))).one()
+
+        # 获取最近访问记录（按ID倒序走 share_id 索引；访问者用户名批量查询）
+        recent_logs = (await db.execute(
+            select(ShareAccessLog).where(ShareAccessLog.share_id == share_id)
+            .order_by(desc(ShareAccessLog.id)).limit(10)
+        )).scalars().all()
+        usernames = await _load_usernames(db, (log.visitor_user_id for log in recent_logs))
+        recent_access_logs = [
+            _to_access_log_response(log, usernames.get(log.visitor_user_id)) for log in recent_logs
+        ]
+
+        base_response = (await self._build_share_responses([share], db))[0]
+        unique_views = await unique_view_service.get_share_unique_counts(share_id)
+
+        return ShareDetailResponse(
+            **base_response.dict(),
+            today_views=views.today,
+            week_views=views.week,
+            month_views=views.month,
+            unique_views=unique_views["total"],
+            today_unique_views=unique_views["today"],
+            week_unique_views=unique_views["week"],
+            recent_access_logs=recent_access_logs
+        )
+
+    async def access_shared_document(self, share_code: str, request: AccessShareRequest,
+                                     visitor_ip: str, visitor_user_agent: str,
+                                     visitor_user_id: Optional[int], db: AsyncSession) -> PublicDocumentResponse:
+        """访问分享的文档"""
+        share = (await db.execute(
+            select(DocumentShare).where(DocumentShare.share_code == share_code)
+        )).scalar_one_or_none()
+
         if not share:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -236,7 +350,7 @@ class ShareSystemService:
         # 检查是否过期
         if share.expire_time and share.expire_time < datetime.utcnow():
             share.status = "expired"
-            db.commit()
+            await db.commit()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="分享链接已过期"
@@ -256,31 +370,26 @@ class ShareSystemService:
                     detail="分享密码错误"
                 )
 
-        # 记录访问日志
-        self._log_access(share.id, "VIEW", visitor_ip, visitor_user_agent, visitor_user_id, db)
-
-        # 更新访问计数
-        share.view_count += 1
-        db.commit()
-
-        # 获取文档信息
-        document = db.query(Document).filter(Document.id == share.document_id).first()
-
-        # 🔧 修复：检查文档是否存在
-        if not document:
+        # 记录访问日志并更新访问计数：交给 access_log_writer 批量写入，请求内不写库；去重窗口内的重复访问不记录
+        visitor = visitor_id(visitor_user_id, visitor_ip, visitor_user_agent)
+        view = await unique_view_service.record_share_view(share.id, visitor)
+        if view:
+            await access_log_writer.submit(access_event(
+                share.id, "VIEW", visitor_ip, visitor_user_agent, visitor_user_id, new_visitor=view == VIEW_NEW_VISITOR
+            ))
+
+        # 文档与作者一次JOIN查询
+        row = (await db.execute(
+            select(Document, User.username).join(User, Document.user_id == User.id)
+            .where(Document.id == share.document_id)
+        )).first()
+
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="文档不存在"
             )
-
-        author = db.query(User).filter(User.id == document.user_id).first()
-
-        # 🔧 修复：检查作者是否存在
-        if not author:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="作者信息不存在"
-            )
+        document, author_username = row
 
         return PublicDocumentResponse(
             id=document.id,
@@ -289,178 +398,70 @@ class ShareSystemService:
             summary=document.summary,
             file_type=document.file_type,
             file_size=document.file_size,
-            author_username=author.username,
+            author_username=author_username,
             publish_time=document.publish_time,
-            view_count=share.view_count,
+            view_count=share.view_count + (1 if view else 0),
             allow_download=share.allow_download,
             allow_comment=share.allow_comment
         )
 
-    def download_shared_document(self, share_code: str, visitor_ip: str,
-                                 visitor_user_agent: str, visitor_user_id: Optional[int],
-                                 db: Session) -> Tuple[str, str]:
-        """下载分享的文档"""
-        share = db.query(DocumentShare).filter(DocumentShare.share_code == share_code).first()
-
-        if not share:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="分享链接不存在"
-            )
-
-        if not share.allow_download:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="该分享不允许下载"
-            )
-
-        # 记录下载日志
-        self._log_access(share.id, "DOWNLOAD", visitor_ip, visitor_user_agent, visitor_user_id, db)
-
-        # 更新下载计数
-        share.download_count += 1
-        db.commit()
-
-        # 获取文档信息
-        document = db.query(Document).filter(Document.id == share.document_id).first()
-
-        return document.file_path, document.title
-
-    def get_share_stats(self, current_user, db: Session) -> ShareStatsResponse:
+    async def get_share_stats(self, current_user, db: AsyncSession) -> ShareStatsResponse:
         """获取分享统计"""
         user_id = current_user.id
 
-        # 🔧 修复：直接使用字符串
-        total_shares = db.query(DocumentShare).filter(DocumentShare.user_id == user_id).count()
-        active_shares = db.query(DocumentShare).filter(
-            and_(DocumentShare.user_id == user_id, DocumentShare.status == "active")
-        ).count()
-        expired_shares = db.query(DocumentShare).filter(
-            and_(DocumentShare.user_id == user_id, DocumentShare.status == "expired")
-        ).count()
-        disabled_shares = db.query(DocumentShare).filter(
-            and_(DocumentShare.user_id == user_id, DocumentShare.status == "disabled")
-        ).count()
-
-        # 访问统计
+        # 各状态分享数与总访问/下载量：条件聚合，一次查询
+        share_stats = (await db.execute(
+            select(
+                func.count(DocumentShare.id).label("total"),
+                func.count(case((DocumentShare.status == "active", 1))).label("active"),
+                func.count(case((DocumentShare.status == "expired", 1))).label("expired"),
+                func.count(case((DocumentShare.status == "disabled", 1))).label("disabled"),
+                func.coalesce(func.sum(DocumentShare.view_count), 0).label("views"),
+                func.coalesce(func.sum(DocumentShare.download_count), 0).label("downloads")
+            ).where(DocumentShare.user_id == user_id)
+        )).one()
+
+        # 时间范围访问量（日汇总表）
         user_shares_query = select(DocumentShare.id).where(DocumentShare.user_id == user_id)
-
-        total_views = db.query(func.sum(DocumentShare.view_count)).filter(
-            DocumentShare.user_id == user_id
-        ).scalar() or 0
-
-        total_downloads = db.query(func.sum(DocumentShare.download_count)).filter(
-            DocumentShare.user_id == user_id
-        ).scalar() or 0
-
-        # 时间范围统计
-        now = datetime.utcnow()
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        week_start = now - timedelta(days=7)
-        month_start = now - timedelta(days=30)
-
-        today_views = db.query(ShareAccessLog).filter(
-            and_(
-                ShareAccessLog.share_id.in_(user_shares_query),
-                ShareAccessLog.access_type == "VIEW",
-                ShareAccessLog.accessed_at >= today_start
-            )
-        ).count()
-
-        week_views = db.query(ShareAccessLog).filter(
-            and_(
-                ShareAccessLog.share_id.in_(user_shares_query),
-                ShareAccessLog.access_type == "VIEW",
-                ShareAccessLog.accessed_at >= week_start
-            )
-        ).count()
-
-        month_views = db.query(ShareAccessLog).filter(
-            and_(
-                ShareAccessLog.share_id.in_(user_shares_query),
-                ShareAccessLog.access_type == "VIEW",
-                ShareAccessLog.accessed_at >= month_start
-            )
-        ).count()
+        views = (await db.execute(window_views_select(ShareDailyStats.share_id.in_(user_shares_query)))).one()
 
         # 热门分享
-        popular_shares = db.query(DocumentShare).filter(
-            DocumentShare.user_id == user_id
-        ).order_by(desc(DocumentShare.view_count)).limit(5).all()
-
-        popular_share_responses = [self._build_share_response(share, db) for share in popular_shares]
+        popular_shares = (await db.execute(
+            select(DocumentShare).where(DocumentShare.user_id == user_id)
+            .order_by(desc(DocumentShare.view_count)).limit(5)
+        )).scalars().all()
 
         return ShareStatsResponse(
-            total_shares=total_shares,
-            active_shares=active_shares,
-            expired_shares=expired_shares,
-            disabled_shares=disabled_shares,
-            total_views=total_views,
-            total_downloads=total_downloads,
-            today_views=today_views,
-            week_views=week_views,
-            month_views=month_views,
-            popular_shares=popular_share_responses
+            total_shares=share_stats.total,
+            active_shares=share_stats.active,
+            expired_shares=share_stats.expired,
+            disabled_shares=share_stats.disabled,
+            total_views=share_stats.views,
+            total_downloads=share_stats.downloads,
+            today_views=views.today,
+            week_views=views.week,
+            month_views=views.month,
+            popular_shares=await self._build_share_responses(popular_shares, db)
         )
 
-    def _build_share_response(self, share: DocumentShare, db: Session) -> ShareResponse:
-        """构建分享响应"""
-        document = db.query(Document).filter(Document.id == share.document_id).first()
-
-        # 🔑 关键修改：从环境变量读取基础URL，默认本地地址
-        base_url = os.getenv("BASE_URL", "http://localhost:8100")
-        share_url = f"{base_url}/api/v2/share_system/public/{share.share_code}"
-
-        return ShareResponse(
-            id=share.id,
-            document_id=share.document_id,
-            share_code=share.share_code,
-            share_type=share.share_type,
-            share_url=share_url,  # 这里会根据环境变量自动变化
-            allow_download=share.allow_download,
-            allow_comment=share.allow_comment,
-            status=share.status,
-            expire_time=share.expire_time,
-            view_count=share.view_count,
-            download_count=share.download_count,
-            created_at=share.created_at,
-            updated_at=share.updated_at,
-            document_title=document.title,
-            document_summary=document.summary
-        )
-
-    def _build_access_log_response(self, log: ShareAccessLog, db: Session) -> AccessLogResponse:
-        """构建访问日志响应"""
-        visitor_username = None
-        if log.visitor_user_id:
-            visitor = db.query(User).filter(User.id == log.visitor_user_id).first()
-            if visitor:
-                visitor_username = visitor.username
+    async def _build_share_responses(self, shares: List[DocumentShare], db: AsyncSession) -> List[ShareResponse]:
+        """批量构建分享响应（文档信息一次IN查询）"""
+        document_ids = {share.document_id for share in shares}
+        documents: Dict[int, Document] = {}
+        if document_ids:
+            result = await db.execute(select(Document).where(Document.id.in_(document_ids)))
+            documents = {document.id: document for document in result.scalars().all()}
+        return [_to_share_response(share, documents.get(share.document_id)) for share in shares]
 
-        return AccessLogResponse(
-            id=log.id,
-            access_type=log.access_type,
-            access_result=log.access_result,
-            visitor_ip=log.visitor_ip,
-            visitor_user_id=log.visitor_user_id,
-            visitor_username=visitor_username,
-            accessed_at=log.accessed_at
-        )
 
-    def _log_access(self, share_id: int, access_type: str, visitor_ip: str,
-                    visitor_user_agent: str, visitor_user_id: Optional[int], db: Session):
-        """记录访问日志"""
-        log = ShareAccessLog(
-            share_id=share_id,
-            visitor_ip=visitor_ip,
-            visitor_user_agent=visitor_user_agent,
-            visitor_user_id=visitor_user_id,
-            access_type=access_type,
-            access_result="success"
-        )
-        db.add(log)
-        db.commit()
+async def _load_usernames(db: AsyncSession, user_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+    ids = {user_id for user_id in user_ids if user_id}
+    if not ids:
+        return {}
+    result = await db.execute(select(User.id, User.username).where(User.id.in_(ids)))
+    return {row.id: row.username for row in result.all()}
 
 
 # 创建服务实例
-share_system_service = ShareSystemService()
\ No newline at end of file
+share_system_service = ShareSystemService()
+async_share_system_service = AsyncShareSystemService()
\ No newline at end of file
@@ -1,12 +1,17 @@
 # app/modules/v2/tech_square/models.py
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func, text
-from typing import List, Optional, Dict, Any
+from sqlalchemy import and_, or_, desc, exists, func, text, select, case
+from typing import List, Optional, Dict, Any, Sequence
 from datetime import datetime, timedelta
 
 # 修复导入路径 - 使用相对路径
 from ..document_manager.models import Document  # 修改这行
 from ..document_publish.models import PublishRecord  # 修改这行
+from ...v1.user_register.models import User
+from ....core.config import settings
+from ....core.pagination import capped_count_select, keyset_after
+from ....core.text_search import query_terms
+from .search_index import search_scores_subquery
 
 # 后面的代码保持不变...
 
@@ -15,103 +20,198 @@ class TechSquareQueries:
     """技术广场专用查询类 - 封装复杂查询逻辑"""
 
     @staticmethod
-    def get_published_documents_query(
-            db: Session,
+    def get_category_stats(db: Session) -> Dict[str, int]:
+        """获取分类统计"""
+        stats = db.execute(TechSquareQueries.category_stats_select()).all()
+        return TechSquareQueries.category_stats_from_rows(stats)
+
+    @staticmethod
+    def time_filter_start(time_filter: Optional[str]) -> Optional[datetime]:
+        """时间筛选对应的起始时间 (today/week/month)，无筛选时返回None"""
+        now = datetime.utcnow()
+        if time_filter == 'today':
+            return now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if time_filter == 'week':
+            return now - timedelta(days=7)
+        if time_filter == 'month':
+            return now - timedelta(days=30)
+        return None
+
+    # ==================== select() 语句（同步 Session / AsyncSession 共用） ====================
+
+    @staticmethod
+    def document_list_select(
             search: Optional[str] = None,
             file_type: Optional[str] = None,
             time_filter: Optional[str] = None,
-            sort_by: str = "latest"
+            sort_by: str = "latest",
+            after: Optional[Sequence[Any]] = None,
+            search_engine: Optional[str] = None
     ):
         """
-        构建已发布文档查询
+        已发布文档列表语句（包含作者用户名、昵称）
+
+        只构建语句不执行：同步服务用 db.execute()，异步服务用 await db.execute()
 
         Args:
-            search: 搜索关键词
-            file_type: 文件类型筛选 (md/pdf)
-            time_filter: 时间筛选 (today/week/month)
-            sort_by: 排序方式 (latest/popular/recommended)
+            after: 游标分页的上一页末行排序键 (sort_key, record_id)，传入时只返回其后的文档
+            search_engine: 搜索实现 index / like，默认取配置 SEARCH_ENGINE
         """
-        # 基础查询：JOIN文档表和发布记录表
-        query = db.query(
+        scores = TechSquareQueries.search_scores(search, search_engine)
+        sort_columns = TechSquareQueries.sort_columns(sort_by, scores)
+
+        stmt = select(
             Document.id,
             Document.title,
             Document.summary,
             Document.file_type,
             Document.user_id,
+            User.username,
+            User.nickname,
             PublishRecord.publish_time,
             PublishRecord.view_count,
-            PublishRecord.is_featured
+            PublishRecord.is_featured,
+            PublishRecord.id.label("record_id"),
+            sort_columns[0].label("sort_key")
         ).join(
             PublishRecord, Document.id == PublishRecord.document_id
-        ).filter(
+        ).join(
+            User, Document.user_id == User.id
+        ).where(
             PublishRecord.publish_status == 'published'
         )
 
-        # 搜索筛选
-        if search:
-            search_pattern = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Document.title.like(search_pattern),
-                    Document.summary.like(search_pattern)
-                )
-            )
+        # 🔍 搜索筛选：倒排索引只返回命中全部检索词的文档
+        if scores is not None:
+            stmt = stmt.join(scores, scores.c.document_id == Document.id)
+        elif search:
+            stmt = stmt.where(TechSquareQueries.like_condition(search))
+
+        # 📁 文件类型筛选
+        if file_type:
+            stmt = stmt.where(Document.file_type == file_type)
+
+        # 📅 时间筛选
+        start_time = TechSquareQueries.time_filter_start(time_filter)
+        if start_time:
+            stmt = stmt.where(PublishRecord.publish_time >= start_time)
 
-        # 文件类型筛选
-        if file_type and file_type in ['md', 'pdf']:
-            query = query.filter(Document.file_type == file_type)
-
-        # 时间筛选
-        if time_filter:
-            now = datetime.utcnow()
-            if time_filter == 'today':
-                start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            elif time_filter == 'week':
-                start_time = now - timedelta(days=7)
-            elif time_filter == 'month':
-                start_time = now - timedelta(days=30)
-            else:
-                start_time = None
-
-            if start_time:
-                query = query.filter(PublishRecord.publish_time >= start_time)
-
-        # 排序逻辑
+        # 📑 游标分页：从上一页末行之后继续
+        if after is not None:
+            stmt = stmt.where(keyset_after(sort_columns, after))
+
+        # 📊 排序（发布记录ID作为平局裁决，保证翻页顺序稳定）
+        return stmt.order_by(*[desc(column) for column in sort_columns])
+
+    @staticmethod
+    def search_scores(search: Optional[str], search_engine: Optional[str] = None):
+        """
+        关键词对应的 BM25 打分子查询 (document_id, score)
+
+        无关键词、配置为 like、或关键词中没有可检索的词（如纯标点）时返回 None，由调用方退回 LIKE 匹配
+        """
+        if not search or (search_engine or settings.SEARCH_ENGINE) != "index":
+            return None
+        terms = query_terms(search)
+        return search_scores_subquery(terms) if terms else None
+
+    @staticmethod
+    def like_condition(search: str):
+        """旧的模糊匹配条件（无法使用索引，只作为回退）"""
+        search_pattern = f"%{search}%"
+        return or_(
+            Document.title.like(search_pattern),
+            Document.summary.like(search_pattern)
+        )
+
+    @staticmethod
+    def sort_columns(sort_by: str, scores=None) -> List[Any]:
+        """各排序方式的排序列（均为降序），最后一列是唯一的发布记录ID"""
+        if sort_by == "relevance" and scores is not None:
+            return [scores.c.score, PublishRecord.id]
         if sort_by == "popular":
-            query = query.order_by(desc(PublishRecord.view_count))
-        elif sort_by == "recommended":
-            # 综合推荐算法：最近3天的文档 + 浏览量权重
-            recent_boost = func.CASE(
-                (PublishRecord.publish_time >= datetime.utcnow() - timedelta(days=3), 100),
-                else_=0
+            return [PublishRecord.view_count, PublishRecord.id]
+        if sort_by == "recommended":
+            # 推荐算法：最近3天的文档获得加成
+            recent_threshold = datetime.utcnow() - timedelta(days=3)
+            score = case(
+                (PublishRecord.publish_time >= recent_threshold, PublishRecord.view_count + 100),
+                else_=PublishRecord.view_count
             )
-            query = query.order_by(desc(PublishRecord.view_count + recent_boost))
-        else:  # latest
-            query = query.order_by(desc(PublishRecord.publish_time))
+            return [score, PublishRecord.id]
+        # latest（没有关键词时的 relevance 也按最新）
+        return [PublishRecord.publish_time, PublishRecord.id]
 
-        return query
+    @staticmethod
+    def count_select(stmt, cap: Optional[int] = None):
+        """列表语句对应的总数语句（去掉排序）；指定 cap 时最多数到 cap + 1 行"""
+        return capped_count_select(stmt, cap)
 
     @staticmethod
-    def get_category_stats(db: Session) -> Dict[str, int]:
-        """获取分类统计"""
-        stats = db.query(
+    def document_detail_select(document_id: int):
+        """已发布文档详情语句（包含内容和作者信息）"""
+        return select(
+            Document.id,
+            Document.title,
+            Document.content,
+            Document.summary,
+            Document.file_type,
+            Document.file_path,
+            Document.user_id,
+            User.username,
+            User.nickname,
+            PublishRecord.publish_time,
+            PublishRecord.view_count,
+            PublishRecord.is_featured
+        ).join(
+            PublishRecord, Document.id == PublishRecord.document_id
+        ).join(
+            User, Document.user_id == User.id
+        ).where(
+            Document.id == document_id,
+            PublishRecord.publish_status == 'published'
+        )
+
+    @staticmethod
+    def category_stats_select():
+        """分类统计语句"""
+        return select(
             Document.file_type,
             func.count(Document.id).label('count')
         ).join(
             PublishRecord, Document.id == PublishRecord.document_id
-        ).filter(
+        ).where(
             PublishRecord.publish_status == 'published'
-        ).group_by(Document.file_type).all()
+        ).group_by(Document.file_type)
 
+    @staticmethod
+    def category_stats_from_rows(rows) -> Dict[str, int]:
         result = {'md': 0, 'pdf': 0}
-        for stat in stats:
-            result[stat.file_type] = stat.count
-
+        for row in rows:
+            result[row.file_type] = row.count
         return result
 
     @staticmethod
-    def get_hot_documents(db: Session, limit: int = 10):
-        """获取热门文档（按浏览量排序）"""
-        return TechSquareQueries.get_published_documents_query(
-            db, sort_by="popular"
-        ).limit(limit)
\ No newline at end of file
+    def published_exists_select(document_id: int):
+        """文档是否已发布（发布记录按 document_id 索引查找，不读取文档内容）"""
+        return select(exists().where(
+            PublishRecord.document_id == document_id,
+            PublishRecord.publish_status == 'published'
+        ))
+
+    @staticmethod
+    def published_stats_select():
+        """
+        全站统计语句：总发布数、总浏览量、今日发布数、精选数
+
+        用条件聚合一次扫描发布记录表，代替原来的4次 COUNT/SUM 查询
+        """
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        return select(
+            func.count(PublishRecord.id).label('total_documents'),
+            func.coalesce(func.sum(PublishRecord.view_count), 0).label('total_views'),
+            func.count(case((PublishRecord.publish_time >= today_start, 1))).label('today_published'),
+            func.count(case((PublishRecord.is_featured == True, 1))).label('featured_count')
+        ).where(
+            PublishRecord.publish_status == 'published'
+        )
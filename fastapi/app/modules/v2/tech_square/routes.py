@@ -1,12 +1,17 @@
 # app/modules/v2/tech_square/routes.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 # 在文件最顶部添加
+import functools
+import logging
 import time
 # 修复导入路径 - 使用相对路径
-from ....core.database import get_db  # 修改这行
-from .services import TechSquareService
+from ....core.database import get_db, get_async_db  # 修改这行
+from ....core.log import get_logger, log_sampled
+from ....core.pagination import InvalidCursorError
+from .services import TechSquareService, AsyncTechSquareService
 # 在现有导入中添加
 from fastapi.responses import FileResponse, StreamingResponse
 from .schemas import (
@@ -16,12 +21,53 @@ from .schemas import (
     DocumentFileInfoResponse  # 新增
 )
 # 🆕 导入技术广场统计缓存服务# 🆕 导入缓存服务# 🆕 导入热门数据缓存服务
-from ....core.redis.services import tech_square_stats_cache_service, document_list_cache_service, hot_data_cache_service, search_cache_service
+from ....core.redis.services import tech_square_stats_cache_service, document_list_cache_service, hot_data_cache_service, search_cache_service, view_counter_service, unique_view_service
+from ....core.redis.services.unique_views import visitor_id
+from ..share_system.dependencies import get_optional_current_user_async
+
+logger = get_logger(__name__)
+
 router = APIRouter()
 
 # 后面的代码保持不变...
 
 
+async def _with_cursor_errors(result):
+    """执行游标分页查询，无效游标返回400"""
+    try:
+        return await result
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _live_view_counts(field: Optional[str] = None):
+    """
+    返回前把Redis中尚未写回数据库的浏览量增量合并到 view_count（缓存命中、降级等所有返回路径）
+
+    被装饰的路由返回缓存服务给出的dict、不要自行转换为响应模型：快照中 stamp 记录的 _view_marks
+    只在dict中，转换后丢失，写回之后旧快照的浏览量会回落
+
+    Args:
+        field: 文档列表所在字段，为空时返回值本身是一篇文档
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            await view_counter_service.apply_pending(result, field)
+            return result
+        return wrapper
+    return decorator
+
+
+async def _apply_unique_visitors(stats: dict):
+    """技术广场独立访客数（PFCOUNT 实时查询，不随统计数据缓存）"""
+    counts = await unique_view_service.get_square_unique_counts()
+    stats["unique_visitors"] = counts["total"]
+    stats["today_unique_visitors"] = counts["today"]
+    stats["week_unique_visitors"] = counts["week"]
+
+
 @router.get("/test")
 async def test_tech_square():
     """测试技术广场模块连通性"""
@@ -34,6 +80,7 @@ async def test_tech_square():
 
 
 @router.get("/documents", response_model=DocumentListResponse)
+@_live_view_counts("documents")
 async def get_document_list(
         page: int = Query(1, ge=1, description="页码"),
         size: int = Query(20, ge=1, le=100, description="每页数量"),
@@ -41,7 +88,9 @@ async def get_document_list(
         file_type: Optional[FileTypeFilter] = Query(None, description="文件类型筛选"),
         time_filter: Optional[TimeFilter] = Query(None, description="时间筛选"),
         sort_by: SortOption = Query(SortOption.LATEST, description="排序方式"),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="游标（取自上一页的next_cursor，传入时忽略page）"),
+        include_total: bool = Query(True, description="是否返回总数（false时不执行COUNT）"),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取文档列表（Redis缓存优化版）
@@ -52,6 +101,8 @@ async def get_document_list(
     - 文件类型筛选（md/pdf）
     - 时间筛选（今日/本周/本月）
     - 多种排序（最新/最热/推荐）
+    - 游标分页：传入上一页的 next_cursor，深翻页耗时不随页数增长，不返回总数
+    - 总数：按筛选条件缓存，超过上限时返回近似值（total_approximate=true）；include_total=false 时不统计
 
     性能优化：
     - ✅ Redis缓存：10分钟TTL
@@ -60,17 +111,24 @@ async def get_document_list(
     - ✅ 优雅降级：Redis不可用时直接查询数据库
     - ✅ 详细性能监控和调试信息
     """
-    print("📄 [TECH_SQUARE_DOCS] 开始获取技术广场文档列表（缓存版）")
-    print(
-        f"📄 [TECH_SQUARE_DOCS] 查询参数: page={page}, size={size}, search='{search}', type={file_type}, time={time_filter}, sort={sort_by}")
+    logger.debug("📄 [TECH_SQUARE_DOCS] 开始获取技术广场文档列表（缓存版）")
+    logger.debug("📄 [TECH_SQUARE_DOCS] 查询参数: page=%s, size=%s, search='%s', type=%s, time=%s, sort=%s",
+                 page, size, search, file_type, time_filter, sort_by)
+
+    # 📑 游标分页：直接走 keyset 查询，不经过页码缓存
+    if cursor:
+        request = DocumentListRequest(page=page, size=size, search=search, file_type=file_type,
+                                      time_filter=time_filter, sort_by=sort_by, cursor=cursor,
+                                      include_total=include_total)
+        return await _with_cursor_errors(AsyncTechSquareService(db).get_document_list(request))
 
     try:
         start_time = time.time()
 
         # 🚀 使用缓存服务获取文档列表
-        def query_function(**kwargs):
+        async def query_function(**kwargs):
             """实际的数据库查询函数"""
-            print(f"🗄️ [TECH_SQUARE_DOCS] 执行数据库查询...")
+            logger.debug("🗄️ [TECH_SQUARE_DOCS] 执行数据库查询...")
 
             # 构建请求对象
             request = DocumentListRequest(
@@ -79,12 +137,13 @@ async def get_document_list(
                 search=kwargs['search'],
                 file_type=kwargs['file_type'],
                 time_filter=kwargs['time_filter'],
-                sort_by=kwargs['sort_by']
+                sort_by=kwargs['sort_by'],
+                include_total=kwargs['include_total']
             )
 
-            # 调用原有服务
-            service = TechSquareService(db)
-            return service.get_document_list(request)
+            # 调用异步服务（后台刷新缓存时传入独立的异步会话）
+            service = AsyncTechSquareService(kwargs.get('db') or db)
+            return await service.get_document_list(request)
 
         # 转换枚举参数为字符串
         file_type_str = file_type.value if file_type else None
@@ -99,17 +158,18 @@ async def get_document_list(
             search=search,
             file_type=file_type_str,
             time_filter=time_filter_str,
-            sort_by=sort_by_str
+            sort_by=sort_by_str,
+            include_total=include_total
         )
 
         total_time = (time.time() - start_time) * 1000
 
         # 添加路由层的调试信息
         is_cached = result.get("cache_info", {}).get("cached", False)
-        print(f"📄 [TECH_SQUARE_DOCS] 文档列表获取完成，总耗时: {total_time:.2f}ms")
-        print(f"📄 [TECH_SQUARE_DOCS] 缓存状态: {'命中' if is_cached else '未命中'}")
-        print(
-            f"📄 [TECH_SQUARE_DOCS] 返回结果: 总数{result.get('total', 0)}, 当前页{len(result.get('documents', []))}条")
+        logger.debug("📄 [TECH_SQUARE_DOCS] 文档列表获取完成，总耗时: %.2fms", total_time)
+        log_sampled(logger, logging.DEBUG, "📄 [TECH_SQUARE_DOCS] 缓存状态: %s", '命中' if is_cached else '未命中')
+        logger.debug("📄 [TECH_SQUARE_DOCS] 返回结果: 总数%s, 当前页%s条",
+                     result.get('total', 0), len(result.get('documents', [])))
 
         # 添加路由层的性能信息
         result["_route_debug_info"] = {
@@ -128,24 +188,19 @@ async def get_document_list(
         }
 
         if is_cached:
-            print(f"✅ [TECH_SQUARE_DOCS] 缓存命中! 总耗时: {total_time:.2f}ms")
+            log_sampled(logger, logging.DEBUG, "✅ [TECH_SQUARE_DOCS] 缓存命中! 总耗时: %.2fms", total_time)
         else:
-            print(f"🔄 [TECH_SQUARE_DOCS] 缓存未命中，已查询数据库并写入缓存")
+            log_sampled(logger, logging.DEBUG, "🔄 [TECH_SQUARE_DOCS] 缓存未命中，已查询数据库并写入缓存")
 
-        # 转换为响应模型
-        if isinstance(result, dict):
-            # 如果是字典，需要转换为Pydantic模型
-            return DocumentListResponse(**result)
-        else:
-            # 如果已经是模型，直接返回
-            return result
+        # 直接返回dict，由 response_model 转换：_live_view_counts 要在转换前读取快照中的 _view_marks
+        return result
 
     except Exception as e:
         error_time = (time.time() - start_time) * 1000 if 'start_time' in locals() else 0
-        print(f"❌ [TECH_SQUARE_DOCS] 获取文档列表失败 ({error_time:.2f}ms): {str(e)}")
+        logger.error("❌ [TECH_SQUARE_DOCS] 获取文档列表失败 (%.2fms): %s", error_time, e)
 
         # 🛡️ 优雅降级：缓存服务异常时使用原有服务
-        print(f"🔄 [TECH_SQUARE_DOCS] 尝试使用原有服务作为降级方案...")
+        logger.info("🔄 [TECH_SQUARE_DOCS] 尝试直接查询数据库作为降级方案...")
         try:
             request = DocumentListRequest(
                 page=page,
@@ -153,13 +208,14 @@ async def get_document_list(
                 search=search,
                 file_type=file_type,
                 time_filter=time_filter,
-                sort_by=sort_by
+                sort_by=sort_by,
+                include_total=include_total
             )
 
-            service = TechSquareService(db)
-            fallback_result = service.get_document_list(request)
+            service = AsyncTechSquareService(db)
+            fallback_result = await service.get_document_list(request)
 
-            print(f"✅ [TECH_SQUARE_DOCS] 降级方案成功")
+            logger.info("✅ [TECH_SQUARE_DOCS] 降级方案成功")
 
             # 添加降级信息
             if hasattr(fallback_result, '__dict__'):
@@ -172,16 +228,17 @@ async def get_document_list(
             return fallback_result
 
         except Exception as fallback_error:
-            print(f"❌ [TECH_SQUARE_DOCS] 降级方案也失败: {str(fallback_error)}")
+            logger.error("❌ [TECH_SQUARE_DOCS] 降级方案也失败: %s", fallback_error)
             raise HTTPException(
                 status_code=500,
                 detail=f"获取文档列表失败: {str(e)}，降级方案也失败: {str(fallback_error)}"
             )
 
 @router.get("/documents/{document_id}", response_model=DocumentDetailResponse)
+@_live_view_counts()
 async def get_document_detail(
         document_id: int,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取文档详情
@@ -189,8 +246,8 @@ async def get_document_detail(
     返回已发布文档的完整信息，包括内容
     """
     try:
-        service = TechSquareService(db)
-        document = service.get_document_detail(document_id)
+        service = AsyncTechSquareService(db)
+        document = await service.get_document_detail(document_id)
 
         if not document:
             raise HTTPException(status_code=404, detail="文档不存在或未发布")
@@ -204,19 +261,22 @@ async def get_document_detail(
 
 
 @router.get("/search", response_model=DocumentListResponse)
+@_live_view_counts("documents")
 async def search_documents(
         keyword: str = Query(..., min_length=1, max_length=100, description="搜索关键词"),
         page: int = Query(1, ge=1, description="页码"),
         size: int = Query(20, ge=1, le=50, description="每页数量"),
         file_type: Optional[FileTypeFilter] = Query(None, description="文件类型筛选"),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="游标（取自上一页的next_cursor，传入时忽略page）"),
+        include_total: bool = Query(True, description="是否返回总数（false时不执行COUNT）"),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     搜索文档（Redis缓存优化版）
 
     智能搜索功能：
-    - 标题匹配
-    - 摘要内容匹配
+    - 倒排索引全文检索：标题、摘要、正文（Markdown / PDF 文本），中文按二元组切词
+    - 按 BM25 相关度排序，标题命中权重更高
     - 支持文件类型筛选
 
     性能优化：
@@ -226,28 +286,35 @@ async def search_documents(
     - ✅ 优雅降级：Redis不可用时直接查询数据库
     - ✅ 详细性能监控和调试信息
     """
-    print("🔍 [SEARCH] 开始搜索文档（缓存版）")
-    print(f"🔍 [SEARCH] 搜索参数: keyword='{keyword}', page={page}, size={size}, file_type={file_type}")
+    logger.debug("🔍 [SEARCH] 开始搜索文档（缓存版）")
+    logger.debug("🔍 [SEARCH] 搜索参数: keyword='%s', page=%s, size=%s, file_type=%s", keyword, page, size, file_type)
+
+    # 📑 游标分页：直接走 keyset 查询，不经过页码缓存
+    if cursor:
+        request = SearchRequest(keyword=keyword, page=page, size=size, file_type=file_type, cursor=cursor,
+                                include_total=include_total)
+        return await _with_cursor_errors(AsyncTechSquareService(db).search_documents(request))
 
     try:
         start_time = time.time()
 
         # 🚀 使用缓存服务获取搜索结果
-        def query_function(**kwargs):
+        async def query_function(**kwargs):
             """实际的数据库查询函数"""
-            print(f"🗄️ [SEARCH] 执行数据库搜索查询...")
+            logger.debug("🗄️ [SEARCH] 执行数据库搜索查询...")
 
             # 构建搜索请求对象
             request = SearchRequest(
                 keyword=kwargs['keyword'],
                 page=kwargs['page'],
                 size=kwargs['size'],
-                file_type=FileTypeFilter(kwargs['file_type']) if kwargs['file_type'] else None
+                file_type=FileTypeFilter(kwargs['file_type']) if kwargs['file_type'] else None,
+                include_total=kwargs['include_total']
             )
 
-            # 调用原有服务
-            service = TechSquareService(db)
-            return service.search_documents(request)
+            # 调用异步服务
+            service = AsyncTechSquareService(db)
+            return await service.search_documents(request)
 
         # 转换枚举参数为字符串
         file_type_str = file_type.value if file_type else None
@@ -258,16 +325,17 @@ async def search_documents(
             keyword=keyword,
             page=page,
             size=size,
-            file_type=file_type_str
+            file_type=file_type_str,
+            include_total=include_total
         )
 
         total_time = (time.time() - start_time) * 1000
 
         # 添加路由层的调试信息
         is_cached = result.get("cache_info", {}).get("cached", False) if result else False
-        print(f"🔍 [SEARCH] 搜索完成，总耗时: {total_time:.2f}ms")
-        print(f"🔍 [SEARCH] 缓存状态: {'命中' if is_cached else '未命中'}")
-        print(f"🔍 [SEARCH] 搜索结果: 当前页{len(result.get('documents', []))}条, 总计{result.get('total', 0)}条")
+        logger.debug("🔍 [SEARCH] 搜索完成，总耗时: %.2fms", total_time)
+        log_sampled(logger, logging.DEBUG, "🔍 [SEARCH] 缓存状态: %s", '命中' if is_cached else '未命中')
+        logger.debug("🔍 [SEARCH] 搜索结果: 当前页%s条, 总计%s条", len(result.get('documents', [])), result.get('total', 0))
 
         # 添加路由层的性能信息
         if result:
@@ -285,34 +353,32 @@ async def search_documents(
             }
 
         if is_cached:
-            print(f"✅ [SEARCH] 缓存命中! 总耗时: {total_time:.2f}ms")
+            log_sampled(logger, logging.DEBUG, "✅ [SEARCH] 缓存命中! 总耗时: %.2fms", total_time)
         else:
-            print(f"🔄 [SEARCH] 缓存未命中，已查询数据库并写入缓存")
+            log_sampled(logger, logging.DEBUG, "🔄 [SEARCH] 缓存未命中，已查询数据库并写入缓存")
 
-        # 转换为响应模型
-        if isinstance(result, dict):
-            return DocumentListResponse(**result)
-        else:
-            return result
+        # 直接返回dict，由 response_model 转换：_live_view_counts 要在转换前读取快照中的 _view_marks
+        return result
 
     except Exception as e:
         error_time = (time.time() - start_time) * 1000 if 'start_time' in locals() else 0
-        print(f"❌ [SEARCH] 搜索失败 ({error_time:.2f}ms): {str(e)}")
+        logger.error("❌ [SEARCH] 搜索失败 (%.2fms): %s", error_time, e)
 
         # 🛡️ 优雅降级：缓存服务异常时使用原有服务
-        print(f"🔄 [SEARCH] 尝试使用原有服务作为降级方案...")
+        logger.info("🔄 [SEARCH] 尝试直接查询数据库作为降级方案...")
         try:
             request = SearchRequest(
                 keyword=keyword,
                 page=page,
                 size=size,
-                file_type=file_type
+                file_type=file_type,
+                include_total=include_total
             )
 
-            service = TechSquareService(db)
-            fallback_result = service.search_documents(request)
+            service = AsyncTechSquareService(db)
+            fallback_result = await service.search_documents(request)
 
-            print(f"✅ [SEARCH] 降级方案成功")
+            logger.info("✅ [SEARCH] 降级方案成功")
 
             # 添加降级信息
             if hasattr(fallback_result, '__dict__'):
@@ -325,31 +391,36 @@ async def search_documents(
             return fallback_result
 
         except Exception as fallback_error:
-            print(f"❌ [SEARCH] 降级方案也失败: {str(fallback_error)}")
+            logger.error("❌ [SEARCH] 降级方案也失败: %s", fallback_error)
             raise HTTPException(
                 status_code=500,
                 detail=f"搜索文档失败: {str(e)}，降级方案也失败: {str(fallback_error)}"
             )
 
 @router.get("/category-stats", response_model=CategoryStatsResponse)
-async def get_category_stats(db: Session = Depends(get_db)):
+async def get_category_stats(db: AsyncSession = Depends(get_async_db)):
     """
-    获取分类统计信息
+    获取分类统计信息（L1 + Redis缓存）
 
     返回各文件类型的文档数量
     """
     try:
-        service = TechSquareService(db)
-        return service.get_category_stats()
+        return await tech_square_stats_cache_service.get_category_stats(db)
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取分类统计失败: {str(e)}")
+        logger.error("❌ [CATEGORY_STATS] 缓存服务异常，直接查询数据库: %s", e)
+        try:
+            service = AsyncTechSquareService(db)
+            return await service.get_category_stats()
+        except Exception as fallback_error:
+            raise HTTPException(status_code=500, detail=f"获取分类统计失败: {str(fallback_error)}")
 
 
 @router.get("/hot-documents", response_model=HotDocumentsResponse)
+@_live_view_counts("documents")
 async def get_hot_documents(
         limit: int = Query(10, ge=1, le=50, description="返回数量"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取热门文档（Redis缓存优化版）
@@ -362,18 +433,18 @@ async def get_hot_documents(
     - ✅ 优雅降级：Redis不可用时直接查询数据库
     - ✅ 详细性能监控和调试信息
     """
-    print("🔥 [HOT_DOCS] 开始获取热门文档（缓存版）")
-    print(f"🔥 [HOT_DOCS] 查询参数: limit={limit}")
+    logger.debug("🔥 [HOT_DOCS] 开始获取热门文档（缓存版）")
+    logger.debug("🔥 [HOT_DOCS] 查询参数: limit=%s", limit)
 
     try:
         start_time = time.time()
 
         # 🚀 使用缓存服务获取热门文档
-        def query_function(**kwargs):
+        async def query_function(**kwargs):
             """实际的数据库查询函数"""
-            print(f"🗄️ [HOT_DOCS] 执行数据库查询...")
-            service = TechSquareService(db)
-            return service.get_hot_documents(kwargs['limit'])
+            logger.debug("🗄️ [HOT_DOCS] 执行数据库查询...")
+            service = AsyncTechSquareService(kwargs.get('db') or db)
+            return await service.get_hot_documents(kwargs['limit'])
 
         result = await hot_data_cache_service.get_hot_documents(
             db=db,
@@ -385,9 +456,9 @@ async def get_hot_documents(
 
         # 添加路由层的调试信息
         is_cached = result.get("cache_info", {}).get("cached", False) if result else False
-        print(f"🔥 [HOT_DOCS] 热门文档获取完成，总耗时: {total_time:.2f}ms")
-        print(f"🔥 [HOT_DOCS] 缓存状态: {'命中' if is_cached else '未命中'}")
-        print(f"🔥 [HOT_DOCS] 返回结果: {len(result.get('documents', [])) if result else 0}条")
+        logger.debug("🔥 [HOT_DOCS] 热门文档获取完成，总耗时: %.2fms", total_time)
+        log_sampled(logger, logging.DEBUG, "🔥 [HOT_DOCS] 缓存状态: %s", '命中' if is_cached else '未命中')
+        logger.debug("🔥 [HOT_DOCS] 返回结果: %s条", len(result.get('documents', [])) if result else 0)
 
         # 添加路由层的性能信息
         if result:
@@ -400,27 +471,24 @@ async def get_hot_documents(
             }
 
         if is_cached:
-            print(f"✅ [HOT_DOCS] 缓存命中! 总耗时: {total_time:.2f}ms")
+            log_sampled(logger, logging.DEBUG, "✅ [HOT_DOCS] 缓存命中! 总耗时: %.2fms", total_time)
         else:
-            print(f"🔄 [HOT_DOCS] 缓存未命中，已查询数据库并写入缓存")
+            log_sampled(logger, logging.DEBUG, "🔄 [HOT_DOCS] 缓存未命中，已查询数据库并写入缓存")
 
-        # 转换为响应模型
-        if isinstance(result, dict):
-            return HotDocumentsResponse(**result)
-        else:
-            return result
+        # 直接返回dict，由 response_model 转换：_live_view_counts 要在转换前读取快照中的 _view_marks
+        return result
 
     except Exception as e:
         error_time = (time.time() - start_time) * 1000 if 'start_time' in locals() else 0
-        print(f"❌ [HOT_DOCS] 获取热门文档失败 ({error_time:.2f}ms): {str(e)}")
+        logger.error("❌ [HOT_DOCS] 获取热门文档失败 (%.2fms): %s", error_time, e)
 
         # 🛡️ 优雅降级：缓存服务异常时使用原有服务
-        print(f"🔄 [HOT_DOCS] 尝试使用原有服务作为降级方案...")
+        logger.info("🔄 [HOT_DOCS] 尝试直接查询数据库作为降级方案...")
         try:
-            service = TechSquareService(db)
-            fallback_result = service.get_hot_documents(limit)
+            service = AsyncTechSquareService(db)
+            fallback_result = await service.get_hot_documents(limit)
 
-            print(f"✅ [HOT_DOCS] 降级方案成功")
+            logger.info("✅ [HOT_DOCS] 降级方案成功")
 
             # 添加降级信息
             if hasattr(fallback_result, '__dict__'):
@@ -433,15 +501,16 @@ async def get_hot_documents(
             return fallback_result
 
         except Exception as fallback_error:
-            print(f"❌ [HOT_DOCS] 降级方案也失败: {str(fallback_error)}")
+            logger.error("❌ [HOT_DOCS] 降级方案也失败: %s", fallback_error)
             raise HTTPException(
                 status_code=500,
                 detail=f"获取热门文档失败: {str(e)}，降级方案也失败: {str(fallback_error)}"
             )
 @router.get("/latest-documents", response_model=HotDocumentsResponse)
+@_live_view_counts("documents")
 async def get_latest_documents(
         limit: int = Query(10, ge=1, le=50, description="返回数量"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取最新发布文档（Redis缓存优化版）
@@ -454,18 +523,18 @@ async def get_latest_documents(
     - ✅ 优雅降级：Redis不可用时直接查询数据库
     - ✅ 详细性能监控和调试信息
     """
-    print("📅 [LATEST_DOCS] 开始获取最新文档（缓存版）")
-    print(f"📅 [LATEST_DOCS] 查询参数: limit={limit}")
+    logger.debug("📅 [LATEST_DOCS] 开始获取最新文档（缓存版）")
+    logger.debug("📅 [LATEST_DOCS] 查询参数: limit=%s", limit)
 
     try:
         start_time = time.time()
 
         # 🚀 使用缓存服务获取最新文档
-        def query_function(**kwargs):
+        async def query_function(**kwargs):
             """实际的数据库查询函数"""
-            print(f"🗄️ [LATEST_DOCS] 执行数据库查询...")
-            service = TechSquareService(db)
-            return service.get_latest_documents(kwargs['limit'])
+            logger.debug("🗄️ [LATEST_DOCS] 执行数据库查询...")
+            service = AsyncTechSquareService(kwargs.get('db') or db)
+            return await service.get_latest_documents(kwargs['limit'])
 
         result = await hot_data_cache_service.get_latest_documents(
             db=db,
@@ -477,9 +546,9 @@ async def get_latest_documents(
 
         # 添加路由层的调试信息
         is_cached = result.get("cache_info", {}).get("cached", False) if result else False
-        print(f"📅 [LATEST_DOCS] 最新文档获取完成，总耗时: {total_time:.2f}ms")
-        print(f"📅 [LATEST_DOCS] 缓存状态: {'命中' if is_cached else '未命中'}")
-        print(f"📅 [LATEST_DOCS] 返回结果: {len(result.get('documents', [])) if result else 0}条")
+        logger.debug("📅 [LATEST_DOCS] 最新文档获取完成，总耗时: %.2fms", total_time)
+        log_sampled(logger, logging.DEBUG, "📅 [LATEST_DOCS] 缓存状态: %s", '命中' if is_cached else '未命中')
+        logger.debug("📅 [LATEST_DOCS] 返回结果: %s条", len(result.get('documents', [])) if result else 0)
 
         # 添加路由层的性能信息
         if result:
@@ -492,27 +561,24 @@ async def get_latest_documents(
             }
 
         if is_cached:
-            print(f"✅ [LATEST_DOCS] 缓存命中! 总耗时: {total_time:.2f}ms")
+            log_sampled(logger, logging.DEBUG, "✅ [LATEST_DOCS] 缓存命中! 总耗时: %.2fms", total_time)
         else:
-            print(f"🔄 [LATEST_DOCS] 缓存未命中，已查询数据库并写入缓存")
+            log_sampled(logger, logging.DEBUG, "🔄 [LATEST_DOCS] 缓存未命中，已查询数据库并写入缓存")
 
-        # 转换为响应模型
-        if isinstance(result, dict):
-            return HotDocumentsResponse(**result)
-        else:
-            return result
+        # 直接返回dict，由 response_model 转换：_live_view_counts 要在转换前读取快照中的 _view_marks
+        return result
 
     except Exception as e:
         error_time = (time.time() - start_time) * 1000 if 'start_time' in locals() else 0
-        print(f"❌ [LATEST_DOCS] 获取最新文档失败 ({error_time:.2f}ms): {str(e)}")
+        logger.error("❌ [LATEST_DOCS] 获取最新文档失败 (%.2fms): %s", error_time, e)
 
         # 🛡️ 优雅降级：缓存服务异常时使用原有服务
-        print(f"🔄 [LATEST_DOCS] 尝试使用原有服务作为降级方案...")
+        logger.info("🔄 [LATEST_DOCS] 尝试直接查询数据库作为降级方案...")
         try:
-            service = TechSquareService(db)
-            fallback_result = service.get_latest_documents(limit)
+            service = AsyncTechSquareService(db)
+            fallback_result = await service.get_latest_documents(limit)
 
-            print(f"✅ [LATEST_DOCS] 降级方案成功")
+            logger.info("✅ [LATEST_DOCS] 降级方案成功")
 
             # 添加降级信息
             if hasattr(fallback_result, '__dict__'):
@@ -525,14 +591,14 @@ async def get_latest_documents(
             return fallback_result
 
         except Exception as fallback_error:
-            print(f"❌ [LATEST_DOCS] 降级方案也失败: {str(fallback_error)}")
+            logger.error("❌ [LATEST_DOCS] 降级方案也失败: %s", fallback_error)
             raise HTTPException(
                 status_code=500,
                 detail=f"获取最新文档失败: {str(e)}，降级方案也失败: {str(fallback_error)}"
             )
 
 @router.get("/stats", response_model=TechSquareStatsResponse)
-async def get_tech_square_stats(db: Session = Depends(get_db)):
+async def get_tech_square_stats(db: AsyncSession = Depends(get_async_db)):
     """
     获取技术广场统计信息（Redis缓存优化版）
 
@@ -547,20 +613,21 @@ async def get_tech_square_stats(db: Session = Depends(get_db)):
     - ✅ 优雅降级：Redis不可用时直接查询数据库
     - ✅ 详细性能监控和调试信息
     """
-    print("🏛️ [TECH_SQUARE_STATS] 开始获取技术广场统计数据（缓存版）")
+    logger.debug("🏛️ [TECH_SQUARE_STATS] 开始获取技术广场统计数据（缓存版）")
 
     try:
         start_time = time.time()
 
         # 🚀 使用缓存服务获取统计数据
         result = await tech_square_stats_cache_service.get_tech_square_stats(db)
+        await _apply_unique_visitors(result)
 
         total_time = (time.time() - start_time) * 1000
 
         # 添加路由层的调试信息
         is_cached = result.get("cache_info", {}).get("cached", False)
-        print(f"🏛️ [TECH_SQUARE_STATS] 统计数据获取完成，总耗时: {total_time:.2f}ms")
-        print(f"🏛️ [TECH_SQUARE_STATS] 缓存状态: {'命中' if is_cached else '未命中'}")
+        logger.debug("🏛️ [TECH_SQUARE_STATS] 统计数据获取完成，总耗时: %.2fms", total_time)
+        log_sampled(logger, logging.DEBUG, "🏛️ [TECH_SQUARE_STATS] 缓存状态: %s", '命中' if is_cached else '未命中')
 
         # 添加路由层的性能信息
         result["_route_debug_info"] = {
@@ -571,29 +638,30 @@ async def get_tech_square_stats(db: Session = Depends(get_db)):
         }
 
         if is_cached:
-            print(f"✅ [TECH_SQUARE_STATS] 缓存命中! 总耗时: {total_time:.2f}ms")
+            log_sampled(logger, logging.DEBUG, "✅ [TECH_SQUARE_STATS] 缓存命中! 总耗时: %.2fms", total_time)
         else:
-            print(f"🔄 [TECH_SQUARE_STATS] 缓存未命中，已查询数据库并写入缓存")
+            log_sampled(logger, logging.DEBUG, "🔄 [TECH_SQUARE_STATS] 缓存未命中，已查询数据库并写入缓存")
 
         return result
 
     except Exception as e:
         error_time = (time.time() - start_time) * 1000 if 'start_time' in locals() else 0
-        print(f"❌ [TECH_SQUARE_STATS] 获取统计信息失败 ({error_time:.2f}ms): {str(e)}")
+        logger.error("❌ [TECH_SQUARE_STATS] 获取统计信息失败 (%.2fms): %s", error_time, e)
 
         # 🛡️ 优雅降级：缓存服务异常时使用原有服务
-        print(f"🔄 [TECH_SQUARE_STATS] 尝试使用原有服务作为降级方案...")
+        logger.info("🔄 [TECH_SQUARE_STATS] 尝试直接查询数据库作为降级方案...")
         try:
-            service = TechSquareService(db)
-            fallback_result = service.get_tech_square_stats()
+            service = AsyncTechSquareService(db)
+            fallback_result = await service.get_tech_square_stats()
 
-            print(f"✅ [TECH_SQUARE_STATS] 降级方案成功")
+            logger.info("✅ [TECH_SQUARE_STATS] 降级方案成功")
 
             # 添加降级信息
             if hasattr(fallback_result, '__dict__'):
                 fallback_dict = fallback_result.__dict__
             else:
                 fallback_dict = fallback_result
+            await _apply_unique_visitors(fallback_dict)
 
             fallback_dict["_fallback_info"] = {
                 "used_fallback": True,
@@ -604,7 +672,7 @@ async def get_tech_square_stats(db: Session = Depends(get_db)):
             return fallback_dict
 
         except Exception as fallback_error:
-            print(f"❌ [TECH_SQUARE_STATS] 降级方案也失败: {str(fallback_error)}")
+            logger.error("❌ [TECH_SQUARE_STATS] 降级方案也失败: %s", fallback_error)
             raise HTTPException(
                 status_code=500,
                 detail=f"获取统计信息失败: {str(e)}，降级方案也失败: {str(fallback_error)}"
@@ -612,21 +680,29 @@ async def get_tech_square_stats(db: Session = Depends(get_db)):
 @router.post("/view/{document_id}")
 async def increment_view_count(
         document_id: int,
-        db: Session = Depends(get_db)
+        req: Request,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Optional = Depends(get_optional_current_user_async)
 ):
     """
     增加文档浏览量
 
-    用于前端访问文档时调用
+    用于前端访问文档时调用：
+    - 同一访客（登录用户ID，或 IP + User-Agent）在去重窗口内重复浏览只计一次，重复请求不产生任何写入
+    - 新浏览计入独立访客（HyperLogLog），浏览量只写入Redis缓冲（一次 HINCRBY），后台任务批量写回数据库
+    - 不存在或未发布的文档返回404，不写入任何Redis数据（避免任意ID产生永久的HLL和计数字段）
     """
     try:
-        service = TechSquareService(db)
-        success = service.increment_view_count(document_id)
-
-        if not success:
+        if not await AsyncTechSquareService(db).is_published(document_id):
             raise HTTPException(status_code=404, detail="文档不存在或未发布")
 
-        return {"status": "success", "message": "浏览量已增加"}
+        visitor = visitor_id(current_user.id if current_user else None,
+                             req.client.host if req.client else None, req.headers.get("user-agent"))
+        if not await unique_view_service.record_document_view(document_id, visitor):
+            return {"status": "success", "message": "重复浏览，未计数", "counted": False}
+
+        await view_counter_service.increment(document_id)
+        return {"status": "success", "message": "浏览量已增加", "counted": True}
 
     except HTTPException:
         raise
@@ -9,6 +9,7 @@ class SortOption(str, Enum):
     LATEST = "latest"
     POPULAR = "popular"
     RECOMMENDED = "recommended"
+    RELEVANCE = "relevance"  # 按全文检索相关度（BM25），仅在有搜索关键词时生效
 
 
 class TimeFilter(str, Enum):
@@ -33,6 +34,8 @@ class DocumentListRequest(BaseModel):
     file_type: Optional[FileTypeFilter] = Field(None, description="文件类型筛选")
     time_filter: Optional[TimeFilter] = Field(None, description="时间筛选")
     sort_by: SortOption = Field(SortOption.LATEST, description="排序方式")
+    cursor: Optional[str] = Field(None, description="游标（传入时使用游标分页，忽略page）")
+    include_total: bool = Field(True, description="是否返回总数（false时不执行COUNT）")
 
 
 class SearchRequest(BaseModel):
@@ -41,6 +44,8 @@ class SearchRequest(BaseModel):
     page: int = Field(1, ge=1, description="页码")
     size: int = Field(20, ge=1, le=50, description="每页数量")
     file_type: Optional[FileTypeFilter] = Field(None, description="文件类型筛选")
+    cursor: Optional[str] = Field(None, description="游标（传入时使用游标分页，忽略page）")
+    include_total: bool = Field(True, description="是否返回总数（false时不执行COUNT）")
 
 
 # 🆕 用户信息模型
@@ -75,12 +80,14 @@ class DocumentItemResponse(BaseModel):
 class DocumentListResponse(BaseModel):
     """文档列表响应模型"""
     documents: List[DocumentItemResponse]
-    total: int
-    page: int
+    total: Optional[int] = Field(None, description="总数（游标分页模式或 include_total=false 时不计算）")
+    total_approximate: bool = Field(False, description="总数是否为近似值（超过精确统计上限）")
+    page: Optional[int] = Field(None, description="页码（游标分页模式为空）")
     size: int
-    total_pages: int
+    total_pages: Optional[int] = Field(None, description="总页数（游标分页模式不计算）")
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = Field(None, description="下一页游标（没有下一页时为空）")
 
 
 class DocumentDetailResponse(BaseModel):
@@ -121,6 +128,9 @@ class TechSquareStatsResponse(BaseModel):
     today_published: int = Field(..., description="今日发布数")
     featured_count: int = Field(..., description="精选文档数")
     category_stats: CategoryStatsResponse
+    unique_visitors: Optional[int] = Field(None, description="累计独立访客数（HyperLogLog估算，Redis不可用时为空）")
+    today_unique_visitors: Optional[int] = Field(None, description="今日独立访客数")
+    week_unique_visitors: Optional[int] = Field(None, description="近7天独立访客数")
 
 # 在文件末尾添加以下新的响应模型
 
@@ -0,0 +1,295 @@
+# app/modules/v2/tech_square/search_index.py
+"""
+技术广场全文检索：倒排索引 + BM25 排序
+
+代替 title LIKE '%kw%' OR summary LIKE '%kw%' 的全表扫描：
+- us_search_postings:  倒排表，主键 (term, document_id)，按词取倒排链是主键范围扫描，
+                       查询耗时与命中文档数相关，与已发布文档总数无关
+- us_search_documents: 已索引文档及其加权长度（BM25 长度归一化）
+- us_search_stats:     单行统计（文档数、总长度），建索引时增量维护，查询时不需要扫描全表求平均长度
+
+索引范围：已发布文档的标题、摘要、正文（Markdown 内容、PDF 提取文本），分词见 core/text_search.py
+增量更新：发布、撤回、更新已发布文档时调用 search_index_service.schedule_sync（提交后在线程池中建索引），
+          删除文档时在同一事务内调用 remove_document
+全量重建：python -m app.modules.v2.tech_square.search_index rebuild
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+import PyPDF2
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import (
+    BigInteger, Column, DateTime, ForeignKey, Index, Integer, String, delete, func, insert, select, true, update
+)
+from sqlalchemy.orm import Session
+
+from ....core.config import settings
+from ....core.database import Base, SessionLocal
+from ....core.log import get_logger
+from ....core.redis.services import cache_invalidation_service
+from ....core.text_search import (
+    BM25_B, BM25_K1, CONTENT_WEIGHT, MAX_TERM_LENGTH, SUMMARY_WEIGHT, TITLE_WEIGHT, term_frequencies
+)
+from ..document_manager.models import Document
+from ..document_publish.models import PublishRecord
+
+logger = get_logger(__name__)
+
+# 统计表只有一行
+STATS_ROW_ID = 1
+
+
+class SearchPosting(Base):
+    """倒排表：检索词 → 文档"""
+    __tablename__ = "us_search_postings"
+
+    # 二进制排序规则：检索词按字节比较，避免 unicode_ci 把不同的词判为重复主键
+    term = Column(String(MAX_TERM_LENGTH, collation="utf8mb4_bin"), primary_key=True, comment="检索词")
+    document_id = Column(Integer, ForeignKey("us_documents.id", ondelete="CASCADE"), primary_key=True)
+    tf = Column(Integer, nullable=False, comment="字段加权词频")
+
+    __table_args__ = (
+        Index('idx_document_id', 'document_id'),
+    )
+
+
+class SearchDocument(Base):
+    """已索引文档"""
+    __tablename__ = "us_search_documents"
+
+    document_id = Column(Integer, ForeignKey("us_documents.id", ondelete="CASCADE"), primary_key=True)
+    length = Column(Integer, nullable=False, default=0, comment="字段加权文档长度")
+    indexed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SearchStats(Base):
+    """索引统计（单行）"""
+    __tablename__ = "us_search_stats"
+
+    id = Column(Integer, primary_key=True)
+    doc_count = Column(Integer, nullable=False, default=0, comment="已索引文档数")
+    total_length = Column(BigInteger, nullable=False, default=0, comment="加权文档长度之和")
+
+
+def search_scores_subquery(terms: List[str]):
+    """
+    BM25 打分子查询：(document_id, score)，只包含命中全部检索词的文档
+
+    score = Σ idf(t) · tf · (k1 + 1) / (tf + k1 · (1 - b + b · len / avgdl))
+    idf(t) = ln(1 + (N - df + 0.5) / (df + 0.5))
+    """
+    stats = select(
+        SearchStats.doc_count,
+        (SearchStats.total_length * 1.0 / func.nullif(SearchStats.doc_count, 0)).label("avgdl")
+    ).where(SearchStats.id == STATS_ROW_ID).subquery("search_stats")
+
+    doc_freq = select(
+        SearchPosting.term,
+        func.count().label("df")
+    ).where(SearchPosting.term.in_(terms)).group_by(SearchPosting.term).subquery("search_df")
+
+    idf = func.ln(1 + (stats.c.doc_count - doc_freq.c.df + 0.5) / (doc_freq.c.df + 0.5))
+    length_norm = 1 - BM25_B + BM25_B * SearchDocument.length / stats.c.avgdl
+    score = func.sum(idf * SearchPosting.tf * (BM25_K1 + 1) / (SearchPosting.tf + BM25_K1 * length_norm))
+
+    return select(
+        SearchPosting.document_id,
+        # 保留6位小数：游标分页按分数比较，避免浮点尾数误差
+        func.round(score, 6).label("score")
+    ).join(
+        doc_freq, doc_freq.c.term == SearchPosting.term
+    ).join(
+        SearchDocument, SearchDocument.document_id == SearchPosting.document_id
+    ).join(
+        stats, true()
+    ).where(
+        SearchPosting.term.in_(terms)
+    ).group_by(
+        SearchPosting.document_id
+    ).having(
+        func.count() == len(terms)
+    ).subquery("search_scores")
+
+
+class SearchIndexService:
+    """倒排索引维护服务"""
+
+    def __init__(self):
+        self.max_content_chars = settings.SEARCH_CONTENT_MAX_CHARS
+        self._pending = set()  # 进行中的后台索引任务（保留引用，避免任务被回收）
+
+    def schedule_sync(self, document_id: int):
+        """
+        在业务事务提交后调度一次 sync_document，不阻塞事件循环
+
+        有运行中的事件循环时（async 路由内）放到线程池执行，使用独立的数据库会话；
+        否则（同步路由的工作线程、脚本）直接执行。索引写入后再递增搜索相关缓存的版本号，
+        避免索引完成之前的旧搜索结果被缓存到下次失效
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._sync_in_session(document_id)
+            return
+
+        task = loop.create_task(run_in_threadpool(self._sync_in_session, document_id))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _sync_in_session(self, document_id: int):
+        with SessionLocal() as session:
+            if self.sync_document(session, document_id):
+                cache_invalidation_service.on_search_index_changed()
+
+    def sync_document(self, db: Session, document_id: int) -> bool:
+        """
+        按文档当前的发布状态更新索引：已发布则（重新）建索引，否则移出索引
+
+        在业务事务提交之后调用；索引失败只记录日志，不影响发布流程（可用 rebuild 修复）
+        """
+        try:
+            document = db.query(Document).join(
+                PublishRecord, Document.id == PublishRecord.document_id
+            ).filter(
+                Document.id == document_id,
+                PublishRecord.publish_status == 'published'
+            ).first()
+
+            if document:
+                self._index(db, document)
+            else:
+                self.remove_document(db, document_id)
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.error("❌ [SEARCH_INDEX] 文档 %s 索引更新失败: %s", document_id, e)
+            return False
+
+    def remove_document(self, db: Session, document_id: int):
+        """把文档移出索引（不提交，随调用方的事务一起提交）"""
+        indexed = db.get(SearchDocument, document_id)
+        if not indexed:
+            return
+
+        db.execute(delete(SearchPosting).where(SearchPosting.document_id == document_id))
+        self._adjust_stats(db, -1, -indexed.length)
+        db.delete(indexed)
+        db.flush()
+
+    def rebuild(self, db: Session, batch_size: int = 200) -> int:
+        """清空并重建全部已发布文档的索引，返回索引文档数"""
+        db.execute(delete(SearchPosting))
+        db.execute(delete(SearchDocument))
+        db.execute(delete(SearchStats))
+        db.commit()
+
+        document_ids = db.execute(
+            select(PublishRecord.document_id).where(PublishRecord.publish_status == 'published')
+        ).scalars().all()
+
+        for start in range(0, len(document_ids), batch_size):
+            batch = document_ids[start:start + batch_size]
+            for document in db.query(Document).filter(Document.id.in_(batch)).all():
+                self._index(db, document)
+            db.commit()
+            logger.info("🔍 [SEARCH_INDEX] 重建进度: %s/%s", min(start + batch_size, len(document_ids)),
+                        len(document_ids))
+
+        return len(document_ids)
+
+    def _index(self, db: Session, document: Document):
+        frequencies, length = term_frequencies([
+            (document.title, TITLE_WEIGHT),
+            (document.summary, SUMMARY_WEIGHT),
+            (self.extract_text(document), CONTENT_WEIGHT),
+        ])
+
+        db.execute(delete(SearchPosting).where(SearchPosting.document_id == document.id))
+        if frequencies:
+            db.execute(insert(SearchPosting), [
+                {"term": term, "document_id": document.id, "tf": tf} for term, tf in frequencies.items()
+            ])
+
+        indexed = db.get(SearchDocument, document.id)
+        if indexed:
+            self._adjust_stats(db, 0, length - indexed.length)
+            indexed.length = length
+            indexed.indexed_at = datetime.utcnow()
+        else:
+            self._adjust_stats(db, 1, length)
+            db.add(SearchDocument(document_id=document.id, length=length))
+        db.flush()
+
+        logger.debug("🔍 [SEARCH_INDEX] 文档 %s 已索引: %s 个词, 长度 %s", document.id, len(frequencies), length)
+
+    @staticmethod
+    def _adjust_stats(db: Session, doc_delta: int, length_delta: int):
+        """增量更新统计行（原子加减，多个worker同时建索引也不会丢失更新）"""
+        result = db.execute(
+            update(SearchStats).where(SearchStats.id == STATS_ROW_ID).values(
+                doc_count=SearchStats.doc_count + doc_delta,
+                total_length=SearchStats.total_length + length_delta
+            )
+        )
+        if result.rowcount == 0:
+            db.add(SearchStats(id=STATS_ROW_ID, doc_count=max(doc_delta, 0), total_length=max(length_delta, 0)))
+            db.flush()
+
+    def extract_text(self, document: Document) -> str:
+        """正文文本：Markdown 取内容字段（为空时读取上传文件），PDF 提取文字；最多 max_content_chars 个字符"""
+        if document.file_type == 'pdf':
+            return self._extract_pdf_text(document.file_path)
+
+        if document.content:
+            return document.content[:self.max_content_chars]
+
+        if document.file_path and os.path.exists(document.file_path):
+            try:
+                with open(document.file_path, encoding='utf-8', errors='ignore') as f:
+                    return f.read(self.max_content_chars)
+            except OSError as e:
+                logger.warning("⚠️ [SEARCH_INDEX] 读取文件失败 %s: %s", document.file_path, e)
+        return ""
+
+    def _extract_pdf_text(self, file_path: Optional[str]) -> str:
+        if not file_path or not os.path.exists(file_path):
+            return ""
+
+        parts = []
+        size = 0
+        try:
+            with open(file_path, 'rb') as file:
+                for page in PyPDF2.PdfReader(file).pages:
+                    text = page.extract_text() or ""
+                    parts.append(text)
+                    size += len(text)
+                    if size >= self.max_content_chars:
+                        break
+        except Exception as e:
+            # 加密或损坏的PDF：只索引标题和摘要
+            logger.warning("⚠️ [SEARCH_INDEX] PDF文本提取失败 %s: %s", file_path, e)
+        return "".join(parts)[:self.max_content_chars]
+
+
+# 全局实例
+search_index_service = SearchIndexService()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("用法: python -m app.modules.v2.tech_square.search_index rebuild")
+        sys.exit(1)
+
+    from ...v1.user_register.models import User  # noqa: F401  注册外键引用的表
+
+    session = SessionLocal()
+    try:
+        count = search_index_service.rebuild(session)
+    finally:
+        session.close()
+    cache_invalidation_service.on_search_index_changed()
+    print(f"✅ 索引重建完成: {count} 篇已发布文档")
@@ -1,10 +1,14 @@
 # app/modules/v2/tech_square/services.py
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy import func, desc
 
 from .models import TechSquareQueries
+from ....core.pagination import decode_cursor, page_cursor, slice_page
+from ....core.redis.services import count_cache_service, view_counter_service
+from ....core.redis.tags import PUBLIC_LIST_NAMESPACE
 from .schemas import (
     DocumentListRequest, DocumentListResponse, DocumentItemResponse,
     DocumentDetailResponse, CategoryStatsResponse, HotDocumentsResponse,
@@ -15,6 +19,7 @@ from ..document_manager.models import Document  # 修改这行
 from ..document_publish.models import PublishRecord  # 修改这行
 from ...v1.user_register.models import User  # 修改这行
 
+import hashlib
 import urllib.parse
 import re
 import mimetypes
@@ -72,74 +77,6 @@ class TechSquareService:
         # 这里需要根据TechSquareQueries的实现来适配筛选条件
         return enhanced_query
 
-    def _build_document_query_with_filters(self, search=None, file_type=None, time_filter=None, sort_by="latest"):
-        """
-        构建带筛选条件的文档查询（包含用户信息）
-        """
-        # 基础查询：JOIN Document + PublishRecord + User
-        query = self.db.query(
-            Document.id,
-            Document.title,
-            Document.summary,
-            Document.file_type,
-            Document.user_id,
-            User.username,
-            User.nickname,
-            PublishRecord.publish_time,
-            PublishRecord.view_count,
-            PublishRecord.is_featured
-        ).join(
-            PublishRecord, Document.id == PublishRecord.document_id
-        ).join(
-            User, Document.user_id == User.id
-        ).filter(
-            PublishRecord.publish_status == 'published'
-        )
-
-        # 🔍 搜索筛选
-        if search:
-            search_pattern = f"%{search}%"
-            query = query.filter(
-                (Document.title.like(search_pattern)) |
-                (Document.summary.like(search_pattern))
-            )
-
-        # 📁 文件类型筛选
-        if file_type:
-            query = query.filter(Document.file_type == file_type)
-
-        # 📅 时间筛选
-        if time_filter:
-            now = datetime.utcnow()
-            if time_filter == "today":
-                start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                query = query.filter(PublishRecord.publish_time >= start_time)
-            elif time_filter == "week":
-                start_time = now - timedelta(days=7)
-                query = query.filter(PublishRecord.publish_time >= start_time)
-            elif time_filter == "month":
-                start_time = now - timedelta(days=30)
-                query = query.filter(PublishRecord.publish_time >= start_time)
-
-        # 📊 排序
-        if sort_by == "popular":
-            query = query.order_by(desc(PublishRecord.view_count))
-        elif sort_by == "recommended":
-            # 推荐算法：最近3天的文档获得加成
-            recent_threshold = datetime.utcnow() - timedelta(days=3)
-            query = query.order_by(
-                desc(
-                    func.case(
-                        (PublishRecord.publish_time >= recent_threshold, PublishRecord.view_count + 100),
-                        else_=PublishRecord.view_count
-                    )
-                )
-            )
-        else:  # latest
-            query = query.order_by(desc(PublishRecord.publish_time))
-
-        return query
-
     # ==================== 🆕 文件访问功能 ====================
 
     @staticmethod
@@ -369,49 +306,19 @@ class TechSquareService:
         2. 执行分页查询
         3. 组装响应数据
         """
-        # 🆕 使用新的查询方法，包含用户信息
-        query = self._build_document_query_with_filters(
-            search=request.search,
-            file_type=request.file_type.value if request.file_type else None,
-            time_filter=request.time_filter.value if request.time_filter else None,
-            sort_by=request.sort_by.value
-        )
+        sort_by = request.sort_by.value
+        if request.cursor:
+            after = decode_cursor(request.cursor, _cursor_kind(sort_by))
+            rows = self.db.execute(_document_list_select(request, after).limit(request.size + 1)).all()
+            return _build_cursor_response(rows, request.size, sort_by)
 
-        # 计算总数
-        total = query.count()
+        stmt = _document_list_select(request)
 
-        # 分页查询
+        total, approximate = self._total(stmt, _list_count_signature(request), request.include_total)
         offset = (request.page - 1) * request.size
-        documents = query.offset(offset).limit(request.size).all()
-
-        # 🆕 转换为响应模型（包含用户信息）
-        document_items = []
-        for doc in documents:
-            document_items.append(DocumentItemResponse(
-                id=doc.id,
-                title=doc.title,
-                summary=doc.summary or "暂无摘要",
-                file_type=doc.file_type,
-                user_id=doc.user_id,
-                username=doc.username,  # 🆕 用户名
-                nickname=doc.nickname,  # 🆕 昵称
-                publish_time=doc.publish_time,
-                view_count=doc.view_count,
-                is_featured=doc.is_featured
-            ))
-
-        # 计算分页信息
-        total_pages = (total + request.size - 1) // request.size
-
-        return DocumentListResponse(
-            documents=document_items,
-            total=total,
-            page=request.page,
-            size=request.size,
-            total_pages=total_pages,
-            has_next=request.page < total_pages,
-            has_prev=request.page > 1
-        )
+        rows = self.db.execute(stmt.offset(offset).limit(request.size + 1)).all()
+
+        return _build_list_response(rows, total, approximate, request.page, request.size, sort_by)
 
     def get_document_detail(self, document_id: int) -> Optional[DocumentDetailResponse]:
         """
@@ -422,46 +329,8 @@ class TechSquareService:
         2. 返回完整文档信息（包含用户信息）
         3. 不在此处增加浏览量（由专门接口处理）
         """
-        # 🆕 JOIN查询获取文档、发布信息和用户信息
-        result = self.db.query(
-            Document.id,
-            Document.title,
-            Document.content,
-            Document.summary,
-            Document.file_type,
-            Document.file_path,
-            Document.user_id,
-            User.username,  # 🆕 用户名
-            User.nickname,  # 🆕 昵称
-            PublishRecord.publish_time,
-            PublishRecord.view_count,
-            PublishRecord.is_featured
-        ).join(
-            PublishRecord, Document.id == PublishRecord.document_id
-        ).join(
-            User, Document.user_id == User.id  # 🆕 JOIN用户表
-        ).filter(
-            Document.id == document_id,
-            PublishRecord.publish_status == 'published'
-        ).first()
-
-        if not result:
-            return None
-
-        return DocumentDetailResponse(
-            id=result.id,
-            title=result.title,
-            content=result.content,
-            summary=result.summary,
-            file_type=result.file_type,
-            file_path=result.file_path,
-            user_id=result.user_id,
-            username=result.username,  # 🆕 用户名
-            nickname=result.nickname,  # 🆕 昵称
-            publish_time=result.publish_time,
-            view_count=result.view_count,
-            is_featured=result.is_featured
-        )
+        result = self.db.execute(TechSquareQueries.document_detail_select(document_id)).first()
+        return _to_detail_response(result) if result else None
 
     def search_documents(self, request: SearchRequest) -> DocumentListResponse:
         """
@@ -472,163 +341,267 @@ class TechSquareService:
         2. 摘要内容匹配次之
         3. 按相关度排序
         """
-        # 🆕 使用新的查询方法，包含用户信息
-        query = self._build_document_query_with_filters(
-            search=request.keyword,
-            file_type=request.file_type.value if request.file_type else None,
-            sort_by="latest"  # 搜索结果按最新排序
-        )
+        if request.cursor:
+            after = decode_cursor(request.cursor, _cursor_kind(SEARCH_SORT))
+            rows = self.db.execute(_search_select(request, after).limit(request.size + 1)).all()
+            return _build_cursor_response(rows, request.size, SEARCH_SORT)
 
-        # 分页处理
-        total = query.count()
+        stmt = _search_select(request)
+
+        total, approximate = self._total(stmt, _search_count_signature(request), request.include_total)
         offset = (request.page - 1) * request.size
-        documents = query.offset(offset).limit(request.size).all()
-
-        # 🆕 组装响应（包含用户信息）
-        document_items = [
-            DocumentItemResponse(
-                id=doc.id,
-                title=doc.title,
-                summary=doc.summary or "暂无摘要",
-                file_type=doc.file_type,
-                user_id=doc.user_id,
-                username=doc.username,  # 🆕 用户名
-                nickname=doc.nickname,  # 🆕 昵称
-                publish_time=doc.publish_time,
-                view_count=doc.view_count,
-                is_featured=doc.is_featured
-            )
-            for doc in documents
-        ]
-
-        total_pages = (total + request.size - 1) // request.size
-
-        return DocumentListResponse(
-            documents=document_items,
-            total=total,
-            page=request.page,
-            size=request.size,
-            total_pages=total_pages,
-            has_next=request.page < total_pages,
-            has_prev=request.page > 1
+        rows = self.db.execute(stmt.offset(offset).limit(request.size + 1)).all()
+
+        return _build_list_response(rows, total, approximate, request.page, request.size, SEARCH_SORT)
+
+    def _total(self, stmt, signature: str, include_total: bool) -> Tuple[Optional[int], bool]:
+        """列表总数（按筛选条件缓存，超过上限为近似值）；不需要总数时返回 (None, False)"""
+        if not include_total:
+            return None, False
+        return count_cache_service.get_total_sync(
+            PUBLIC_LIST_NAMESPACE, signature,
+            lambda cap: self.db.execute(TechSquareQueries.count_select(stmt, cap)).scalar_one()
         )
 
     def get_category_stats(self) -> CategoryStatsResponse:
         """获取分类统计信息"""
         stats = TechSquareQueries.get_category_stats(self.db)
-
-        return CategoryStatsResponse(
-            md_count=stats.get('md', 0),
-            pdf_count=stats.get('pdf', 0),
-            total_count=stats.get('md', 0) + stats.get('pdf', 0)
-        )
+        return _to_category_response(stats)
 
     def get_hot_documents(self, limit: int = 10) -> HotDocumentsResponse:
         """获取热门文档 🆕 包含用户信息"""
-        # 🆕 使用新的查询方法，包含用户信息
-        query = self._build_document_query_with_filters(sort_by="popular")
-        documents = query.limit(limit).all()
-
-        document_items = [
-            DocumentItemResponse(
-                id=doc.id,
-                title=doc.title,
-                summary=doc.summary or "暂无摘要",
-                file_type=doc.file_type,
-                user_id=doc.user_id,
-                username=doc.username,  # 🆕 用户名
-                nickname=doc.nickname,  # 🆕 昵称
-                publish_time=doc.publish_time,
-                view_count=doc.view_count,
-                is_featured=doc.is_featured
-            )
-            for doc in documents
-        ]
-
-        return HotDocumentsResponse(documents=document_items)
+        stmt = TechSquareQueries.document_list_select(sort_by="popular").limit(limit)
+        documents = self.db.execute(stmt).all()
+        return HotDocumentsResponse(documents=[_to_document_item(doc) for doc in documents])
 
     def get_latest_documents(self, limit: int = 10) -> HotDocumentsResponse:
         """获取最新发布文档 🆕 包含用户信息"""
-        # 🆕 使用新的查询方法，包含用户信息
-        query = self._build_document_query_with_filters(sort_by="latest")
-        documents = query.limit(limit).all()
-
-        document_items = [
-            DocumentItemResponse(
-                id=doc.id,
-                title=doc.title,
-                summary=doc.summary or "暂无摘要",
-                file_type=doc.file_type,
-                user_id=doc.user_id,
-                username=doc.username,  # 🆕 用户名
-                nickname=doc.nickname,  # 🆕 昵称
-                publish_time=doc.publish_time,
-                view_count=doc.view_count,
-                is_featured=doc.is_featured
-            )
-            for doc in documents
-        ]
-
-        return HotDocumentsResponse(documents=document_items)
+        stmt = TechSquareQueries.document_list_select(sort_by="latest").limit(limit)
+        documents = self.db.execute(stmt).all()
+        return HotDocumentsResponse(documents=[_to_document_item(doc) for doc in documents])
 
     def get_tech_square_stats(self) -> TechSquareStatsResponse:
         """获取技术广场统计信息"""
-        # 总发布文档数
-        total_documents = self.db.query(PublishRecord).filter(
-            PublishRecord.publish_status == 'published'
-        ).count()
-
-        # 总浏览量
-        total_views = self.db.query(
-            func.sum(PublishRecord.view_count)
-        ).filter(
-            PublishRecord.publish_status == 'published'
-        ).scalar() or 0
-
-        # 今日发布数
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_published = self.db.query(PublishRecord).filter(
-            PublishRecord.publish_status == 'published',
-            PublishRecord.publish_time >= today_start
-        ).count()
-
-        # 精选文档数
-        featured_count = self.db.query(PublishRecord).filter(
-            PublishRecord.publish_status == 'published',
-            PublishRecord.is_featured == True
-        ).count()
-
-        # 分类统计
-        category_stats = self.get_category_stats()
-
-        return TechSquareStatsResponse(
-            total_documents=total_documents,
-            total_views=int(total_views),
-            today_published=today_published,
-            featured_count=featured_count,
-            category_stats=category_stats
-        )
+        stats = self.db.execute(TechSquareQueries.published_stats_select()).one()
+        return _to_tech_square_stats(stats, self.get_category_stats())
 
     def increment_view_count(self, document_id: int) -> bool:
         """
         增加文档浏览量
 
-        业务逻辑：
-        1. 验证文档是否已发布
-        2. 原子性更新浏览量
-        3. 返回操作结果
+        浏览量先写入Redis缓冲，由后台任务批量写回数据库（见 view_counter.py），
+        不再每次浏览都 SELECT + UPDATE + COMMIT；不存在或未发布的文档返回False，不写缓冲
         """
-        # 查找发布记录
-        publish_record = self.db.query(PublishRecord).filter(
-            PublishRecord.document_id == document_id,
-            PublishRecord.publish_status == 'published'
-        ).first()
-
-        if not publish_record:
+        if not self.db.execute(TechSquareQueries.published_exists_select(document_id)).scalar():
             return False
+        view_counter_service.increment_sync(document_id)
+        return True
+
+
+class AsyncTechSquareService:
+    """
+    技术广场只读查询（AsyncSession 版）
+
+    与 TechSquareService 共用 TechSquareQueries 的语句和响应组装，
+    查询通过 await 执行，慢SQL不会阻塞worker的事件循环
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_document_list(self, request: DocumentListRequest) -> DocumentListResponse:
+        """获取文档列表（分页 + 筛选 + 搜索）"""
+        sort_by = request.sort_by.value
+        if request.cursor:
+            after = decode_cursor(request.cursor, _cursor_kind(sort_by))
+            return await self._cursor_page(_document_list_select(request, after), request.size, sort_by)
+        signature = _list_count_signature(request) if request.include_total else None
+        return await self._paginate(_document_list_select(request), request.page, request.size, sort_by, signature)
+
+    async def search_documents(self, request: SearchRequest) -> DocumentListResponse:
+        """搜索文档"""
+        if request.cursor:
+            after = decode_cursor(request.cursor, _cursor_kind(SEARCH_SORT))
+            return await self._cursor_page(_search_select(request, after), request.size, SEARCH_SORT)
+        signature = _search_count_signature(request) if request.include_total else None
+        return await self._paginate(_search_select(request), request.page, request.size, SEARCH_SORT, signature)
+
+    async def get_document_detail(self, document_id: int) -> Optional[DocumentDetailResponse]:
+        """获取已发布文档详情"""
+        result = (await self.db.execute(TechSquareQueries.document_detail_select(document_id))).first()
+        return _to_detail_response(result) if result else None
+
+    async def is_published(self, document_id: int) -> bool:
+        """文档是否已发布"""
+        return bool((await self.db.execute(TechSquareQueries.published_exists_select(document_id))).scalar())
+
+    async def get_hot_documents(self, limit: int = 10) -> HotDocumentsResponse:
+        """获取热门文档"""
+        stmt = TechSquareQueries.document_list_select(sort_by="popular").limit(limit)
+        documents = (await self.db.execute(stmt)).all()
+        return HotDocumentsResponse(documents=[_to_document_item(doc) for doc in documents])
+
+    async def get_latest_documents(self, limit: int = 10) -> HotDocumentsResponse:
+        """获取最新发布文档"""
+        stmt = TechSquareQueries.document_list_select(sort_by="latest").limit(limit)
+        documents = (await self.db.execute(stmt)).all()
+        return HotDocumentsResponse(documents=[_to_document_item(doc) for doc in documents])
+
+    async def get_category_stats(self) -> CategoryStatsResponse:
+        """获取分类统计信息"""
+        rows = (await self.db.execute(TechSquareQueries.category_stats_select())).all()
+        return _to_category_response(TechSquareQueries.category_stats_from_rows(rows))
+
+    async def get_tech_square_stats(self) -> TechSquareStatsResponse:
+        """获取技术广场统计信息"""
+        stats = (await self.db.execute(TechSquareQueries.published_stats_select())).one()
+        return _to_tech_square_stats(stats, await self.get_category_stats())
 
-        # 增加浏览量
-        publish_record.view_count += 1
-        self.db.commit()
+    async def _paginate(self, stmt, page: int, size: int, sort_by: str,
+                        count_signature: Optional[str]) -> DocumentListResponse:
+        """页码分页；count_signature 为空时不统计总数"""
+        total, approximate = None, False
+        if count_signature is not None:
+            async def count(cap: int) -> int:
+                return (await self.db.execute(TechSquareQueries.count_select(stmt, cap))).scalar_one()
 
-        return True
\ No newline at end of file
+            total, approximate = await count_cache_service.get_total(PUBLIC_LIST_NAMESPACE, count_signature, count)
+
+        rows = (await self.db.execute(stmt.offset((page - 1) * size).limit(size + 1))).all()
+        return _build_list_response(rows, total, approximate, page, size, sort_by)
+
+    async def _cursor_page(self, stmt, size: int, sort_by: str) -> DocumentListResponse:
+        """游标分页：多取一行判断是否有下一页，不计算总数"""
+        rows = (await self.db.execute(stmt.limit(size + 1))).all()
+        return _build_cursor_response(rows, size, sort_by)
+
+
+# ==================== 查询语句与响应组装（同步/异步服务共用） ====================
+
+# 搜索结果按相关度（BM25）排序；SEARCH_ENGINE=like 时退回按最新排序
+SEARCH_SORT = "relevance"
+
+
+def _document_list_select(request: DocumentListRequest, after=None):
+    return TechSquareQueries.document_list_select(
+        search=request.search,
+        file_type=request.file_type.value if request.file_type else None,
+        time_filter=request.time_filter.value if request.time_filter else None,
+        sort_by=request.sort_by.value,
+        after=after
+    )
+
+
+def _search_select(request: SearchRequest, after=None):
+    return TechSquareQueries.document_list_select(
+        search=request.keyword,
+        file_type=request.file_type.value if request.file_type else None,
+        sort_by=SEARCH_SORT,
+        after=after
+    )
+
+
+def _list_count_signature(request: DocumentListRequest) -> str:
+    """总数缓存的筛选条件签名（与页码、每页数量、排序无关）"""
+    return _count_signature(
+        request.search,
+        request.file_type.value if request.file_type else None,
+        request.time_filter.value if request.time_filter else None
+    )
+
+
+def _search_count_signature(request: SearchRequest) -> str:
+    # 与同条件的列表筛选语句相同，共用同一个总数
+    return _count_signature(request.keyword, request.file_type.value if request.file_type else None, None)
+
+
+def _count_signature(search: Optional[str], file_type: Optional[str], time_filter: Optional[str]) -> str:
+    search_hash = hashlib.md5(search.encode("utf-8")).hexdigest()[:12] if search else "none"
+    return f"tech_square:q{search_hash}:t{file_type or 'none'}:time{time_filter or 'none'}"
+
+
+def _cursor_kind(sort_by: str) -> str:
+    return f"tech_square:{sort_by}"
+
+
+def _sort_key(row) -> Tuple[Any, int]:
+    return row.sort_key, row.record_id
+
+
+def _to_document_item(doc) -> DocumentItemResponse:
+    return DocumentItemResponse(
+        id=doc.id,
+        title=doc.title,
+        summary=doc.summary or "暂无摘要",
+        file_type=doc.file_type,
+        user_id=doc.user_id,
+        username=doc.username,  # 🆕 用户名
+        nickname=doc.nickname,  # 🆕 昵称
+        publish_time=doc.publish_time,
+        view_count=doc.view_count,
+        is_featured=doc.is_featured
+    )
+
+
+def _build_list_response(rows, total: Optional[int], approximate: bool, page: int, size: int,
+                         sort_by: str) -> DocumentListResponse:
+    """页码分页响应：rows 多取一行，用于在不依赖总数的情况下判断是否有下一页"""
+    documents = rows[:size]
+    has_next = len(rows) > size
+    return DocumentListResponse(
+        documents=[_to_document_item(doc) for doc in documents],
+        total=total,
+        total_approximate=approximate,
+        page=page,
+        size=size,
+        total_pages=(total + size - 1) // size if total is not None else None,
+        has_next=has_next,
+        has_prev=page > 1,
+        next_cursor=page_cursor(documents, has_next, _cursor_kind(sort_by), _sort_key)
+    )
+
+
+def _build_cursor_response(rows, size: int, sort_by: str) -> DocumentListResponse:
+    documents, has_next, next_cursor = slice_page(rows, size, _cursor_kind(sort_by), _sort_key)
+    return DocumentListResponse(
+        documents=[_to_document_item(doc) for doc in documents],
+        size=size,
+        has_next=has_next,
+        has_prev=True,
+        next_cursor=next_cursor
+    )
+
+
+def _to_detail_response(result) -> DocumentDetailResponse:
+    return DocumentDetailResponse(
+        id=result.id,
+        title=result.title,
+        content=result.content,
+        summary=result.summary,
+        file_type=result.file_type,
+        file_path=result.file_path,
+        user_id=result.user_id,
+        username=result.username,
+        nickname=result.nickname,
+        publish_time=result.publish_time,
+        view_count=result.view_count,
+        is_featured=result.is_featured
+    )
+
+
+def _to_category_response(stats: Dict[str, int]) -> CategoryStatsResponse:
+    return CategoryStatsResponse(
+        md_count=stats.get('md', 0),
+        pdf_count=stats.get('pdf', 0),
+        total_count=stats.get('md', 0) + stats.get('pdf', 0)
+    )
+
+
+def _to_tech_square_stats(stats, category_stats: CategoryStatsResponse) -> TechSquareStatsResponse:
+    return TechSquareStatsResponse(
+        total_documents=stats.total_documents,
+        total_views=int(stats.total_views or 0),
+        today_published=stats.today_published,
+        featured_count=stats.featured_count,
+        category_stats=category_stats
+    )
@@ -1,7 +1,32 @@
 #!/usr/bin/env python3
 """
 性能测试脚本
+
+用法：
+    python performance_test.py                         # 多端口 /api/health 并发测试
+    python performance_test.py db --save after.json    # 数据库读接口并发吞吐（单worker）
+    python performance_test.py compare before.json after.json
+    python performance_test.py paging --pages 1,100,1000,10000  # 深翻页：页码分页 vs 游标分页
+    python performance_test.py search --keywords 数据库,redis   # 全文检索：LIKE vs 倒排索引
+
+db 模式说明：
+- 用单worker启动服务（uvicorn app.main:app --port 8100 --workers 1），结果即为每个worker的吞吐
+- 对每个数据库读接口并发压测，同时用一个探测线程持续请求 /api/health：
+  同步查询阻塞事件循环时，探测请求会排在慢查询后面，探测延迟明显升高
+- 在改造前后的代码上各跑一次并 --save，再用 compare 对比
+
+paging 模式说明：
+- 对每个页深，先请求上一页（页码模式）拿到 next_cursor，再分别计时：
+  页码分页 ?page=N 与游标分页 ?cursor=...，游标分页的耗时应不随页深增长
+- 需要足够的已发布文档（建议百万级）才能看出差别
+
+search 模式说明：
+- 在本进程内直接执行技术广场搜索语句（不经过HTTP和缓存），对比 LIKE 与倒排索引（BM25）的每秒查询数
+- 使用 .env 中的 DATABASE_URL，需先重建索引：python -m app.modules.v2.tech_square.search_index rebuild
+- LIKE 只匹配标题和摘要，倒排索引还包含正文，两者的命中数会不同
 """
+import argparse
+import json
 import requests
 import time
 import threading
@@ -105,5 +130,235 @@ def test_performance():
             print("   ❌ 测试失败")
 
 
+# ==================== 数据库读接口并发吞吐 ====================
+
+def db_read_endpoints(document_id, share_code=None):
+    """改造为异步会话的读接口（技术广场 / 互动 / 分享）"""
+    endpoints = {
+        "tech_square_detail": f"/api/v2/tech_square/documents/{document_id}",
+        "tech_square_search": "/api/v2/tech_square/search?keyword=test",
+        "interaction_like_status": f"/api/v2/interaction/documents/{document_id}/like-status",
+        "interaction_comments": f"/api/v2/interaction/documents/{document_id}/comments",
+        "interaction_stats": f"/api/v2/interaction/documents/{document_id}/stats",
+    }
+    if share_code:
+        endpoints["share_public"] = f"/api/v2/share_system/public/{share_code}"
+    return endpoints
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _probe_health(base_url, stop_event, latencies):
+    """探测线程：持续请求 /api/health，记录事件循环的排队延迟"""
+    while not stop_event.is_set():
+        elapsed = test_single_request(f"{base_url}/api/health")
+        if elapsed is not None:
+            latencies.append(elapsed)
+        time.sleep(0.02)
+
+
+def run_endpoint_load(base_url, path, threads, requests_count):
+    """并发压测单个接口，同时探测 /api/health 延迟"""
+    url = f"{base_url}{path}"
+    response_times = []
+    probe_latencies = []
+    stop_event = threading.Event()
+    probe = threading.Thread(target=_probe_health, args=(base_url, stop_event, probe_latencies), daemon=True)
+
+    probe.start()
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for result in executor.map(lambda _: test_single_request(url), range(requests_count)):
+            if result is not None:
+                response_times.append(result)
+    total_time = time.time() - start_time
+    stop_event.set()
+    probe.join()
+
+    return {
+        "threads": threads,
+        "requests": requests_count,
+        "success_rate": round(len(response_times) / requests_count * 100, 1),
+        "qps": round(len(response_times) / total_time, 1) if total_time > 0 else 0.0,
+        "avg_ms": round(statistics.mean(response_times) * 1000, 1) if response_times else 0.0,
+        "p95_ms": round(_percentile(response_times, 95) * 1000, 1),
+        "health_probe_p95_ms": round(_percentile(probe_latencies, 95) * 1000, 1),
+        "health_probe_max_ms": round(max(probe_latencies) * 1000, 1) if probe_latencies else 0.0,
+    }
+
+
+def test_db_concurrency(base_url, document_id, share_code, threads_list, requests_per_thread):
+    """数据库读接口并发吞吐测试（单worker），返回可保存的结果"""
+    print("🧪 数据库读接口并发测试（单worker）")
+    print("=" * 50)
+
+    if test_single_request(f"{base_url}/api/health") is None:
+        print(f"❌ {base_url} 不可用")
+        return None
+
+    results = {"base_url": base_url, "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "endpoints": {}}
+    for name, path in db_read_endpoints(document_id, share_code).items():
+        results["endpoints"][name] = []
+        for threads in threads_list:
+            stats = run_endpoint_load(base_url, path, threads, threads * requests_per_thread)
+            results["endpoints"][name].append(stats)
+            print(f"🔄 {name} x{threads}: QPS {stats['qps']}, 平均 {stats['avg_ms']}ms, "
+                  f"P95 {stats['p95_ms']}ms, health探测P95 {stats['health_probe_p95_ms']}ms")
+
+    return results
+
+
+# ==================== 深翻页：页码分页 vs 游标分页 ====================
+
+def _timed_get(url, params):
+    start_time = time.time()
+    response = requests.get(url, params=params, timeout=60)
+    response.raise_for_status()
+    return (time.time() - start_time) * 1000, response.json()
+
+
+def test_deep_paging(base_url, pages, size, sort_by, repeat):
+    """技术广场列表在不同页深下的耗时对比"""
+    print(f"🧪 深翻页测试 (sort={sort_by}, size={size})")
+    print("=" * 50)
+    print(f"{'页深':>8}{'页码分页ms':>14}{'游标分页ms':>14}")
+
+    url = f"{base_url}/api/v2/tech_square/documents"
+    for page in pages:
+        cursor_times = []
+        cursor = None
+        if page > 1:
+            _, previous = _timed_get(url, {"page": page - 1, "size": size, "sort_by": sort_by})
+            cursor = previous.get("next_cursor")
+            if not cursor:
+                print(f"{page:>8}  超出数据范围，停止")
+                break
+
+        # 页码模式走缓存，只有首次请求是数据库耗时，因此只计一次（压测前请先清空缓存）
+        offset_ms, _ = _timed_get(url, {"page": page, "size": size, "sort_by": sort_by})
+        # 游标模式不经过缓存，取多次的中位数
+        for _ in range(repeat if cursor else 0):
+            elapsed, _ = _timed_get(url, {"cursor": cursor, "size": size, "sort_by": sort_by})
+            cursor_times.append(elapsed)
+
+        cursor_ms = f"{statistics.median(cursor_times):.1f}" if cursor_times else "-"
+        print(f"{page:>8}{offset_ms:>14.1f}{cursor_ms:>14}")
+
+
+# ==================== 全文检索：LIKE vs 倒排索引 ====================
+
+def _statement_qps(session, stmt, duration):
+    count = 0
+    start_time = time.time()
+    while time.time() - start_time < duration:
+        session.execute(stmt).all()
+        count += 1
+    return count / (time.time() - start_time)
+
+
+def test_search_engines(keywords, size, duration):
+    """技术广场搜索第一页（含总数）在两种实现下的每秒查询数"""
+    from app.core.database import SessionLocal
+    from app.modules.v2.interaction import models as _interaction_models  # noqa: F401  文档模型的关联表
+    from app.modules.v2.share_system import models as _share_models  # noqa: F401
+    from app.modules.v2.tech_square.models import TechSquareQueries
+
+    print(f"🧪 全文检索测试 (size={size}, 每项 {duration}s)")
+    print("=" * 50)
+    print(f"{'关键词':<16}{'LIKE命中':>10}{'LIKE QPS':>10}{'索引命中':>10}{'索引 QPS':>10}{'提升':>8}")
+
+    session = SessionLocal()
+    try:
+        for keyword in keywords:
+            results = {}
+            for engine in ("like", "index"):
+                stmt = TechSquareQueries.document_list_select(search=keyword, sort_by="relevance", search_engine=engine)
+                total = session.execute(TechSquareQueries.count_select(stmt)).scalar_one()
+                page_qps = _statement_qps(session, stmt.limit(size), duration)
+                results[engine] = (total, page_qps)
+
+            (like_total, like_qps), (index_total, index_qps) = results["like"], results["index"]
+            speedup = f"{index_qps / like_qps:.1f}x" if like_qps else "-"
+            print(f"{keyword:<16}{like_total:>10}{like_qps:>10.1f}{index_total:>10}{index_qps:>10.1f}{speedup:>8}")
+    finally:
+        session.close()
+
+
+def compare_results(before_path, after_path):
+    """对比两次 db 模式的结果"""
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+
+    print(f"📊 对比: {before_path} → {after_path}")
+    print(f"{'接口':<28}{'并发':>6}{'QPS前':>10}{'QPS后':>10}{'变化':>9}{'探测P95前':>12}{'探测P95后':>12}")
+    for name, after_runs in after["endpoints"].items():
+        before_runs = {run["threads"]: run for run in before["endpoints"].get(name, [])}
+        for run in after_runs:
+            old = before_runs.get(run["threads"])
+            if not old:
+                continue
+            change = f"{(run['qps'] / old['qps'] - 1) * 100:+.0f}%" if old["qps"] else "-"
+            print(f"{name:<28}{run['threads']:>6}{old['qps']:>10}{run['qps']:>10}{change:>9}"
+                  f"{old['health_probe_p95_ms']:>12}{run['health_probe_p95_ms']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FastAPI性能测试")
+    subparsers = parser.add_subparsers(dest="mode")
+
+    db_parser = subparsers.add_parser("db", help="数据库读接口并发吞吐（单worker）")
+    db_parser.add_argument("--base-url", default="http://localhost:8100")
+    db_parser.add_argument("--document-id", type=int, default=1, help="已发布文档ID")
+    db_parser.add_argument("--share-code", default=None, help="公开分享码（可选）")
+    db_parser.add_argument("--threads", default="1,10,50", help="并发数列表，逗号分隔")
+    db_parser.add_argument("--requests-per-thread", type=int, default=20)
+    db_parser.add_argument("--save", default=None, help="结果保存为JSON")
+
+    compare_parser = subparsers.add_parser("compare", help="对比两次 db 模式结果")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    paging_parser = subparsers.add_parser("paging", help="深翻页：页码分页 vs 游标分页")
+    paging_parser.add_argument("--base-url", default="http://localhost:8100")
+    paging_parser.add_argument("--pages", default="1,10,100,1000,10000", help="页深列表，逗号分隔")
+    paging_parser.add_argument("--size", type=int, default=20)
+    paging_parser.add_argument("--sort-by", default="latest", choices=["latest", "popular", "recommended"])
+    paging_parser.add_argument("--repeat", type=int, default=3, help="游标分页重复次数")
+
+    search_parser = subparsers.add_parser("search", help="全文检索：LIKE vs 倒排索引")
+    search_parser.add_argument("--keywords", default="数据库,redis,性能优化,fastapi", help="关键词列表，逗号分隔")
+    search_parser.add_argument("--size", type=int, default=20)
+    search_parser.add_argument("--duration", type=float, default=5, help="每个关键词每种实现的测试时长（秒）")
+
+    args = parser.parse_args()
+
+    if args.mode == "db":
+        threads_list = [int(item) for item in args.threads.split(",") if item.strip()]
+        results = test_db_concurrency(args.base_url, args.document_id, args.share_code,
+                                      threads_list, args.requests_per_thread)
+        if results and args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"💾 结果已保存: {args.save}")
+    elif args.mode == "paging":
+        pages = [int(item) for item in args.pages.split(",") if item.strip()]
+        test_deep_paging(args.base_url, pages, args.size, args.sort_by, args.repeat)
+    elif args.mode == "search":
+        keywords = [item.strip() for item in args.keywords.split(",") if item.strip()]
+        test_search_engines(keywords, args.size, args.duration)
+    elif args.mode == "compare":
+        compare_results(args.before, args.after)
+    else:
+        test_performance()
+
+
 if __name__ == "__main__":
-    test_performance()
\ No newline at end of file
+    main()
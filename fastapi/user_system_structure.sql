@@ -87,6 +87,7 @@ CREATE TABLE `us_document_comments` (
   `parent_id` int DEFAULT NULL,
   `content` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
   `is_deleted` tinyint(1) DEFAULT '0',
+  `reply_count` int NOT NULL DEFAULT '0',
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
@@ -94,6 +95,8 @@ CREATE TABLE `us_document_comments` (
   KEY `idx_user_id` (`user_id`),
   KEY `idx_parent_id` (`parent_id`),
   KEY `idx_created_at` (`created_at`),
+  KEY `idx_document_parent_created` (`document_id`,`parent_id`,`created_at`,`id`),
+  KEY `idx_parent_created` (`parent_id`,`created_at`,`id`),
   CONSTRAINT `us_document_comments_ibfk_1` FOREIGN KEY (`document_id`) REFERENCES `us_documents` (`id`) ON DELETE CASCADE,
   CONSTRAINT `us_document_comments_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `us_users` (`id`) ON DELETE CASCADE,
   CONSTRAINT `us_document_comments_ibfk_3` FOREIGN KEY (`parent_id`) REFERENCES `us_document_comments` (`id`) ON DELETE CASCADE
@@ -117,6 +120,7 @@ CREATE TABLE `us_document_favorites` (
   KEY `idx_document_id` (`document_id`),
   KEY `idx_user_id` (`user_id`),
   KEY `idx_created_at` (`created_at`),
+  KEY `idx_user_created` (`user_id`,`created_at`,`id`),
   CONSTRAINT `us_document_favorites_ibfk_1` FOREIGN KEY (`document_id`) REFERENCES `us_documents` (`id`) ON DELETE CASCADE,
   CONSTRAINT `us_document_favorites_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `us_users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=70 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -233,6 +237,7 @@ CREATE TABLE `us_documents` (
   KEY `idx_publish_time` (`publish_time`),
   KEY `idx_documents_title_content` (`title`,`content`(100)),
   KEY `idx_documents_status_publish_time` (`status`,`publish_time` DESC),
+  KEY `idx_documents_user_updated` (`user_id`,`updated_at`,`id`),
   CONSTRAINT `us_documents_ibfk_1` FOREIGN KEY (`folder_id`) REFERENCES `us_folders` (`id`) ON DELETE SET NULL,
   CONSTRAINT `us_documents_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `us_users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=110 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -349,6 +354,8 @@ CREATE TABLE `us_publish_records` (
   KEY `idx_publish_time` (`publish_time`),
   KEY `idx_publish_records_status_time` (`publish_status`,`publish_time` DESC),
   KEY `idx_publish_records_view_count` (`view_count` DESC),
+  KEY `idx_publish_records_status_time_id` (`publish_status`,`publish_time`,`id`),
+  KEY `idx_publish_records_status_views_id` (`publish_status`,`view_count`,`id`),
   CONSTRAINT `us_publish_records_ibfk_1` FOREIGN KEY (`document_id`) REFERENCES `us_documents` (`id`) ON DELETE CASCADE,
   CONSTRAINT `us_publish_records_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `us_users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=35 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -377,6 +384,54 @@ CREATE TABLE `us_review_rules` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `us_search_documents`
+--
+
+DROP TABLE IF EXISTS `us_search_documents`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `us_search_documents` (
+  `document_id` int NOT NULL,
+  `length` int NOT NULL DEFAULT '0' COMMENT '字段加权文档长度',
+  `indexed_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`document_id`),
+  CONSTRAINT `us_search_documents_ibfk_1` FOREIGN KEY (`document_id`) REFERENCES `us_documents` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `us_search_postings`
+--
+
+DROP TABLE IF EXISTS `us_search_postings`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `us_search_postings` (
+  `term` varchar(32) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL COMMENT '检索词',
+  `document_id` int NOT NULL,
+  `tf` int NOT NULL COMMENT '字段加权词频',
+  PRIMARY KEY (`term`,`document_id`),
+  KEY `idx_document_id` (`document_id`),
+  CONSTRAINT `us_search_postings_ibfk_1` FOREIGN KEY (`document_id`) REFERENCES `us_documents` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `us_search_stats`
+--
+
+DROP TABLE IF EXISTS `us_search_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `us_search_stats` (
+  `id` int NOT NULL,
+  `doc_count` int NOT NULL DEFAULT '0' COMMENT '已索引文档数',
+  `total_length` bigint NOT NULL DEFAULT '0' COMMENT '加权文档长度之和',
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `us_share_access_logs`
 --
@@ -403,6 +458,46 @@ CREATE TABLE `us_share_access_logs` (
 ) ENGINE=InnoDB AUTO_INCREMENT=16 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `us_share_access_logs_archive`
+--
+
+DROP TABLE IF EXISTS `us_share_access_logs_archive`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `us_share_access_logs_archive` (
+  `id` int NOT NULL,
+  `share_id` int NOT NULL,
+  `visitor_ip` varchar(45) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  `visitor_user_agent` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci,
+  `visitor_user_id` int DEFAULT NULL,
+  `access_type` varchar(20) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
+  `access_result` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci DEFAULT 'success',
+  `accessed_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_share_id` (`share_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `us_share_daily_stats`
+--
+
+DROP TABLE IF EXISTS `us_share_daily_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `us_share_daily_stats` (
+  `share_id` int NOT NULL,
+  `day` date NOT NULL COMMENT '日期（UTC）',
+  `views` int NOT NULL DEFAULT '0' COMMENT '访问次数',
+  `downloads` int NOT NULL DEFAULT '0' COMMENT '下载次数',
+  `unique_visitors` int NOT NULL DEFAULT '0' COMMENT '当日独立访客数',
+  PRIMARY KEY (`share_id`,`day`),
+  KEY `idx_day` (`day`),
+  CONSTRAINT `us_share_daily_stats_ibfk_1` FOREIGN KEY (`share_id`) REFERENCES `us_document_shares` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `us_upload_records`
 --
@@ -435,6 +530,27 @@ CREATE TABLE `us_upload_records` (
 ) ENGINE=InnoDB AUTO_INCREMENT=68 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='文件上传记录表';
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `us_user_interaction_stats`
+--
+
+DROP TABLE IF EXISTS `us_user_interaction_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `us_user_interaction_stats` (
+  `user_id` int NOT NULL,
+  `likes_given` int NOT NULL DEFAULT '0',
+  `favorites_given` int NOT NULL DEFAULT '0',
+  `comments_given` int NOT NULL DEFAULT '0',
+  `likes_received` int NOT NULL DEFAULT '0',
+  `favorites_received` int NOT NULL DEFAULT '0',
+  `comments_received` int NOT NULL DEFAULT '0',
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`user_id`),
+  CONSTRAINT `us_user_interaction_stats_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `us_users` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `us_users`
 --
@@ -0,0 +1,160 @@
+"""
+文档管理查询次数回归测试脚本
+功能：统计文件夹树、文档列表构建时执行的SQL语句数量，确认语句数不随文件夹/文档数量增长（防止N+1查询回归）
+
+运行方式（在 fastapi 目录下，使用内存SQLite，不需要启动服务和MySQL）：
+    python 测试脚本/v2测试脚本/test_document_manager_query_count.py
+"""
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+# 导入全部模型，保证关系映射完整
+from app.modules.v1.user_register.models import User
+from app.modules.v2.document_manager.models import Document, Folder
+from app.modules.v2.document_manager.services import DocumentService, FolderService
+from app.modules.v2.document_publish.models import PublishRecord
+from app.modules.v2.interaction import models as _interaction_models  # noqa: F401
+from app.modules.v2.share_system import models as _share_models  # noqa: F401
+from app.modules.v2.tech_square import search_index as _search_index  # noqa: F401
+
+# 测试规模：每一档的文件夹数和文档数
+SIZES = [50, 200, 400]
+PAGE_SIZE = 20
+
+
+class QueryCounter:
+    """通过 before_cursor_execute 事件统计实际发往数据库的语句数量"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements: List[str] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    @contextmanager
+    def counting(self):
+        self.count = 0
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def build_fixture(n: int):
+    """建一个内存库：1个用户，n个文件夹（两级树），n篇文档（半数在文件夹内，部分已发布）"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Folder.__table__, Document.__table__, PublishRecord.__table__
+    ])
+    session = sessionmaker(bind=engine)()
+
+    session.add(User(id=1, username="query_count", email="query_count@example.com", password_hash="x"))
+    session.flush()
+
+    roots = n // 5
+    folders = []
+    for i in range(n):
+        parent = folders[i % roots] if i >= roots else None
+        folder = Folder(name=f"文件夹{i}", user_id=1, parent_id=parent.id if parent else None,
+                        level=3 if parent else 2)
+        session.add(folder)
+        session.flush()
+        folders.append(folder)
+
+    now = datetime(2024, 1, 1)
+    documents = []
+    for i in range(n):
+        documents.append(Document(
+            title=f"文档{i}", content="# 内容", file_type="md", status="draft", user_id=1,
+            folder_id=folders[i].id if i % 2 == 0 else None,
+            created_at=now, updated_at=now + timedelta(minutes=i % 37)
+        ))
+    session.add_all(documents)
+    session.flush()
+
+    session.add_all([
+        PublishRecord(document_id=doc.id, user_id=1, publish_status="published")
+        for doc in documents[::3]
+    ])
+    session.commit()
+    return engine, session, folders, documents
+
+
+def measure(n: int) -> Dict[str, int]:
+    """在规模 n 下统计各个构建函数的语句数"""
+    engine, session, folders, documents = build_fixture(n)
+    # 在计数前取出ID，避免 expire_all 后访问属性触发的刷新语句被计入
+    folder_id, document_id = folders[0].id, documents[0].id
+    counter = QueryCounter(engine)
+    counts = {}
+
+    def run(name, func):
+        session.expire_all()
+        with counter.counting():
+            result = func()
+        counts[name] = counter.count
+        return result
+
+    tree = run("folder_tree", lambda: FolderService.get_folder_tree(session, 1))
+    assert len(tree) == n // 5, f"根文件夹数量不对: {len(tree)}"
+
+    page = run("document_list", lambda: DocumentService.get_documents_list(session, 1, page_size=PAGE_SIZE))
+    assert len(page.documents) == PAGE_SIZE and page.total == n
+
+    run("document_list_folder", lambda: DocumentService.get_documents_list(
+        session, 1, folder_id=folder_id, page_size=PAGE_SIZE))
+
+    run("document_list_root", lambda: DocumentService.get_documents_list(
+        session, 1, folder_id=0, page_size=PAGE_SIZE))
+
+    next_page = run("document_list_cursor", lambda: DocumentService.get_documents_list(
+        session, 1, page_size=PAGE_SIZE, cursor=page.next_cursor))
+    assert not {doc.id for doc in page.documents} & {doc.id for doc in next_page.documents}, "游标翻页出现重复"
+
+    run("document_detail", lambda: DocumentService.get_document(session, document_id, 1))
+
+    session.close()
+    engine.dispose()
+    return counts
+
+
+def main():
+    """主函数"""
+    print("🚀 文档管理查询次数回归测试")
+    print("=" * 50)
+
+    results = {}
+    for n in SIZES:
+        results[n] = measure(n)
+        print(f"📊 文件夹/文档数 {n}: {results[n]}")
+
+    failed = []
+    baseline = results[SIZES[0]]
+    for name, expected in baseline.items():
+        observed = [results[n][name] for n in SIZES]
+        if any(count != expected for count in observed):
+            failed.append(name)
+            print(f"❌ {name}: 语句数随数据量变化 {observed}")
+        else:
+            print(f"✅ {name}: 固定 {expected} 条语句")
+
+    assert not failed, f"查询次数随数据量增长（疑似N+1回归）: {failed}"
+    print("\n🎯 测试完成!")
+
+
+if __name__ == "__main__":
+    main()
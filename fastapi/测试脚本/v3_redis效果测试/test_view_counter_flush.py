@@ -0,0 +1,119 @@
+"""
+浏览量写回回落测试脚本
+功能：缓存的技术广场列表快照在浏览量写回数据库之后，接口返回的 view_count 不应低于写回之前
+
+按路由的真实路径执行：回源函数 stamp 快照 → _live_view_counts 合并增量 → response_model 转换；
+写库替换为内存字典，Redis 使用测试专用的Key（需要本地Redis，配置同 .env）
+
+运行方式（在 fastapi 目录下）：
+    python 测试脚本/v3_redis效果测试/test_view_counter_flush.py
+"""
+import asyncio
+import copy
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.core.redis.async_client import async_redis_client
+from app.core.redis.services.view_counter import view_counter_service
+from app.modules.v2.tech_square.routes import _live_view_counts
+from app.modules.v2.tech_square.schemas import DocumentListResponse
+
+DOCUMENT_IDS = [910001, 910002]
+
+# 模拟的数据库浏览量
+database: Dict[int, int] = {910001: 100, 910002: 50}
+
+
+async def fake_write(deltas: Dict[int, int]):
+    """代替写库：增量加到内存字典"""
+    for document_id, delta in deltas.items():
+        database[document_id] += delta
+
+
+def load_page() -> dict:
+    """模拟回源：从"数据库"读出一页文档"""
+    return {
+        "documents": [
+            {"id": document_id, "title": f"文档{document_id}", "summary": None, "file_type": "md",
+             "user_id": 1, "username": "view_test", "publish_time": datetime(2024, 1, 1),
+             "view_count": database[document_id]}
+            for document_id in DOCUMENT_IDS
+        ],
+        "total": len(DOCUMENT_IDS), "page": 1, "size": 20, "total_pages": 1, "has_next": False, "has_prev": False
+    }
+
+
+async def serve(snapshot: dict) -> List[int]:
+    """按路由路径返回一次缓存快照，得到客户端看到的浏览量"""
+    @_live_view_counts("documents")
+    async def route():
+        return copy.deepcopy(snapshot)  # 与缓存命中一样，每次拿到独立副本
+
+    response = DocumentListResponse.model_validate(await route())
+    return [document.view_count for document in response.documents]
+
+
+async def run() -> bool:
+    service = view_counter_service
+    service.buffer_key = "test:views:pending"
+    service.flushing_key = "test:views:flushing"
+    service.flushed_key = "test:views:flushed"
+    service.flush_gen_key = "test:views:flush_gen"
+    service._write = fake_write
+    await async_redis_client.delete(service.buffer_key, service.flushing_key, service.flushed_key,
+                                    service.flush_gen_key)
+
+    ok = True
+
+    def check(name: str, observed: List[int], expected: List[int]):
+        nonlocal ok
+        passed = observed == expected
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} {name}: {observed}（期望 {expected}）")
+
+    try:
+        for _ in range(3):
+            await service.increment(DOCUMENT_IDS[0])
+        await service.increment(DOCUMENT_IDS[1])
+
+        # 缓存快照：回源读库后 stamp
+        snapshot = load_page()
+        await service.stamp(snapshot, "documents")
+        check("写回前", await serve(snapshot), [103, 51])
+
+        # 写库与提交之间读取
+        async def write_and_check(deltas):
+            check("写回进行中", await serve(snapshot), [103, 51])
+            await fake_write(deltas)
+
+        service._write = write_and_check
+        await service.flush()
+        service._write = fake_write
+        check("写回后（旧快照）", await serve(snapshot), [103, 51])
+        check("写回后（新快照）", await serve(load_page()), [103, 51])
+
+        await service.increment(DOCUMENT_IDS[0])
+        await service.flush()
+        check("第二次写回后（旧快照）", await serve(snapshot), [104, 51])
+    finally:
+        await async_redis_client.delete(service.buffer_key, service.flushing_key, service.flushed_key,
+                                        service.flush_gen_key)
+    return ok
+
+
+def main():
+    """主函数"""
+    print("🚀 浏览量写回回落测试")
+    print("=" * 50)
+
+    ok = asyncio.run(run())
+    assert ok, "缓存快照的浏览量在写回后回落"
+    print("\n🎯 测试完成!")
+
+
+if __name__ == "__main__":
+    main()